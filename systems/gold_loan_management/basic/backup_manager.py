@@ -608,6 +608,26 @@ class BackupManager:
             print(f"Error setting backup locations: {e}")
             return False
     
+    def _copy_database(self, source_path: str, dest_path: str) -> None:
+        """
+        Copy a SQLite database with the online backup API.
+
+        The live database runs in WAL mode, so a plain file copy can miss
+        committed pages still sitting in the -wal file. The backup API reads a
+        consistent snapshot without blocking the cashier's writes, and when the
+        destination is the live database it writes through SQLite so other
+        open connections see the restored data.
+        """
+        src = sqlite3.connect(str(source_path))
+        try:
+            dst = sqlite3.connect(str(dest_path))
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+        finally:
+            src.close()
+
     def get_backup_locations(self) -> tuple:
         """Get configured backup locations"""
         loc1 = self.config.get('backup_location1', str(self.default_backup_dir1))
@@ -645,7 +665,7 @@ class BackupManager:
                 try:
                     Path(loc_path).mkdir(parents=True, exist_ok=True)
                     backup_file = Path(loc_path) / backup_name
-                    shutil.copy2(str(self.db_full_path), str(backup_file))
+                    self._copy_database(str(self.db_full_path), str(backup_file))
                     self.last_backup_path = str(backup_file)
                     self.last_backup_name = backup_file.name
                     created_any = True
@@ -912,15 +932,19 @@ class BackupManager:
                     return False
             
             # Close any open connections to the database
-            # (This would need to be coordinated with the app)
+            try:
+                from database import close_all_connections
+                close_all_connections()
+            except ImportError:
+                pass
             
             # Create a safety backup of current database
             current_backup = self.db_full_path.parent / f"backup_pre_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
             if self.db_full_path.exists():
-                shutil.copy2(str(self.db_full_path), str(current_backup))
+                self._copy_database(str(self.db_full_path), str(current_backup))
             
             # Restore from backup
-            shutil.copy2(str(actual_backup_path), str(self.db_full_path))
+            self._copy_database(str(actual_backup_path), str(self.db_full_path))
             
             # Clean up temp decrypted file if created
             if temp_decrypted and Path(temp_decrypted).exists():
@@ -934,7 +958,7 @@ class BackupManager:
             for loc_path in [loc1, loc2]:
                 try:
                     dest = Path(loc_path) / self.db_file
-                    shutil.copy2(str(self.db_full_path), str(dest))
+                    self._copy_database(str(self.db_full_path), str(dest))
                 except Exception as e:
                     print(f"Error updating backup location {loc_path}: {e}")
             
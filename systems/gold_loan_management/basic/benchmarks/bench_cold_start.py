@@ -0,0 +1,52 @@
+"""Cold-start cost of init_database() on a large shop database.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--loans 50000] [--repeat 20]
+
+"up to date" is the normal app start: init_database() reads PRAGMA
+user_version and finds nothing to do. "every-start schema pass" replays the
+baseline migration step, which is the CREATE TABLE IF NOT EXISTS / PRAGMA
+table_info probing / backfill UPDATE / seed work the old init_database()
+ran on every launch.
+"""
+
+import argparse
+
+from common import database, make_temp_db, seed_book, summarize, time_calls
+
+
+def _every_start_pass(db_path):
+    conn = database.get_connection(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        database._migrate_baseline(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _cold_init(db_path):
+    # Drop pooled connections so each run pays for opening the file, as a launch does.
+    database.close_all_connections()
+    database.init_database(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--loans', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = make_temp_db(prefix='bench_cold_start_')
+    seed_book(db_path, customers=max(100, args.loans // 5), loans=args.loans)
+    print(f"Database: {db_path} ({args.loans} loans, schema version {database.get_schema_version(db_path)})\n")
+
+    legacy = summarize('every-start schema pass',
+                       time_calls(lambda: (_every_start_pass(db_path), _cold_init(db_path)), args.repeat))
+    current = summarize('init_database (up to date)',
+                        time_calls(lambda: _cold_init(db_path), args.repeat))
+    print(f"\nSaved per launch: {legacy - current:8.1f} ms ({legacy / current:4.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Concurrent reader/writer stress test against the real schema.
+
+Usage:
+    python benchmarks/bench_concurrency.py [--seconds 10] [--readers 4] [--writers 2]
+
+Simulates the shop PC: the cashier (writer threads) issues loans and cash
+entries while the loans page, dashboard, SMS scheduler and morning popup
+(reader threads) query the same file. Runs once in rollback-journal mode
+(the old behaviour) and once with the WAL profile, and reports write
+latency, read throughput and lock errors for each.
+"""
+
+import argparse
+import random
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+from common import database, make_temp_db, seed_book, summarize
+
+
+def _writer(db_path, stop, latencies, errors, seed):
+    rng = random.Random(seed)
+    customer_ids = [r['id'] for r in database.search_customers('', db_path=db_path)[:200]]
+    while not stop.is_set():
+        today = date.today()
+        data = {
+            'ticket_no': database.generate_ticket_no(db_path),
+            'customer_id': rng.choice(customer_ids),
+            'loan_amount': 50000.0,
+            'assessed_value': 62500.0,
+            'market_value': 70000.0,
+            'interest_rate': 2.5,
+            'overdue_interest_rate': 5.0,
+            'duration_months': 3,
+            'issue_date': today.isoformat(),
+            'expire_date': (today + timedelta(days=90)).isoformat(),
+            'total_gold_weight': 8.0,
+            'total_item_weight': 8.5,
+        }
+        items = [{'article_type': 'Chain', 'total_weight': 8.5, 'gold_weight': 8.0, 'carat': 22}]
+        start = time.perf_counter()
+        try:
+            loan_id = database.create_loan(data, items, db_path=db_path)
+            database.add_cash_transaction(today.isoformat(), 'loan_disbursement', 50000.0,
+                                          reference_id=loan_id, reference_type='loan', db_path=db_path)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+        except sqlite3.OperationalError as exc:
+            errors.append(str(exc))
+
+
+def _reader(db_path, stop, counter, errors):
+    while not stop.is_set():
+        try:
+            database.search_loans('', 'active', db_path=db_path)
+            database.get_dashboard_stats(db_path=db_path)
+            database.get_cash_summary(date.today().isoformat(), db_path=db_path)
+            counter.append(1)
+        except sqlite3.OperationalError as exc:
+            errors.append(str(exc))
+
+
+def run(journal_mode, seconds, readers, writers):
+    database.set_connection_profile(journal_mode=journal_mode,
+                                    synchronous='FULL' if journal_mode != 'WAL' else 'NORMAL')
+    db_path = make_temp_db(prefix=f'bench_{journal_mode.lower()}_')
+    # init_database() re-applies the stored settings; pin the mode under test.
+    database.set_setting('db_journal_mode', journal_mode, db_path=db_path)
+    database.set_setting('db_synchronous', 'FULL' if journal_mode != 'WAL' else 'NORMAL', db_path=db_path)
+    database.init_database(db_path)
+    seed_book(db_path, customers=2000, loans=10000)
+
+    stop = threading.Event()
+    write_latencies, read_counter, errors = [], [], []
+    threads = [threading.Thread(target=_writer, args=(db_path, stop, write_latencies, errors, i))
+               for i in range(writers)]
+    threads += [threading.Thread(target=_reader, args=(db_path, stop, read_counter, errors))
+                for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    print(f"\n== journal_mode={journal_mode} ({readers} readers, {writers} writers, {seconds}s) ==")
+    if write_latencies:
+        summarize('create_loan + cash entry', write_latencies)
+    print(f"loans written: {len(write_latencies)}   reader passes: {len(read_counter)}   "
+          f"lock errors: {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    args = parser.parse_args()
+
+    for mode in ('DELETE', 'WAL'):
+        run(mode, args.seconds, args.readers, args.writers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Per-call latency of database.py functions: fresh connection vs pooled connection.
+
+Usage:
+    python benchmarks/bench_connections.py [--repeat 500]
+
+The "fresh" numbers reproduce the old get_connection() behaviour (a new
+sqlite3.connect + row_factory + PRAGMA foreign_keys for every call). The
+"pooled" numbers run the same statements through the shared per-thread pool.
+"""
+
+import argparse
+import sqlite3
+import threading
+
+from common import database, make_temp_db, seed_book, summarize, time_calls
+
+
+def _fresh_connection(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def _fresh_get_setting(db_path):
+    conn = _fresh_connection(db_path)
+    row = conn.execute("SELECT value FROM settings WHERE key=?", ('company_name',)).fetchone()
+    conn.close()
+    return row
+
+
+def _fresh_get_customer(db_path):
+    conn = _fresh_connection(db_path)
+    row = conn.execute("SELECT * FROM customers WHERE id=?", (1,)).fetchone()
+    conn.close()
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    db_path = make_temp_db()
+    seed_book(db_path, customers=500, loans=2000)
+    print(f"Database: {db_path}\n")
+
+    fresh_setting = summarize('get_setting (fresh connection)',
+                              time_calls(lambda: _fresh_get_setting(db_path), args.repeat))
+    pooled_setting = summarize('get_setting (pooled)',
+                               time_calls(lambda: database.get_setting('company_name', db_path=db_path), args.repeat))
+    fresh_customer = summarize('get_customer (fresh connection)',
+                               time_calls(lambda: _fresh_get_customer(db_path), args.repeat))
+    pooled_customer = summarize('get_customer (pooled)',
+                                time_calls(lambda: database.get_customer(1, db_path=db_path), args.repeat))
+
+    # Background threads (SMS scheduler, morning popup) get their own pooled connection.
+    thread_samples = []
+    worker = threading.Thread(
+        target=lambda: thread_samples.extend(
+            time_calls(lambda: database.get_setting('company_name', db_path=db_path), args.repeat)
+        )
+    )
+    worker.start()
+    worker.join()
+    summarize('get_setting (pooled, worker thread)', thread_samples)
+
+    print(f"\nSpeed-up get_setting:  {fresh_setting / pooled_setting:5.1f}x")
+    print(f"Speed-up get_customer: {fresh_customer / pooled_customer:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Keystroke-to-render latency of the customers page search.
+
+Usage:
+    python benchmarks/bench_customer_search.py [--customers 20000] [--loans 40000] [--repeat 5]
+
+Replays typing a name into the search box and times everything a debounced
+keystroke does before Tk draws: the old path (matching rows, every customer
+and every active loan to compute the header counts, then one grid row per
+match) against the new one (match count, cached header stats, first page).
+Also checks the cached stats equal the old counts, and that a customer or
+loan write invalidates the cache.
+"""
+
+import argparse
+import time
+
+from common import database, make_temp_db, seed_book, summarize
+
+TYPED = 'Customer 12'
+PAGE_SIZE = 200
+
+
+def _rows(customers):
+    return [[c['nic'], c['name'], c['phone'], c.get('birthday') or '-', c.get('address') or '-'] for c in customers]
+
+
+def old_keystroke(query, db_path):
+    customers = database.search_customers(query, db_path=db_path)
+    all_customers = database.search_customers('', db_path=db_path)
+    active_loans = database.search_loans(status='active', db_path=db_path)
+    nics = {str(loan.get('customer_nic', '')).strip() for loan in active_loans if loan.get('customer_nic')}
+    stats = {
+        'total_customers': len(all_customers),
+        'with_birthday': sum(1 for c in all_customers if (c.get('birthday') or '').strip()),
+        'with_active_loans': sum(1 for c in all_customers if str(c.get('nic', '')).strip() in nics),
+    }
+    return len(customers), stats, _rows(customers)
+
+
+def new_keystroke(query, db_path):
+    matched = database.count_customers(query, db_path=db_path)
+    stats = database.get_customer_stats(db_path=db_path)
+    customers = database.search_customers(query, page_size=PAGE_SIZE, db_path=db_path)
+    return matched, stats, _rows(customers)
+
+
+def replay(fn, db_path, repeat):
+    samples = []
+    for _ in range(repeat):
+        for end in range(1, len(TYPED) + 1):
+            started = time.perf_counter()
+            fn(TYPED[:end], db_path)
+            samples.append((time.perf_counter() - started) * 1000.0)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--customers', type=int, default=20000)
+    parser.add_argument('--loans', type=int, default=40000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = make_temp_db(prefix='bench_customer_search_')
+    seed_book(db_path, customers=args.customers, loans=args.loans)
+
+    failures = 0
+    for query in ('', 'Cust', TYPED):
+        old_count, old_stats, _ = old_keystroke(query, db_path)
+        new_count, new_stats, _ = new_keystroke(query, db_path)
+        if (old_count, old_stats) != (new_count, new_stats):
+            failures += 1
+            print(f"MISMATCH {query!r}: old {old_count} {old_stats}  new {new_count} {new_stats}")
+
+    before = database.get_customer_stats(db_path=db_path)
+    database.create_customer('99000001V', 'Cache Check', '0770000001', birthday='1990-01-01', db_path=db_path)
+    after = database.get_customer_stats(db_path=db_path)
+    if (after['total_customers'], after['with_birthday']) != (before['total_customers'] + 1,
+                                                             before['with_birthday'] + 1):
+        failures += 1
+        print(f"STALE after create_customer: {before} -> {after}")
+    conn = database.get_connection(db_path)
+    loan_id = conn.execute("SELECT id FROM loans WHERE status='active' LIMIT 1").fetchone()[0]
+    conn.close()
+    database.update_loan_status(loan_id, 'redeemed', db_path=db_path)
+    if database.get_customer_stats(db_path=db_path) != old_keystroke('', db_path)[1]:
+        failures += 1
+        print("STALE after update_loan_status")
+    print(f"{failures} mismatches\n")
+
+    old = summarize('keystroke (three full queries)', replay(old_keystroke, db_path, args.repeat))
+    new = summarize('keystroke (count + cached stats + page)', replay(new_keystroke, db_path, args.repeat))
+    print(f"\nSpeed-up: {old / new:5.1f}x")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
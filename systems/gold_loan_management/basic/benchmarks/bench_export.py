@@ -0,0 +1,152 @@
+"""Memory and time of exporting a full multi-year loan ledger.
+
+Usage:
+    python benchmarks/bench_export.py [--loans 50000]
+
+Exports the Loan Ledger for the whole book twice per format: the old way
+(fetch every row, format the table, then write it; a regular openpyxl
+Workbook for .xlsx) and through pages.reports.write_export() fed from a
+cursor batch by batch, as the report page does. Reports the wall time and
+the peak Python heap (tracemalloc, from a second traced run) of each, and
+checks both files hold the same rows. Excel is skipped when openpyxl is
+not installed.
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+import tracemalloc
+
+from common import database, make_temp_db, seed_book
+from pages.reports import EXPORT_BATCH_ROWS, write_export
+from utils import format_currency, format_date, get_status_text
+
+COLUMNS = ['Ticket', 'Customer', 'Amount', 'Status', 'Rate%', 'OD%', 'Issue', 'Renew', 'Expire', 'Gold(g)']
+LEDGER_SQL = '''SELECT l.id, l.ticket_no, c.name AS customer_name, l.loan_amount,
+                      l.assessed_value, l.market_value, l.interest_rate,
+                      l.overdue_interest_rate, l.duration_months, l.issue_date,
+                      l.renew_date, l.expire_date, l.status, l.total_gold_weight,
+                      l.total_item_weight
+               FROM loans l
+               JOIN customers c ON l.customer_id=c.id
+               WHERE l.issue_date >= ? AND l.issue_date < ?
+               ORDER BY l.id DESC'''
+PARAMS = ('0000-01-01', '9999-12-31')
+
+
+def format_row(r):
+    return [
+        r['ticket_no'],
+        r['customer_name'],
+        format_currency(r['loan_amount']),
+        get_status_text(r['status'], r['expire_date']),
+        f"{float(r['interest_rate'] or 0):.2f}",
+        f"{float(r['overdue_interest_rate'] or 0):.2f}",
+        format_date(r['issue_date']),
+        format_date(r['renew_date']) if r['renew_date'] else '-',
+        format_date(r['expire_date']),
+        f"{float(r['total_gold_weight'] or 0):.3f}",
+    ]
+
+
+def old_export(db_path, path, kind):
+    conn = database.get_connection(db_path)
+    try:
+        loans = [dict(r) for r in conn.execute(LEDGER_SQL, PARAMS).fetchall()]
+    finally:
+        conn.close()
+    rows = [format_row(r) for r in loans]
+    export_rows = [list(r) for r in rows]
+    if kind == 'xlsx':
+        from openpyxl import Workbook
+
+        wb = Workbook()
+        ws = wb.active
+        ws.title = 'Report'
+        ws.append(COLUMNS)
+        for row in export_rows:
+            ws.append(row)
+        wb.save(path)
+    else:
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(export_rows)
+    return len(export_rows)
+
+
+def streamed_rows(db_path):
+    conn = database.get_connection(db_path)
+    try:
+        cursor = conn.execute(LEDGER_SQL, PARAMS)
+        while True:
+            batch = cursor.fetchmany(EXPORT_BATCH_ROWS)
+            if not batch:
+                break
+            for row in batch:
+                yield format_row(dict(row))
+    finally:
+        conn.close()
+
+
+def new_export(db_path, path, kind):
+    return write_export(path, kind, COLUMNS, streamed_rows(db_path))
+
+
+def measure(label, fn):
+    started = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - started
+    # A second, traced run for the heap peak; tracing slows it down too much to time.
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} {count:>8,} rows  {elapsed:7.2f} s  peak heap {peak / 2 ** 20:8.1f} MB")
+    return peak
+
+
+def read_back(path, kind):
+    if kind == 'xlsx':
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True)
+        return [[('' if v is None else str(v)) for v in row] for row in wb.active.iter_rows(values_only=True)]
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--loans', type=int, default=50000)
+    args = parser.parse_args()
+
+    db_path = make_temp_db(prefix='bench_export_')
+    seed_book(db_path, customers=max(100, args.loans // 5), loans=args.loans)
+    out_dir = tempfile.mkdtemp(prefix='bench_export_out_')
+
+    try:
+        import openpyxl  # noqa: F401
+        kinds = ['csv', 'xlsx']
+    except ImportError:
+        kinds = ['csv']
+        print('openpyxl not installed; skipping the Excel export')
+
+    failures = 0
+    for kind in kinds:
+        old_path = os.path.join(out_dir, f'old.{kind}')
+        new_path = os.path.join(out_dir, f'new.{kind}')
+        old = measure(f'{kind}: fetch all, then write', lambda: old_export(db_path, old_path, kind))
+        new = measure(f'{kind}: streamed from the cursor', lambda: new_export(db_path, new_path, kind))
+        print(f"{'':<34} peak heap {old / max(new, 1):5.1f}x smaller")
+        if read_back(old_path, kind) != read_back(new_path, kind):
+            failures += 1
+            print(f"MISMATCH  {kind} exports differ")
+    print(f"{failures} mismatching exports")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""Gold Inventory report: correlated redemption lookups vs. one joined pass.
+
+Usage:
+    python benchmarks/bench_gold_inventory.py [--loans 50000] [--operations 2000] [--repeat 3]
+
+Runs the Gold Inventory report's data load for both scopes and a few date
+ranges both ways:
+  old  a GROUP BY for the article summary, plus a detail query with a
+       correlated MAX(payment_date) subquery per item, then three more
+       Python passes for the active / redeemed weights
+  new  the redemption date computed once per loan in a CTE and joined, with
+       summary, totals and details built in one pass (as pages/reports.py does)
+and requires the outputs to match before timing them. Then replays the
+app's write paths (see check_loan_stats.py) and checks the gold_vault
+running totals against a recount, and times get_gold_in_vault() against
+that recount.
+"""
+
+import argparse
+from datetime import date, timedelta
+
+from common import database, make_temp_db, seed_book, summarize, time_calls
+from check_loan_stats import replay_operations
+
+DATE_FILTER = database.date_range_sql('l.issue_date')
+
+
+def _query(db_path, sql, params=()):
+    conn = database.get_connection(db_path)
+    try:
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+    finally:
+        conn.close()
+
+
+def _status_filter(scope):
+    return "AND l.status='active'" if scope == 'active' else ''
+
+
+def _summary(rows):
+    return sorted(
+        (r['article_type'], r['item_count'], r['total_qty'], round(r['total_item_weight'], 3),
+         round(r['total_gold_weight'], 3), r['avg_carat'], round(r['total_est_value'], 2))
+        for r in rows
+    )
+
+
+def old_pipeline(db_path, scope, date_from, date_to):
+    rng = database.date_range_params(date_from, date_to)
+    summary = _query(
+        db_path,
+        f'''SELECT li.article_type, COUNT(*) AS item_count,
+                COALESCE(SUM(li.quantity),0) AS total_qty,
+                COALESCE(SUM(li.total_weight),0) AS total_item_weight,
+                COALESCE(SUM(li.gold_weight),0) AS total_gold_weight,
+                COALESCE(SUM(li.estimated_value),0) AS total_est_value,
+                ROUND(AVG(li.carat), 2) AS avg_carat
+            FROM loan_items li
+            JOIN loans l ON li.loan_id=l.id
+            WHERE {DATE_FILTER}
+            {_status_filter(scope)}
+            GROUP BY li.article_type
+            ORDER BY total_gold_weight DESC''',
+        rng,
+    )
+    details = _query(
+        db_path,
+        f'''SELECT l.ticket_no, li.article_type, li.total_weight, li.gold_weight,
+            l.status AS loan_status,
+            (SELECT MAX(lp.payment_date)
+             FROM loan_payments lp
+             WHERE lp.loan_id=l.id AND lp.payment_type='redemption') AS redeem_date
+            FROM loan_items li
+            JOIN loans l ON li.loan_id=l.id
+            WHERE {DATE_FILTER}
+            {_status_filter(scope)}
+            ORDER BY li.id DESC''',
+        rng,
+    )
+
+    def is_redeemed(row):
+        redeem_day = str(row['redeem_date'] or '')[:10]
+        return row['loan_status'] == 'redeemed' and bool(redeem_day) and date_from <= redeem_day <= date_to
+
+    def is_active(row):
+        redeem_day = str(row['redeem_date'] or '')[:10]
+        if row['loan_status'] == 'active':
+            return True
+        return row['loan_status'] == 'redeemed' and (not redeem_day or redeem_day > date_to)
+
+    weights = (
+        round(sum(float(r['total_weight'] or 0) for r in details if is_active(r)), 3),
+        round(sum(float(r['total_weight'] or 0) for r in details if is_redeemed(r)), 3),
+        round(sum(float(r['gold_weight'] or 0) for r in details if is_active(r)), 3),
+    )
+    detail_rows = [(r['ticket_no'], r['article_type'], str(r['redeem_date'] or '')[:10]) for r in details]
+    return _summary(summary), weights, detail_rows
+
+
+def new_pipeline(db_path, scope, date_from, date_to):
+    details = _query(
+        db_path,
+        f'''WITH scoped AS (
+                SELECT l.id FROM loans l
+                WHERE {DATE_FILTER}
+                {_status_filter(scope)}
+            ),
+            redeemed AS (
+                SELECT lp.loan_id, MAX(lp.payment_date) AS redeem_date
+                FROM scoped s
+                JOIN loan_payments lp ON lp.loan_id=s.id
+                WHERE lp.payment_type='redemption'
+                GROUP BY lp.loan_id
+            )
+            SELECT l.ticket_no, li.article_type, li.quantity, li.total_weight,
+                   li.gold_weight, li.carat, li.estimated_value,
+                   l.status AS loan_status, rd.redeem_date
+            FROM scoped s
+            JOIN loans l ON l.id=s.id
+            JOIN loan_items li ON li.loan_id=l.id
+            LEFT JOIN redeemed rd ON rd.loan_id=l.id
+            ORDER BY li.id DESC''',
+        database.date_range_params(date_from, date_to),
+    )
+    by_article = {}
+    active_item = redeemed_item = active_gold = 0.0
+    detail_rows = []
+    for r in details:
+        item_weight = float(r['total_weight'] or 0)
+        gold_weight = float(r['gold_weight'] or 0)
+        article = by_article.setdefault(r['article_type'], [0, 0, 0.0, 0.0, 0.0, 0, 0])
+        article[0] += 1
+        article[1] += int(r['quantity'] or 0)
+        article[2] += item_weight
+        article[3] += gold_weight
+        article[4] += float(r['estimated_value'] or 0)
+        if r['carat'] is not None:
+            article[5] += r['carat']
+            article[6] += 1
+        redeem_day = str(r['redeem_date'] or '')[:10]
+        if r['loan_status'] == 'active' or (r['loan_status'] == 'redeemed' and (not redeem_day or redeem_day > date_to)):
+            active_item += item_weight
+            active_gold += gold_weight
+        elif r['loan_status'] == 'redeemed' and date_from <= redeem_day <= date_to:
+            redeemed_item += item_weight
+        detail_rows.append((r['ticket_no'], r['article_type'], redeem_day))
+    summary = [
+        {'article_type': k, 'item_count': a[0], 'total_qty': a[1], 'total_item_weight': a[2],
+         'total_gold_weight': a[3], 'total_est_value': a[4],
+         'avg_carat': round(a[5] / a[6], 2) if a[6] else None}
+        for k, a in by_article.items()
+    ]
+    return _summary(summary), (round(active_item, 3), round(redeemed_item, 3), round(active_gold, 3)), detail_rows
+
+
+def vault_recount(db_path):
+    rows = _query(
+        db_path,
+        f"""SELECT li.carat, li.article_type, COUNT(*) AS items, SUM(li.gold_weight) AS gold_weight
+            FROM loan_items li JOIN loans l ON l.id = li.loan_id
+            WHERE l.status IN ({', '.join(repr(s) for s in database.VAULT_STATUSES)})
+            GROUP BY 1, 2""",
+    )
+    return {(r['carat'], r['article_type']): (r['items'], round(r['gold_weight'], 3)) for r in rows}
+
+
+def vault_totals(db_path):
+    return {(r['carat'], r['article_type']): (r['items'], round(r['gold_weight'], 3))
+            for r in database.get_gold_in_vault(db_path)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--loans', type=int, default=50000)
+    parser.add_argument('--operations', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    db_path = make_temp_db(prefix='bench_gold_inventory_')
+    seed_book(db_path, customers=max(100, args.loans // 5), loans=args.loans)
+
+    today = date.today()
+    ranges = [
+        ('last 90 days', (today - timedelta(days=90)).isoformat(), today.isoformat()),
+        ('whole book', (today - timedelta(days=4 * 365)).isoformat(), today.isoformat()),
+    ]
+    failures = 0
+    for scope in ('active', 'all'):
+        for label, date_from, date_to in ranges:
+            old = old_pipeline(db_path, scope, date_from, date_to)
+            new = new_pipeline(db_path, scope, date_from, date_to)
+            if old != new:
+                failures += 1
+                print(f"MISMATCH  {scope} / {label}: weights old {old[1]} new {new[1]}, "
+                      f"summary equal {old[0] == new[0]}, details equal {old[2] == new[2]}")
+            print(f"{scope} / {label}: {len(new[2])} items")
+            before = summarize('  old (correlated redeem date)',
+                               time_calls(lambda: old_pipeline(db_path, scope, date_from, date_to), args.repeat))
+            after = summarize('  new (joined, one pass)',
+                              time_calls(lambda: new_pipeline(db_path, scope, date_from, date_to), args.repeat))
+            print(f"{'':<40} speed-up {before / after:5.1f}x")
+
+    replay_operations(db_path, args.operations)
+    if vault_totals(db_path) != vault_recount(db_path):
+        failures += 1
+        print(f"MISMATCH  gold_vault after {args.operations} replayed write operations")
+    print(f"gold in vault after {args.operations} replayed write operations: "
+          f"{sum(v[0] for v in vault_totals(db_path).values())} items")
+    before = summarize('  recount from loan_items', time_calls(lambda: vault_recount(db_path), args.repeat * 5))
+    after = summarize('  gold_vault running totals', time_calls(lambda: vault_totals(db_path), args.repeat * 5))
+    print(f"{'':<40} speed-up {before / after:5.1f}x")
+    print(f"{failures} mismatches")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
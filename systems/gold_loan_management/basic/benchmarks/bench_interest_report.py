@@ -0,0 +1,179 @@
+"""Interest report: old per-loan pipeline vs. pre-aggregated payments + batch accrual.
+
+Usage:
+    python benchmarks/bench_interest_report.py [--loans 50000] [--repeat 3]
+
+Runs the Interest report's data load for a few date ranges both ways:
+  old  GROUP BY over a LEFT JOIN on loan_payments with a correlated EXISTS,
+       then get_duration_rate() and calculate_total_payable() per active loan
+  new  payments summed per loan in one CTE, accrual for every active loan in
+       one calculate_total_payable_batch() call (as pages/reports.py does)
+and requires every row and both totals to match before timing them.
+"""
+
+import argparse
+
+from common import database, make_temp_db, seed_book, summarize, time_calls
+from utils import calculate_total_payable, calculate_total_payable_batch, format_currency
+
+DATE_FILTER = database.date_range_sql('l.issue_date')
+DATE_FILTER_UPPER = database.date_range_sql('l.issue_date', lower=False)
+COLLECTED = database.interest_collected_sql('lp', 'COALESCE(l.interest_principal_amount, l.loan_amount, 0)')
+
+
+def _query(db_path, sql, params):
+    conn = database.get_connection(db_path)
+    try:
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+    finally:
+        conn.close()
+
+
+def _rows(loans, accrued):
+    total_collected = total_current = 0.0
+    rows = []
+    for loan in loans:
+        principal = float(loan.get('interest_principal_amount') or loan.get('loan_amount') or 0)
+        collected = float(loan.get('collected_interest') or 0)
+        interest, overdue = accrued.get(loan['id'], (0.0, 0.0))
+        total_collected += collected
+        total_current += interest + overdue
+        rows.append([loan['ticket_no'], format_currency(principal), format_currency(collected),
+                     format_currency(interest), format_currency(overdue),
+                     format_currency(collected + interest + overdue)])
+    return round(total_collected, 2), round(total_current, 2), rows
+
+
+def old_pipeline(db_path, date_from, date_to):
+    rng = database.date_range_params(date_from, date_to)
+    paid = database.date_range_sql('lp.payment_date')
+    loans = _query(
+        db_path,
+        f'''SELECT l.id, l.ticket_no, l.customer_id, c.name AS customer_name,
+                  l.status, l.loan_amount, l.interest_principal_amount,
+                  l.interest_rate, l.overdue_interest_rate, l.duration_months,
+                  l.issue_date, l.renew_date, l.expire_date,
+                  COALESCE(SUM(CASE
+                    WHEN {paid} AND lp.payment_type='interest' THEN lp.amount
+                    WHEN {paid} AND lp.payment_type='penalty' THEN lp.amount
+                    WHEN {paid} AND lp.payment_type='redemption' THEN
+                        CASE
+                            WHEN (COALESCE(lp.interest_amount,0) + COALESCE(lp.overdue_interest_amount,0)) > 0
+                                THEN COALESCE(lp.interest_amount,0) + COALESCE(lp.overdue_interest_amount,0)
+                            ELSE MAX(
+                                0,
+                                COALESCE(lp.amount,0)
+                                - COALESCE(NULLIF(lp.principal_amount,0), COALESCE(l.interest_principal_amount, l.loan_amount, 0))
+                                - COALESCE(lp.other_charges_amount,0)
+                            )
+                        END
+                    ELSE 0 END), 0) AS collected_interest
+           FROM loans l
+           JOIN customers c ON l.customer_id=c.id
+           LEFT JOIN loan_payments lp ON lp.loan_id=l.id
+                WHERE {DATE_FILTER_UPPER}
+                  AND (
+                      {DATE_FILTER}
+                      OR EXISTS (
+                            SELECT 1 FROM loan_payments lp2
+                            WHERE lp2.loan_id=l.id AND {database.date_range_sql('lp2.payment_date')}
+                      )
+                      OR l.status='active'
+                  )
+           GROUP BY l.id
+           ORDER BY l.id DESC''',
+        (*rng, *rng, *rng, *database.date_range_params(date_to=date_to, lower=False), *rng, *rng),
+    )
+    accrued = {}
+    for loan in loans:
+        if loan.get('status') != 'active':
+            continue
+        dur_rate = database.get_duration_rate(loan.get('duration_months') or 1, db_path=db_path)
+        max_interest_months = dur_rate.get('max_interest_months', 3) if dur_rate else 3
+        payable = calculate_total_payable(
+            float(loan.get('interest_principal_amount') or loan.get('loan_amount') or 0),
+            loan.get('interest_rate') or 0, loan.get('duration_months') or 1,
+            loan.get('overdue_interest_rate') or 0, str(loan.get('expire_date') or ''),
+            str(loan.get('renew_date') or loan.get('issue_date')), max_interest_months,
+            as_of_date_str=date_to,
+        )
+        accrued[loan['id']] = (float(payable.get('interest') or 0), float(payable.get('overdue_interest') or 0))
+    return _rows(loans, accrued)
+
+
+def new_pipeline(db_path, date_from, date_to):
+    rng = database.date_range_params(date_from, date_to)
+    loans = _query(
+        db_path,
+        f'''WITH paid AS (
+               SELECT lp.loan_id, COALESCE(SUM({COLLECTED}), 0) AS collected_interest
+               FROM loan_payments lp
+               JOIN loans l ON l.id=lp.loan_id
+               WHERE {database.date_range_sql('lp.payment_date')}
+               GROUP BY lp.loan_id
+           )
+           SELECT l.id, l.ticket_no, l.customer_id, c.name AS customer_name,
+                  l.status, l.loan_amount, l.interest_principal_amount,
+                  l.interest_rate, l.overdue_interest_rate, l.duration_months,
+                  l.issue_date, l.renew_date, l.expire_date,
+                  COALESCE(p.collected_interest, 0) AS collected_interest
+           FROM loans l
+           JOIN customers c ON l.customer_id=c.id
+           LEFT JOIN paid p ON p.loan_id=l.id
+           WHERE {DATE_FILTER_UPPER}
+             AND ({DATE_FILTER} OR p.loan_id IS NOT NULL OR l.status='active')
+           ORDER BY l.id DESC''',
+        (*rng, *database.date_range_params(date_to=date_to, lower=False), *rng),
+    )
+    active = [loan for loan in loans if loan.get('status') == 'active']
+    payable = calculate_total_payable_batch(
+        [float(loan.get('interest_principal_amount') or loan.get('loan_amount') or 0) for loan in active],
+        [loan.get('interest_rate') or 0 for loan in active],
+        [loan.get('overdue_interest_rate') or 0 for loan in active],
+        [loan.get('expire_date') or '' for loan in active],
+        [loan.get('renew_date') or loan.get('issue_date') or '' for loan in active],
+        as_of_date=date_to,
+    )
+    accrued = {
+        loan['id']: (float(interest or 0), float(overdue or 0))
+        for loan, interest, overdue in zip(active, payable['interest'], payable['overdue_interest'])
+    }
+    return _rows(loans, accrued)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--loans', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    db_path = make_temp_db(prefix='bench_interest_report_')
+    seed_book(db_path, customers=max(100, args.loans // 5), loans=args.loans)
+
+    from datetime import date, timedelta
+    today = date.today()
+    ranges = [
+        ('last 30 days', (today - timedelta(days=30)).isoformat(), today.isoformat()),
+        ('last year', (today - timedelta(days=365)).isoformat(), today.isoformat()),
+        ('whole book', (today - timedelta(days=4 * 365)).isoformat(), today.isoformat()),
+    ]
+    failures = 0
+    for label, date_from, date_to in ranges:
+        old = old_pipeline(db_path, date_from, date_to)
+        new = new_pipeline(db_path, date_from, date_to)
+        if old != new:
+            failures += 1
+            differing = sum(1 for a, b in zip(old[2], new[2]) if a != b) + abs(len(old[2]) - len(new[2]))
+            print(f"MISMATCH  {label}: totals old {old[:2]} new {new[:2]}, {differing} differing rows")
+        print(f"{label}: {len(new[2])} loans")
+        before = summarize('  old (EXISTS + per-loan lookups)',
+                           time_calls(lambda: old_pipeline(db_path, date_from, date_to), args.repeat))
+        after = summarize('  new (payments CTE + batch accrual)',
+                          time_calls(lambda: new_pipeline(db_path, date_from, date_to), args.repeat))
+        print(f"{'':<40} speed-up {before / after:5.1f}x")
+    print(f"{failures} mismatching ranges")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
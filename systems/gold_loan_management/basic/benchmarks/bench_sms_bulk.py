@@ -0,0 +1,118 @@
+"""Outbox sends: one request per SMS vs. multi-recipient requests, against a local gateway.
+
+Usage:
+    python benchmarks/bench_sms_bulk.py [--messages 200] [--latency 0.08] [--gateway-rate 20]
+
+Starts sms_gateway_stub.py, points the SMS settings of a throwaway database
+at it and drains queued batches with an SmsOutboxSender:
+  same text     --messages identical SMS (a festival greeting), sent with
+                bulk_size=1 (the previous one-request-per-message sender)
+                and with bulk_size=TEXTLK_BULK_SIZE
+  personalised  --messages SMS that each name their recipient; every text is
+                different, so bulk mode must fall back to one request each
+  rejected      a same-text batch with a few numbers the gateway rejects;
+                only those rows may end 'failed'
+Each run requires one gateway delivery and one 'sent' row per good number,
+and reports the requests made and the messages per second.
+"""
+
+import argparse
+import time
+
+from common import database, make_temp_db
+from sms_gateway_stub import start_stub
+from sms_service import TEXTLK_BULK_SIZE, SmsOutboxSender, TokenBucket, queue_sms_jobs
+
+
+def statuses(db_path, category):
+    conn = database.get_connection(db_path)
+    try:
+        return {r[0]: r[1] for r in conn.execute(
+            "SELECT recipient, status FROM sms_messages WHERE category=?", (category,))}
+    finally:
+        conn.close()
+
+
+def drain(db_path, category, timeout=300.0):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if not any(status in ('queued', 'claimed') for status in statuses(db_path, category).values()):
+            break
+        time.sleep(0.05)
+    return time.perf_counter() - started
+
+
+def run(stub, db_path, args, label, jobs, bulk_size, bad=()):
+    category = jobs[0]['category']
+    stub.reset()
+    sender = SmsOutboxSender(db_path=db_path, limiter=TokenBucket(args.gateway_rate, 5), poll_interval=0.2,
+                             bulk_size=bulk_size)
+    if bad:
+        # queue_sms_jobs() would refuse them; the gateway is the one that says no here.
+        database.enqueue_sms_many([{'recipient': phone, 'message': jobs[0]['message'], 'category': category}
+                                   for phone in bad], db_path=db_path)
+    queue_sms_jobs(jobs, db_path=db_path)
+    sender.start().wake()
+    elapsed = drain(db_path, category)
+    sender.stop()
+
+    good = [job['recipient'] for job in jobs]
+    logged = statuses(db_path, category)
+    failures = 0
+    wrong = [p for p in good if stub.delivered[p] != 1 or logged.get(p) != 'sent']
+    wrong += [p for p in bad if stub.delivered[p] or logged.get(p) != 'failed']
+    if wrong or len(logged) != len(good) + len(bad):
+        failures += 1
+        print(f"MISMATCH  {category}: {len(wrong)} recipients with the wrong delivery count or status")
+    print(f"{label:<34} {len(logged):4d} messages, {stub.requests:4d} requests, {elapsed:6.2f} s "
+          f"({len(logged) / elapsed:6.1f} msg/s)")
+    return failures, elapsed, stub.requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.08)
+    parser.add_argument('--gateway-rate', type=float, default=20.0)
+    args = parser.parse_args()
+
+    db_path = make_temp_db(prefix='bench_sms_bulk_')
+    stub = start_stub(latency=args.latency, rate=args.gateway_rate * 1.5, burst=10)
+    database.set_setting('sms_gateway_base_url', stub.url, db_path=db_path)
+    database.set_setting('sms_gateway_token', 'bench-token', db_path=db_path)
+    database.set_setting('sms_sender_id', 'BENCH', db_path=db_path)
+
+    def batch(prefix, category, personalised=False):
+        return [{'recipient': f'94{prefix}{i:07d}', 'category': category,
+                 'message': f'Dear customer {i}, happy new year!' if personalised else 'Happy new year!'}
+                for i in range(args.messages)]
+
+    failures = 0
+    result, before, _ = run(stub, db_path, args, 'same text, one request per SMS',
+                            batch('71', 'bench_single'), 1)
+    failures += result
+    result, after, requests = run(stub, db_path, args, f'same text, bulk_size={TEXTLK_BULK_SIZE}',
+                                  batch('72', 'bench_bulk'), TEXTLK_BULK_SIZE)
+    failures += result
+    print(f"{'':<34} speed-up {before / after:5.1f}x")
+    if requests != -(-args.messages // TEXTLK_BULK_SIZE):
+        failures += 1
+        print(f"MISMATCH  bench_bulk: {requests} requests")
+
+    result, _, requests = run(stub, db_path, args, f'personalised, bulk_size={TEXTLK_BULK_SIZE}',
+                              batch('73', 'bench_personal', personalised=True), TEXTLK_BULK_SIZE)
+    failures += result
+    if requests != args.messages:
+        failures += 1
+        print(f"MISMATCH  bench_personal: {requests} requests, expected one per message")
+
+    result, _, _ = run(stub, db_path, args, 'same text with rejected numbers',
+                       batch('74', 'bench_rejected'), TEXTLK_BULK_SIZE, bad=('9474000', '947400000000'))
+    failures += result
+    stub.shutdown()
+    print(f"{failures} mismatches")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
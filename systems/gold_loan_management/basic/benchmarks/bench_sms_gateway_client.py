@@ -0,0 +1,105 @@
+"""Per-message overhead of send_sms(): new connection per SMS vs. the shared client.
+
+Usage:
+    python benchmarks/bench_sms_gateway_client.py [--messages 300] [--latency 0]
+
+Starts sms_gateway_stub.py over plain HTTP and over HTTPS (when the
+cryptography package is available) and sends --messages SMS one after
+another two ways:
+  old  what send_sms() did before: get_sms_settings() and a module-level
+       requests.post() (a new TCP + TLS connection) for every message
+  new  send_sms() through the shared SmsGatewayClient: one pooled
+       requests.Session and settings read once
+With the stub's latency at 0 the timings are pure client overhead. Reports
+per-message latency and how many connections the stub saw, and checks that
+saved settings are picked up after invalidate_sms_settings().
+"""
+
+import argparse
+import os
+
+import requests
+
+from common import database, make_temp_db, summarize, time_calls
+from sms_gateway_stub import start_stub
+from sms_service import get_gateway_client, invalidate_sms_settings, normalize_phone_number, send_sms
+
+
+def old_send_sms(recipient, message, db_path):
+    settings = database.get_sms_settings(db_path)
+    recipient = normalize_phone_number(recipient, settings.get('sms_default_country_code', '94'))
+    response = requests.post(
+        settings['sms_gateway_base_url'],
+        json={'recipient': recipient, 'sender_id': settings['sms_sender_id'], 'type': 'plain', 'message': message},
+        headers={'Authorization': f"Bearer {settings['sms_gateway_token']}", 'Content-Type': 'application/json',
+                 'Accept': 'application/json'},
+        timeout=25,
+    )
+    data = response.json()
+    database.log_sms_message(recipient=recipient, recipients=recipient, message=message, category='bench_old',
+                             status='sent' if response.ok else 'failed', provider='text.lk', response=data,
+                             db_path=db_path)
+    return response.ok
+
+
+def configure(db_path, stub):
+    database.set_setting('sms_gateway_base_url', stub.url, db_path=db_path)
+    database.set_setting('sms_gateway_token', 'bench-token', db_path=db_path)
+    database.set_setting('sms_sender_id', 'BENCH', db_path=db_path)
+    invalidate_sms_settings()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+
+    db_path = make_temp_db(prefix='bench_sms_client_')
+    try:
+        import cryptography  # noqa: F401
+        schemes = [False, True]
+    except ImportError:
+        schemes = [False]
+        print('cryptography not installed; skipping the HTTPS run')
+
+    failures = 0
+    for tls in schemes:
+        stub = start_stub(latency=args.latency, rate=1e9, burst=1e9, tls=tls)
+        if stub.cafile:
+            os.environ['REQUESTS_CA_BUNDLE'] = stub.cafile
+        configure(db_path, stub)
+        label = 'https' if tls else 'http'
+        counter = iter(range(10 ** 9))
+
+        stub.reset()
+        before = summarize(f'{label}: old (connection per SMS)',
+                           time_calls(lambda: old_send_sms(f'9477{next(counter):07d}', 'Bench', db_path),
+                                      args.messages))
+        old_connections = len(stub.connections)
+        stub.reset()
+        after = summarize(f'{label}: new (shared session)',
+                          time_calls(lambda: send_sms(f'9477{next(counter):07d}', 'Bench', category='bench_new',
+                                                      db_path=db_path), args.messages))
+        print(f"{'':<40} speed-up {before / after:5.1f}x   connections {old_connections} -> {len(stub.connections)}")
+        if sum(stub.delivered.values()) != args.messages:
+            failures += 1
+            print(f"MISMATCH  {label}: stub received {sum(stub.delivered.values())} of {args.messages} messages")
+        stub.shutdown()
+        get_gateway_client().session.close()
+        os.environ.pop('REQUESTS_CA_BUNDLE', None)
+
+    # Saved settings are cached until invalidated.
+    database.set_setting('sms_sender_id', '', db_path=db_path)
+    cached = get_gateway_client().settings(db_path)['sms_sender_id']
+    invalidate_sms_settings()
+    fresh = get_gateway_client().settings(db_path)['sms_sender_id']
+    if (cached, fresh) != ('BENCH', ''):
+        failures += 1
+        print(f"MISMATCH  settings cache: before invalidate {cached!r}, after {fresh!r}")
+    print(f"{failures} mismatches")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Bulk SMS rendering: per-recipient context + re.sub vs. batch contexts + compiled template.
+
+Usage:
+    python benchmarks/bench_sms_render.py [--recipients 1000] [--repeat 5]
+
+Renders one message per recipient for two kinds of batch:
+  promotion  customers only, so each needs its latest loan looked up
+  reminder   loans with their customer, as the morning popup sends them
+both ways:
+  old  build_sms_context() as it was (three get_setting() calls, a latest-loan
+       query per customer, calculate_total_payable() per loan) and a re.sub()
+       pass over the template per message
+  new  build_sms_contexts() for the whole batch and one compile_template()
+and requires identical messages before counting the SQL statements each
+way runs and timing them.
+"""
+
+import argparse
+import re
+from datetime import datetime
+
+from common import database, make_temp_db, seed_book, summarize, time_calls
+from sms_service import build_sms_contexts, compile_template
+from utils import calculate_total_payable
+
+TEMPLATE = ('Dear {{customer_name}}, your loan {{ticket_no}} of Rs. {{loan_amount}} expires on '
+            '{{ expire_date }}. Interest due: Rs. {{total_interest}}. {{company_name}} {{company_phone}}')
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def old_context(customer, loan, message, db_path):
+    """build_sms_context() before batching, trimmed to the fields TEMPLATE reads."""
+    customer = customer or {}
+    loan = loan or {}
+    if not loan and customer and customer.get('id'):
+        loan = database.get_latest_loan_for_customer(customer.get('id'), db_path) or {}
+    context = {
+        'company_name': database.get_setting('company_name', 'Gold Loan Center', db_path=db_path),
+        'company_phone': database.get_setting('company_phone', '', db_path=db_path),
+        'company_address': database.get_setting('company_address', '', db_path=db_path),
+        'message': message,
+        'date': datetime.now().strftime('%Y-%m-%d'),
+        'ticket_no': '', 'loan_amount': '', 'expire_date': '', 'total_interest': '',
+    }
+    if customer:
+        context['customer_name'] = customer.get('name', '')
+    if loan:
+        payable = calculate_total_payable(
+            _to_float(loan.get('interest_principal_amount') or loan.get('loan_amount')),
+            _to_float(loan.get('interest_rate')), _to_float(loan.get('duration_months')),
+            _to_float(loan.get('overdue_interest_rate', 0)),
+            loan.get('expire_date') or '', loan.get('renew_date') or loan.get('issue_date') or '',
+        )
+        context.update({
+            'ticket_no': loan.get('ticket_no', ''),
+            'loan_amount': loan.get('loan_amount', ''),
+            'expire_date': loan.get('expire_date', ''),
+            'total_interest': f"{round(payable['interest'] + payable['overdue_interest'], 2):.2f}",
+            'customer_name': loan.get('customer_name', context.get('customer_name', '')),
+        })
+    return context
+
+
+def old_render(text, context):
+    def replace(match):
+        value = context.get(match.group(1).strip(), '')
+        return '' if value is None else str(value)
+    return re.sub(r'\{\{\s*([a-zA-Z0-9_]+)\s*\}\}', replace, text)
+
+
+def render_old(pairs, db_path):
+    return [old_render(TEMPLATE, old_context(customer, loan, TEMPLATE, db_path)) for customer, loan in pairs]
+
+
+def render_new(pairs, db_path):
+    template = compile_template(TEMPLATE)
+    return [template.render(context) for context in build_sms_contexts(pairs, message=TEMPLATE, db_path=db_path)]
+
+
+def count_statements(fn):
+    conn = database.get_connection()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        result = fn()
+    finally:
+        conn.set_trace_callback(None)
+        conn.close()
+    return result, sum(1 for sql in statements if sql.lstrip().upper().startswith('SELECT'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recipients', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = make_temp_db(prefix='bench_sms_render_')
+    seed_book(db_path, customers=args.recipients * 2, loans=args.recipients * 4)
+    database.set_setting('company_name', 'Bench Gold Loans', db_path=db_path)
+    database.set_setting('company_phone', '0112345678', db_path=db_path)
+
+    conn = database.get_connection(db_path)
+    try:
+        customers = [dict(r) for r in conn.execute("SELECT * FROM customers ORDER BY id LIMIT ?",
+                                                   (args.recipients,))]
+        loans = [dict(r) for r in conn.execute(
+            """SELECT l.*, c.name AS customer_name, c.nic AS customer_nic, c.phone AS customer_phone
+               FROM loans l JOIN customers c ON c.id = l.customer_id
+               WHERE l.status = 'active' ORDER BY l.expire_date LIMIT ?""", (args.recipients,))]
+    finally:
+        conn.close()
+    batches = [
+        ('promotion', [(customer, None) for customer in customers]),
+        ('reminder', [({'id': loan['customer_id'], 'name': loan['customer_name']}, loan) for loan in loans]),
+    ]
+
+    failures = 0
+    for label, pairs in batches:
+        old, old_queries = count_statements(lambda: render_old(pairs, db_path))
+        new, new_queries = count_statements(lambda: render_new(pairs, db_path))
+        if old != new:
+            failures += 1
+            differing = sum(1 for a, b in zip(old, new) if a != b)
+            print(f"MISMATCH  {label}: {differing} of {len(old)} messages differ, e.g.\n  old {next(a for a, b in zip(old, new) if a != b)}"
+                  f"\n  new {next(b for a, b in zip(old, new) if a != b)}")
+        print(f"{label}: {len(pairs)} recipients, SELECTs old {old_queries}  new {new_queries}")
+        before = summarize('  old (per-recipient context + re.sub)',
+                           time_calls(lambda: render_old(pairs, db_path), args.repeat))
+        after = summarize('  new (batch contexts + compiled template)',
+                          time_calls(lambda: render_new(pairs, db_path), args.repeat))
+        print(f"{'':<40} speed-up {before / after:5.1f}x")
+    print(f"{failures} mismatching batches")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
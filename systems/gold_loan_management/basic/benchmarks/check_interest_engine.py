@@ -0,0 +1,110 @@
+"""Check utils.calculate_total_payable_batch() against the scalar function.
+
+Usage:
+    python benchmarks/check_interest_engine.py [--cases 200000] [--seed 1] [--book 50000]
+
+Generates random loans (amounts on and off the half-cent grid, fractional
+rates, renewals, loans issued after the as-of date, blank / malformed dates
+and rates) and requires every field of every loan to equal
+calculate_total_payable() exactly, for both the NumPy and the pure-Python
+backend. Then times a whole book through the scalar loop and the batch.
+"""
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+import common  # noqa: F401  (puts the app folder on sys.path)
+import utils
+
+FIELDS = ('interest', 'overdue_days', 'overdue_base_interest', 'overdue_penalty_interest',
+          'overdue_interest', 'total', 'days_passed')
+BAD_DATES = ['', None, 'N/A', '2024-02-30', '2024-13-01', '2024/01/05', '2024-1-5', '2024-W01-1']
+BAD_RATES = [None, '', 'abc']
+
+
+def _random_loan(rng, as_of):
+    issue = as_of - timedelta(days=rng.randint(-30, 4 * 365))
+    months = rng.choice([1, 2, 3, 6, 12])
+    expire = issue + timedelta(days=months * 30 + rng.choice([0, 0, 0, -3, 7]))
+    amount = rng.choice([
+        float(rng.randint(1, 500) * 1000),
+        round(rng.uniform(100, 900000), 2),
+        rng.randint(1, 10 ** 7) / 8.0,
+    ])
+    rate = rng.choice([2.5, 3.0, 1.75, round(rng.uniform(0.1, 6.0), 3), 0])
+    overdue_rate = rng.choice([5.0, 0, 2.25, round(rng.uniform(0, 8.0), 3)])
+    issue_str = issue.isoformat() + rng.choice(['', '', ' 10:15:00'])
+    expire_str = expire.isoformat()
+    roll = rng.random()
+    if roll < 0.02:
+        issue_str = rng.choice(BAD_DATES)
+    elif roll < 0.04:
+        expire_str = rng.choice(BAD_DATES)
+    elif roll < 0.05:
+        rate = rng.choice(BAD_RATES)
+    elif roll < 0.06:
+        overdue_rate = rng.choice(BAD_RATES)
+    return amount, rate, overdue_rate, expire_str, issue_str
+
+
+def check(cases, seed):
+    rng = random.Random(seed)
+    failures = 0
+    for as_of in (date.today(), date(2024, 2, 29), date(2026, 1, 1)):
+        loans = [_random_loan(rng, as_of) for _ in range(cases // 3)]
+        amounts, rates, overdue_rates, expires, issues = (list(col) for col in zip(*loans))
+        expected = [utils.calculate_total_payable(a, r, 3, o, e, i, as_of_date_str=as_of.isoformat())
+                    for a, r, o, e, i in loans]
+        backends = [False] + ([True] if utils.NUMPY_AVAILABLE else [])
+        for use_numpy in backends:
+            got = utils.calculate_total_payable_batch(amounts, rates, overdue_rates, expires, issues,
+                                                      as_of_date=as_of, use_numpy=use_numpy)
+            for idx, want in enumerate(expected):
+                for field in FIELDS:
+                    if got[field][idx] != want[field]:
+                        failures += 1
+                        if failures <= 20:
+                            print(f"MISMATCH numpy={use_numpy} as_of={as_of} {field}: batch {got[field][idx]!r} "
+                                  f"scalar {want[field]!r} loan={loans[idx]}")
+        print(f"as of {as_of}: {len(loans)} loans x {len(backends)} backend(s) checked")
+    print(f"{failures} mismatching values (NumPy {'available' if utils.NUMPY_AVAILABLE else 'not installed'})")
+    return failures
+
+
+def bench(book, seed):
+    rng = random.Random(seed)
+    as_of = date.today()
+    loans = [_random_loan(rng, as_of) for _ in range(book)]
+    columns = [list(col) for col in zip(*loans)]
+
+    started = time.perf_counter()
+    for a, r, o, e, i in loans:
+        utils.calculate_total_payable(a, r, 3, o, e, i)
+    scalar_ms = (time.perf_counter() - started) * 1000.0
+    print(f"\n{book} loans")
+    print(f"scalar loop            {scalar_ms:9.1f} ms")
+    backends = [False] + ([True] if utils.NUMPY_AVAILABLE else [])
+    for use_numpy in backends:
+        started = time.perf_counter()
+        utils.calculate_total_payable_batch(*columns, use_numpy=use_numpy)
+        ms = (time.perf_counter() - started) * 1000.0
+        label = 'batch (NumPy)' if use_numpy else 'batch (pure Python)'
+        print(f"{label:<22} {ms:9.1f} ms   {scalar_ms / ms:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cases', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--book', type=int, default=50000)
+    args = parser.parse_args()
+
+    failures = check(args.cases, args.seed)
+    bench(args.book, args.seed)
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Verify the trigger-maintained dashboard counters (loan_stats).
+
+Usage:
+    python benchmarks/check_loan_stats.py [--loans 20000] [--operations 2000] [--repeat 200]
+    python benchmarks/check_loan_stats.py --db path/to/gold_loan_basic_database.db [--repair]
+
+Without --db, seeds a synthetic book, replays a random mix of the app's
+write paths (new loans, renewals, redemptions, status changes, deletes,
+new customers), then diffs loan_stats against a from-scratch rebuild and
+times get_dashboard_stats() against the old nine-query version.
+With --db, only runs the consistency check on that file.
+"""
+
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+
+from common import database, make_temp_db, seed_book, summarize, time_calls
+
+
+def _old_dashboard_stats(db_path):
+    conn = database.get_connection(db_path)
+    today = date.today().isoformat()
+    stats = {}
+    stats['total_active'] = conn.execute("SELECT COUNT(*) FROM loans WHERE status='active'").fetchone()[0]
+    stats['total_redeemed'] = conn.execute("SELECT COUNT(*) FROM loans WHERE status='redeemed'").fetchone()[0]
+    stats['total_renewed'] = conn.execute("SELECT COUNT(*) FROM loans WHERE status='renewed'").fetchone()[0]
+    stats['total_loans'] = conn.execute("SELECT COUNT(*) FROM loans").fetchone()[0]
+    stats['total_customers'] = conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+    stats['active_loan_amount'] = conn.execute(
+        "SELECT COALESCE(SUM(COALESCE(advance_amount, loan_amount)),0) FROM loans WHERE status='active'"
+    ).fetchone()[0]
+    stats['overdue_count'] = conn.execute(
+        "SELECT COUNT(*) FROM loans WHERE status='active' AND expire_date < ?", (today,)
+    ).fetchone()[0]
+    stats['today_loans'] = conn.execute("SELECT COUNT(*) FROM loans WHERE date(created_at)=?", (today,)).fetchone()[0]
+    stats['today_revenue'] = conn.execute(
+        "SELECT COALESCE(SUM(amount),0) FROM loan_payments WHERE date(payment_date)=?", (today,)
+    ).fetchone()[0]
+    conn.close()
+    return stats
+
+
+def _new_loan(db_path, rng, customer_ids):
+    today = date.today()
+    amount = float(rng.randint(10, 300) * 1000)
+    data = {
+        'ticket_no': '',
+        'customer_id': rng.choice(customer_ids),
+        'loan_amount': amount,
+        'assessed_value': amount * 1.25,
+        'market_value': amount * 1.4,
+        'interest_rate': 2.5,
+        'overdue_interest_rate': 5.0,
+        'duration_months': 3,
+        'issue_date': today.isoformat(),
+        'expire_date': (today + timedelta(days=90)).isoformat(),
+        'total_gold_weight': 8.0,
+        'total_item_weight': 8.5,
+    }
+    items = [{'article_type': 'Chain', 'total_weight': 8.5, 'gold_weight': 8.0, 'carat': 22}]
+    return database.create_loan(data, items, db_path=db_path)
+
+
+def replay_operations(db_path, operations, seed=7):
+    rng = random.Random(seed)
+    conn = database.get_connection(db_path)
+    loan_ids = [r[0] for r in conn.execute("SELECT id FROM loans").fetchall()]
+    customer_ids = [r[0] for r in conn.execute("SELECT id FROM customers").fetchall()]
+    conn.close()
+    for i in range(operations):
+        op = rng.choice(['new', 'new', 'renew', 'redeem', 'status', 'delete', 'customer'])
+        if op == 'new':
+            loan_ids.append(_new_loan(db_path, rng, customer_ids))
+        elif op == 'customer':
+            customer_id, _ = database.create_customer(f'88{i:07d}V', f'Replay Customer {i}', '0770000000',
+                                                      db_path=db_path)
+            customer_ids.append(customer_id)
+        elif op == 'renew':
+            database.renew_loan(rng.choice(loan_ids), 3, 2500.0, 2.5, 0, None,
+                                principal_reduction=rng.choice([0, 5000.0]),
+                                new_loan_amount=float(rng.randint(10, 300) * 1000), db_path=db_path)
+        elif op == 'redeem':
+            database.redeem_loan(rng.choice(loan_ids), 55000.0, None, db_path=db_path)
+        elif op == 'status':
+            database.update_loan_status(rng.choice(loan_ids), rng.choice(database.LOAN_STATUSES), db_path=db_path)
+        elif op == 'delete' and loan_ids:
+            loan_id = loan_ids.pop(rng.randrange(len(loan_ids)))
+            database.delete_loan(loan_id, db_path=db_path)
+
+
+def report(mismatches):
+    for counter, stored, actual in mismatches:
+        print(f"MISMATCH  {counter}: stored {stored}  actual {actual}")
+    print(f"{len(mismatches)} mismatching counters")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db')
+    parser.add_argument('--repair', action='store_true')
+    parser.add_argument('--loans', type=int, default=20000)
+    parser.add_argument('--operations', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.db:
+        database.init_database(args.db)
+        mismatches = database.check_loan_stats(repair=args.repair, db_path=args.db)
+        report(mismatches)
+        sys.exit(1 if mismatches and not args.repair else 0)
+
+    db_path = make_temp_db(prefix='bench_loan_stats_')
+    seed_book(db_path, customers=max(100, args.loans // 5), loans=args.loans)
+    # seed_book bulk-inserts through the triggers; the counters must already agree.
+    report(database.check_loan_stats(db_path=db_path))
+
+    replay_operations(db_path, args.operations)
+    print(f"after {args.operations} replayed write operations:")
+    report(database.check_loan_stats(db_path=db_path))
+
+    old = _old_dashboard_stats(db_path)
+    new = database.get_dashboard_stats(db_path=db_path)
+    diff = {k: (old[k], new[k]) for k in old if abs(float(old[k]) - float(new[k])) > 0.005}
+    print(f"dashboard values differ: {diff or 'none'}\n")
+
+    before = summarize('get_dashboard_stats (nine queries)',
+                       time_calls(lambda: _old_dashboard_stats(db_path), args.repeat))
+    after = summarize('get_dashboard_stats (loan_stats row)',
+                      time_calls(lambda: database.get_dashboard_stats(db_path=db_path), args.repeat))
+    print(f"\nSpeed-up: {before / after:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
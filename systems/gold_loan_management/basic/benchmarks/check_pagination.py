@@ -0,0 +1,92 @@
+"""Check the keyset-paged listing APIs against the unpaged ones and time them.
+
+Usage:
+    python benchmarks/check_pagination.py [--loans 20000] [--page-size 200] [--repeat 20]
+
+Walks every page of search_loans(), search_customers() and
+search_customers_with_loan() for a set of queries and status filters,
+requires the concatenated pages to equal the unpaged result (same rows, same
+order) and count_*() to equal its length, then times opening the loans page
+the old way (every row) against a first page plus count.
+"""
+
+import argparse
+
+from common import database, make_temp_db, seed_book, summarize, time_calls
+
+QUERIES = ('', 'a', 'Cust', '077', 'no-such-customer')
+STATUSES = ('all', 'active', 'overdue', 'redeemed', 'repawned')
+
+
+def walk(fn, cursor, page_size, **kwargs):
+    rows, after = [], None
+    while True:
+        page = fn(after_id=after, page_size=page_size, **kwargs)
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        after = page[-1][cursor]
+
+
+def check(db_path, page_size):
+    failures = []
+    for query in QUERIES:
+        for status in STATUSES:
+            for sort_overdue in (False, True):
+                full = database.search_loans(query, status, sort_overdue, db_path=db_path)
+                paged = walk(database.search_loans, 'id', page_size, query=query, status=status,
+                             sort_overdue=sort_overdue, db_path=db_path)
+                if [r['id'] for r in full] != [r['id'] for r in paged]:
+                    failures.append(f'search_loans({query!r}, {status!r}, sort_overdue={sort_overdue})')
+            if database.count_loans(query, status, db_path=db_path) != len(full):
+                failures.append(f'count_loans({query!r}, {status!r})')
+            if database.get_loan_search_totals(query, status, db_path=db_path)['count'] != len(full):
+                failures.append(f'get_loan_search_totals({query!r}, {status!r})')
+
+        full = database.search_customers(query, db_path=db_path)
+        paged = walk(database.search_customers, 'id', page_size, query=query, db_path=db_path)
+        # Unpaged full-text results are ranked; paged ones are by name. Compare as sets.
+        if sorted(r['id'] for r in full) != sorted(r['id'] for r in paged):
+            failures.append(f'search_customers({query!r})')
+        if database.count_customers(query, db_path=db_path) != len(full):
+            failures.append(f'count_customers({query!r})')
+
+        full = database.search_customers_with_loan(query, db_path=db_path)
+        paged = walk(database.search_customers_with_loan, 'loan_id', page_size, query=query, db_path=db_path)
+        if [r['loan_id'] for r in full] != [r['loan_id'] for r in paged]:
+            failures.append(f'search_customers_with_loan({query!r})')
+        if database.count_customers_with_loan(query, db_path=db_path) != len(full):
+            failures.append(f'count_customers_with_loan({query!r})')
+
+    for failure in failures:
+        print(f'MISMATCH  {failure}')
+    print(f'{len(failures)} mismatching listings')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--loans', type=int, default=20000)
+    parser.add_argument('--page-size', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = make_temp_db(prefix='bench_pagination_')
+    seed_book(db_path, customers=max(100, args.loans // 5), loans=args.loans)
+    failures = check(db_path, args.page_size)
+
+    print()
+    before = summarize('loans page open (every row)',
+                       time_calls(lambda: database.search_loans(db_path=db_path), args.repeat))
+    after = summarize('loans page open (first page + totals)',
+                      time_calls(lambda: (database.search_loans(page_size=args.page_size, db_path=db_path),
+                                          database.get_loan_search_totals(db_path=db_path)), args.repeat))
+    summarize('next page from the middle of the book',
+              time_calls(lambda: database.search_loans(after_id=args.loans // 2, page_size=args.page_size,
+                                                       db_path=db_path), args.repeat))
+    print(f'\nSpeed-up (page open): {before / after:5.1f}x')
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""Run EXPLAIN QUERY PLAN over every SQL statement in database.py and pages/reports.py.
+
+Usage:
+    python benchmarks/check_query_plans.py [--loans 5000] [--verbose]
+
+Statements are extracted statically: string literals passed to execute(),
+executemany(), ReportsPage._query() / _scalar(), including SQL assembled with
+``sql += ...`` inside the same function. f-string fragments such as the
+reports' date column are replaced with a representative column; other
+fragments are evaluated against database.py's globals, and the loop
+variables of the rollup rebuilds are bound once per rollup table (see
+FUNCTION_BINDINGS), so each generated statement is planned. Each
+statement is planned against a seeded database and every full table scan
+("SCAN <table>" without an index) of a non-lookup table is flagged.
+Schema migration steps (init_database(), _migrate_*()) are skipped.
+Exits 1 if any statement could not be planned (SKIPPED).
+"""
+
+import argparse
+import ast
+import os
+import re
+import sqlite3
+
+from common import APP_ROOT, database, make_temp_db, seed_book
+
+SOURCES = ('database.py', os.path.join('pages', 'reports.py'))
+EXEC_METHODS = {'execute', 'executemany', '_query', '_scalar'}
+SQL_START = re.compile(r'^\s*(SELECT|WITH|UPDATE|DELETE|INSERT)\b', re.IGNORECASE)
+
+# One-off schema maintenance (backfills at startup) is expected to scan.
+SKIP_FUNCTIONS = ('init_database', '_migrate_', '_create_', '_rebuild_table', '_seed_settings')
+
+# Backfills and consistency checks read whole tables by design: their
+# statements are planned (so they must still parse) but scans are not flagged.
+FULL_PASS_FUNCTIONS = ('_rebuild_', '_compute_loan_stats', 'check_loan_stats', 'check_report_rollups')
+
+# Lookup tables stay tiny; scanning them is cheaper than an index probe.
+SMALL_TABLES = {'users', 'settings', 'market_rates', 'duration_rates', 'sms_templates',
+                'letter_templates', 'sqlite_master',
+                # json_each(?) walks a bound id list, not a table.
+                'json_each'}
+
+TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+SQL_KEYWORDS = {'WHERE', 'ON', 'JOIN', 'LEFT', 'INNER', 'GROUP', 'ORDER', 'LIMIT', 'SET', 'USING', 'AND'}
+
+# Stand-ins for interpolated fragments, keyed by their source text.
+FRAGMENT_STANDINS = {
+    '_dc': database.date_range_sql('l.issue_date'),
+}
+
+# Helpers that build SQL fragments; calls with literal arguments are evaluated.
+# ReportsPage._date_field_filter() is planned for the default 'Issue Date' field.
+FRAGMENT_BUILDERS = {
+    'date_range_sql': database.date_range_sql,
+    '_date_field_filter': lambda *args, **kwargs: database.date_range_sql('l.issue_date', *args, **kwargs),
+}
+
+
+def _rebuild_rollup_bindings():
+    for grain, width in database.ROLLUP_GRAINS:
+        for kind, source in database._rollup_sources(width).items():
+            keys, measures = database._ROLLUPS[kind]
+            yield {'grain': grain, 'width': width, 'kind': kind, 'source': source, 'keys': keys, 'measures': measures}
+
+
+def _rollup_query_bindings():
+    for kind in database._ROLLUPS:
+        yield {'kind': kind, 'select': 'r.period, COUNT(*)', 'clause': 'GROUP BY', 'value': 'r.period',
+               'source': database.rollup_source(kind, '2024-01-15', '2024-06-10')[0]}
+
+
+# Loop variables of functions that build one statement per rollup table; the
+# function's statements are planned once per binding.
+FUNCTION_BINDINGS = {
+    '_rebuild_report_rollups': _rebuild_rollup_bindings,
+    'check_report_rollups': lambda: (dict(zip(('table', 'keys', 'measures', 'source'), target))
+                                     for target in database._rollup_targets()),
+    '_rollup_query': _rollup_query_bindings,
+}
+
+
+def _fragment(expr, env):
+    """SQL for an interpolated expression, or None if it cannot be resolved."""
+    if expr in FRAGMENT_STANDINS:
+        return FRAGMENT_STANDINS[expr]
+    try:
+        value = eval(expr, vars(database), env)  # noqa: S307 - the app's own source
+    except Exception:
+        return None
+    return value if isinstance(value, (str, int, float)) else None
+
+
+def _call_fragment(node):
+    if not isinstance(node, ast.Call):
+        return None
+    name = getattr(node.func, 'id', None) or getattr(node.func, 'attr', None)
+    builder = FRAGMENT_BUILDERS.get(name)
+    if builder is None:
+        return None
+    try:
+        args = [ast.literal_eval(a) for a in node.args]
+        kwargs = {k.arg: ast.literal_eval(k.value) for k in node.keywords}
+    except ValueError:
+        return None
+    return builder(*args, **kwargs)
+
+
+def _render(node, source, built, env=None):
+    """Flatten a str constant / f-string node into SQL text, or None."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    fragment = _call_fragment(node)
+    if fragment is not None:
+        return fragment
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(str(value.value))
+                continue
+            expr = ast.get_source_segment(source, value.value) or ''
+            fragment = _call_fragment(value.value)
+            if fragment is not None:
+                parts.append(fragment)
+            elif isinstance(value.value, ast.Name) and value.value.id in built:
+                parts.append(built[value.value.id])
+            else:
+                fragment = _fragment(expr, env or {})
+                # Left unresolved, NULL makes the statement fail to plan and show as SKIPPED.
+                parts.append('NULL' if fragment is None else str(fragment))
+        return ''.join(parts)
+    if isinstance(node, ast.Name) and env and isinstance(env.get(node.id), str):
+        return env[node.id]
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left, right = _render(node.left, source, built, env), _render(node.right, source, built, env)
+        if left is not None and right is not None:
+            return left + right
+    if isinstance(node, ast.IfExp):
+        return _render(node.body, source, built, env)
+    return None
+
+
+def _collect_assignments(body, source, built, env=None):
+    """Replay string assignments in source order, following only the first branch of each if."""
+    for stmt in body:
+        if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name):
+            text = _render(stmt.value, source, built, env)
+            if text is not None:
+                built[stmt.targets[0].id] = text
+        elif isinstance(stmt, ast.AugAssign) and isinstance(stmt.target, ast.Name):
+            text = _render(stmt.value, source, built, env)
+            if text is not None and stmt.target.id in built:
+                built[stmt.target.id] += text
+        elif isinstance(stmt, (ast.If, ast.For, ast.While, ast.With)):
+            _collect_assignments(stmt.body, source, built, env)
+        elif isinstance(stmt, ast.Try):
+            _collect_assignments(stmt.body, source, built, env)
+            _collect_assignments(stmt.finalbody, source, built, env)
+
+
+def _own_nodes(func):
+    """Walk func's body without descending into nested function definitions."""
+    nested = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+    stack = [stmt for stmt in func.body if not isinstance(stmt, nested)]
+    while stack:
+        node = stack.pop()
+        yield node
+        for child in ast.iter_child_nodes(node):
+            if not isinstance(child, nested):
+                stack.append(child)
+
+
+def _walk_functions(node, enclosing):
+    """Yield (function, built) pairs; nested functions (report load() closures) see
+    the fragments their enclosing function assigned."""
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            yield child, enclosing
+        else:
+            yield from _walk_functions(child, enclosing)
+
+
+def extract_statements(path):
+    source = open(path, encoding='utf-8').read()
+    tree = ast.parse(source)
+    found = set()
+    pending = list(_walk_functions(tree, {}))
+    while pending:
+        func, enclosing = pending.pop()
+        if func.name.startswith(SKIP_FUNCTIONS):
+            continue
+        bindings = FUNCTION_BINDINGS.get(func.name)
+        for env in (bindings() if bindings else [{}]):
+            built = dict(enclosing)
+            _collect_assignments(func.body, source, built, env)
+            if not env:
+                pending.extend(_walk_functions(func, built))
+            for node in _own_nodes(func):
+                if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                        and node.func.attr in EXEC_METHODS and node.args):
+                    continue
+                arg = node.args[0]
+                if isinstance(arg, ast.Name) and arg.id in built:
+                    text = built[arg.id]
+                else:
+                    text = _render(arg, source, built, env)
+                if text and SQL_START.match(text):
+                    found.add((os.path.relpath(path, APP_ROOT), func.name, node.lineno, text))
+    return sorted(found, key=lambda item: (item[0], item[2], item[3]))
+
+
+def _table_aliases(sql):
+    aliases = {}
+    for table, alias in TABLE_REF.findall(sql):
+        aliases[table] = table
+        if alias and alias.upper() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def _count_placeholders(sql):
+    """Parameters sql binds: bare ? take the next number, ?N names one."""
+    count, highest, quote = 0, 0, None
+    for i, ch in enumerate(sql):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif ch == '?':
+            number = re.match(r'\d+', sql[i + 1:])
+            if number:
+                highest = max(highest, int(number.group()))
+            else:
+                count += 1
+                highest = max(highest, count)
+    return highest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--loans', type=int, default=5000)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    db_path = make_temp_db(prefix='bench_plans_')
+    seed_book(db_path, customers=max(100, args.loans // 5), loans=args.loans)
+    conn = database.get_connection(db_path)
+    conn.execute("ANALYZE")
+
+    statements = []
+    for rel in SOURCES:
+        statements.extend(extract_statements(os.path.join(APP_ROOT, rel)))
+
+    flagged, errors = [], []
+    for path, func, lineno, sql in statements:
+        try:
+            plan = conn.execute("EXPLAIN QUERY PLAN " + sql, [None] * _count_placeholders(sql)).fetchall()
+        except sqlite3.Error as exc:
+            errors.append((path, func, lineno, str(exc)))
+            continue
+        aliases = _table_aliases(sql)
+        # Reading a subquery's rows back (SCAN r after CO-ROUTINE r) is not a table scan.
+        subqueries = {row['detail'].split()[1] for row in plan
+                      if row['detail'].startswith(('CO-ROUTINE ', 'MATERIALIZE '))}
+        scans = []
+        for row in plan:
+            detail = row['detail']
+            if not detail.startswith('SCAN ') or ' USING ' in detail:
+                continue
+            target = detail.split()[1]
+            if target not in subqueries and aliases.get(target, target) not in SMALL_TABLES:
+                scans.append(detail)
+        if scans and not func.startswith(FULL_PASS_FUNCTIONS):
+            flagged.append((path, func, lineno, scans))
+        if args.verbose:
+            print(f"{path}:{lineno} {func}")
+            for row in plan:
+                print(f"    {row['detail']}")
+    conn.close()
+
+    for path, func, lineno, scans in flagged:
+        print(f"FULL SCAN  {path}:{lineno} {func}: {'; '.join(scans)}")
+    for path, func, lineno, err in errors:
+        print(f"SKIPPED    {path}:{lineno} {func}: {err}")
+    print(f"\n{len(statements)} statements planned, {len(flagged)} with full scans, {len(errors)} skipped")
+    raise SystemExit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Verify the report result cache and time repeat views against recomputing.
+
+Usage:
+    python benchmarks/check_report_cache.py [--loans 50000] [--operations 200] [--repeat 5]
+
+Uses the Interest and Gold Inventory report loads (see bench_interest_report.py
+and bench_gold_inventory.py) through pages.reports.REPORT_CACHE the way
+ReportsPage._run_report does: key on the data_versions counters plus the
+report and its range, serve a hit, otherwise load and store. Checks that:
+  - after every replayed write (loans, payments, customers, cash register)
+    that changed a row, the cached answer is a miss; every answer served
+    equals a fresh load;
+  - with nothing written, a repeat view is a hit and returns the same result;
+  - with a budget of about four results, 30-day windows evict least
+    recently used entries first and the byte count matches the entries
+    held and never exceeds the budget.
+Then times a first view against a repeat view.
+"""
+
+import argparse
+import random
+from datetime import date, timedelta
+
+from common import database, make_temp_db, seed_book, summarize, time_calls
+from check_loan_stats import replay_operations
+from bench_gold_inventory import new_pipeline as gold_inventory
+from bench_interest_report import new_pipeline as interest_report
+from pages.reports import _MISS, REPORT_CACHE, ReportCache, _approx_size
+
+
+def cached(cache, name, load, *args):
+    key = (database.get_data_versions(database.REPORT_DATA_TABLES), (name, args))
+    result = cache.get(key)
+    if result is _MISS:
+        result = load(*args)
+        cache.put(key, result)
+    return result
+
+
+def check_budget(db_path, today, windows=20):
+    """Fill a cache sized for about four interest results with sliding 30-day windows."""
+    failures = 0
+    ranges = [((today - timedelta(days=30 + week * 7)).isoformat(), (today - timedelta(days=week * 7)).isoformat())
+              for week in range(windows)]
+    sizes = [_approx_size(interest_report(db_path, start, end)) for start, end in ranges]
+    small = ReportCache(max_bytes=4 * max(sizes) + max(sizes) // 2)
+    evictions = 0
+    for n, (start, end) in enumerate(ranges):
+        if n >= 2:
+            # Touch the oldest window still held so it outlives newer ones.
+            cached(small, 'interest', interest_report, db_path, *ranges[0])
+        held = len(small)
+        cached(small, 'interest', interest_report, db_path, start, end)
+        evictions += held + 1 - len(small)
+        entry_bytes = sum(size for _, size in small._entries.values())
+        if small.size_bytes > small.max_bytes or small.size_bytes != entry_bytes:
+            failures += 1
+            print(f"MISMATCH  cache at {small.size_bytes} bytes ({entry_bytes} in entries), "
+                  f"budget {small.max_bytes}")
+            break
+    keys = [key[1] for key in small._entries]
+    if evictions == 0 or len(small) < 2:
+        failures += 1
+        print(f"MISMATCH  {windows} windows under the budget: {evictions} evictions, {len(small)} entries held")
+    if ('interest', (db_path, *ranges[0])) not in keys:
+        failures += 1
+        print("MISMATCH  the most recently read window was evicted before older ones")
+    print(f"{small.max_bytes / 2 ** 20:.2f} MB budget after {windows} windows: {len(small)} entries, "
+          f"{small.size_bytes / 2 ** 20:.2f} MB, {evictions} evictions")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--loans', type=int, default=50000)
+    parser.add_argument('--operations', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = make_temp_db(prefix='check_report_cache_')
+    seed_book(db_path, customers=max(100, args.loans // 5), loans=args.loans)
+
+    today = date.today()
+    date_from, date_to = (today - timedelta(days=90)).isoformat(), today.isoformat()
+    reports = [
+        ('interest', interest_report, (db_path, date_from, date_to)),
+        ('gold_inventory', gold_inventory, (db_path, 'all', date_from, date_to)),
+    ]
+    failures = 0
+    rng = random.Random(3)
+
+    for name, load, load_args in reports:
+        cached(REPORT_CACHE, name, load, *load_args)
+    last_versions = database.get_data_versions(database.REPORT_DATA_TABLES)
+    for i in range(args.operations):
+        if rng.random() < 0.2:
+            database.add_cash_transaction(today.isoformat(), 'expense', 100.0, 'replay', db_path=db_path)
+        else:
+            replay_operations(db_path, 1, seed=i)
+        versions = database.get_data_versions(database.REPORT_DATA_TABLES)
+        for name, load, load_args in reports:
+            hits = REPORT_CACHE.hits
+            served = cached(REPORT_CACHE, name, load, *load_args)
+            if REPORT_CACHE.hits != hits and versions != last_versions:
+                failures += 1
+                print(f"MISMATCH  {name}: served from cache after write {i}")
+            elif served != load(*load_args):
+                failures += 1
+                print(f"MISMATCH  {name}: cached result differs from a fresh load after write {i}")
+        last_versions = versions
+    for name, load, load_args in reports:
+        hits = REPORT_CACHE.hits
+        if cached(REPORT_CACHE, name, load, *load_args) != load(*load_args) or REPORT_CACHE.hits != hits + 1:
+            failures += 1
+            print(f"MISMATCH  {name}: repeat view without writes was not a matching hit")
+    print(f"{args.operations} replayed writes: {REPORT_CACHE.hits} hits, {REPORT_CACHE.misses} misses, "
+          f"{len(REPORT_CACHE)} entries, {REPORT_CACHE.size_bytes / 2 ** 20:.1f} MB")
+
+    failures += check_budget(db_path, today)
+
+    print()
+    for name, load, load_args in reports:
+        def first_view():
+            REPORT_CACHE.clear()
+            return cached(REPORT_CACHE, name, load, *load_args)
+
+        before = summarize(f'{name}: first view', time_calls(first_view, args.repeat))
+        cached(REPORT_CACHE, name, load, *load_args)
+        after = summarize(f'{name}: repeat view',
+                          time_calls(lambda: cached(REPORT_CACHE, name, load, *load_args), args.repeat * 20))
+        print(f"{'':<40} speed-up {before / after:7.1f}x")
+    print(f"{failures} mismatches")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Verify the trigger-maintained report rollups and time the reports on them.
+
+Usage:
+    python benchmarks/check_report_rollups.py [--loans 50000] [--operations 2000] [--repeat 20]
+    python benchmarks/check_report_rollups.py --db path/to/gold_loan_basic_database.db [--repair]
+
+Without --db, seeds a synthetic book, replays the app's write paths (see
+check_loan_stats.py), diffs every rollup table against a from-scratch
+aggregation, then checks and times the Summary / Analytics / Gold Inventory
+figures read from raw rows against the same figures read from the rollups
+for a few report ranges. With --db, only runs the consistency check on that
+file; --repair backfills the rollups when they drifted.
+"""
+
+import argparse
+import sys
+from datetime import date, timedelta
+
+from common import database, make_temp_db, seed_book, summarize, time_calls
+from check_loan_stats import replay_operations
+
+INTEREST_SQL = database.interest_collected_sql('lp', 'COALESCE(l.interest_principal_amount, l.loan_amount, 0)')
+
+
+def raw_figures(db_path, date_from, date_to):
+    conn = database.get_connection(db_path)
+    rng = database.date_range_params(date_from, date_to)
+    try:
+        by_status = {
+            r[0]: (r[1], round(r[2], 2))
+            for r in conn.execute(
+                "SELECT status, COUNT(*), COALESCE(SUM(loan_amount), 0) FROM loans l "
+                f"WHERE {database.date_range_sql('l.issue_date')} GROUP BY status", rng)
+        }
+        payments = tuple(round(v, 2) for v in conn.execute(
+            f"""SELECT COALESCE(SUM(lp.amount), 0), COALESCE(SUM({INTEREST_SQL}), 0)
+                FROM loan_payments lp JOIN loans l ON l.id = lp.loan_id
+                WHERE {database.date_range_sql('lp.payment_date')}""", rng).fetchone())
+        months = dict(conn.execute(
+            f"""SELECT substr(issue_date, 1, 7), COUNT(*) FROM loans l
+                WHERE {database.date_range_sql('l.issue_date')} GROUP BY 1""", rng).fetchall())
+        gold = {
+            r[0]: (r[1], round(r[2], 3))
+            for r in conn.execute(
+                f"""SELECT li.article_type, COUNT(*), COALESCE(SUM(li.gold_weight), 0)
+                    FROM loan_items li JOIN loans l ON li.loan_id = l.id
+                    WHERE l.status = 'active' AND {database.date_range_sql('l.issue_date')}
+                    GROUP BY li.article_type""", rng)
+        }
+    finally:
+        conn.close()
+    return by_status, payments, months, gold
+
+
+def rollup_figures(db_path, date_from, date_to):
+    conn = database.get_connection(db_path)
+    try:
+        src, params = database.rollup_source('loans', date_from, date_to)
+        by_status = {
+            r[0]: (r[1], round(r[2], 2))
+            for r in conn.execute(
+                f"SELECT status, SUM(loans), SUM(issued_amount) FROM {src} GROUP BY status HAVING SUM(loans) > 0",
+                params)
+        }
+        months = dict(conn.execute(
+            f"SELECT substr(period, 1, 7), SUM(loans) FROM {src} GROUP BY 1 HAVING SUM(loans) > 0",
+            params).fetchall())
+        src, params = database.rollup_source('payments', date_from, date_to)
+        payments = tuple(round(v, 2) for v in conn.execute(
+            f"SELECT COALESCE(SUM(amount), 0), COALESCE(SUM(interest_collected), 0) FROM {src}", params).fetchone())
+        src, params = database.rollup_source('gold', date_from, date_to)
+        gold = {
+            r[0]: (r[1], round(r[2], 3))
+            for r in conn.execute(
+                f"""SELECT article_type, SUM(items), SUM(gold_weight) FROM {src}
+                    WHERE status = 'active' GROUP BY article_type HAVING SUM(items) > 0""", params)
+        }
+    finally:
+        conn.close()
+    return by_status, payments, months, gold
+
+
+def report(mismatches):
+    for table, key, stored, actual in mismatches[:20]:
+        print(f"MISMATCH  {table} {key}: stored {stored}  actual {actual}")
+    print(f"{len(mismatches)} mismatching rollup rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db')
+    parser.add_argument('--repair', action='store_true')
+    parser.add_argument('--loans', type=int, default=50000)
+    parser.add_argument('--operations', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.db:
+        database.init_database(args.db)
+        mismatches = database.check_report_rollups(repair=args.repair, db_path=args.db)
+        report(mismatches)
+        sys.exit(1 if mismatches and not args.repair else 0)
+
+    db_path = make_temp_db(prefix='bench_report_rollups_')
+    seed_book(db_path, customers=max(100, args.loans // 5), loans=args.loans)
+    failures = database.check_report_rollups(db_path=db_path)
+    report(failures)
+
+    replay_operations(db_path, args.operations)
+    print(f"after {args.operations} replayed write operations:")
+    mismatches = database.check_report_rollups(db_path=db_path)
+    report(mismatches)
+    failures += mismatches
+
+    today = date.today()
+    ranges = [
+        ('last 90 days', (today - timedelta(days=90)).isoformat(), today.isoformat()),
+        ('this year', today.replace(month=1, day=1).isoformat(), today.isoformat()),
+        ('last 3 years', (today - timedelta(days=3 * 365)).isoformat(), today.isoformat()),
+    ]
+    print()
+    for label, date_from, date_to in ranges:
+        raw = raw_figures(db_path, date_from, date_to)
+        rolled = rollup_figures(db_path, date_from, date_to)
+        if raw != rolled:
+            failures.append(label)
+            print(f"MISMATCH  report figures for {label}:\n  raw    {raw}\n  rollup {rolled}")
+        old = summarize(f'{label}: raw rows',
+                        time_calls(lambda: raw_figures(db_path, date_from, date_to), args.repeat))
+        new = summarize(f'{label}: rollups',
+                        time_calls(lambda: rollup_figures(db_path, date_from, date_to), args.repeat))
+        print(f"{'':<40} speed-up {old / new:5.1f}x")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""Check the SMS outbox delivers every message exactly once, against a local gateway.
+
+Usage:
+    python benchmarks/check_sms_outbox.py [--messages 120] [--latency 0.08] [--gateway-rate 20]
+
+Starts sms_gateway_stub.py and points the SMS settings of a throwaway
+database at it, then:
+  old scheduler  two overlapping ticks of the previous _check_sms_scheduler
+                 loop (get_pending_scheduled_sms, send, mark) on a slow
+                 gateway; reports how many scheduled SMS went out twice
+  scheduled      the same rows moved with enqueue_due_scheduled_sms() from
+                 four threads at once, drained by the outbox sender
+  two senders    --messages queued by queue_sms_jobs() and drained by two
+                 SmsOutboxSender instances (as two app instances on one
+                 file would), with 5% 503s; the texts are identical, so they
+                 go out as a few bulk requests; queued again with the same
+                 idempotency keys, which must add nothing
+  throttled      --messages personalised texts (one request each) from a
+                 sender whose token bucket runs at 3x the gateway's rate, so
+                 the gateway answers 429 + Retry-After and TokenBucket.defer()
+                 pauses the workers; fails if the stub throttled nothing
+  crash          a claim whose lease ran out must end 'failed', not resent,
+                 and stop() must hand unsent claims back to the queue
+Each run requires one gateway delivery and one 'sent' row per recipient.
+"""
+
+import argparse
+import threading
+import time
+from datetime import datetime
+
+from common import database, make_temp_db
+from sms_gateway_stub import start_stub
+from sms_service import SmsOutboxSender, TokenBucket, queue_sms_jobs, send_sms
+
+
+def recipients(prefix, n):
+    return [f'94{prefix}{i:07d}' for i in range(n)]
+
+
+def statuses(db_path, category):
+    conn = database.get_connection(db_path)
+    try:
+        return dict(((r[0], r[1]), r[2]) for r in conn.execute(
+            "SELECT recipient, status, COUNT(*) FROM sms_messages WHERE category=? GROUP BY 1, 2", (category,)))
+    finally:
+        conn.close()
+
+
+def drain(db_path, category, timeout=120.0):
+    """Wait until no message of category is queued or claimed; returns the seconds taken."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if not any(status in ('queued', 'claimed') for _, status in statuses(db_path, category)):
+            break
+        time.sleep(0.05)
+    return time.perf_counter() - started
+
+
+def check(stub, db_path, phones, category):
+    duplicates = [p for p in phones if stub.delivered[p] > 1]
+    missing = [p for p in phones if stub.delivered[p] == 0]
+    logged = statuses(db_path, category)
+    bad_rows = any(logged.get((p, 'sent')) != 1 for p in phones) or sum(logged.values()) != len(phones)
+    if duplicates or missing:
+        print(f"MISMATCH  {category}: {len(duplicates)} recipients got duplicates, {len(missing)} got nothing")
+    if bad_rows:
+        print(f"MISMATCH  {category}: sms_messages does not hold exactly one 'sent' row per recipient")
+    return int(bool(duplicates or missing)) + int(bad_rows)
+
+
+def schedule(db_path, phones, category):
+    due = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    for phone in phones:
+        database.add_scheduled_sms(phone, f'Scheduled {category}', due, category=category, db_path=db_path)
+    return due
+
+
+def old_scheduler_tick(db_path, now):
+    for msg in database.get_pending_scheduled_sms(now, db_path=db_path):
+        ok, err, _ = send_sms(msg['recipient'], msg['message'], category=msg['category'], db_path=db_path)
+        if ok:
+            database.mark_scheduled_sms_sent(msg['id'], db_path=db_path)
+        else:
+            database.mark_scheduled_sms_failed(msg['id'], err, db_path=db_path)
+
+
+def run_old_scheduler(stub, db_path, phones):
+    now = schedule(db_path, phones, 'bench_old_scheduled')
+    ticks = [threading.Thread(target=old_scheduler_tick, args=(db_path, now)) for _ in range(2)]
+    for i, tick in enumerate(ticks):
+        tick.start()
+        if i == 0:
+            time.sleep(0.5)  # the next tick fires while the first is still sending
+    for tick in ticks:
+        tick.join()
+    twice = sum(1 for p in phones if stub.delivered[p] > 1)
+    print(f"old scheduler  {twice}/{len(phones)} scheduled SMS sent twice by two overlapping ticks")
+
+
+def run_scheduled(stub, db_path, phones, sender):
+    now = schedule(db_path, phones, 'bench_scheduled')
+    ticks = [threading.Thread(target=database.enqueue_due_scheduled_sms, args=(now,), kwargs={'db_path': db_path})
+             for _ in range(4)]
+    for tick in ticks:
+        tick.start()
+    for tick in ticks:
+        tick.join()
+    sender.wake()
+    elapsed = drain(db_path, 'bench_scheduled')
+    failures = check(stub, db_path, phones, 'bench_scheduled')
+    conn = database.get_connection(db_path)
+    try:
+        left = conn.execute(
+            "SELECT COUNT(*) FROM scheduled_sms WHERE category='bench_scheduled' AND status != 'sent'").fetchone()[0]
+    finally:
+        conn.close()
+    if left:
+        failures += 1
+        print(f"MISMATCH  bench_scheduled: {left} scheduled_sms rows not marked sent")
+    print(f"scheduled      {len(phones)} messages from 4 concurrent ticks in {elapsed:5.2f} s")
+    return failures
+
+
+def run_two_senders(stub, db_path, phones, senders):
+    jobs = [{'recipient': phone, 'message': 'Outbox test', 'category': 'bench_outbox',
+             'idempotency_key': f'bench:{phone}'} for phone in phones]
+    started = time.perf_counter()
+    queued, rejected = queue_sms_jobs(jobs, batch_id='bench', db_path=db_path)
+    blocked = time.perf_counter() - started
+    for sender in senders:
+        sender.wake()
+    elapsed = drain(db_path, 'bench_outbox')
+    again, _ = queue_sms_jobs(jobs, batch_id='bench-again', db_path=db_path)
+    failures = check(stub, db_path, phones, 'bench_outbox')
+    if queued != len(phones) or rejected or again:
+        failures += 1
+        print(f"MISMATCH  bench_outbox: queued {queued}, rejected {len(rejected)}, re-queued {again}")
+    progress = database.get_sms_batch_progress('bench', db_path=db_path)
+    if progress != {'sent': len(phones)}:
+        failures += 1
+        print(f"MISMATCH  bench_outbox: batch progress {progress}")
+    print(f"two senders    {len(phones)} messages in {elapsed:5.2f} s ({len(phones) / elapsed:5.1f} msg/s), "
+          f"caller blocked {blocked * 1000:6.1f} ms, 429s {stub.throttled}, 503s {stub.unavailable}")
+    return failures
+
+
+def run_throttled(stub, db_path, phones, rate):
+    jobs = [{'recipient': phone, 'message': f'Throttle test {i}', 'category': 'bench_throttled'}
+            for i, phone in enumerate(phones)]
+    sender = SmsOutboxSender(db_path=db_path, limiter=TokenBucket(rate * 3, 15), poll_interval=0.2).start()
+    queue_sms_jobs(jobs, db_path=db_path)
+    sender.wake()
+    elapsed = drain(db_path, 'bench_throttled')
+    sender.stop()
+    failures = check(stub, db_path, phones, 'bench_throttled')
+    if not stub.throttled:
+        failures += 1
+        print("MISMATCH  bench_throttled: the gateway never answered 429, so the retry path did not run")
+    print(f"throttled      {len(phones)} messages in {elapsed:5.2f} s ({len(phones) / elapsed:5.1f} msg/s), "
+          f"requests {stub.requests}, 429s {stub.throttled}")
+    return failures
+
+
+def run_crash(stub, db_path, sender):
+    failures = 0
+    database.enqueue_sms('94790000001', 'Crash test', category='bench_crash', db_path=db_path)
+    # A sender that died right after claiming: its lease is already over.
+    claimed = database.claim_sms_messages('crashed-sender', lease_seconds=-1, db_path=db_path)
+    expired = database.expire_sms_leases(db_path=db_path)
+    row = statuses(db_path, 'bench_crash')
+    if not claimed or expired != 1 or row != {('94790000001', 'failed'): 1} or stub.delivered['94790000001']:
+        failures += 1
+        print(f"MISMATCH  bench_crash: expired {expired}, rows {row}")
+
+    # stop() while messages wait on the rate limit: nothing may stay claimed.
+    sender.limiter = TokenBucket(0.5, 1)
+    jobs = [{'recipient': phone, 'message': 'Stop test', 'category': 'bench_stop'}
+            for phone in recipients('78', 6)]
+    queue_sms_jobs(jobs, db_path=db_path)
+    sender.start().wake()
+    time.sleep(1.0)
+    sender.stop()
+    rows = statuses(db_path, 'bench_stop')
+    by_status = {}
+    for (_, status), count in rows.items():
+        by_status[status] = by_status.get(status, 0) + count
+    if by_status.get('claimed') or sum(by_status.values()) != len(jobs):
+        failures += 1
+        print(f"MISMATCH  bench_stop: {by_status}")
+    print(f"crash          expired lease -> failed, not resent; after stop(): {by_status}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=120)
+    parser.add_argument('--latency', type=float, default=0.08)
+    parser.add_argument('--gateway-rate', type=float, default=20.0)
+    args = parser.parse_args()
+
+    db_path = make_temp_db(prefix='check_sms_outbox_')
+    stub = start_stub(latency=args.latency, rate=args.gateway_rate, burst=5)
+    database.set_setting('sms_gateway_base_url', stub.url, db_path=db_path)
+    database.set_setting('sms_gateway_token', 'bench-token', db_path=db_path)
+    database.set_setting('sms_sender_id', 'BENCH', db_path=db_path)
+
+    failures = 0
+    stub.latency = 1.0
+    run_old_scheduler(stub, db_path, recipients('71', 4))
+    stub.latency = args.latency
+
+    senders = [
+        SmsOutboxSender(db_path=db_path, limiter=TokenBucket(args.gateway_rate * 1.5, 10), poll_interval=0.2).start()
+        for _ in range(2)
+    ]
+    stub.reset()
+    failures += run_scheduled(stub, db_path, recipients('72', 40), senders[0])
+    stub.reset()
+    stub.fail_rate = 0.05
+    failures += run_two_senders(stub, db_path, recipients('77', args.messages), senders)
+    stub.fail_rate = 0.0
+    for sender in senders:
+        sender.stop()
+
+    stub.reset()
+    time.sleep(1)  # let the gateway's bucket refill
+    failures += run_throttled(stub, db_path, recipients('76', args.messages), args.gateway_rate)
+
+    stub.reset()
+    failures += run_crash(stub, db_path, SmsOutboxSender(db_path=db_path, poll_interval=0.2, bulk_size=1))
+    stub.shutdown()
+    print(f"{failures} mismatches")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Shared helpers for the database benchmarks.
+
+Each benchmark builds a throwaway database with the real schema from
+database.init_database() and seeds it with a synthetic loan book, so numbers
+are comparable between branch PCs and never touch the live shop database.
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_ROOT not in sys.path:
+    sys.path.insert(0, APP_ROOT)
+
+import database  # noqa: E402
+
+
+ARTICLE_TYPES = ['Chain', 'Ring', 'Bracelet', 'Necklace', 'Earrings', 'Pendant', 'Bangle']
+FIRST_NAMES = ['Nimal', 'Kamal', 'Sunil', 'Priya', 'Malini', 'Ravi', 'Anita', 'Suresh', 'Deepa', 'Chaminda']
+LAST_NAMES = ['Perera', 'Silva', 'Fernando', 'Kumar', 'Menon', 'Sharma', 'Jayasinghe', 'Bandara']
+
+
+def make_temp_db(prefix='bench_'):
+    """Create an initialised database in a temp dir and make it the active DB."""
+    tmp_dir = tempfile.mkdtemp(prefix=prefix)
+    db_path = os.path.join(tmp_dir, 'gold_loan_basic_database.db')
+    database.init_database(db_path)
+    return db_path
+
+
+def seed_book(db_path, customers=1000, loans=5000, seed=42):
+    """Bulk-insert a synthetic customer/loan/item/payment book."""
+    rng = random.Random(seed)
+    today = date.today()
+    conn = database.get_connection(db_path)
+    try:
+        conn.executemany(
+            "INSERT INTO customers (nic, name, phone, address, birthday, job, marital_status, language) VALUES (?,?,?,?,?,?,?,?)",
+            [
+                (
+                    f'{900000000 + i}V',
+                    f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}',
+                    f'07{rng.randint(10000000, 99999999)}',
+                    f'{i} Main Street',
+                    (today - timedelta(days=rng.randint(18 * 365, 70 * 365))).isoformat(),
+                    'Trader',
+                    'Married',
+                    rng.choice(['Sinhala', 'Tamil', 'English']),
+                )
+                for i in range(customers)
+            ],
+        )
+        customer_ids = [r[0] for r in conn.execute("SELECT id FROM customers").fetchall()]
+
+        loan_rows = []
+        for i in range(loans):
+            issue = today - timedelta(days=rng.randint(0, 3 * 365))
+            months = rng.choice([1, 3, 6, 12])
+            expire = issue + timedelta(days=months * 30)
+            amount = float(rng.randint(10, 500) * 1000)
+            status = rng.choices(['active', 'redeemed', 'forfeited', 'repawned'], [60, 32, 4, 4])[0]
+            weight = round(rng.uniform(2.0, 40.0), 2)
+            loan_rows.append((
+                f'GL{i + 1:06d}', rng.choice(customer_ids), 'Personal', amount, amount, amount,
+                amount * 1.25, amount * 1.4, 2.5, 5.0, months, issue.isoformat(), expire.isoformat(),
+                status, weight, weight + 0.5, f'{issue.isoformat()} 10:00:00', f'{issue.isoformat()} 10:00:00',
+            ))
+        conn.executemany(
+            """INSERT INTO loans (ticket_no, customer_id, purpose, advance_amount, loan_amount,
+                   interest_principal_amount, assessed_value, market_value, interest_rate,
+                   overdue_interest_rate, duration_months, issue_date, expire_date, status,
+                   total_gold_weight, total_item_weight, created_at, updated_at)
+               VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""",
+            loan_rows,
+        )
+
+        loans_by_id = conn.execute("SELECT id, loan_amount, status, issue_date, total_gold_weight FROM loans").fetchall()
+        item_rows = []
+        payment_rows = []
+        for row in loans_by_id:
+            item_rows.append((
+                row['id'], rng.choice(ARTICLE_TYPES), '', 1, row['total_gold_weight'] + 0.5,
+                row['total_gold_weight'], rng.choice([18, 22, 24]), row['loan_amount'] * 1.4,
+            ))
+            paid_on = f"{row['issue_date']} 12:00:00"
+            if row['status'] == 'redeemed':
+                payment_rows.append((row['id'], 'redemption', row['loan_amount'] * 1.05, row['loan_amount'],
+                                     row['loan_amount'] * 0.05, paid_on))
+            elif rng.random() < 0.3:
+                payment_rows.append((row['id'], 'interest', row['loan_amount'] * 0.025, 0,
+                                     row['loan_amount'] * 0.025, paid_on))
+        conn.executemany(
+            """INSERT INTO loan_items (loan_id, article_type, description, quantity, total_weight,
+                   gold_weight, carat, estimated_value) VALUES (?,?,?,?,?,?,?,?)""",
+            item_rows,
+        )
+        conn.executemany(
+            """INSERT INTO loan_payments (loan_id, payment_type, amount, principal_amount,
+                   interest_amount, payment_date) VALUES (?,?,?,?,?,?)""",
+            payment_rows,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def time_calls(fn, repeat=200):
+    """Call fn() repeat times and return per-call latencies in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return samples
+
+
+def summarize(label, samples):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{label:<40} mean {statistics.mean(ordered):8.3f} ms   "
+          f"median {statistics.median(ordered):8.3f} ms   p95 {p95:8.3f} ms")
+    return statistics.mean(ordered)
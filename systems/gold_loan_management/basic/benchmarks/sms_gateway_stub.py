@@ -0,0 +1,195 @@
+"""Local stand-in for the Text.lk send endpoint, for SMS benchmarks.
+
+Usage:
+    python benchmarks/sms_gateway_stub.py [--port 8765] [--latency 0.08] [--rate 20] [--burst 5] [--tls]
+
+Accepts the same POST body as https://app.text.lk/api/v3/sms/send and answers
+like it after --latency seconds (plus up to 50% jitter). Requests beyond
+--rate per second (with a --burst allowance) get 429 with Retry-After, and
+--fail-rate of the rest get 503, so retry and throttling paths can be
+exercised. A comma-separated recipient list is one request; its reply lists
+each number as Delivered, or Rejected when it is not 11 digits (those are
+not delivered). Point sms_gateway_base_url at http://127.0.0.1:<port>/api/v3/sms/send.
+--tls serves HTTPS with a throwaway self-signed certificate (needs the
+cryptography package); clients trust it through REQUESTS_CA_BUNDLE=<cafile>.
+Benchmarks import start_stub() and read the per-recipient delivery counts
+and the number of distinct client connections.
+"""
+
+import argparse
+import datetime
+import ipaddress
+import json
+import os
+import random
+import ssl
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class GatewayStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.08, rate=20.0, burst=5, fail_rate=0.0, seed=1, tls=False):
+        super().__init__(address, _Handler)
+        self.cafile = None
+        if tls:
+            self.cafile = _self_signed_cert()
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(self.cafile)
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+        self.latency = latency
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.fail_rate = fail_rate
+        self.delivered = Counter()
+        self.requests = 0
+        self.throttled = 0
+        self.unavailable = 0
+        self.connections = set()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        scheme = 'https' if self.cafile else 'http'
+        return f'{scheme}://127.0.0.1:{self.server_address[1]}/api/v3/sms/send'
+
+    def admit(self):
+        """'ok', 'throttled' or 'unavailable' for one incoming request."""
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                self.throttled += 1
+                return 'throttled'
+            self._tokens -= 1
+            if self._rng.random() < self.fail_rate:
+                self.unavailable += 1
+                return 'unavailable'
+            return 'ok'
+
+    def reset(self):
+        with self._lock:
+            self.delivered.clear()
+            self.connections.clear()
+            self.requests = self.throttled = self.unavailable = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle on, a kept-alive
+    # connection would stall on the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *_args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        with server._lock:
+            server.connections.add(self.client_address)
+        time.sleep(server.latency * (1 + server._rng.random() * 0.5))
+        verdict = server.admit()
+        if verdict == 'throttled':
+            self._reply(429, {'status': 'error', 'message': 'Too Many Attempts.'}, {'Retry-After': '1'})
+        elif verdict == 'unavailable':
+            self._reply(503, {'status': 'error', 'message': 'Service Unavailable'})
+        else:
+            recipients = [r for r in str(body.get('recipient', '')).split(',') if r]
+            if len(recipients) == 1:
+                with server._lock:
+                    server.delivered.update(recipients)
+                    sms_id = f'stub-{sum(server.delivered.values())}'
+                self._reply(200, {'status': 'success', 'message': 'Your message was successfully delivered',
+                                  'data': {'sms_id': sms_id}})
+                return
+            items = []
+            with server._lock:
+                for recipient in recipients:
+                    if recipient.isdigit() and len(recipient) == 11:
+                        server.delivered[recipient] += 1
+                        items.append({'recipient': recipient, 'status': 'Delivered',
+                                      'sms_id': f'stub-{sum(server.delivered.values())}'})
+                    else:
+                        items.append({'recipient': recipient, 'status': 'Rejected',
+                                      'message': 'Invalid phone number'})
+            self._reply(200, {'status': 'success', 'message': 'Your message was successfully delivered',
+                              'data': items})
+
+    def _reply(self, code, data, headers=None):
+        raw = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(raw)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+def _self_signed_cert():
+    """Write a key + certificate for 127.0.0.1 to a temp PEM file and return its path."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, '127.0.0.1')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address('127.0.0.1'))]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    path = os.path.join(tempfile.mkdtemp(prefix='sms_stub_tls_'), 'stub.pem')
+    with open(path, 'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    return path
+
+
+def start_stub(port=0, **options):
+    """Start a GatewayStub on a daemon thread; call .shutdown() when done."""
+    server = GatewayStub(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.08)
+    parser.add_argument('--rate', type=float, default=20.0)
+    parser.add_argument('--burst', type=int, default=5)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--tls', action='store_true')
+    args = parser.parse_args()
+    server = GatewayStub(('127.0.0.1', args.port), latency=args.latency, rate=args.rate,
+                         burst=args.burst, fail_rate=args.fail_rate, tls=args.tls)
+    print(f'Text.lk stand-in listening on {server.url}')
+    if server.cafile:
+        print(f'trust it with REQUESTS_CA_BUNDLE={server.cafile}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -5,8 +5,12 @@ Handles all SQLite operations for the gold loan management system.
 
 import sqlite3
 import os
+import calendar
+import collections
+import math
 import hashlib
 import sys
+import threading
 import time
 import json
 from datetime import datetime, timedelta
@@ -22,11 +26,606 @@ def set_db_file(db_path):
         DB_FILE = db_path
 
 
+# ── Connection pool ──
+# Every function in this module follows the get_connection() ... conn.close()
+# pattern. Opening a fresh sqlite3 connection for each call is expensive, so
+# each thread keeps one long-lived connection per database file and
+# get_connection() hands out a lightweight lease on it. Closing the lease
+# returns the connection to the thread's pool instead of closing the file.
+#
+# Connections never cross threads: the Tk thread and the background SMS /
+# scheduler threads each get their own, which keeps sqlite3's default
+# check_same_thread protection intact.
+
+_pool_local = threading.local()
+_pool_lock = threading.Lock()
+_pool_generation = 0
+
+# Connection tuning profile. The database runs in WAL mode so the Tk thread,
+# the SMS scheduler / morning popup threads and backups can read while the
+# cashier writes. Every value can be overridden from the settings table
+# (db_journal_mode, db_synchronous, db_cache_size_kb, db_mmap_size_mb,
+# db_temp_store, db_busy_timeout_ms) and is applied by init_database().
+DEFAULT_CONNECTION_PROFILE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size_kb': 16384,
+    'mmap_size_mb': 128,
+    'temp_store': 'MEMORY',
+    'busy_timeout_ms': 5000,
+}
+
+_PROFILE_SETTING_KEYS = {
+    'journal_mode': 'db_journal_mode',
+    'synchronous': 'db_synchronous',
+    'cache_size_kb': 'db_cache_size_kb',
+    'mmap_size_mb': 'db_mmap_size_mb',
+    'temp_store': 'db_temp_store',
+    'busy_timeout_ms': 'db_busy_timeout_ms',
+}
+
+_PROFILE_CHOICES = {
+    'journal_mode': ('WAL', 'DELETE', 'TRUNCATE', 'PERSIST'),
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+    'temp_store': ('DEFAULT', 'FILE', 'MEMORY'),
+}
+
+_connection_profile = dict(DEFAULT_CONNECTION_PROFILE)
+
+
+def _normalize_profile(values):
+    """Merge values over the defaults, dropping anything SQLite would reject."""
+    profile = dict(DEFAULT_CONNECTION_PROFILE)
+    for key, value in (values or {}).items():
+        if key not in profile or value in (None, ''):
+            continue
+        if key in _PROFILE_CHOICES:
+            value = str(value).strip().upper()
+            if value in _PROFILE_CHOICES[key]:
+                profile[key] = value
+        else:
+            try:
+                profile[key] = max(0, int(float(value)))
+            except (TypeError, ValueError):
+                pass
+    return profile
+
+
+def get_connection_profile():
+    """Return a copy of the PRAGMA profile applied to new connections."""
+    return dict(_connection_profile)
+
+
+def set_connection_profile(**values):
+    """Replace the connection profile; pooled connections reopen with it."""
+    global _connection_profile
+    _connection_profile = _normalize_profile(values)
+    close_all_connections()
+    return get_connection_profile()
+
+
+class _PooledConnection:
+    """A cached sqlite3 connection owned by a single thread."""
+
+    def __init__(self, db_path, generation):
+        profile = _connection_profile
+        factory = _ProfilingConnection if query_profiling_enabled() else sqlite3.Connection
+        self.raw = sqlite3.connect(db_path, timeout=profile['busy_timeout_ms'] / 1000.0, factory=factory)
+        self.raw.row_factory = sqlite3.Row
+        self.raw.execute("PRAGMA foreign_keys = ON")
+        self.raw.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout_ms'])}")
+        self.raw.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+        self.raw.execute(f"PRAGMA cache_size = {-int(profile['cache_size_kb'])}")
+        self.raw.execute(f"PRAGMA mmap_size = {int(profile['mmap_size_mb']) * 1024 * 1024}")
+        self.raw.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+        self.generation = generation
+        self.leases = 0
+
+    def release(self):
+        self.leases = max(0, self.leases - 1)
+        if self.leases == 0 and self.raw.in_transaction:
+            # A caller bailed out before commit (usually via an exception);
+            # discard the half-finished work just like closing a connection would.
+            self.raw.rollback()
+
+    def dispose(self):
+        try:
+            self.raw.close()
+        except sqlite3.Error:
+            pass
+
+
+class ConnectionLease:
+    """Connection handle returned by get_connection().
+
+    Behaves like a sqlite3.Connection. close() hands the underlying connection
+    back to the pool; uncommitted changes are rolled back once the last lease
+    held by the thread is closed. A lease that is garbage collected without
+    being closed (e.g. when an exception skips conn.close()) releases itself.
+    """
+
+    __slots__ = ('_pooled', '_conn')
+
+    def __init__(self, pooled):
+        pooled.leases += 1
+        self._pooled = pooled
+        self._conn = pooled.raw
+
+    def __getattr__(self, name):
+        conn = self._conn
+        if conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    def close(self):
+        pooled = self._pooled
+        if pooled is None:
+            return
+        self._pooled = None
+        self._conn = None
+        pooled.release()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def _pool_key(db_path):
+    return os.path.abspath(db_path or DB_FILE)
+
+
 def get_connection(db_path=None):
-    conn = sqlite3.connect(db_path or DB_FILE)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    """Return a lease on this thread's pooled connection for db_path."""
+    pool = getattr(_pool_local, 'connections', None)
+    if pool is None:
+        pool = _pool_local.connections = {}
+
+    key = _pool_key(db_path)
+    pooled = pool.get(key)
+    if pooled is not None and pooled.generation != _pool_generation and pooled.leases == 0:
+        pooled.dispose()
+        pooled = None
+    if pooled is None:
+        pooled = _PooledConnection(key, _pool_generation)
+        pool[key] = pooled
+    return ConnectionLease(pooled)
+
+
+def load_connection_profile(db_path=None):
+    """Read the db_* tuning settings, apply them and switch the journal mode.
+
+    Called by init_database(); returns the profile now in effect.
+    """
+    conn = get_connection(db_path)
+    try:
+        keys = tuple(_PROFILE_SETTING_KEYS.values())
+        rows = conn.execute(
+            f"SELECT key, value FROM settings WHERE key IN ({','.join('?' * len(keys))})",
+            keys,
+        ).fetchall()
+    finally:
+        conn.close()
+    stored = {row['key']: row['value'] for row in rows}
+    values = {name: stored.get(key) for name, key in _PROFILE_SETTING_KEYS.items()}
+    profile = set_connection_profile(**values)
+
+    # journal_mode is persistent in the database file; it only needs to be
+    # switched once, but re-issuing it on an already-WAL database is free.
+    conn = get_connection(db_path)
+    try:
+        mode = conn.execute(f"PRAGMA journal_mode = {profile['journal_mode']}").fetchone()[0]
+        if str(mode).upper() != profile['journal_mode']:
+            print(f"Warning: journal_mode {profile['journal_mode']} unavailable, using {mode}")
+    finally:
+        conn.close()
+    return profile
+
+
+def checkpoint_database(db_path=None, mode='PASSIVE'):
+    """Fold the WAL back into the main database file (no-op outside WAL mode)."""
+    mode = str(mode).upper()
+    if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+        mode = 'PASSIVE'
+    conn = get_connection(db_path)
+    try:
+        row = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        return tuple(row) if row else None
+    finally:
+        conn.close()
+
+
+def get_pool_generation():
+    """Counter bumped by close_all_connections(); a change means the file may have been replaced."""
+    return _pool_generation
+
+
+def close_all_connections():
+    """Retire every pooled connection (e.g. before a backup restore replaces the file).
+
+    Idle connections owned by the calling thread are closed immediately; other
+    threads reopen theirs the next time they call get_connection().
+    """
+    global _pool_generation
+    with _pool_lock:
+        _pool_generation += 1
+    pool = getattr(_pool_local, 'connections', None) or {}
+    for key, pooled in list(pool.items()):
+        if pooled.leases == 0:
+            pooled.dispose()
+            del pool[key]
+
+
+# ── Query profiler ──
+# Opt-in instrumentation for finding the slow queries on a shop's own data.
+# While enabled, pooled connections are opened with a connection/cursor
+# factory that times every execute() together with the fetches that drain
+# it, counts the rows, and attributes the statement to the function that
+# issued it. Statements slower than the threshold also go to a slow-query log;
+# their EXPLAIN QUERY PLAN is taken when the log is read, off the hot path.
+# Disabled (the default) connections are plain sqlite3 and nothing is timed.
+#
+# Settings: db_profile_queries ('1' to record from startup), db_slow_query_ms.
+
+DEFAULT_SLOW_QUERY_MS = 50
+SLOW_QUERY_LOG_SIZE = 200
+_PROFILE_SAMPLE_SIZE = 1000
+# Generic query helpers whose caller is the interesting frame.
+_PROFILE_PASSTHROUGH = ('_query', '_scalar')
+_PROFILE_INTERNALS = ('_ProfilingConnection.', '_ProfilingCursor.', 'QueryProfiler.')
+_PLANNABLE_SQL = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_query_profiler = None
+
+
+class _QueryStat:
+    __slots__ = ('calls', 'rows', 'total_ms', 'max_ms', 'samples')
+
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = collections.deque(maxlen=_PROFILE_SAMPLE_SIZE)
+
+    def add(self, ms, rows):
+        self.calls += 1
+        self.rows += rows
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.samples.append(ms)
+
+    def as_dict(self):
+        samples = sorted(self.samples)
+        p95 = samples[max(0, math.ceil(len(samples) * 0.95) - 1)] if samples else 0.0
+        return {
+            'calls': self.calls,
+            'rows': self.rows,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'p95_ms': round(p95, 3),
+            'max_ms': round(self.max_ms, 3),
+        }
+
+
+class _QueryRun:
+    """One execution of a statement, open until its cursor is drained or dropped."""
+
+    __slots__ = ('db_path', 'sql', 'params', 'function', 'ms', 'rows')
+
+    def __init__(self, db_path, sql, params, function):
+        self.db_path = db_path
+        self.sql = sql
+        self.params = params
+        self.function = function
+        self.ms = 0.0
+        self.rows = 0
+
+
+class QueryProfiler:
+    """Per-function and per-statement timings plus the slow-query log."""
+
+    def __init__(self, slow_ms=DEFAULT_SLOW_QUERY_MS):
+        self.enabled = True
+        self.slow_ms = float(slow_ms)
+        self.started_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.functions = {}
+        self.statements = {}
+        self.slow_log = collections.deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self._normalized = {}
+        self._lock = threading.Lock()
+
+    def start(self, db_path, sql, params):
+        return _QueryRun(db_path, sql, params, _profile_caller())
+
+    def finish(self, run):
+        statement = self._normalized.get(run.sql)
+        if statement is None:
+            statement = self._normalized[run.sql] = ' '.join(run.sql.split())
+        with self._lock:
+            for table, key in ((self.functions, run.function), (self.statements, statement)):
+                stat = table.get(key)
+                if stat is None:
+                    stat = table[key] = _QueryStat()
+                stat.add(run.ms, run.rows)
+            if run.ms >= self.slow_ms:
+                self.slow_log.append({
+                    'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'function': run.function,
+                    'statement': statement,
+                    'ms': round(run.ms, 3),
+                    'rows': run.rows,
+                    'plan': None,
+                    '_db_path': run.db_path,
+                    '_params': run.params,
+                })
+
+    def _explain_pending(self):
+        with self._lock:
+            pending = [entry for entry in self.slow_log if entry['plan'] is None]
+        plans = {}
+        for entry in pending:
+            key = (entry['_db_path'], entry['statement'])
+            if key not in plans:
+                plans[key] = _explain_statement(entry['_db_path'], entry['statement'], entry['_params'])
+            entry['plan'] = plans[key]
+            entry['_params'] = None
+
+    def snapshot(self):
+        self._explain_pending()
+        with self._lock:
+            functions = [dict(name=name, **stat.as_dict()) for name, stat in self.functions.items()]
+            statements = [dict(statement=sql, **stat.as_dict()) for sql, stat in self.statements.items()]
+            slow = [{k: v for k, v in entry.items() if not k.startswith('_')} for entry in self.slow_log]
+        functions.sort(key=lambda row: row['total_ms'], reverse=True)
+        statements.sort(key=lambda row: row['total_ms'], reverse=True)
+        slow.sort(key=lambda row: row['ms'], reverse=True)
+        return {
+            'enabled': self.enabled,
+            'started_at': self.started_at,
+            'slow_query_ms': self.slow_ms,
+            'functions': functions,
+            'statements': statements,
+            'slow_queries': slow,
+        }
+
+
+def _profile_caller():
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_globals is globals() and frame.f_code.co_qualname.startswith(_PROFILE_INTERNALS):
+        frame = frame.f_back
+    while frame is not None and frame.f_code.co_name in _PROFILE_PASSTHROUGH and frame.f_back is not None:
+        frame = frame.f_back
+    if frame is None:
+        return '?'
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_qualname}"
+
+
+def _explain_statement(db_path, sql, params):
+    """EXPLAIN QUERY PLAN on a private connection so the plan is not profiled itself."""
+    if not sql.lstrip().upper().startswith(_PLANNABLE_SQL):
+        return []
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+        finally:
+            conn.close()
+    except (sqlite3.Error, ValueError) as e:
+        return [f"(plan unavailable: {e})"]
+    depth = {0: 0}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, 0) + 1
+        lines.append('  ' * (depth[node_id] - 1) + detail)
+    return lines
+
+
+class _ProfilingCursor(sqlite3.Cursor):
+    """Cursor that times execute() and every fetch until the result is drained."""
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self._run = None
+
+    def _begin(self, sql, params):
+        self._finish()
+        profiler = _query_profiler
+        if profiler is not None:
+            self._run = profiler.start(self.connection.db_path, sql, params)
+
+    def _finish(self):
+        run, self._run = self._run, None
+        profiler = _query_profiler
+        if run is not None and profiler is not None:
+            profiler.finish(run)
+
+    def _timed(self, started, rows=0):
+        run = self._run
+        if run is not None:
+            run.ms += (time.perf_counter() - started) * 1000.0
+            run.rows += rows
+
+    def execute(self, sql, parameters=()):
+        self._begin(sql, parameters)
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except BaseException:
+            self._timed(started)
+            self._finish()
+            raise
+        if self.description is None:
+            # DML / DDL: nothing left to fetch, count the rows it touched.
+            self._timed(started, max(self.rowcount, 0))
+            self._finish()
+        else:
+            self._timed(started)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._begin(sql, None)
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._timed(started, max(self.rowcount, 0))
+            self._finish()
+        return self
+
+    def executescript(self, sql_script):
+        self._begin(sql_script, None)
+        started = time.perf_counter()
+        try:
+            super().executescript(sql_script)
+        finally:
+            self._timed(started)
+            self._finish()
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._timed(started, 0 if row is None else 1)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._timed(started, len(rows))
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._timed(started, len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._timed(started)
+            self._finish()
+            raise
+        self._timed(started, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # conn.execute(...).fetchone() leaves the cursor undrained; record it when dropped.
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class _ProfilingConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors report to the active QueryProfiler."""
+
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self.db_path = os.path.abspath(database)
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or _ProfilingCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        # The COMMIT (and its fsync) is often the slowest step of a write.
+        profiler = _query_profiler
+        if profiler is None or not self.in_transaction:
+            return super().commit()
+        run = profiler.start(self.db_path, 'COMMIT', None)
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            run.ms = (time.perf_counter() - started) * 1000.0
+            profiler.finish(run)
+
+
+def enable_query_profiling(slow_ms=None, reset=False):
+    """Start recording query timings; pooled connections reopen instrumented."""
+    global _query_profiler
+    if _query_profiler is None or reset:
+        _query_profiler = QueryProfiler(DEFAULT_SLOW_QUERY_MS if slow_ms is None else slow_ms)
+    elif slow_ms is not None:
+        _query_profiler.slow_ms = float(slow_ms)
+    _query_profiler.enabled = True
+    close_all_connections()
+    return _query_profiler
+
+
+def disable_query_profiling():
+    """Stop recording; what was collected stays readable until reset."""
+    if _query_profiler is not None and _query_profiler.enabled:
+        _query_profiler.enabled = False
+        close_all_connections()
+
+
+def query_profiling_enabled():
+    return _query_profiler is not None and _query_profiler.enabled
+
+
+def reset_query_profile():
+    """Drop collected timings, keeping the current on/off state and threshold."""
+    global _query_profiler
+    if _query_profiler is not None:
+        profiler = QueryProfiler(_query_profiler.slow_ms)
+        profiler.enabled = _query_profiler.enabled
+        _query_profiler = profiler
+
+
+def get_query_profile():
+    """Return the collected timings as plain data (None if never enabled)."""
+    if _query_profiler is None:
+        return None
+    return _query_profiler.snapshot()
+
+
+def export_query_profile(path):
+    """Write get_query_profile() to path as JSON; returns the profile written."""
+    profile = get_query_profile() or {}
+    profile['exported_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
+    return profile
+
+
+def load_query_profiler_settings(db_path=None):
+    """Enable the profiler at startup when db_profile_queries is '1'."""
+    if get_setting('db_profile_queries', '0', db_path) != '1':
+        return
+    try:
+        slow_ms = float(get_setting('db_slow_query_ms', str(DEFAULT_SLOW_QUERY_MS), db_path))
+    except ValueError:
+        slow_ms = DEFAULT_SLOW_QUERY_MS
+    enable_query_profiling(slow_ms)
 
 
 def hash_password(password):
@@ -37,21 +636,25 @@ def init_database(db_path=None):
     if db_path:
         set_db_file(db_path)
 
-    # Check if database file exists and is valid
+    # Check if database file exists and is valid. Reading the schema version
+    # doubles as the validity probe: it is the only read an up-to-date
+    # database needs before the app starts.
     db_file_to_use = db_path or DB_FILE
+    schema_version = 0
     if os.path.exists(db_file_to_use):
         try:
             # Try to open and verify it's a valid SQLite database
             test_conn = sqlite3.connect(db_file_to_use)
-            test_conn.execute("SELECT name FROM sqlite_master WHERE type='table' LIMIT 1")
+            schema_version = test_conn.execute("PRAGMA user_version").fetchone()[0]
             test_conn.close()
         except sqlite3.DatabaseError as e:
+            schema_version = 0
             # Database is corrupted or encrypted, remove it
             print(f"Warning: Corrupted database detected: {e}")
             print(f"Removing corrupted database: {db_file_to_use}")
+            close_all_connections()
             
             # Wait a moment for any locks to release
-            import time
             time.sleep(0.5)
             
             # Try to remove with retries
@@ -60,6 +663,9 @@ def init_database(db_path=None):
                 try:
                     if os.path.exists(db_file_to_use):
                         os.remove(db_file_to_use)
+                        for suffix in ('-wal', '-shm'):
+                            if os.path.exists(db_file_to_use + suffix):
+                                os.remove(db_file_to_use + suffix)
                         print("Corrupted database removed. Creating fresh database...")
                         break
                 except PermissionError:
@@ -83,9 +689,292 @@ def init_database(db_path=None):
                     print(f"Error removing corrupted database: {remove_error}")
                     raise Exception(f"Cannot remove corrupted database file: {db_file_to_use}")
 
+    if schema_version < SCHEMA_VERSION:
+        migrate_database(db_path)
+
+    # Apply WAL / PRAGMA tuning from settings before anything else runs.
+    load_connection_profile(db_path)
+    load_query_profiler_settings(db_path)
+
+
+# ── Secondary indexes ──
+# Adding or changing an index means appending a migration step that calls
+# _create_secondary_indexes() again (see MIGRATIONS below).
+SECONDARY_INDEXES = (
+    # name, table, columns
+    ('idx_loans_status_expire', 'loans', 'status, expire_date'),
+    ('idx_loans_customer', 'loans', 'customer_id, id'),
+    ('idx_loans_issue_date', 'loans', 'issue_date'),
+    ('idx_loans_created_at', 'loans', 'created_at'),
+    ('idx_loan_items_loan', 'loan_items', 'loan_id'),
+    ('idx_loan_payments_loan', 'loan_payments', 'loan_id, payment_date'),
+    ('idx_loan_payments_date', 'loan_payments', 'payment_date'),
+    ('idx_loan_renewals_loan', 'loan_renewals', 'loan_id, renewed_at'),
+    ('idx_loan_renewals_renewed_at', 'loan_renewals', 'renewed_at'),
+    ('idx_repawn_history_loan', 'repawn_history', 'loan_id, status'),
+    ('idx_cash_register_date', 'cash_register', 'transaction_date, id'),
+    ('idx_cash_register_type_date', 'cash_register', 'transaction_type, transaction_date'),
+    ('idx_customers_name', 'customers', 'name'),
+    ('idx_customers_birthday_mmdd', 'customers', 'substr(birthday, 6)'),
+    ('idx_sms_messages_status', 'sms_messages', 'status'),
+    ('idx_sms_messages_category_status', 'sms_messages', 'category, status'),
+    ('idx_sms_messages_created_at', 'sms_messages', 'created_at'),
+    ('idx_sms_messages_customer', 'sms_messages', 'customer_id, category, status'),
+    ('idx_scheduled_sms_status_time', 'scheduled_sms', 'status, scheduled_time'),
+    ('idx_customer_letters_loan', 'customer_letters', 'loan_id'),
+    ('idx_customer_letters_customer', 'customer_letters', 'customer_id'),
+    ('idx_customer_letters_template', 'customer_letters', 'template_id'),
+    ('idx_loan_approval_requests_loan', 'loan_approval_requests', 'loan_id'),
+    ('idx_loan_approval_requests_status', 'loan_approval_requests', 'status, created_at'),
+    # Report date ranges (see date_range_sql()).
+    ('idx_loans_status_updated_at', 'loans', 'status, updated_at'),
+    ('idx_customers_created_at', 'customers', 'created_at'),
+    ('idx_customer_letters_created_at', 'customer_letters', 'created_at'),
+    ('idx_loan_approval_requests_created_at', 'loan_approval_requests', 'created_at'),
+    ('idx_audit_log_created_at', 'audit_log', 'created_at'),
+)
+
+
+
+def _create_secondary_indexes(c):
+    for name, table, columns in SECONDARY_INDEXES:
+        c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+    # Refresh planner statistics so the new indexes are picked up immediately.
+    c.execute("ANALYZE")
+
+
+# ── Full-text search index ──
+# Substring search over customers, tickets and letter subjects is served by
+# FTS5 trigram shadow tables kept in sync by triggers. Interpreters whose
+# SQLite lacks FTS5 (or the trigram tokenizer) keep using LIKE '%q%'.
+
+# Trigram matching needs at least three characters; shorter queries use LIKE.
+FTS_MIN_QUERY_LENGTH = 3
+
+_SEARCH_INDEXES = (
+    # fts table, content table, indexed columns
+    ('customers_fts', 'customers', ('name', 'nic', 'phone')),
+    ('loans_fts', 'loans', ('ticket_no',)),
+    ('customer_letters_fts', 'customer_letters', ('subject',)),
+)
+
+_fts5_supported = None
+# Database path -> whether its FTS tables exist; filled lazily on first search.
+_search_index_ready = {}
+
+
+def fts5_available():
+    """Return True when the interpreter's SQLite has FTS5 with the trigram tokenizer."""
+    global _fts5_supported
+    if _fts5_supported is None:
+        probe = sqlite3.connect(':memory:')
+        try:
+            probe.execute("CREATE VIRTUAL TABLE fts_probe USING fts5(body, tokenize='trigram')")
+            _fts5_supported = True
+        except sqlite3.Error:
+            _fts5_supported = False
+        finally:
+            probe.close()
+    return _fts5_supported
+
+
+def _create_search_index(c):
+    """(Re)create the FTS5 shadow tables and their sync triggers."""
+    for fts, table, columns in _SEARCH_INDEXES:
+        cols = ', '.join(columns)
+        new_vals = ', '.join(f'new.{col}' for col in columns)
+        old_vals = ', '.join(f'old.{col}' for col in columns)
+        for suffix in ('ai', 'ad', 'au'):
+            c.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        c.execute(f"DROP TABLE IF EXISTS {fts}")
+        c.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', "
+            f"content_rowid='id', tokenize='trigram')"
+        )
+        c.execute(
+            f"""CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals});
+                END"""
+        )
+        c.execute(
+            f"""CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals});
+                END"""
+        )
+        c.execute(
+            f"""CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals});
+                    INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals});
+                END"""
+        )
+        c.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def rebuild_search_index(db_path=None):
+    """Rebuild the FTS5 tables, e.g. after moving the file to a PC whose SQLite has FTS5."""
+    key = _pool_key(db_path)
+    _search_index_ready.pop(key, None)
+    if not fts5_available():
+        return False
     conn = get_connection(db_path)
-    c = conn.cursor()
+    try:
+        conn.execute("BEGIN")
+        _create_search_index(conn.cursor())
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        print(f"Migration info: {e}")
+        return False
+    finally:
+        conn.close()
 
+
+def _use_search_index(query, db_path=None):
+    if len(query or '') < FTS_MIN_QUERY_LENGTH or not fts5_available():
+        return False
+    key = _pool_key(db_path)
+    ready = _search_index_ready.get(key)
+    if ready is None:
+        conn = get_connection(db_path)
+        try:
+            ready = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                (_SEARCH_INDEXES[0][0],),
+            ).fetchone() is not None
+        finally:
+            conn.close()
+        _search_index_ready[key] = ready
+    return ready
+
+
+def _fts_match(query, columns=None):
+    """Build an FTS5 MATCH expression for a literal substring, optionally column-restricted."""
+    phrase = '"' + str(query).replace('"', '""') + '"'
+    if columns:
+        return '{' + ' '.join(columns) + '} : ' + phrase
+    return phrase
+
+
+# ── Schema migrations ──
+# The database file records how far it has been migrated in PRAGMA
+# user_version. init_database() reads that one integer and, only when it is
+# behind SCHEMA_VERSION, runs the pending steps of MIGRATIONS in order, each
+# in its own transaction together with the version bump. To change the
+# schema, append a step; never edit a step that has shipped.
+
+# Columns added after a table first shipped. Files created by older builds
+# get them on the baseline step; fresh files already have them.
+_LATE_COLUMNS = (
+    ('users', 'updated_at', "TEXT"),
+    ('customers', 'birthday', "TEXT"),
+    ('customers', 'job', "TEXT"),
+    ('customers', 'marital_status', "TEXT"),
+    ('customers', 'language', "TEXT"),
+    ('loans', 'renew_date', "TEXT"),
+    ('loans', 'advance_amount', "REAL"),
+    ('loans', 'interest_principal_amount', "REAL"),
+    ('loans', 'is_other_bank_ticket', "INTEGER NOT NULL DEFAULT 0"),
+    ('loans', 'other_bank_paid_amount', "REAL NOT NULL DEFAULT 0"),
+    ('loans', 'service_charge_rate', "REAL NOT NULL DEFAULT 0"),
+    ('loans', 'service_charge_amount', "REAL NOT NULL DEFAULT 0"),
+    ('loans', 'service_charge_payment_mode', "TEXT NOT NULL DEFAULT 'financed'"),
+    ('loans', 'customer_balance_amount', "REAL NOT NULL DEFAULT 0"),
+    ('loan_renewals', 'payment_amount', "REAL NOT NULL DEFAULT 0"),
+    ('loan_renewals', 'normal_interest_due', "REAL NOT NULL DEFAULT 0"),
+    ('loan_renewals', 'overdue_interest_due', "REAL NOT NULL DEFAULT 0"),
+    ('loan_renewals', 'principal_reduction', "REAL NOT NULL DEFAULT 0"),
+    ('loan_renewals', 'new_loan_amount', "REAL"),
+    ('loan_renewals', 'other_charges', "REAL NOT NULL DEFAULT 0"),
+    ('loan_renewals', 'overdue_penalty_interest', "REAL NOT NULL DEFAULT 0"),
+    ('loan_payments', 'principal_amount', "REAL NOT NULL DEFAULT 0"),
+    ('loan_payments', 'interest_amount', "REAL NOT NULL DEFAULT 0"),
+    ('loan_payments', 'overdue_interest_amount', "REAL NOT NULL DEFAULT 0"),
+    ('loan_payments', 'other_charges_amount', "REAL NOT NULL DEFAULT 0"),
+    ('duration_rates', 'max_interest_months', "INTEGER DEFAULT 3"),
+    ('duration_rates', 'duration_unit', "TEXT DEFAULT 'months'"),
+    ('duration_rates', 'other_charges_renewal', "REAL NOT NULL DEFAULT 0"),
+    ('duration_rates', 'other_charges_redeem', "REAL NOT NULL DEFAULT 0"),
+    ('letter_templates', 'language', "TEXT NOT NULL DEFAULT 'English'"),
+    ('letter_templates', 'category', "TEXT NOT NULL DEFAULT 'overdue_notice'"),
+    ('letter_templates', 'subject', "TEXT"),
+    ('letter_templates', 'body_json', "TEXT"),
+    ('letter_templates', 'is_default', "INTEGER NOT NULL DEFAULT 0"),
+    ('letter_templates', 'created_by', "INTEGER"),
+    ('letter_templates', 'created_at', "TEXT"),
+    ('letter_templates', 'updated_at', "TEXT"),
+    ('customer_letters', 'loan_id', "INTEGER"),
+    ('customer_letters', 'customer_id', "INTEGER"),
+    ('customer_letters', 'template_id', "INTEGER"),
+    ('customer_letters', 'language', "TEXT NOT NULL DEFAULT 'English'"),
+    ('customer_letters', 'subject', "TEXT"),
+    ('customer_letters', 'body_json', "TEXT"),
+    ('customer_letters', 'body_text', "TEXT"),
+    ('customer_letters', 'status', "TEXT NOT NULL DEFAULT 'draft'"),
+    ('customer_letters', 'printed_at', "TEXT"),
+    ('customer_letters', 'sent_at', "TEXT"),
+    ('customer_letters', 'created_by', "INTEGER"),
+    ('customer_letters', 'created_at', "TEXT"),
+    ('customer_letters', 'updated_at', "TEXT"),
+)
+
+DEFAULT_SETTINGS = {
+    'company_name': 'Gold Loan Center',
+    'company_phone': '',
+    'company_address': '',
+    'ticket_prefix': 'GL',
+    'print_format': 'a4',
+    'other_bank_service_charge_pct': '2.0',
+    'sms_gateway_base_url': 'https://app.text.lk/api/v3/sms/send',
+    'sms_gateway_token': '',
+    'sms_sender_id': '',
+    'sms_default_country_code': '94',
+    'sms_enabled': '0',
+    'sms_auto_new_loan': '0',
+    'sms_auto_renewal': '0',
+    'sms_auto_redemption': '0',
+    'sms_auto_reminder': '0',
+    'cash_management_enabled': '0',
+    'cash_management_popup_mode': 'daily',
+    'cash_management_last_date': '',
+    'db_journal_mode': DEFAULT_CONNECTION_PROFILE['journal_mode'],
+    'db_synchronous': DEFAULT_CONNECTION_PROFILE['synchronous'],
+    'db_cache_size_kb': str(DEFAULT_CONNECTION_PROFILE['cache_size_kb']),
+    'db_mmap_size_mb': str(DEFAULT_CONNECTION_PROFILE['mmap_size_mb']),
+    'db_temp_store': DEFAULT_CONNECTION_PROFILE['temp_store'],
+    'db_busy_timeout_ms': str(DEFAULT_CONNECTION_PROFILE['busy_timeout_ms']),
+}
+
+
+def _table_columns(c, table):
+    return [row[1] for row in c.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def _rebuild_table(c, table, create_sql):
+    """Swap a table for a new definition, copying the columns both versions share.
+
+    create_sql must create `<table>_new`. SQLite cannot ALTER a CHECK or
+    UNIQUE constraint, so this is the only way to change one. Callers run
+    with foreign keys off (see migrate_database()).
+    """
+    old_cols = _table_columns(c, table)
+    c.execute(create_sql)
+    new_cols = set(_table_columns(c, f'{table}_new'))
+    cols = ', '.join(col for col in old_cols if col in new_cols)
+    c.execute(f"INSERT INTO {table}_new ({cols}) SELECT {cols} FROM {table}")
+    c.execute(f"DROP TABLE {table}")
+    c.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+
+def _seed_settings(c, defaults):
+    c.executemany(
+        "INSERT OR IGNORE INTO settings (key, value) VALUES (?,?)",
+        list(defaults.items()),
+    )
+
+
+def _migrate_baseline(c):
+    """Bring a fresh file, or one from any build before versioned migrations, to the v1 schema."""
     c.execute('''CREATE TABLE IF NOT EXISTS users (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         username TEXT UNIQUE NOT NULL,
@@ -358,17 +1247,35 @@ def init_database(db_path=None):
         UNIQUE(customer_id, wish_year)
     )''')
 
-    # Migrate existing databases: allow repawned status by recreating the loans table check constraint.
-    # SQLite does not support ALTER TABLE ... MODIFY COLUMN, so we inspect the schema SQL directly.
-    # If 'repawned' is not already in the CHECK constraint, recreate the table.
+    # Per-prefix ticket counter; see _reserve_ticket_no().
+    c.execute('''CREATE TABLE IF NOT EXISTS ticket_sequences (
+        prefix TEXT PRIMARY KEY,
+        last_number INTEGER NOT NULL DEFAULT 0
+    )''')
+
+    # Create repawn_history table to track repawning events
+    c.execute('''CREATE TABLE IF NOT EXISTS repawn_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        loan_id INTEGER NOT NULL,
+        repawned_by INTEGER,
+        repawned_at TEXT DEFAULT (datetime('now','localtime')),
+        restock_by INTEGER,
+        restock_at TEXT,
+        destination TEXT,
+        remarks TEXT,
+        status TEXT NOT NULL DEFAULT 'repawned' CHECK(status IN ('repawned','restocked')),
+        FOREIGN KEY (loan_id) REFERENCES loans(id),
+        FOREIGN KEY (repawned_by) REFERENCES users(id),
+        FOREIGN KEY (restock_by) REFERENCES users(id)
+    )''')
+
+    # Old builds: the loans CHECK constraint predates the 'repawned' status.
     _loans_ddl = c.execute(
         "SELECT sql FROM sqlite_master WHERE type='table' AND name='loans'"
     ).fetchone()
     _loans_sql = (_loans_ddl[0] or '') if _loans_ddl else ''
     if "'repawned'" not in _loans_sql and '"repawned"' not in _loans_sql:
-        # Disable FK enforcement during the table swap to avoid child-table constraint errors.
-        c.execute("PRAGMA foreign_keys = OFF")
-        c.execute('''CREATE TABLE IF NOT EXISTS loans_new (
+        _rebuild_table(c, 'loans', '''CREATE TABLE loans_new (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             ticket_no TEXT UNIQUE NOT NULL,
             customer_id INTEGER NOT NULL,
@@ -400,81 +1307,47 @@ def init_database(db_path=None):
             FOREIGN KEY (customer_id) REFERENCES customers(id),
             FOREIGN KEY (created_by) REFERENCES users(id)
         )''')
-        c.execute('INSERT INTO loans_new SELECT * FROM loans')
-        c.execute('DROP TABLE loans')
-        c.execute('ALTER TABLE loans_new RENAME TO loans')
-        c.execute("PRAGMA foreign_keys = ON")
 
-    # Create repawn_history table to track repawning events
-    c.execute('''CREATE TABLE IF NOT EXISTS repawn_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        loan_id INTEGER NOT NULL,
-        repawned_by INTEGER,
-        repawned_at TEXT DEFAULT (datetime('now','localtime')),
-        restock_by INTEGER,
-        restock_at TEXT,
-        destination TEXT,
-        remarks TEXT,
-        status TEXT NOT NULL DEFAULT 'repawned' CHECK(status IN ('repawned','restocked')),
-        FOREIGN KEY (loan_id) REFERENCES loans(id),
-        FOREIGN KEY (repawned_by) REFERENCES users(id),
-        FOREIGN KEY (restock_by) REFERENCES users(id)
-    )''')
+    # Old builds (formerly migrate_db.py): duration rates were not per carat.
+    # Rates become the carat-0 default and are copied to every standard carat.
+    if 'carat' not in _table_columns(c, 'duration_rates'):
+        rate_cols = [col for col in _table_columns(c, 'duration_rates') if col != 'id']
+        c.execute('''CREATE TABLE duration_rates_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            carat INTEGER NOT NULL DEFAULT 0,
+            duration_months INTEGER NOT NULL,
+            assessed_percentage REAL NOT NULL,
+            interest_rate REAL NOT NULL,
+            overdue_interest_rate REAL NOT NULL,
+            is_active INTEGER DEFAULT 1,
+            updated_at TEXT DEFAULT (datetime('now','localtime')),
+            UNIQUE(carat, duration_months)
+        )''')
+        for col, ddl in [(col, ddl) for table, col, ddl in _LATE_COLUMNS if table == 'duration_rates']:
+            if col in rate_cols:
+                c.execute(f"ALTER TABLE duration_rates_new ADD COLUMN {col} {ddl}")
+        cols = ', '.join(rate_cols)
+        for ct in (0, 16, 17, 18, 19, 20, 21, 22, 23, 24):
+            c.execute(
+                f"INSERT INTO duration_rates_new (carat, {cols}) SELECT ?, {cols} FROM duration_rates",
+                (ct,),
+            )
+        c.execute('DROP TABLE duration_rates')
+        c.execute('ALTER TABLE duration_rates_new RENAME TO duration_rates')
 
     # Backward-compatible schema updates for existing databases.
-    loan_cols = {row['name'] for row in c.execute("PRAGMA table_info(loans)").fetchall()}
-    if 'renew_date' not in loan_cols:
-        c.execute("ALTER TABLE loans ADD COLUMN renew_date TEXT")
-    if 'advance_amount' not in loan_cols:
-        c.execute("ALTER TABLE loans ADD COLUMN advance_amount REAL")
-    if 'interest_principal_amount' not in loan_cols:
-        c.execute("ALTER TABLE loans ADD COLUMN interest_principal_amount REAL")
-    if 'is_other_bank_ticket' not in loan_cols:
-        c.execute("ALTER TABLE loans ADD COLUMN is_other_bank_ticket INTEGER NOT NULL DEFAULT 0")
-    if 'other_bank_paid_amount' not in loan_cols:
-        c.execute("ALTER TABLE loans ADD COLUMN other_bank_paid_amount REAL NOT NULL DEFAULT 0")
-    if 'service_charge_rate' not in loan_cols:
-        c.execute("ALTER TABLE loans ADD COLUMN service_charge_rate REAL NOT NULL DEFAULT 0")
-    if 'service_charge_amount' not in loan_cols:
-        c.execute("ALTER TABLE loans ADD COLUMN service_charge_amount REAL NOT NULL DEFAULT 0")
-    if 'service_charge_payment_mode' not in loan_cols:
-        c.execute("ALTER TABLE loans ADD COLUMN service_charge_payment_mode TEXT NOT NULL DEFAULT 'financed'")
-    if 'customer_balance_amount' not in loan_cols:
-        c.execute("ALTER TABLE loans ADD COLUMN customer_balance_amount REAL NOT NULL DEFAULT 0")
-
-    customer_cols = {row['name'] for row in c.execute("PRAGMA table_info(customers)").fetchall()}
-    if 'birthday' not in customer_cols:
-        c.execute("ALTER TABLE customers ADD COLUMN birthday TEXT")
-    if 'job' not in customer_cols:
-        c.execute("ALTER TABLE customers ADD COLUMN job TEXT")
-    if 'marital_status' not in customer_cols:
-        c.execute("ALTER TABLE customers ADD COLUMN marital_status TEXT")
-    if 'language' not in customer_cols:
-        c.execute("ALTER TABLE customers ADD COLUMN language TEXT")
-
+    existing = {}
+    for table, col, ddl in _LATE_COLUMNS:
+        if table not in existing:
+            existing[table] = set(_table_columns(c, table))
+        if col not in existing[table]:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {col} {ddl}")
+
+    # Backfill values the added columns could not default to.
+    c.execute("UPDATE users SET updated_at = COALESCE(updated_at, datetime('now','localtime'))")
     c.execute("UPDATE customers SET marital_status = COALESCE(NULLIF(marital_status, ''), 'Unmarried')")
     c.execute("UPDATE customers SET language = COALESCE(NULLIF(language, ''), 'Sinhala')")
 
-    # Letters tables can already exist from older builds with a different shape.
-    # Ensure all required columns exist before letter queries run.
-    letter_template_cols = {row['name'] for row in c.execute("PRAGMA table_info(letter_templates)").fetchall()}
-    if 'language' not in letter_template_cols:
-        c.execute("ALTER TABLE letter_templates ADD COLUMN language TEXT NOT NULL DEFAULT 'English'")
-    if 'category' not in letter_template_cols:
-        c.execute("ALTER TABLE letter_templates ADD COLUMN category TEXT NOT NULL DEFAULT 'overdue_notice'")
-    if 'subject' not in letter_template_cols:
-        c.execute("ALTER TABLE letter_templates ADD COLUMN subject TEXT")
-    if 'body_json' not in letter_template_cols:
-        c.execute("ALTER TABLE letter_templates ADD COLUMN body_json TEXT")
-    if 'is_default' not in letter_template_cols:
-        c.execute("ALTER TABLE letter_templates ADD COLUMN is_default INTEGER NOT NULL DEFAULT 0")
-    if 'created_by' not in letter_template_cols:
-        c.execute("ALTER TABLE letter_templates ADD COLUMN created_by INTEGER")
-    if 'created_at' not in letter_template_cols:
-        c.execute("ALTER TABLE letter_templates ADD COLUMN created_at TEXT")
-    if 'updated_at' not in letter_template_cols:
-        c.execute("ALTER TABLE letter_templates ADD COLUMN updated_at TEXT")
-
     c.execute("UPDATE letter_templates SET language = COALESCE(NULLIF(language, ''), 'English')")
     c.execute("UPDATE letter_templates SET category = COALESCE(NULLIF(category, ''), 'overdue_notice')")
     c.execute("UPDATE letter_templates SET subject = COALESCE(NULLIF(subject, ''), COALESCE(name, 'Letter Notice'))")
@@ -485,34 +1358,6 @@ def init_database(db_path=None):
     c.execute("UPDATE letter_templates SET created_at = COALESCE(NULLIF(created_at, ''), datetime('now','localtime'))")
     c.execute("UPDATE letter_templates SET updated_at = COALESCE(NULLIF(updated_at, ''), datetime('now','localtime'))")
 
-    letter_cols = {row['name'] for row in c.execute("PRAGMA table_info(customer_letters)").fetchall()}
-    if 'loan_id' not in letter_cols:
-        c.execute("ALTER TABLE customer_letters ADD COLUMN loan_id INTEGER")
-    if 'customer_id' not in letter_cols:
-        c.execute("ALTER TABLE customer_letters ADD COLUMN customer_id INTEGER")
-    if 'template_id' not in letter_cols:
-        c.execute("ALTER TABLE customer_letters ADD COLUMN template_id INTEGER")
-    if 'language' not in letter_cols:
-        c.execute("ALTER TABLE customer_letters ADD COLUMN language TEXT NOT NULL DEFAULT 'English'")
-    if 'subject' not in letter_cols:
-        c.execute("ALTER TABLE customer_letters ADD COLUMN subject TEXT")
-    if 'body_json' not in letter_cols:
-        c.execute("ALTER TABLE customer_letters ADD COLUMN body_json TEXT")
-    if 'body_text' not in letter_cols:
-        c.execute("ALTER TABLE customer_letters ADD COLUMN body_text TEXT")
-    if 'status' not in letter_cols:
-        c.execute("ALTER TABLE customer_letters ADD COLUMN status TEXT NOT NULL DEFAULT 'draft'")
-    if 'printed_at' not in letter_cols:
-        c.execute("ALTER TABLE customer_letters ADD COLUMN printed_at TEXT")
-    if 'sent_at' not in letter_cols:
-        c.execute("ALTER TABLE customer_letters ADD COLUMN sent_at TEXT")
-    if 'created_by' not in letter_cols:
-        c.execute("ALTER TABLE customer_letters ADD COLUMN created_by INTEGER")
-    if 'created_at' not in letter_cols:
-        c.execute("ALTER TABLE customer_letters ADD COLUMN created_at TEXT")
-    if 'updated_at' not in letter_cols:
-        c.execute("ALTER TABLE customer_letters ADD COLUMN updated_at TEXT")
-
     c.execute("UPDATE customer_letters SET language = COALESCE(NULLIF(language, ''), 'English')")
     c.execute("UPDATE customer_letters SET subject = COALESCE(NULLIF(subject, ''), 'Customer Letter')")
     c.execute("UPDATE customer_letters SET body_json = COALESCE(NULLIF(body_json, ''), '{\"text\":\"\",\"tags\":[]}')")
@@ -524,26 +1369,12 @@ def init_database(db_path=None):
     c.execute("UPDATE loans SET advance_amount = COALESCE(advance_amount, loan_amount)")
     c.execute("UPDATE loans SET interest_principal_amount = COALESCE(interest_principal_amount, loan_amount)")
 
-    renewal_cols = {row['name'] for row in c.execute("PRAGMA table_info(loan_renewals)").fetchall()}
-    if 'payment_amount' not in renewal_cols:
-        c.execute("ALTER TABLE loan_renewals ADD COLUMN payment_amount REAL NOT NULL DEFAULT 0")
-    if 'normal_interest_due' not in renewal_cols:
-        c.execute("ALTER TABLE loan_renewals ADD COLUMN normal_interest_due REAL NOT NULL DEFAULT 0")
-    if 'overdue_interest_due' not in renewal_cols:
-        c.execute("ALTER TABLE loan_renewals ADD COLUMN overdue_interest_due REAL NOT NULL DEFAULT 0")
-    if 'principal_reduction' not in renewal_cols:
-        c.execute("ALTER TABLE loan_renewals ADD COLUMN principal_reduction REAL NOT NULL DEFAULT 0")
-    if 'new_loan_amount' not in renewal_cols:
-        c.execute("ALTER TABLE loan_renewals ADD COLUMN new_loan_amount REAL")
-
-    # Add max_interest_months column to duration_rates for capping interest rate growth
-    duration_cols = {row['name'] for row in c.execute("PRAGMA table_info(duration_rates)").fetchall()}
-    if 'max_interest_months' not in duration_cols:
-        c.execute("ALTER TABLE duration_rates ADD COLUMN max_interest_months INTEGER DEFAULT 3")
-    
-    # Add duration_unit column to support days and months
-    if 'duration_unit' not in duration_cols:
-        c.execute("ALTER TABLE duration_rates ADD COLUMN duration_unit TEXT DEFAULT 'months'")
+    # Old 'renewed' status is treated as active so loan actions remain available.
+    c.execute(
+        """UPDATE loans
+           SET status='active', updated_at=datetime('now','localtime')
+           WHERE status='renewed'"""
+    )
 
     # Seed default admin user
     admin_exists = c.execute("SELECT COUNT(*) FROM users WHERE role='admin'").fetchone()[0]
@@ -561,12 +1392,12 @@ def init_database(db_path=None):
         ]
         c.executemany("INSERT INTO market_rates (carat, rate_per_gram) VALUES (?,?)", default_rates)
 
-    # One-time migration: old builds stored rates per gram.
+    # Old builds stored rates per gram.
     # If unit marker is missing and values look like per-gram rates, convert to per-8g.
     unit_row = c.execute("SELECT value FROM settings WHERE key='market_rate_unit'").fetchone()
     if not unit_row:
         max_rate_row = c.execute("SELECT MAX(rate_per_gram) AS max_rate FROM market_rates").fetchone()
-        max_rate = max_rate_row['max_rate'] if max_rate_row and max_rate_row['max_rate'] is not None else 0
+        max_rate = max_rate_row[0] if max_rate_row and max_rate_row[0] is not None else 0
         if max_rate and float(max_rate) < 15000:
             c.execute("UPDATE market_rates SET rate_per_gram = rate_per_gram * 8")
         c.execute(
@@ -591,31 +1422,7 @@ def init_database(db_path=None):
                     "INSERT INTO duration_rates (carat, duration_months, assessed_percentage, interest_rate, overdue_interest_rate) VALUES (?,?,?,?,?)",
                     (ct, dm, pct, ir, od))
 
-    # Seed default settings
-    defaults = {
-        'company_name': 'Gold Loan Center',
-        'company_phone': '',
-        'company_address': '',
-        'ticket_prefix': 'GL',
-        'print_format': 'a4',
-        'other_bank_service_charge_pct': '2.0',
-        'sms_gateway_base_url': 'https://app.text.lk/api/v3/sms/send',
-        'sms_gateway_token': '',
-        'sms_sender_id': '',
-        'sms_default_country_code': '94',
-        'sms_enabled': '0',
-        'sms_auto_new_loan': '0',
-        'sms_auto_renewal': '0',
-        'sms_auto_redemption': '0',
-        'sms_auto_reminder': '0',
-        'cash_management_enabled': '0',
-        'cash_management_popup_mode': 'daily',
-        'cash_management_last_date': '',
-    }
-    for key, val in defaults.items():
-        existing = c.execute("SELECT key FROM settings WHERE key=?", (key,)).fetchone()
-        if not existing:
-            c.execute("INSERT INTO settings (key, value) VALUES (?,?)", (key, val))
+    _seed_settings(c, DEFAULT_SETTINGS)
 
     sms_template_count = c.execute("SELECT COUNT(*) FROM sms_templates").fetchone()[0]
     if not sms_template_count:
@@ -693,122 +1500,154 @@ def init_database(db_path=None):
                 (tpl['name'], tpl['language'], 'overdue_notice', tpl['subject'], body_json)
             )
 
-    conn.commit()
-    conn.close()
-    
-    # Run migrations
-    ensure_users_updated_at_column(db_path)
-    ensure_duration_rates_other_charges_columns(db_path)
-    ensure_loan_renewals_other_charges_column(db_path)
-    ensure_loan_payments_redemption_details_columns(db_path)
-    ensure_legacy_renewed_status_compatibility(db_path)
 
+def _migrate_secondary_indexes(c):
+    """Create the secondary index set (replaces the db_index_version setting)."""
+    _create_secondary_indexes(c)
+    c.execute("DELETE FROM settings WHERE key='db_index_version'")
+
+
+def _migrate_search_index(c):
+    """Create the FTS5 search tables where the interpreter supports them."""
+    if fts5_available():
+        _create_search_index(c)
+    c.execute("DELETE FROM settings WHERE key='db_search_index_version'")
+
+
+def _migrate_loan_stats(c):
+    """Create the trigger-maintained dashboard counters and fill them from the current book."""
+    _create_loan_stats(c)
+    _rebuild_loan_stats(c)
+
+
+def _migrate_data_versions(c):
+    """Create the data_versions counters and the triggers that bump them."""
+    _create_data_versions(c)
+
+
+def _migrate_report_rollups(c):
+    """Create the trigger-maintained report rollups and backfill them from the current book."""
+    _create_report_rollups(c)
+    _rebuild_report_rollups(c)
 
-def ensure_users_updated_at_column(db_path=None):
-    """Add updated_at column to users table if it doesn't exist (migration)."""
-    conn = get_connection(db_path)
-    c = conn.cursor()
-    
-    try:
-        # Check if updated_at column exists
-        c.execute("PRAGMA table_info(users)")
-        columns = [row[1] for row in c.fetchall()]
-        
-        if 'updated_at' not in columns:
-            # Add the column without default (SQLite doesn't allow function defaults in ALTER)
-            c.execute("ALTER TABLE users ADD COLUMN updated_at TEXT")
-            # Update all existing rows to have the current timestamp
-            c.execute("UPDATE users SET updated_at = datetime('now','localtime')")
-            conn.commit()
-    except Exception as e:
-        print(f"Migration info: {e}")
-    finally:
-        conn.close()
 
+def _migrate_report_data_versions(c):
+    """Add data_versions counters for the other tables the reports read."""
+    _create_data_versions(c, REPORT_DATA_TABLES)
 
-def ensure_duration_rates_other_charges_columns(db_path=None):
-    """Add other_charges columns to duration_rates table (migration)."""
+
+def _migrate_rollup_repricing(c):
+    """Re-create the rollup triggers (adds rollup_loans_principal_au) and rebuild the drifted rollups."""
+    _create_report_rollups(c)
+    _rebuild_report_rollups(c)
+
+
+def _migrate_gold_vault(c):
+    """Create the gold-in-vault running totals and fill them from the current book."""
+    _create_gold_vault(c)
+    _rebuild_gold_vault(c)
+
+
+def _migrate_sms_outbox(c):
+    """Turn sms_messages into the outbox (idempotency key, lease and schedule columns)."""
+    _create_sms_outbox(c)
+
+
+# Ordered steps; a file at user_version N has had the first N applied.
+MIGRATIONS = (
+    ('baseline schema', _migrate_baseline),
+    ('secondary indexes', _migrate_secondary_indexes),
+    ('full-text search index', _migrate_search_index),
+    ('birthday and SMS history indexes', _migrate_secondary_indexes),
+    ('report date range indexes', _migrate_secondary_indexes),
+    ('dashboard counters', _migrate_loan_stats),
+    ('data version counters', _migrate_data_versions),
+    ('report rollups', _migrate_report_rollups),
+    ('gold in vault totals', _migrate_gold_vault),
+    ('rollups follow principal changes', _migrate_rollup_repricing),
+    ('report data versions', _migrate_report_data_versions),
+    ('SMS outbox', _migrate_sms_outbox),
+)
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(db_path=None):
     conn = get_connection(db_path)
-    c = conn.cursor()
-    
     try:
-        c.execute("PRAGMA table_info(duration_rates)")
-        columns = [row[1] for row in c.fetchall()]
-        
-        if 'other_charges_renewal' not in columns:
-            c.execute("ALTER TABLE duration_rates ADD COLUMN other_charges_renewal REAL NOT NULL DEFAULT 0")
-        if 'other_charges_redeem' not in columns:
-            c.execute("ALTER TABLE duration_rates ADD COLUMN other_charges_redeem REAL NOT NULL DEFAULT 0")
-        
-        conn.commit()
-    except Exception as e:
-        print(f"Migration info: {e}")
+        return conn.execute("PRAGMA user_version").fetchone()[0]
     finally:
         conn.close()
 
 
-def ensure_loan_renewals_other_charges_column(db_path=None):
-    """Add other_charges column to loan_renewals table (migration)."""
+def migrate_database(db_path=None):
+    """Apply every pending step of MIGRATIONS; returns the names of the steps applied.
+
+    Each step commits together with its user_version bump, so an interrupted
+    upgrade resumes at the first step that did not finish.
+    """
+    applied = []
     conn = get_connection(db_path)
-    c = conn.cursor()
-    
     try:
-        c.execute("PRAGMA table_info(loan_renewals)")
-        columns = [row[1] for row in c.fetchall()]
-        
-        if 'other_charges' not in columns:
-            c.execute("ALTER TABLE loan_renewals ADD COLUMN other_charges REAL NOT NULL DEFAULT 0")
-        if 'overdue_penalty_interest' not in columns:
-            c.execute("ALTER TABLE loan_renewals ADD COLUMN overdue_penalty_interest REAL NOT NULL DEFAULT 0")
-        
-        conn.commit()
-    except Exception as e:
-        print(f"Migration info: {e}")
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        if current >= SCHEMA_VERSION:
+            return applied
+        # Table rebuilds would trip child foreign keys; the pragma is a no-op
+        # inside a transaction, so it is switched before the first BEGIN.
+        conn.execute("PRAGMA foreign_keys = OFF")
+        for version, (name, step) in enumerate(MIGRATIONS, start=1):
+            if version <= current:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                step(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(name)
+            print(f"Migration info: applied step {version} ({name})")
     finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+        _search_index_ready.pop(_pool_key(db_path), None)
         conn.close()
+    return applied
 
 
-def ensure_loan_payments_redemption_details_columns(db_path=None):
-    """Add redemption detail columns to loan_payments table if they don't exist (migration)."""
-    conn = get_connection(db_path)
-    c = conn.cursor()
+# ── Date range helpers ──
+# Dates are stored as ISO text ('YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'), so
+# `date(col) BETWEEN a AND b` selects the same rows as `col >= a AND col < b+1`.
+# The second form leaves the column bare and lets SQLite use its index.
 
-    try:
-        c.execute("PRAGMA table_info(loan_payments)")
-        columns = [row[1] for row in c.fetchall()]
-
-        if 'principal_amount' not in columns:
-            c.execute("ALTER TABLE loan_payments ADD COLUMN principal_amount REAL NOT NULL DEFAULT 0")
-        if 'interest_amount' not in columns:
-            c.execute("ALTER TABLE loan_payments ADD COLUMN interest_amount REAL NOT NULL DEFAULT 0")
-        if 'overdue_interest_amount' not in columns:
-            c.execute("ALTER TABLE loan_payments ADD COLUMN overdue_interest_amount REAL NOT NULL DEFAULT 0")
-        if 'other_charges_amount' not in columns:
-            c.execute("ALTER TABLE loan_payments ADD COLUMN other_charges_amount REAL NOT NULL DEFAULT 0")
+def day_after(day):
+    """Return the ISO date following `day` ('YYYY-MM-DD...'), or None."""
+    if not day:
+        return None
+    return (datetime.strptime(str(day)[:10], '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
 
-        conn.commit()
-    except Exception as e:
-        print(f"Migration info: {e}")
-    finally:
-        conn.close()
 
+def date_range_sql(column, lower=True, upper=True):
+    """Index-friendly stand-in for date(column) BETWEEN ? AND ? (or >= ? / <= ? alone).
 
-def ensure_legacy_renewed_status_compatibility(db_path=None):
-    """Normalize old 'renewed' loan status to active so actions remain available."""
-    conn = get_connection(db_path)
-    c = conn.cursor()
+    Bind the values returned by date_range_params().
+    """
+    parts = []
+    if lower:
+        parts.append(f"{column} >= ?")
+    if upper:
+        parts.append(f"{column} < ?")
+    return ' AND '.join(parts)
 
-    try:
-        c.execute(
-            """UPDATE loans
-               SET status='active', updated_at=datetime('now','localtime')
-               WHERE status='renewed'"""
-        )
-        conn.commit()
-    except Exception as e:
-        print(f"Migration info: {e}")
-    finally:
-        conn.close()
+
+def date_range_params(date_from=None, date_to=None, lower=True, upper=True):
+    """Bind values for date_range_sql(): the inclusive date_to becomes an exclusive next day."""
+    params = []
+    if lower:
+        params.append(date_from)
+    if upper:
+        params.append(day_after(date_to))
+    return tuple(params)
 
 
 # ── User operations ──
@@ -856,31 +1695,95 @@ def update_user(user_id, full_name, role, is_active, password=None, db_path=None
 
 
 # ── Customer operations ──
+# Listings page with a keyset cursor: pass page_size for one page, then the
+# last row's id as after_id for the next. Paged customer results are ordered
+# by (name, id) so the cursor stays stable; without page_size every match is
+# returned as before. count_*() give the matching total for the UI.
+
+def _customer_search_filter(query, db_path=None):
+    """WHERE fragment and params matching customers (alias c) against query."""
+    if not query:
+        return '1=1', []
+    if _use_search_index(query, db_path):
+        return "c.id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?)", [_fts_match(query)]
+    return "(c.name LIKE ? OR c.nic LIKE ? OR c.phone LIKE ?)", [f'%{query}%'] * 3
 
-def search_customers(query='', db_path=None):
+
+def search_customers(query='', after_id=None, page_size=None, db_path=None):
     conn = get_connection(db_path)
-    rows = conn.execute(
-        "SELECT * FROM customers WHERE name LIKE ? OR nic LIKE ? OR phone LIKE ? ORDER BY name",
-        (f'%{query}%', f'%{query}%', f'%{query}%')
-    ).fetchall()
+    if page_size is not None:
+        where, params = _customer_search_filter(query, db_path)
+        if after_id is not None:
+            where += " AND (c.name, c.id) > (SELECT name, id FROM customers WHERE id = ?)"
+            params.append(after_id)
+        rows = conn.execute(
+            f"SELECT c.* FROM customers c WHERE {where} ORDER BY c.name, c.id LIMIT ?",
+            (*params, int(page_size))
+        ).fetchall()
+    elif _use_search_index(query, db_path):
+        rows = conn.execute(
+            """SELECT c.* FROM customers_fts f
+               JOIN customers c ON c.id = f.rowid
+               WHERE customers_fts MATCH ?
+               ORDER BY f.rank, c.name""",
+            (_fts_match(query),)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT * FROM customers WHERE name LIKE ? OR nic LIKE ? OR phone LIKE ? ORDER BY name",
+            (f'%{query}%', f'%{query}%', f'%{query}%')
+        ).fetchall()
     conn.close()
     return [dict(r) for r in rows]
 
 
-def search_customers_with_loan(query='', db_path=None):
-    """Return one row per loan (all statuses), searchable by name/nic/phone/ticket_no."""
+def count_customers(query='', db_path=None):
     conn = get_connection(db_path)
-    rows = conn.execute(
-        """SELECT l.id AS loan_id, l.ticket_no, l.status AS loan_status,
+    try:
+        if not query:
+            # Trigger-maintained counter (see Dashboard stats).
+            row = conn.execute("SELECT total_customers FROM loan_stats WHERE id = 1").fetchone()
+            if row is not None:
+                return row[0]
+        where, params = _customer_search_filter(query, db_path)
+        return conn.execute(f"SELECT COUNT(*) FROM customers c WHERE {where}", params).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _customer_loan_search_filter(query, db_path=None):
+    if not query:
+        return '1=1', []
+    if _use_search_index(query, db_path):
+        match = _fts_match(query)
+        return ("""(c.id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?)
+              OR l.id IN (SELECT rowid FROM loans_fts WHERE loans_fts MATCH ?))""", [match, match])
+    return ("(c.name LIKE ? OR c.nic LIKE ? OR c.phone LIKE ? OR l.ticket_no LIKE ?)",
+            [f'%{query}%'] * 4)
+
+
+def search_customers_with_loan(query='', after_id=None, page_size=None, db_path=None):
+    """Return one row per loan (all statuses), searchable by name/nic/phone/ticket_no.
+
+    Rows are newest loan first; the paging cursor (after_id) is a row's loan_id.
+    """
+    conn = get_connection(db_path)
+    where, params = _customer_loan_search_filter(query, db_path)
+    sql = f"""SELECT l.id AS loan_id, l.ticket_no, l.status AS loan_status,
                   l.loan_amount, l.expire_date,
                   c.id AS customer_id, c.name, c.nic, c.phone, c.address,
                   c.birthday, c.job, c.marital_status, c.language
            FROM customers c
            JOIN loans l ON l.customer_id = c.id
-           WHERE c.name LIKE ? OR c.nic LIKE ? OR c.phone LIKE ? OR l.ticket_no LIKE ?
-           ORDER BY l.id DESC""",
-        (f'%{query}%', f'%{query}%', f'%{query}%', f'%{query}%')
-    ).fetchall()
+           WHERE {where}"""
+    if after_id is not None:
+        sql += " AND l.id < ?"
+        params.append(after_id)
+    sql += " ORDER BY l.id DESC"
+    if page_size is not None:
+        sql += " LIMIT ?"
+        params.append(int(page_size))
+    rows = conn.execute(sql, params).fetchall()
     conn.close()
     result = []
     for r in rows:
@@ -892,6 +1795,22 @@ def search_customers_with_loan(query='', db_path=None):
     return result
 
 
+def count_customers_with_loan(query='', db_path=None):
+    conn = get_connection(db_path)
+    try:
+        if not query:
+            row = conn.execute("SELECT total_loans FROM loan_stats WHERE id = 1").fetchone()
+            if row is not None:
+                return row[0]
+        where, params = _customer_loan_search_filter(query, db_path)
+        return conn.execute(
+            f"SELECT COUNT(*) FROM customers c JOIN loans l ON l.customer_id = c.id WHERE {where}",
+            params
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
 def get_customer(customer_id, db_path=None):
     conn = get_connection(db_path)
     row = conn.execute("SELECT * FROM customers WHERE id=?", (customer_id,)).fetchone()
@@ -948,36 +1867,75 @@ def search_recent_customer_jobs(prefix, db_path=None):
 
 # ── Loan operations ──
 
+def _ticket_prefix(conn):
+    prefix_row = conn.execute("SELECT value FROM settings WHERE key='ticket_prefix'").fetchone()
+    return str(prefix_row['value']).strip() if prefix_row and prefix_row['value'] else 'GL'
+
+
+def _ticket_sequence_last(conn, prefix):
+    """Return the last issued number for prefix, seeding the counter from existing tickets once."""
+    row = conn.execute("SELECT last_number FROM ticket_sequences WHERE prefix=?", (prefix,)).fetchone()
+    if row:
+        return int(row['last_number'])
+
+    start = len(prefix) + 1
+    seed_row = conn.execute(
+        """SELECT MAX(CAST(substr(ticket_no, ?) AS INTEGER)) AS max_num FROM loans
+           WHERE substr(ticket_no, 1, ?) = ?
+             AND length(ticket_no) >= ?
+             AND substr(ticket_no, ?) NOT GLOB '*[^0-9]*'""",
+        (start, len(prefix), prefix, start, start)
+    ).fetchone()
+    last = int(seed_row['max_num'] or 0) if seed_row else 0
+    conn.execute(
+        "INSERT OR IGNORE INTO ticket_sequences (prefix, last_number) VALUES (?,?)",
+        (prefix, last)
+    )
+    row = conn.execute("SELECT last_number FROM ticket_sequences WHERE prefix=?", (prefix,)).fetchone()
+    return int(row['last_number'])
+
+
+def _next_free_ticket(conn, prefix, number):
+    for _ in range(1000):
+        candidate = f"{prefix}{number:06d}"
+        if not conn.execute("SELECT 1 FROM loans WHERE ticket_no=?", (candidate,)).fetchone():
+            return candidate, number
+        number += 1
+    # Extremely unlikely fallback; keeps function total.
+    return f"{prefix}{int(time.time())}", number
+
+
+def _reserve_ticket_no(conn, at_least=0):
+    """Take the next ticket number for the current prefix.
+
+    Must run inside the caller's write transaction so the counter update and
+    the loan INSERT commit (or roll back) together.
+    """
+    prefix = _ticket_prefix(conn)
+    last = _ticket_sequence_last(conn, prefix)
+    ticket, number = _next_free_ticket(conn, prefix, max(last + 1, int(at_least or 0)))
+    conn.execute("UPDATE ticket_sequences SET last_number=? WHERE prefix=?", (number, prefix))
+    return ticket
+
+
+def _auto_ticket_number(conn, ticket_no):
+    """Return the numeric suffix if ticket_no follows the current prefix sequence, else None."""
+    prefix = _ticket_prefix(conn)
+    ticket_no = str(ticket_no or '')
+    suffix = ticket_no[len(prefix):]
+    if ticket_no.startswith(prefix) and suffix.isdigit():
+        return int(suffix)
+    return None
+
+
 def generate_ticket_no(db_path=None):
+    """Preview the next ticket number. The number is only taken by create_loan()."""
     conn = get_connection(db_path)
     try:
-        prefix_row = conn.execute("SELECT value FROM settings WHERE key='ticket_prefix'").fetchone()
-        prefix = str(prefix_row['value']).strip() if prefix_row and prefix_row['value'] else 'GL'
-
-        rows = conn.execute(
-            "SELECT ticket_no FROM loans WHERE ticket_no LIKE ?",
-            (f"{prefix}%",)
-        ).fetchall()
-
-        max_num = 0
-        for r in rows:
-            ticket = str(r['ticket_no'])
-            if not ticket.startswith(prefix):
-                continue
-            suffix = ticket[len(prefix):]
-            if suffix.isdigit():
-                max_num = max(max_num, int(suffix))
-
-        next_num = max_num + 1
-        for _ in range(1000):
-            candidate = f"{prefix}{next_num:06d}"
-            exists = conn.execute("SELECT 1 FROM loans WHERE ticket_no=?", (candidate,)).fetchone()
-            if not exists:
-                return candidate
-            next_num += 1
-
-        # Extremely unlikely fallback; keeps function total.
-        return f"{prefix}{int(time.time())}"
+        prefix = _ticket_prefix(conn)
+        last = _ticket_sequence_last(conn, prefix)
+        conn.commit()
+        return _next_free_ticket(conn, prefix, last + 1)[0]
     finally:
         conn.close()
 
@@ -989,6 +1947,17 @@ def create_loan(data, items, db_path=None):
     try:
         for _ in range(max_attempts):
             try:
+                # Take the write lock up front so a concurrent writer makes us
+                # wait on busy_timeout instead of failing mid-transaction.
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                # Sequence tickets (prefix + digits, or none at all) are reserved
+                # from ticket_sequences under the write lock, so concurrent
+                # writers can never be handed the same number.
+                requested = data.get('ticket_no')
+                auto_number = _auto_ticket_number(conn, requested) if requested else 0
+                if auto_number is not None:
+                    data['ticket_no'] = _reserve_ticket_no(conn, at_least=auto_number)
                 c = conn.cursor()
                 c.execute('''INSERT INTO loans 
                     (ticket_no, customer_id, purpose, advance_amount, loan_amount, interest_principal_amount,
@@ -1029,16 +1998,15 @@ def create_loan(data, items, db_path=None):
                 conn.rollback()
                 last_error = e
                 if 'loans.ticket_no' in str(e):
-                    data['ticket_no'] = generate_ticket_no(db_path)
+                    # Fall back to the sequence on the next attempt.
+                    data['ticket_no'] = ''
                     continue
                 raise
 
-            except sqlite3.OperationalError as e:
+            except sqlite3.OperationalError:
+                # "database is locked" only surfaces after SQLite has already
+                # waited busy_timeout_ms for the other writer, so give up here.
                 conn.rollback()
-                last_error = e
-                if 'database is locked' in str(e).lower():
-                    time.sleep(0.2)
-                    continue
                 raise
 
         if last_error:
@@ -1079,6 +2047,32 @@ def get_latest_loan_for_customer(customer_id, db_path=None):
     return dict(row) if row else None
 
 
+def get_latest_loans_for_customers(customer_ids, db_path=None):
+    """get_latest_loan_for_customer() for many customers in one query; returns {customer_id: loan}."""
+    ids = sorted({int(cid) for cid in customer_ids if cid is not None})
+    if not ids:
+        return {}
+    conn = get_connection(db_path)
+    try:
+        rows = conn.execute(
+            '''SELECT l.*, c.name as customer_name, c.nic as customer_nic,
+                      c.phone as customer_phone, c.address as customer_address,
+                      c.birthday as customer_birthday, c.job as customer_job,
+                      c.marital_status as customer_marital_status, c.language as customer_language
+               FROM loans l
+               JOIN customers c ON l.customer_id = c.id
+               WHERE l.id IN (
+                   SELECT MAX(id) FROM loans
+                   WHERE customer_id IN (SELECT value FROM json_each(?))
+                   GROUP BY customer_id
+               )''',
+            (json.dumps(ids),),
+        ).fetchall()
+    finally:
+        conn.close()
+    return {row['customer_id']: dict(row) for row in rows}
+
+
 def get_loan_by_ticket(ticket_no, db_path=None):
     conn = get_connection(db_path)
     row = conn.execute('''SELECT l.*, c.name as customer_name, c.nic as customer_nic,
@@ -1097,12 +2091,15 @@ def get_loan_items(loan_id, db_path=None):
     return [dict(r) for r in rows]
 
 
-def search_loans(query='', status='all', sort_overdue=False, db_path=None):
-    conn = get_connection(db_path)
-    sql = '''SELECT l.*, c.name as customer_name, c.nic as customer_nic
-             FROM loans l JOIN customers c ON l.customer_id = c.id WHERE 1=1'''
+def _loan_search_filter(query='', status='all', db_path=None):
+    """WHERE fragment and params for the loan listing filters (aliases l, c)."""
+    sql = '1=1'
     params = []
-    if query:
+    if query and _use_search_index(query, db_path):
+        sql += (" AND (l.id IN (SELECT rowid FROM loans_fts WHERE loans_fts MATCH ?)"
+                " OR c.id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?))")
+        params.extend([_fts_match(query), _fts_match(query, ('name', 'nic'))])
+    elif query:
         sql += " AND (l.ticket_no LIKE ? OR c.name LIKE ? OR c.nic LIKE ?)"
         params.extend([f'%{query}%'] * 3)
     if status == 'overdue':
@@ -1115,16 +2112,74 @@ def search_loans(query='', status='all', sort_overdue=False, db_path=None):
     elif status != 'all':
         sql += " AND l.status=?"
         params.append(status)
+    return sql, params
+
+
+def search_loans(query='', status='all', sort_overdue=False, after_id=None, page_size=None, db_path=None):
+    """Loans matching query/status, newest first (earliest expiry first with sort_overdue).
+
+    With page_size, returns one page; pass the last row's id as after_id for the next.
+    """
+    conn = get_connection(db_path)
+    where, params = _loan_search_filter(query, status, db_path)
+    sql = f'''SELECT l.*, c.name as customer_name, c.nic as customer_nic
+             FROM loans l JOIN customers c ON l.customer_id = c.id WHERE {where}'''
     if sort_overdue:
         # Most overdue first = earliest expire_date first
-        sql += " ORDER BY l.expire_date ASC"
+        if after_id is not None:
+            sql += " AND (l.expire_date, l.id) > (SELECT expire_date, id FROM loans WHERE id = ?)"
+            params.append(after_id)
+        sql += " ORDER BY l.expire_date ASC, l.id ASC"
     else:
+        if after_id is not None:
+            sql += " AND l.id < ?"
+            params.append(after_id)
         sql += " ORDER BY l.id DESC"
+    if page_size is not None:
+        sql += " LIMIT ?"
+        params.append(int(page_size))
     rows = conn.execute(sql, params).fetchall()
     conn.close()
     return [dict(r) for r in rows]
 
 
+def count_loans(query='', status='all', db_path=None):
+    conn = get_connection(db_path)
+    try:
+        if not query and (status == 'all' or status in LOAN_STATUSES):
+            # Trigger-maintained counters (see Dashboard stats).
+            column = 'total_loans' if status == 'all' else f'{status}_count'
+            row = conn.execute(f"SELECT {column} FROM loan_stats WHERE id = 1").fetchone()
+            if row is not None:
+                return row[0]
+        where, params = _loan_search_filter(query, status, db_path)
+        return conn.execute(
+            f"SELECT COUNT(*) FROM loans l JOIN customers c ON l.customer_id = c.id WHERE {where}",
+            params
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def get_loan_search_totals(query='', status='all', db_path=None):
+    """Count, active/overdue/repawned counts and total amount over every matching loan."""
+    conn = get_connection(db_path)
+    where, params = _loan_search_filter(query, status, db_path)
+    today = datetime.now().strftime('%Y-%m-%d')
+    row = conn.execute(
+        f"""SELECT COUNT(*) AS count,
+                  COALESCE(SUM(l.status IN ('active','renewed')), 0) AS active_count,
+                  COALESCE(SUM(l.status IN ('active','renewed') AND l.expire_date < ?), 0) AS overdue_count,
+                  COALESCE(SUM(l.status = 'repawned'), 0) AS repawned_count,
+                  COALESCE(SUM(l.loan_amount), 0) AS total_amount
+           FROM loans l JOIN customers c ON l.customer_id = c.id
+           WHERE {where}""",
+        (today, *params)
+    ).fetchone()
+    conn.close()
+    return dict(row)
+
+
 def delete_loan(loan_id, db_path=None):
     conn = get_connection(db_path)
     try:
@@ -1325,6 +2380,20 @@ def get_setting(key, default='', db_path=None):
     return row['value'] if row else default
 
 
+def get_settings(keys, db_path=None):
+    """The stored values of several settings in one query; missing keys are left out."""
+    keys = tuple(keys)
+    if not keys:
+        return {}
+    conn = get_connection(db_path)
+    try:
+        return dict(conn.execute(
+            f"SELECT key, value FROM settings WHERE key IN ({','.join('?' * len(keys))})", keys,
+        ).fetchall())
+    finally:
+        conn.close()
+
+
 def set_setting(key, value, description='', user_id=None, db_path=None):
     conn = get_connection(db_path)
     conn.execute('''INSERT INTO settings (key, value, description, updated_by, updated_at) 
@@ -1560,54 +2629,47 @@ def get_reminder_sent_months(loan_id, db_path=None):
 
 def mark_reminder_sent(loan_id, reminder_month, db_path=None):
     """Record that a monthly reminder was sent for a loan."""
+    mark_reminder_sent_many([(loan_id, reminder_month)], db_path=db_path)
+
+
+def mark_reminder_sent_many(entries, db_path=None):
+    """Record a batch of (loan_id, reminder_month) reminders in one transaction."""
+    entries = [(loan_id, month) for loan_id, month in entries]
+    if not entries:
+        return
     conn = get_connection(db_path)
-    conn.execute(
+    conn.executemany(
         "INSERT OR IGNORE INTO sms_reminder_log (loan_id, reminder_month) VALUES (?,?)",
-        (loan_id, reminder_month),
+        entries,
     )
     conn.commit()
     conn.close()
 
 
 def get_due_reminder_loans(db_path=None):
-    """Return active loans that need a reminder SMS this month (not yet sent)."""
+    """Return overdue active loans that have not had this month's reminder SMS yet."""
+    today = datetime.now().date()
+    current_month = today.strftime('%Y-%m')
+    # expire_date may carry a time part, so compare against the start of tomorrow.
+    tomorrow = (today + timedelta(days=1)).strftime('%Y-%m-%d')
     conn = get_connection(db_path)
     rows = conn.execute(
         """SELECT l.*, c.name AS customer_name, c.nic AS customer_nic,
-                  c.phone AS customer_phone
+                  c.phone AS customer_phone,
+                  ? AS reminder_month, ? AS reminder_date
            FROM loans l
            JOIN customers c ON l.customer_id = c.id
            WHERE l.status = 'active'
-           ORDER BY l.expire_date ASC"""
+             AND l.expire_date != '' AND l.expire_date < ?
+             AND NOT EXISTS (
+                 SELECT 1 FROM sms_reminder_log r
+                 WHERE r.loan_id = l.id AND r.reminder_month = ?
+             )
+           ORDER BY l.expire_date ASC""",
+        (current_month, today.strftime('%Y-%m-%d'), tomorrow, current_month),
     ).fetchall()
     conn.close()
-
-    today = datetime.now().date()
-    current_month = today.strftime('%Y-%m')
-    due = []
-
-    for row in rows:
-        loan = dict(row)
-        expire_str = loan.get('expire_date', '')
-        if not expire_str:
-            continue
-        try:
-            expire_date = datetime.strptime(expire_str[:10], '%Y-%m-%d').date()
-        except ValueError:
-            continue
-
-        # Only show loans whose expire date has already passed (overdue)
-        if expire_date > today:
-            continue
-
-        # Check if this month's reminder has already been sent
-        sent_months = get_reminder_sent_months(loan['id'], db_path)
-        if current_month not in sent_months:
-            loan['reminder_month'] = current_month
-            loan['reminder_date'] = today.strftime('%Y-%m-%d')
-            due.append(loan)
-
-    return due
+    return [dict(r) for r in rows]
 
 
 # ── Birthday wish helpers ──
@@ -1625,38 +2687,49 @@ def get_wished_customer_ids_this_year(db_path=None):
 
 def mark_birthday_wish_sent(customer_id, db_path=None):
     """Record that a birthday wish was sent this year."""
+    mark_birthday_wish_sent_many([customer_id], db_path=db_path)
+
+
+def mark_birthday_wish_sent_many(customer_ids, db_path=None):
+    """Record this year's birthday wish for a batch of customers in one transaction."""
     year = datetime.now().strftime('%Y')
+    entries = [(customer_id, year) for customer_id in customer_ids]
+    if not entries:
+        return
     conn = get_connection(db_path)
-    conn.execute(
+    conn.executemany(
         "INSERT OR IGNORE INTO sms_birthday_wishes (customer_id, wish_year) VALUES (?,?)",
-        (customer_id, year),
+        entries,
     )
     conn.commit()
     conn.close()
 
 
 def get_due_birthday_customers(db_path=None):
-    """Return customers whose birthday is today and haven't been wished this year."""
+    """Return customers whose birthday is today and haven't been wished this year.
+
+    A customer counts as wished if the wish was recorded in sms_birthday_wishes
+    or a birthday SMS to them was sent today (e.g. from the SMS Center).
+    """
     today = datetime.now().date()
-    today_mmdd = today.strftime('%m-%d')
     conn = get_connection(db_path)
     rows = conn.execute(
-        "SELECT * FROM customers WHERE birthday IS NOT NULL AND birthday != ''"
+        """SELECT c.*, ? AS next_birthday
+           FROM customers c
+           WHERE substr(c.birthday, 6) = ?
+             AND NOT EXISTS (
+                 SELECT 1 FROM sms_birthday_wishes w
+                 WHERE w.customer_id = c.id AND w.wish_year = ?
+             )
+             AND NOT EXISTS (
+                 SELECT 1 FROM sms_messages sm
+                 WHERE sm.customer_id = c.id AND sm.category = 'birthday'
+                   AND sm.status = 'sent' AND sm.created_at >= ?
+             )""",
+        (today.strftime('%Y-%m-%d'), today.strftime('%m-%d'), str(today.year), today.strftime('%Y-%m-%d')),
     ).fetchall()
     conn.close()
-
-    year = str(today.year)
-    wished = get_wished_customer_ids_this_year(db_path)
-    result = []
-    for row in rows:
-        c = dict(row)
-        bday = c.get('birthday', '')
-        if not bday or len(bday) < 5:
-            continue
-        if bday[5:] == today_mmdd and c['id'] not in wished:
-            c['next_birthday'] = today.strftime('%Y-%m-%d')
-            result.append(c)
-    return result
+    return [dict(r) for r in rows]
 
 
 def get_sms_template(category, db_path=None):
@@ -1816,7 +2889,9 @@ def get_sms_analytics(db_path=None):
     total = conn.execute("SELECT COUNT(*) as cnt FROM sms_messages").fetchone()['cnt']
     sent = conn.execute("SELECT COUNT(*) as cnt FROM sms_messages WHERE status='sent'").fetchone()['cnt']
     failed = conn.execute("SELECT COUNT(*) as cnt FROM sms_messages WHERE status='failed'").fetchone()['cnt']
-    pending = conn.execute("SELECT COUNT(*) as cnt FROM sms_messages WHERE status='pending'").fetchone()['cnt']
+    pending = conn.execute(
+        "SELECT COUNT(*) as cnt FROM sms_messages WHERE status IN ('pending', 'queued', 'claimed')"
+    ).fetchone()['cnt']
 
     # By category
     by_category = conn.execute(
@@ -1971,28 +3046,682 @@ def set_other_charges(months, carat, renewal_charge, redeem_charge, db_path=None
 
 
 # ── Dashboard stats ──
+# The dashboard reads one row of loan_stats (kept current by triggers on
+# loans, loan_payments and customers) plus today's loan_stats_daily row.
+# Only the overdue count depends on the clock; it stays a live query on
+# idx_loans_status_expire. check_loan_stats() rebuilds the counters from
+# scratch and reports any drift.
+
+LOAN_STATUSES = ('active', 'renewed', 'redeemed', 'forfeited', 'repawned')
+
+_LOAN_STATS_FIELDS = ('total_loans', 'total_customers', 'active_principal') + tuple(
+    f'{status}_count' for status in LOAN_STATUSES
+)
+
+
+def _create_loan_stats(c):
+    """Create the counter tables and the triggers that keep them current."""
+    c.execute('''CREATE TABLE IF NOT EXISTS loan_stats (
+        id INTEGER PRIMARY KEY CHECK(id = 1),
+        total_loans INTEGER NOT NULL DEFAULT 0,
+        total_customers INTEGER NOT NULL DEFAULT 0,
+        active_principal REAL NOT NULL DEFAULT 0,
+        active_count INTEGER NOT NULL DEFAULT 0,
+        renewed_count INTEGER NOT NULL DEFAULT 0,
+        redeemed_count INTEGER NOT NULL DEFAULT 0,
+        forfeited_count INTEGER NOT NULL DEFAULT 0,
+        repawned_count INTEGER NOT NULL DEFAULT 0
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS loan_stats_daily (
+        day TEXT PRIMARY KEY,
+        loans_created INTEGER NOT NULL DEFAULT 0,
+        revenue REAL NOT NULL DEFAULT 0
+    )''')
+    c.execute("INSERT OR IGNORE INTO loan_stats (id) VALUES (1)")
+
+    def status_deltas(*terms):
+        return ',\n                '.join(
+            f"{status}_count = {status}_count " + ' '.join(f"{sign} ({row}.status = '{status}')" for sign, row in terms)
+            for status in LOAN_STATUSES
+        )
+
+    principal = "(CASE WHEN {row}.status = 'active' THEN COALESCE({row}.advance_amount, {row}.loan_amount, 0) ELSE 0 END)"
+    day = "COALESCE(substr({row}.{col}, 1, 10), '')"
+    triggers = {
+        'loan_stats_loans_ai': f"""AFTER INSERT ON loans BEGIN
+            UPDATE loan_stats SET total_loans = total_loans + 1,
+                active_principal = active_principal + {principal.format(row='new')},
+                {status_deltas(('+', 'new'))}
+            WHERE id = 1;
+            INSERT INTO loan_stats_daily (day, loans_created) VALUES ({day.format(row='new', col='created_at')}, 1)
+            ON CONFLICT(day) DO UPDATE SET loans_created = loans_created + 1;
+        END""",
+        'loan_stats_loans_ad': f"""AFTER DELETE ON loans BEGIN
+            UPDATE loan_stats SET total_loans = total_loans - 1,
+                active_principal = active_principal - {principal.format(row='old')},
+                {status_deltas(('-', 'old'))}
+            WHERE id = 1;
+            UPDATE loan_stats_daily SET loans_created = loans_created - 1
+            WHERE day = {day.format(row='old', col='created_at')};
+        END""",
+        'loan_stats_loans_au': f"""AFTER UPDATE OF status, advance_amount, loan_amount, created_at ON loans BEGIN
+            UPDATE loan_stats SET
+                active_principal = active_principal - {principal.format(row='old')} + {principal.format(row='new')},
+                {status_deltas(('-', 'old'), ('+', 'new'))}
+            WHERE id = 1;
+            UPDATE loan_stats_daily SET loans_created = loans_created - 1
+            WHERE day = {day.format(row='old', col='created_at')} AND old.created_at IS NOT new.created_at;
+            INSERT INTO loan_stats_daily (day, loans_created)
+            SELECT {day.format(row='new', col='created_at')}, 1 WHERE old.created_at IS NOT new.created_at
+            ON CONFLICT(day) DO UPDATE SET loans_created = loans_created + 1;
+        END""",
+        'loan_stats_payments_ai': f"""AFTER INSERT ON loan_payments BEGIN
+            INSERT INTO loan_stats_daily (day, revenue) VALUES ({day.format(row='new', col='payment_date')}, new.amount)
+            ON CONFLICT(day) DO UPDATE SET revenue = revenue + excluded.revenue;
+        END""",
+        'loan_stats_payments_ad': f"""AFTER DELETE ON loan_payments BEGIN
+            UPDATE loan_stats_daily SET revenue = revenue - old.amount
+            WHERE day = {day.format(row='old', col='payment_date')};
+        END""",
+        'loan_stats_payments_au': f"""AFTER UPDATE OF amount, payment_date ON loan_payments BEGIN
+            UPDATE loan_stats_daily SET revenue = revenue - old.amount
+            WHERE day = {day.format(row='old', col='payment_date')};
+            INSERT INTO loan_stats_daily (day, revenue) VALUES ({day.format(row='new', col='payment_date')}, new.amount)
+            ON CONFLICT(day) DO UPDATE SET revenue = revenue + excluded.revenue;
+        END""",
+        'loan_stats_customers_ai': """AFTER INSERT ON customers BEGIN
+            UPDATE loan_stats SET total_customers = total_customers + 1 WHERE id = 1;
+        END""",
+        'loan_stats_customers_ad': """AFTER DELETE ON customers BEGIN
+            UPDATE loan_stats SET total_customers = total_customers - 1 WHERE id = 1;
+        END""",
+    }
+    for name, body in triggers.items():
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+        c.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def _compute_loan_stats(c):
+    """Recompute every counter from the base tables: (totals dict, {day: (loans, revenue)})."""
+    status_sums = ', '.join(
+        f"COALESCE(SUM(status = '{status}'), 0) AS {status}_count" for status in LOAN_STATUSES
+    )
+    row = c.execute(
+        f"""SELECT COUNT(*) AS total_loans,
+                  COALESCE(SUM(CASE WHEN status = 'active'
+                                    THEN COALESCE(advance_amount, loan_amount, 0) ELSE 0 END), 0) AS active_principal,
+                  {status_sums}
+           FROM loans"""
+    ).fetchone()
+    totals = dict(row)
+    totals['total_customers'] = c.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+
+    daily = {}
+    for day, count in c.execute(
+        "SELECT COALESCE(substr(created_at, 1, 10), '') AS day, COUNT(*) FROM loans GROUP BY day"
+    ).fetchall():
+        daily[day] = (count, 0.0)
+    for day, revenue in c.execute(
+        "SELECT COALESCE(substr(payment_date, 1, 10), '') AS day, COALESCE(SUM(amount), 0) FROM loan_payments GROUP BY day"
+    ).fetchall():
+        daily[day] = (daily.get(day, (0, 0.0))[0], revenue)
+    return totals, daily
+
+
+def _rebuild_loan_stats(c):
+    totals, daily = _compute_loan_stats(c)
+    c.execute(
+        f"UPDATE loan_stats SET {', '.join(f'{field} = ?' for field in _LOAN_STATS_FIELDS)} WHERE id = 1",
+        [totals[field] for field in _LOAN_STATS_FIELDS],
+    )
+    c.execute("DELETE FROM loan_stats_daily")
+    c.executemany(
+        "INSERT INTO loan_stats_daily (day, loans_created, revenue) VALUES (?,?,?)",
+        [(day, count, revenue) for day, (count, revenue) in daily.items()],
+    )
+
+
+def check_loan_stats(repair=False, db_path=None):
+    """Diff the stored dashboard counters against a from-scratch rebuild.
+
+    Returns a list of (counter, stored, actual) for every mismatch; with
+    repair=True the counters are rebuilt afterwards.
+    """
+    conn = get_connection(db_path)
+    try:
+        totals, daily = _compute_loan_stats(conn)
+        stored = conn.execute("SELECT * FROM loan_stats WHERE id = 1").fetchone()
+        stored = dict(stored) if stored else {}
+        mismatches = []
+        for field in _LOAN_STATS_FIELDS:
+            if abs(float(stored.get(field) or 0) - float(totals[field] or 0)) > 0.005:
+                mismatches.append((field, stored.get(field), totals[field]))
+
+        stored_daily = {
+            row['day']: (row['loans_created'], row['revenue'])
+            for row in conn.execute("SELECT day, loans_created, revenue FROM loan_stats_daily").fetchall()
+        }
+        for day in sorted(set(daily) | set(stored_daily)):
+            have = stored_daily.get(day, (0, 0.0))
+            want = daily.get(day, (0, 0.0))
+            if have[0] != want[0]:
+                mismatches.append((f'{day} loans_created', have[0], want[0]))
+            if abs(float(have[1] or 0) - float(want[1] or 0)) > 0.005:
+                mismatches.append((f'{day} revenue', have[1], want[1]))
+
+        if repair and mismatches:
+            conn.execute("BEGIN IMMEDIATE")
+            _rebuild_loan_stats(conn.cursor())
+            conn.commit()
+        return mismatches
+    finally:
+        conn.close()
+
 
 def get_dashboard_stats(db_path=None):
     conn = get_connection(db_path)
     today = datetime.now().strftime('%Y-%m-%d')
-    stats = {}
-    stats['total_active'] = conn.execute("SELECT COUNT(*) FROM loans WHERE status='active'").fetchone()[0]
-    stats['total_redeemed'] = conn.execute("SELECT COUNT(*) FROM loans WHERE status='redeemed'").fetchone()[0]
-    stats['total_renewed'] = conn.execute("SELECT COUNT(*) FROM loans WHERE status='renewed'").fetchone()[0]
-    stats['total_loans'] = conn.execute("SELECT COUNT(*) FROM loans").fetchone()[0]
-    stats['total_customers'] = conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
-    r = conn.execute("SELECT COALESCE(SUM(COALESCE(advance_amount, loan_amount)),0) FROM loans WHERE status='active'").fetchone()
-    stats['active_loan_amount'] = r[0]
-    r = conn.execute("SELECT COUNT(*) FROM loans WHERE status='active' AND expire_date < ?", (today,)).fetchone()
-    stats['overdue_count'] = r[0]
-    r = conn.execute("SELECT COUNT(*) FROM loans WHERE date(created_at)=?", (today,)).fetchone()
-    stats['today_loans'] = r[0]
-    r = conn.execute("SELECT COALESCE(SUM(amount),0) FROM loan_payments WHERE date(payment_date)=?", (today,)).fetchone()
-    stats['today_revenue'] = r[0]
+    row = conn.execute(
+        """SELECT s.*,
+                  COALESCE(d.loans_created, 0) AS today_loans,
+                  COALESCE(d.revenue, 0) AS today_revenue,
+                  (SELECT COUNT(*) FROM loans WHERE status='active' AND expire_date < ?) AS overdue_count
+           FROM loan_stats s
+           LEFT JOIN loan_stats_daily d ON d.day = ?
+           WHERE s.id = 1""",
+        (today, today),
+    ).fetchone()
     conn.close()
+    row = dict(row) if row else {}
+    stats = {}
+    stats['total_active'] = row.get('active_count', 0)
+    stats['total_redeemed'] = row.get('redeemed_count', 0)
+    stats['total_renewed'] = row.get('renewed_count', 0)
+    stats['total_loans'] = row.get('total_loans', 0)
+    stats['total_customers'] = row.get('total_customers', 0)
+    stats['active_loan_amount'] = row.get('active_principal', 0)
+    stats['overdue_count'] = row.get('overdue_count', 0)
+    stats['today_loans'] = row.get('today_loans', 0)
+    stats['today_revenue'] = row.get('today_revenue', 0)
     return stats
 
 
+# ── Data versions ──
+# Triggers bump a per-table counter in data_versions on every insert, update
+# and delete, whoever does the writing (these functions, SQL run by a page,
+# a restore followed by new writes). Caches remember the counters they were
+# built at and compare them with one primary-key read instead of hooking
+# every write path.
+
+DATA_VERSION_TABLES = ('customers', 'loans')
+
+# Everything pages/reports.py reads; the report cache is keyed on these.
+REPORT_DATA_TABLES = DATA_VERSION_TABLES + (
+    'loan_items', 'loan_payments', 'loan_renewals', 'repawn_history', 'cash_register',
+    'loan_approval_requests', 'customer_letters', 'audit_log', 'users',
+)
+
+
+def _create_data_versions(c, tables=DATA_VERSION_TABLES):
+    c.execute('''CREATE TABLE IF NOT EXISTS data_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )''')
+    for table in tables:
+        c.execute("INSERT OR IGNORE INTO data_versions (name) VALUES (?)", (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            name = f'data_version_{table}_{event.lower()}'
+            c.execute(f"DROP TRIGGER IF EXISTS {name}")
+            c.execute(f"""CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE name = '{table}';
+            END""")
+
+
+def get_data_versions(tables=DATA_VERSION_TABLES, db_path=None, conn=None):
+    """Current change counters for tables, as a tuple in the order given.
+
+    The pool generation is appended, so a restored file never matches a
+    cache built against the file it replaced.
+    """
+    own = conn is None
+    if own:
+        conn = get_connection(db_path)
+    try:
+        rows = dict(conn.execute(
+            f"SELECT name, version FROM data_versions WHERE name IN ({','.join('?' * len(tables))})",
+            tuple(tables),
+        ).fetchall())
+    finally:
+        if own:
+            conn.close()
+    return tuple(rows.get(table, 0) for table in tables) + (get_pool_generation(),)
+
+
+# ── Customer stats ──
+
+# Pool key -> (data versions, stats) for get_customer_stats().
+_customer_stats_cache = {}
+
+
+def get_customer_stats(db_path=None):
+    """Header totals for the customers page, cached until customers or loans change."""
+    key = _pool_key(db_path)
+    conn = get_connection(db_path)
+    try:
+        # Read the versions first: a write landing in between only causes a recompute next time.
+        versions = get_data_versions(('customers', 'loans'), conn=conn)
+        cached = _customer_stats_cache.get(key)
+        if cached is not None and cached[0] == versions:
+            return dict(cached[1])
+        row = conn.execute(
+            """SELECT COUNT(*) AS total_customers,
+                      COALESCE(SUM(TRIM(COALESCE(c.birthday, '')) != ''), 0) AS with_birthday,
+                      COALESCE(SUM(EXISTS (SELECT 1 FROM loans l
+                                           WHERE l.customer_id = c.id AND l.status = 'active')), 0)
+                          AS with_active_loans
+               FROM customers c"""
+        ).fetchone()
+    finally:
+        conn.close()
+    stats = dict(row)
+    _customer_stats_cache[key] = (versions, stats)
+    return dict(stats)
+
+
+# ── Report rollups ──
+# Per-day and per-month totals behind the reports, kept current by triggers
+# the same way loan_stats is:
+#   rollup_loans_*     loans and issued amount by issue period and status
+#   rollup_payments_*  payments, amount and interest collected by payment period and type
+#   rollup_gold_*      items and weights by the loan's issue period, status, article type and carat
+# Every write adds a signed delta to the affected rows, so today's row is as
+# current as last year's. rollup_source() reads whole months from the
+# monthly tables and only the ragged ends of a range from the daily ones.
+# backfill_report_rollups() rebuilds everything from the base tables.
+
+ROLLUP_GRAINS = (('daily', 10), ('monthly', 7))
+
+# kind -> (key columns, measure columns)
+_ROLLUPS = {
+    'loans': (('period', 'status'), ('loans', 'issued_amount')),
+    'payments': (('period', 'payment_type'), ('payments', 'amount', 'interest_collected')),
+    'gold': (('period', 'status', 'article_type', 'carat'),
+             ('items', 'quantity', 'total_weight', 'gold_weight', 'estimated_value')),
+}
+
+_ROLLUP_INTEGER_COLUMNS = ('carat', 'loans', 'payments', 'items', 'quantity')
+
+
+def interest_collected_sql(p, principal):
+    """SQL for the interest part of payment row p (interest, penalty, or the interest in a redemption).
+
+    principal is an expression for the loan's interest principal, used when a
+    redemption did not record its split.
+    """
+    return f"""CASE
+        WHEN {p}.payment_type IN ('interest', 'penalty') THEN {p}.amount
+        WHEN {p}.payment_type = 'redemption' THEN
+            CASE
+                WHEN (COALESCE({p}.interest_amount,0) + COALESCE({p}.overdue_interest_amount,0)) > 0
+                    THEN COALESCE({p}.interest_amount,0) + COALESCE({p}.overdue_interest_amount,0)
+                ELSE MAX(0, COALESCE({p}.amount,0)
+                            - COALESCE(NULLIF({p}.principal_amount,0), {principal})
+                            - COALESCE({p}.other_charges_amount,0))
+            END
+        ELSE 0 END"""
+
+
+def _rollup_table(kind, grain):
+    return f'rollup_{kind}_{grain}'
+
+
+def _upsert_deltas(table, keys, measures, source):
+    """Add the rows of source (a SELECT in key + measure column order) onto table."""
+    return (f"INSERT INTO {table} ({', '.join(keys + measures)}) {source}\n"
+            f"            ON CONFLICT({', '.join(keys)}) DO UPDATE SET "
+            + ', '.join(f"{col} = {col} + excluded.{col}" for col in measures) + ';')
+
+
+def _rollup_upsert(kind, grain, source):
+    return _upsert_deltas(_rollup_table(kind, grain), *_ROLLUPS[kind], source)
+
+
+def _rollup_sources(width):
+    """SELECTs producing the base-table totals per rollup kind at a period width."""
+    period = "COALESCE(substr({col}, 1, %d), '')" % width
+    return {
+        'loans': f"""SELECT {period.format(col='issue_date')} AS period, status,
+                       COUNT(*), COALESCE(SUM(loan_amount), 0)
+                FROM loans GROUP BY 1, 2""",
+        'payments': f"""SELECT {period.format(col='lp.payment_date')} AS period, lp.payment_type,
+                       COUNT(*), COALESCE(SUM(lp.amount), 0),
+                       COALESCE(SUM({interest_collected_sql('lp', "COALESCE(l.interest_principal_amount, l.loan_amount, 0)")}), 0)
+                FROM loan_payments lp LEFT JOIN loans l ON l.id = lp.loan_id
+                GROUP BY 1, 2""",
+        'gold': f"""SELECT {period.format(col='l.issue_date')} AS period, l.status, li.article_type, li.carat,
+                       COUNT(*), COALESCE(SUM(li.quantity), 0), COALESCE(SUM(li.total_weight), 0),
+                       COALESCE(SUM(li.gold_weight), 0), COALESCE(SUM(li.estimated_value), 0)
+                FROM loan_items li JOIN loans l ON l.id = li.loan_id
+                GROUP BY 1, 2, 3, 4""",
+    }
+
+
+def _create_report_rollups(c):
+    """Create the rollup tables and the triggers that keep them current."""
+    for kind, (keys, measures) in _ROLLUPS.items():
+        columns = ',\n'.join(
+            f"        {col} {'INTEGER' if col in _ROLLUP_INTEGER_COLUMNS else 'TEXT'} NOT NULL"
+            for col in keys
+        ) + ',\n' + ',\n'.join(
+            f"        {col} {'INTEGER' if col in _ROLLUP_INTEGER_COLUMNS else 'REAL'} NOT NULL DEFAULT 0"
+            for col in measures
+        )
+        for grain, _width in ROLLUP_GRAINS:
+            c.execute(f"""CREATE TABLE IF NOT EXISTS {_rollup_table(kind, grain)} (
+{columns},
+        PRIMARY KEY ({', '.join(keys)})
+    ) WITHOUT ROWID""")
+
+    def each_grain(build):
+        return '\n            '.join(build(grain, width) for grain, width in ROLLUP_GRAINS)
+
+    def period(row, col, width):
+        return f"COALESCE(substr({row}.{col}, 1, {width}), '')"
+
+    def loan_delta(row, sign, when='1'):
+        return each_grain(lambda grain, width: _rollup_upsert('loans', grain, (
+            f"SELECT {period(row, 'issue_date', width)}, {row}.status, {sign}1, "
+            f"{sign}COALESCE({row}.loan_amount, 0) WHERE {when}"
+        )))
+
+    def payment_delta(row, sign):
+        principal = f"COALESCE((SELECT COALESCE(interest_principal_amount, loan_amount, 0) FROM loans WHERE id = {row}.loan_id), 0)"
+        return each_grain(lambda grain, width: _rollup_upsert('payments', grain, (
+            f"SELECT {period(row, 'payment_date', width)}, {row}.payment_type, {sign}1, "
+            f"{sign}COALESCE({row}.amount, 0), {sign}({interest_collected_sql(row, principal)}) WHERE 1"
+        )))
+
+    def repriced_payments_delta():
+        # A redemption without a recorded split derives its interest from the
+        # loan's current principal, so a renewal re-prices the loan's past ones.
+        old_principal = "COALESCE(old.interest_principal_amount, old.loan_amount, 0)"
+        new_principal = "COALESCE(new.interest_principal_amount, new.loan_amount, 0)"
+        return each_grain(lambda grain, width: _rollup_upsert('payments', grain, (
+            f"SELECT {period('lp', 'payment_date', width)}, lp.payment_type, 0, 0, "
+            f"SUM(({interest_collected_sql('lp', new_principal)}) - ({interest_collected_sql('lp', old_principal)})) "
+            f"FROM loan_payments lp WHERE lp.loan_id = new.id AND lp.payment_type = 'redemption' GROUP BY 1, 2"
+        )))
+
+    def item_delta(row, sign):
+        return each_grain(lambda grain, width: _rollup_upsert('gold', grain, (
+            f"SELECT {period('l', 'issue_date', width)}, l.status, {row}.article_type, {row}.carat, {sign}1, "
+            f"{sign}COALESCE({row}.quantity, 0), {sign}COALESCE({row}.total_weight, 0), "
+            f"{sign}COALESCE({row}.gold_weight, 0), {sign}COALESCE({row}.estimated_value, 0) "
+            f"FROM loans l WHERE l.id = {row}.loan_id"
+        )))
+
+    def loan_items_delta(row, sign, when='1'):
+        return each_grain(lambda grain, width: _rollup_upsert('gold', grain, (
+            f"SELECT {period(row, 'issue_date', width)}, {row}.status, li.article_type, li.carat, {sign}COUNT(*), "
+            f"{sign}COALESCE(SUM(li.quantity), 0), {sign}COALESCE(SUM(li.total_weight), 0), "
+            f"{sign}COALESCE(SUM(li.gold_weight), 0), {sign}COALESCE(SUM(li.estimated_value), 0) "
+            f"FROM loan_items li WHERE li.loan_id = {row}.id AND {when} GROUP BY li.article_type, li.carat"
+        )))
+
+    moved = "(old.status IS NOT new.status OR old.issue_date IS NOT new.issue_date)"
+    triggers = {
+        'rollup_loans_ai': f"""AFTER INSERT ON loans BEGIN
+            {loan_delta('new', '+')}
+        END""",
+        # BEFORE, so the items are still there when a cascade removes them
+        # with the loan (their own triggers then no longer find the loan).
+        'rollup_loans_bd': f"""BEFORE DELETE ON loans BEGIN
+            {loan_delta('old', '-')}
+            {loan_items_delta('old', '-')}
+        END""",
+        'rollup_loans_au': f"""AFTER UPDATE OF status, issue_date, loan_amount ON loans BEGIN
+            {loan_delta('old', '-')}
+            {loan_delta('new', '+')}
+            {loan_items_delta('old', '-', moved)}
+            {loan_items_delta('new', '+', moved)}
+        END""",
+        'rollup_loans_principal_au': f"""AFTER UPDATE OF loan_amount, interest_principal_amount ON loans
+            WHEN COALESCE(old.interest_principal_amount, old.loan_amount, 0)
+                 IS NOT COALESCE(new.interest_principal_amount, new.loan_amount, 0) BEGIN
+            {repriced_payments_delta()}
+        END""",
+        'rollup_items_ai': f"""AFTER INSERT ON loan_items BEGIN
+            {item_delta('new', '+')}
+        END""",
+        'rollup_items_ad': f"""AFTER DELETE ON loan_items BEGIN
+            {item_delta('old', '-')}
+        END""",
+        'rollup_items_au': f"""AFTER UPDATE ON loan_items BEGIN
+            {item_delta('old', '-')}
+            {item_delta('new', '+')}
+        END""",
+        'rollup_payments_ai': f"""AFTER INSERT ON loan_payments BEGIN
+            {payment_delta('new', '+')}
+        END""",
+        'rollup_payments_ad': f"""AFTER DELETE ON loan_payments BEGIN
+            {payment_delta('old', '-')}
+        END""",
+        'rollup_payments_au': f"""AFTER UPDATE ON loan_payments BEGIN
+            {payment_delta('old', '-')}
+            {payment_delta('new', '+')}
+        END""",
+    }
+    for name, body in triggers.items():
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+        c.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def _rebuild_report_rollups(c):
+    for grain, width in ROLLUP_GRAINS:
+        for kind, source in _rollup_sources(width).items():
+            keys, measures = _ROLLUPS[kind]
+            c.execute(f"DELETE FROM {_rollup_table(kind, grain)}")
+            c.execute(f"INSERT INTO {_rollup_table(kind, grain)} ({', '.join(keys + measures)}) {source}")
+
+
+def _rollup_targets():
+    """(table, keys, measures, source SELECT) for every rollup table, gold_vault included."""
+    for grain, width in ROLLUP_GRAINS:
+        for kind, source in _rollup_sources(width).items():
+            yield (_rollup_table(kind, grain), *_ROLLUPS[kind], source)
+    yield ('gold_vault', _VAULT_KEYS, _VAULT_MEASURES, _VAULT_SOURCE)
+
+
+def backfill_report_rollups(db_path=None):
+    """Rebuild every rollup table and gold_vault from loans, loan_items and loan_payments."""
+    conn = get_connection(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _rebuild_report_rollups(conn.cursor())
+            _rebuild_gold_vault(conn.cursor())
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+
+
+def check_report_rollups(repair=False, db_path=None):
+    """Diff the stored rollups against a from-scratch aggregation.
+
+    Returns a list of (table, key, stored, actual) for every mismatching row;
+    with repair=True the rollups are backfilled afterwards.
+    """
+    conn = get_connection(db_path)
+    try:
+        mismatches = []
+        for table, keys, measures, source in _rollup_targets():
+            actual = {tuple(row[:len(keys)]): tuple(row[len(keys):]) for row in conn.execute(source)}
+            stored = {
+                tuple(row[:len(keys)]): tuple(row[len(keys):])
+                for row in conn.execute(f"SELECT {', '.join(keys + measures)} FROM {table}")
+            }
+            zero = (0,) * len(measures)
+            for key in sorted(set(actual) | set(stored), key=repr):
+                have, want = stored.get(key, zero), actual.get(key, zero)
+                if any(abs(float(h or 0) - float(w or 0)) > 0.005 for h, w in zip(have, want)):
+                    mismatches.append((table, key, have, want))
+        if repair and mismatches:
+            conn.execute("BEGIN IMMEDIATE")
+            _rebuild_report_rollups(conn.cursor())
+            _rebuild_gold_vault(conn.cursor())
+            conn.commit()
+        return mismatches
+    finally:
+        conn.close()
+
+
+def _rollup_segments(date_from, date_to):
+    """Split [date_from, date_to] into (grain, first, last) runs of whole months and leftover days."""
+    try:
+        start = datetime.strptime(str(date_from)[:10], '%Y-%m-%d').date()
+        end = datetime.strptime(str(date_to)[:10], '%Y-%m-%d').date()
+    except ValueError:
+        return [('daily', date_from, date_to)]
+    if start > end:
+        return []
+    first_month = start if start.day == 1 else start.replace(day=calendar.monthrange(start.year, start.month)[1]) + timedelta(days=1)
+    last_month_end = end if end.day == calendar.monthrange(end.year, end.month)[1] else end.replace(day=1) - timedelta(days=1)
+    if first_month > last_month_end:
+        return [('daily', start.isoformat(), end.isoformat())]
+    segments = []
+    if start < first_month:
+        segments.append(('daily', start.isoformat(), (first_month - timedelta(days=1)).isoformat()))
+    segments.append(('monthly', first_month.isoformat()[:7], last_month_end.isoformat()[:7]))
+    if last_month_end < end:
+        segments.append(('daily', (last_month_end + timedelta(days=1)).isoformat(), end.isoformat()))
+    return segments
+
+
+def rollup_source(kind, date_from=None, date_to=None):
+    """(sql, params) for a subquery of kind's rollup rows between two dates.
+
+    Use it as a table, e.g. f"SELECT status, SUM(loans) FROM {sql} GROUP BY status".
+    Columns are the kind's keys and measures; period is 'YYYY-MM-DD' on
+    daily rows and 'YYYY-MM' on monthly ones, so group trends by
+    substr(period, 1, 7). Open ends cover everything on that side.
+    """
+    keys, measures = _ROLLUPS[kind]
+    columns = ', '.join(keys + measures)
+    parts, params = [], []
+    for grain, first, last in _rollup_segments(date_from or '0001-01-01', date_to or '9999-12-31'):
+        parts.append(f"SELECT {columns} FROM {_rollup_table(kind, grain)} WHERE period BETWEEN ? AND ?")
+        params.extend((first, last))
+    if not parts:
+        parts.append(f"SELECT {columns} FROM {_rollup_table(kind, 'daily')} WHERE 0")
+    return f"({' UNION ALL '.join(parts)})", tuple(params)
+
+
+# ── Gold in vault ──
+# Running totals of the pledged gold on hand per carat and article type: the
+# items of loans whose status is in VAULT_STATUSES. Triggers move a loan's
+# items in when it is created or restocked and out when it is redeemed,
+# repawned, forfeited or deleted, so get_gold_in_vault() is one small read.
+# check_report_rollups() / backfill_report_rollups() cover it too.
+
+VAULT_STATUSES = ('active', 'renewed')
+
+_VAULT_KEYS = ('carat', 'article_type')
+_VAULT_MEASURES = _ROLLUPS['gold'][1]
+_IN_VAULT = f"IN ({', '.join(repr(status) for status in VAULT_STATUSES)})"
+
+_VAULT_SOURCE = f"""SELECT li.carat, li.article_type,
+                       COUNT(*), COALESCE(SUM(li.quantity), 0), COALESCE(SUM(li.total_weight), 0),
+                       COALESCE(SUM(li.gold_weight), 0), COALESCE(SUM(li.estimated_value), 0)
+                FROM loan_items li JOIN loans l ON l.id = li.loan_id
+                WHERE l.status {_IN_VAULT}
+                GROUP BY 1, 2"""
+
+
+def _create_gold_vault(c):
+    """Create gold_vault and the triggers that keep it current."""
+    c.execute('''CREATE TABLE IF NOT EXISTS gold_vault (
+        carat INTEGER NOT NULL,
+        article_type TEXT NOT NULL,
+        items INTEGER NOT NULL DEFAULT 0,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        total_weight REAL NOT NULL DEFAULT 0,
+        gold_weight REAL NOT NULL DEFAULT 0,
+        estimated_value REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (carat, article_type)
+    ) WITHOUT ROWID''')
+
+    def upsert(source):
+        return _upsert_deltas('gold_vault', _VAULT_KEYS, _VAULT_MEASURES, source)
+
+    def item_delta(row, sign):
+        return upsert(
+            f"SELECT {row}.carat, {row}.article_type, {sign}1, {sign}COALESCE({row}.quantity, 0), "
+            f"{sign}COALESCE({row}.total_weight, 0), {sign}COALESCE({row}.gold_weight, 0), "
+            f"{sign}COALESCE({row}.estimated_value, 0) "
+            f"FROM loans l WHERE l.id = {row}.loan_id AND l.status {_IN_VAULT}"
+        )
+
+    def loan_items_delta(row, sign):
+        return upsert(
+            f"SELECT li.carat, li.article_type, {sign}COUNT(*), {sign}COALESCE(SUM(li.quantity), 0), "
+            f"{sign}COALESCE(SUM(li.total_weight), 0), {sign}COALESCE(SUM(li.gold_weight), 0), "
+            f"{sign}COALESCE(SUM(li.estimated_value), 0) "
+            f"FROM loan_items li WHERE li.loan_id = {row}.id GROUP BY li.carat, li.article_type"
+        )
+
+    triggers = {
+        'vault_items_ai': f"""AFTER INSERT ON loan_items BEGIN
+            {item_delta('new', '+')}
+        END""",
+        'vault_items_ad': f"""AFTER DELETE ON loan_items BEGIN
+            {item_delta('old', '-')}
+        END""",
+        'vault_items_au': f"""AFTER UPDATE ON loan_items BEGIN
+            {item_delta('old', '-')}
+            {item_delta('new', '+')}
+        END""",
+        # Redeem, repawn, forfeit and restock only change the loan's status.
+        'vault_loans_out': f"""AFTER UPDATE OF status ON loans
+            WHEN old.status {_IN_VAULT} AND new.status NOT {_IN_VAULT} BEGIN
+            {loan_items_delta('new', '-')}
+        END""",
+        'vault_loans_in': f"""AFTER UPDATE OF status ON loans
+            WHEN old.status NOT {_IN_VAULT} AND new.status {_IN_VAULT} BEGIN
+            {loan_items_delta('new', '+')}
+        END""",
+        # BEFORE, for the same cascade reason as rollup_loans_bd.
+        'vault_loans_bd': f"""BEFORE DELETE ON loans WHEN old.status {_IN_VAULT} BEGIN
+            {loan_items_delta('old', '-')}
+        END""",
+    }
+    for name, body in triggers.items():
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+        c.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def _rebuild_gold_vault(c):
+    c.execute("DELETE FROM gold_vault")
+    c.execute(f"INSERT INTO gold_vault ({', '.join(_VAULT_KEYS + _VAULT_MEASURES)}) {_VAULT_SOURCE}")
+
+
+def get_gold_in_vault(db_path=None):
+    """Pledged gold on hand per carat and article type, heaviest carat first."""
+    conn = get_connection(db_path)
+    try:
+        rows = conn.execute(
+            """SELECT carat, article_type, items, quantity, total_weight, gold_weight, estimated_value
+               FROM gold_vault
+               WHERE items > 0
+               ORDER BY carat DESC, gold_weight DESC"""
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(r) for r in rows]
+
+
 def add_audit_log(user_id, action, entity_type='', entity_id=None, details='', db_path=None):
     conn = get_connection(db_path)
     conn.execute("INSERT INTO audit_log (user_id, action, entity_type, entity_id, details) VALUES (?,?,?,?,?)",
@@ -2158,10 +3887,14 @@ def search_overdue_loans_for_letters(query='', language='', db_path=None):
                COALESCE(NULLIF(c.language, ''), 'Sinhala') AS customer_language
         FROM loans l
         JOIN customers c ON l.customer_id = c.id
-        WHERE l.status='active' AND date(l.expire_date) < date('now')
+        WHERE l.status='active' AND l.expire_date < date('now')
     '''
     params = []
-    if query:
+    if query and _use_search_index(query, db_path):
+        sql += (" AND (l.id IN (SELECT rowid FROM loans_fts WHERE loans_fts MATCH ?)"
+                " OR c.id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?))")
+        params.extend([_fts_match(query), _fts_match(query)])
+    elif query:
         sql += " AND (l.ticket_no LIKE ? OR c.name LIKE ? OR c.nic LIKE ? OR c.phone LIKE ?)"
         q = f"%{query}%"
         params.extend([q, q, q, q])
@@ -2236,7 +3969,12 @@ def list_customer_letters(query='', db_path=None):
         WHERE 1=1
     '''
     params = []
-    if query:
+    if query and _use_search_index(query, db_path):
+        sql += (" AND (cl.id IN (SELECT rowid FROM customer_letters_fts WHERE customer_letters_fts MATCH ?)"
+                " OR c.id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?)"
+                " OR l.id IN (SELECT rowid FROM loans_fts WHERE loans_fts MATCH ?))")
+        params.extend([_fts_match(query), _fts_match(query, ('name', 'nic')), _fts_match(query)])
+    elif query:
         sql += " AND (cl.subject LIKE ? OR c.name LIKE ? OR c.nic LIKE ? OR l.ticket_no LIKE ?)"
         q = f"%{query}%"
         params.extend([q, q, q, q])
@@ -2314,6 +4052,332 @@ def delete_scheduled_sms(sms_id, db_path=None):
     return deleted
 
 
+# ── SMS outbox ──
+# Every SMS is first written to sms_messages as 'queued' and then delivered by
+# the single sender thread in sms_service (SmsOutboxSender):
+#
+#   queued ──claim──> claimed ──finish──> sent | failed
+#      └──cancel_sms_batch()──> cancelled
+#
+# claim_sms_messages() moves due rows to 'claimed' in a single UPDATE, so two
+# senders (or two app instances on the same file) can never take the same
+# row, and stamps it with the sender's owner id and a lease. A lease that runs
+# out means the sender died with the message in flight; the gateway may or may
+# not have taken it, so expire_sms_leases() marks it failed ("delivery
+# unknown") for the Failed tab instead of sending it again. An idempotency key
+# (e.g. 'scheduled:17', 'reminder:42:2026-10') makes enqueueing the same
+# logical message twice a no-op.
+
+SMS_LEASE_SECONDS = 300
+
+_SMS_OUTBOX_COLUMNS = (
+    ('idempotency_key', "TEXT"),
+    ('batch_id', "TEXT"),
+    ('not_before', "TEXT"),
+    ('lease_owner', "TEXT"),
+    ('lease_expires_at', "TEXT"),
+    ('attempts', "INTEGER NOT NULL DEFAULT 0"),
+    ('scheduled_sms_id', "INTEGER"),
+)
+
+_SMS_ENQUEUE_FIELDS = (
+    'recipient', 'message', 'category', 'customer_id', 'loan_id', 'sent_by',
+    'idempotency_key', 'batch_id', 'not_before', 'scheduled_sms_id',
+)
+
+
+def _create_sms_outbox(c):
+    """Add the outbox columns and indexes to sms_messages."""
+    existing = set(_table_columns(c, 'sms_messages'))
+    for col, ddl in _SMS_OUTBOX_COLUMNS:
+        if col not in existing:
+            c.execute(f"ALTER TABLE sms_messages ADD COLUMN {col} {ddl}")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sms_messages_idempotency ON sms_messages (idempotency_key)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sms_messages_outbox ON sms_messages (status, not_before)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sms_messages_batch ON sms_messages (batch_id, status)")
+
+
+def _sms_now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def enqueue_sms_many(entries, db_path=None):
+    """Queue a batch of SMS in one transaction; returns how many were new.
+
+    Each entry is a dict with recipient and message plus any of category,
+    customer_id, loan_id, sent_by, idempotency_key, batch_id, not_before
+    ('YYYY-MM-DD HH:MM:SS', default now) and scheduled_sms_id. Entries whose
+    idempotency_key is already in the outbox are skipped.
+    """
+    now = _sms_now()
+    rows = []
+    for entry in entries:
+        row = [entry.get(field) for field in _SMS_ENQUEUE_FIELDS]
+        row[2] = row[2] or 'custom'
+        row[8] = row[8] or now
+        rows.append(row)
+    if not rows:
+        return 0
+    conn = get_connection(db_path)
+    try:
+        before = conn.total_changes
+        conn.executemany(
+            f'''INSERT INTO sms_messages
+                   ({', '.join(_SMS_ENQUEUE_FIELDS)}, recipients, status, provider, updated_at)
+                VALUES ({', '.join('?' * len(_SMS_ENQUEUE_FIELDS))}, ?1, 'queued', 'text.lk', datetime('now','localtime'))
+                ON CONFLICT(idempotency_key) DO NOTHING''',
+            rows,
+        )
+        conn.commit()
+        return conn.total_changes - before
+    finally:
+        conn.close()
+
+
+def enqueue_sms(recipient, message, category='custom', customer_id=None, loan_id=None, sent_by=None,
+                idempotency_key=None, batch_id=None, not_before=None, db_path=None):
+    """Queue one SMS; returns its id, or None if idempotency_key was queued before."""
+    conn = get_connection(db_path)
+    try:
+        cursor = conn.execute(
+            '''INSERT INTO sms_messages
+                   (recipient, recipients, message, category, status, provider, customer_id, loan_id, sent_by,
+                    idempotency_key, batch_id, not_before, updated_at)
+               VALUES (?,?,?,?,'queued','text.lk',?,?,?,?,?,?,datetime('now','localtime'))
+               ON CONFLICT(idempotency_key) DO NOTHING''',
+            (recipient, recipient, message, category or 'custom', customer_id, loan_id, sent_by,
+             idempotency_key, batch_id, not_before or _sms_now()),
+        )
+        conn.commit()
+        return cursor.lastrowid if cursor.rowcount else None
+    finally:
+        conn.close()
+
+
+def claim_sms_messages(owner, limit=1, lease_seconds=SMS_LEASE_SECONDS, db_path=None):
+    """Atomically claim the oldest due queued SMS for owner, plus up to limit - 1
+    more due messages with exactly the same text (one bulk request to the gateway).
+
+    Returns the claimed row dicts in queue order, or [] when nothing is due.
+    """
+    now = datetime.now()
+    stamp = now.strftime('%Y-%m-%d %H:%M:%S')
+    conn = get_connection(db_path)
+    try:
+        rows = conn.execute(
+            '''UPDATE sms_messages
+               SET status = 'claimed', lease_owner = ?, lease_expires_at = ?,
+                   attempts = attempts + 1, updated_at = ?
+               WHERE id IN (
+                   SELECT id FROM sms_messages
+                   WHERE status = 'queued' AND not_before <= ?
+                     AND message = (
+                         SELECT message FROM sms_messages
+                         WHERE status = 'queued' AND not_before <= ?
+                         ORDER BY not_before, id
+                         LIMIT 1
+                     )
+                   ORDER BY not_before, id
+                   LIMIT ?
+               )
+               RETURNING *''',
+            (owner, (now + timedelta(seconds=lease_seconds)).strftime('%Y-%m-%d %H:%M:%S'),
+             stamp, stamp, stamp, max(1, int(limit))),
+        ).fetchall()
+        conn.commit()
+    finally:
+        conn.close()
+    return sorted((dict(row) for row in rows), key=lambda row: (row['not_before'], row['id']))
+
+
+def finish_sms_messages(owner, outcomes, db_path=None):
+    """Record the outcomes of messages owner claimed, in one transaction.
+
+    outcomes is a list of (sms_id, record); record holds status ('sent' or
+    'failed') and optionally provider_message_id, response, and the
+    recipient / recipients / message that actually went to the gateway (the
+    normalised number, the numbers of a bulk request, the stripped text). A
+    linked scheduled_sms row gets the same outcome. Returns how many of the
+    messages owner still held.
+    """
+    if not outcomes:
+        return 0
+    finished = 0
+    conn = get_connection(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for sms_id, record in outcomes:
+            status = record['status']
+            response = record.get('response')
+            row = conn.execute(
+                '''UPDATE sms_messages
+                   SET status = ?, provider_message_id = ?, response_json = ?,
+                       recipient = COALESCE(?, recipient), recipients = COALESCE(?, recipients),
+                       message = COALESCE(?, message),
+                       lease_expires_at = NULL, updated_at = datetime('now','localtime')
+                   WHERE id = ? AND lease_owner = ? AND status IN ('claimed', 'failed')
+                   RETURNING scheduled_sms_id''',
+                (status, record.get('provider_message_id') or '',
+                 json.dumps(response, ensure_ascii=False) if response is not None else None,
+                 record.get('recipient'), record.get('recipients') or record.get('recipient'),
+                 record.get('message'), sms_id, owner),
+            ).fetchone()
+            if row is None:
+                continue
+            finished += 1
+            if row['scheduled_sms_id']:
+                error = None
+                if status != 'sent':
+                    error = (response or {}).get('error') or (response or {}).get('message') or 'SMS sending failed.'
+                conn.execute(
+                    '''UPDATE scheduled_sms
+                       SET status = ?, error_message = ?,
+                           sent_at = CASE WHEN ? = 'sent' THEN datetime('now','localtime') ELSE sent_at END
+                       WHERE id = ?''',
+                    (status, error, status, row['scheduled_sms_id']),
+                )
+        conn.commit()
+    finally:
+        conn.close()
+    return finished
+
+
+def release_sms_messages(sms_ids, owner, delay_seconds=0, db_path=None):
+    """Put claimed messages that never reached the gateway back in the queue, due after delay_seconds."""
+    not_before = (datetime.now() + timedelta(seconds=delay_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+    conn = get_connection(db_path)
+    try:
+        cursor = conn.executemany(
+            '''UPDATE sms_messages
+               SET status = 'queued', not_before = ?, lease_owner = NULL, lease_expires_at = NULL,
+                   updated_at = datetime('now','localtime')
+               WHERE id = ? AND lease_owner = ? AND status = 'claimed' ''',
+            [(not_before, sms_id, owner) for sms_id in sms_ids],
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+
+def expire_sms_leases(db_path=None):
+    """Fail claimed messages whose lease ran out; returns how many.
+
+    Their sender stopped mid-send, so they are not sent again automatically.
+    """
+    error = json.dumps({'error': 'The sender stopped before the gateway answered; delivery unknown.'})
+    conn = get_connection(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        ids = [r[0] for r in conn.execute(
+            '''UPDATE sms_messages
+               SET status = 'failed', response_json = ?, lease_expires_at = NULL,
+                   updated_at = datetime('now','localtime')
+               WHERE status = 'claimed' AND lease_expires_at < ?
+               RETURNING scheduled_sms_id''',
+            (error, _sms_now()),
+        ).fetchall()]
+        scheduled = [(sid,) for sid in ids if sid]
+        if scheduled:
+            conn.executemany(
+                "UPDATE scheduled_sms SET status = 'failed', error_message = 'Delivery unknown' WHERE id = ?",
+                scheduled,
+            )
+        conn.commit()
+        return len(ids)
+    finally:
+        conn.close()
+
+
+def enqueue_due_scheduled_sms(current_time_str, db_path=None):
+    """Move scheduled_sms rows that are due into the outbox; returns how many.
+
+    The copy and the status change to 'queued' commit together, and the
+    'scheduled:<id>' key makes a repeat harmless, so overlapping scheduler
+    ticks can never send a scheduled SMS twice.
+    """
+    conn = get_connection(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        before = conn.total_changes
+        conn.execute(
+            '''INSERT INTO sms_messages
+                   (recipient, recipients, message, category, status, provider, customer_id,
+                    idempotency_key, not_before, scheduled_sms_id, updated_at)
+               SELECT recipient, recipient, message, category, 'queued', 'text.lk', customer_id,
+                      'scheduled:' || id, scheduled_time, id, datetime('now','localtime')
+               FROM scheduled_sms
+               WHERE status = 'pending' AND scheduled_time <= ?
+               ON CONFLICT(idempotency_key) DO NOTHING''',
+            (current_time_str,),
+        )
+        queued = conn.total_changes - before
+        conn.execute(
+            "UPDATE scheduled_sms SET status = 'queued' WHERE status = 'pending' AND scheduled_time <= ?",
+            (current_time_str,),
+        )
+        conn.commit()
+        return queued
+    finally:
+        conn.close()
+
+
+def get_sms_batch_progress(batch_id, db_path=None):
+    """Outbox status counts for one batch, e.g. {'queued': 3, 'sent': 10}."""
+    conn = get_connection(db_path)
+    try:
+        return dict(conn.execute(
+            "SELECT status, COUNT(*) FROM sms_messages WHERE batch_id = ? GROUP BY status",
+            (batch_id,),
+        ).fetchall())
+    finally:
+        conn.close()
+
+
+def cancel_sms_batch(batch_id, db_path=None):
+    """Cancel the still-queued messages of a batch; returns how many."""
+    conn = get_connection(db_path)
+    try:
+        cursor = conn.execute(
+            '''UPDATE sms_messages SET status = 'cancelled', updated_at = datetime('now','localtime')
+               WHERE batch_id = ? AND status = 'queued' ''',
+            (batch_id,),
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+
+def requeue_sms_message(sms_id, sent_by=None, db_path=None):
+    """Put a failed SMS back in the queue (Resend), due now; False if it is not failed.
+
+    The row keeps its id, idempotency key and scheduled_sms link, so the
+    sender records the new outcome on it and on the scheduled message.
+    """
+    conn = get_connection(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            '''UPDATE sms_messages
+               SET status = 'queued', attempts = 0, not_before = datetime('now','localtime'),
+                   lease_owner = NULL, lease_expires_at = NULL, sent_by = COALESCE(?, sent_by),
+                   updated_at = datetime('now','localtime')
+               WHERE id = ? AND status = 'failed'
+               RETURNING scheduled_sms_id''',
+            (sent_by, sms_id),
+        ).fetchone()
+        if row is not None and row['scheduled_sms_id']:
+            conn.execute(
+                "UPDATE scheduled_sms SET status = 'queued', error_message = NULL WHERE id = ?",
+                (row['scheduled_sms_id'],),
+            )
+        conn.commit()
+        return row is not None
+    finally:
+        conn.close()
+
+
 def update_customer_birthday(customer_id, birthday, db_path=None):
     conn = get_connection(db_path)
     conn.execute(
@@ -1212,6 +1212,11 @@ class GoldLoanSystemApp:
         except Exception as e:
             print(f"Warning: Failed to start shutdown notifier: {e}")
         finally:
+            try:
+                from sms_service import stop_sms_sender
+                stop_sms_sender(timeout=1.0)
+            except Exception as e:
+                print(f"Warning: Failed to stop SMS sender: {e}")
             self.root.destroy()
 
     def create_backup_after_action(self):
@@ -1224,6 +1229,10 @@ class GoldLoanSystemApp:
             print(f"Warning: Failed to create backup: {e}")
 
     def _start_sms_scheduler(self):
+        from sms_service import start_sms_sender
+
+        # The one thread that sends everything queued in the SMS outbox.
+        start_sms_sender(self.db_file)
         if self.sms_scheduler_job:
             try:
                 self.root.after_cancel(self.sms_scheduler_job)
@@ -1238,18 +1247,20 @@ class GoldLoanSystemApp:
         self.sms_scheduler_job = self.root.after(5000, sms_tick) # Start first tick after 5 seconds
 
     def _check_sms_scheduler(self):
-        # We need database functions
+        """Queue today's automatic birthday wishes and the due scheduled SMS in the outbox.
+
+        Runs on the Tk thread every 30 s; the SMS outbox sender does the sending.
+        """
         from database import (
+            enqueue_due_scheduled_sms,
             get_setting,
             set_setting,
             get_upcoming_birthdays,
-            get_pending_scheduled_sms,
-            mark_scheduled_sms_sent,
-            mark_scheduled_sms_failed,
             list_sms_templates,
-            get_wished_customer_ids_this_year
+            get_wished_customer_ids_this_year,
+            mark_birthday_wish_sent_many,
         )
-        from sms_service import build_sms_context, render_template, send_sms
+        from sms_service import queue_sms_jobs, wake_sms_sender
 
         now = datetime.now()
         current_time_str = now.strftime('%Y-%m-%d %H:%M:%S')
@@ -1281,56 +1292,34 @@ class GoldLoanSystemApp:
                                 if not bday_template:
                                     bday_template = 'Dear {{customer_name}},\n\nWishing you a very Happy Birthday! 🎂🎉\n\nWarm wishes,\n{{company_name}}'
                                 
-                                for customer in birthdays:
-                                    if customer['id'] in wished_ids:
-                                        continue # Skip if already sent this year
-                                    recipient = customer.get('phone', '')
-                                    context = build_sms_context(customer=customer, message=bday_template)
-                                    message = render_template(bday_template, context)
-                                    send_sms(recipient, message, customer=customer, category='birthday', db_path=self.db_file)
+                                # Skip if already sent this year; the key keeps a wish
+                                # queued by the morning popup from going out twice.
+                                due = [customer for customer in birthdays if customer['id'] not in wished_ids]
+                                _, rejected = queue_sms_jobs([
+                                    {'recipient': customer.get('phone', ''), 'template': bday_template,
+                                     'customer': customer, 'category': 'birthday',
+                                     'idempotency_key': f"birthday:{customer['id']}:{now.year}"}
+                                    for customer in due
+                                ], db_path=self.db_file)
+                                # A customer whose wish was not queued (no usable phone)
+                                # stays unmarked and is tried again once the number is fixed.
+                                skipped = {index for index, _ in rejected}
+                                mark_birthday_wish_sent_many(
+                                    [customer['id'] for index, customer in enumerate(due) if index not in skipped],
+                                    db_path=self.db_file,
+                                )
                         except Exception as e:
-                            print(f"Error sending automatic birthday SMS: {e}")
+                            print(f"Error queueing automatic birthday SMS: {e}")
 
                     threading.Thread(target=run_auto_birthdays, daemon=True).start()
 
-        # 2. Scheduled SMS Check
+        # 2. Scheduled SMS Check — moved into the outbox in one transaction, so
+        # a tick that overlaps a slow send can no longer pick the same rows up.
         try:
-            pending_msgs = get_pending_scheduled_sms(current_time_str, db_path=self.db_file)
-            if pending_msgs:
-                def run_pending_scheduled():
-                    for msg in pending_msgs:
-                        try:
-                            sms_id = msg['id']
-                            recipient = msg['recipient']
-                            message = msg['message']
-                            category = msg['category']
-                            customer_id = msg['customer_id']
-                            
-                            customer = None
-                            if customer_id:
-                                from database import get_customer
-                                customer = get_customer(customer_id, db_path=self.db_file)
-
-                            ok, err_msg, response = send_sms(
-                                recipient=recipient,
-                                message=message,
-                                customer=customer,
-                                category=category,
-                                db_path=self.db_file
-                            )
-                            if ok:
-                                provider_msg_id = ''
-                                if response and isinstance(response.get('data'), dict):
-                                    provider_msg_id = str(response['data'].get('sms_id', '') or '')
-                                mark_scheduled_sms_sent(sms_id, provider_msg_id, json.dumps(response) if response else '', db_path=self.db_file)
-                            else:
-                                mark_scheduled_sms_failed(sms_id, err_msg, db_path=self.db_file)
-                        except Exception as e:
-                            mark_scheduled_sms_failed(msg['id'], str(e), db_path=self.db_file)
-                
-                threading.Thread(target=run_pending_scheduled, daemon=True).start()
+            if enqueue_due_scheduled_sms(current_time_str, db_path=self.db_file):
+                wake_sms_sender()
         except Exception as e:
-            print(f"Error checking/sending scheduled SMS: {e}")
+            print(f"Error queueing scheduled SMS: {e}")
 
     def get_subscription_info(self):
         cache = load_license_cache()
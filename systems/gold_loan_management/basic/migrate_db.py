@@ -1,47 +1,21 @@
-import sqlite3
-import os
+import sys
 
-db_path = 'gold_loan_basic_database.db'
+import database
+
+# Brings a database file up to the current schema version. The app does the
+# same on every start (database.init_database); this is for upgrading a copy
+# by hand, e.g. a backup taken on an older build.
+db_path = sys.argv[1] if len(sys.argv) > 1 else 'gold_loan_basic_database.db'
 print(f"Connecting to {db_path}...")
-conn = sqlite3.connect(db_path)
-c = conn.cursor()
 
 try:
-    columns = [row[1] for row in c.execute('PRAGMA table_info(duration_rates)').fetchall()]
-    if 'carat' not in columns:
-        print('Migrating duration_rates to include carat...')
-        c.execute('''CREATE TABLE duration_rates_v2 (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            carat INTEGER NOT NULL DEFAULT 0,
-            duration_months INTEGER NOT NULL,
-            assessed_percentage REAL NOT NULL,
-            interest_rate REAL NOT NULL,
-            overdue_interest_rate REAL NOT NULL,
-            is_active INTEGER DEFAULT 1,
-            updated_at TEXT DEFAULT (datetime('now','localtime')),
-            UNIQUE(carat, duration_months)
-        )''')
-        
-        c.execute('''INSERT INTO duration_rates_v2 
-            (carat, duration_months, assessed_percentage, interest_rate, overdue_interest_rate, is_active, updated_at)
-            SELECT 0, duration_months, assessed_percentage, interest_rate, overdue_interest_rate, is_active, updated_at
-            FROM duration_rates''')
-        
-        # Duplicate for all standard carats
-        carats = [16, 17, 18, 19, 20, 21, 22, 23, 24]
-        for ct in carats:
-            c.execute('''INSERT INTO duration_rates_v2
-                (carat, duration_months, assessed_percentage, interest_rate, overdue_interest_rate, is_active, updated_at)
-                SELECT ?, duration_months, assessed_percentage, interest_rate, overdue_interest_rate, is_active, updated_at
-                FROM duration_rates''', (ct,))
-                
-        c.execute('DROP TABLE duration_rates')
-        c.execute('ALTER TABLE duration_rates_v2 RENAME TO duration_rates')
-        conn.commit()
-        print('Migration success.')
+    before = database.get_schema_version(db_path)
+    applied = database.migrate_database(db_path)
+    if applied:
+        print(f"Migrated from version {before} to {database.SCHEMA_VERSION}: {', '.join(applied)}")
     else:
-        print('Already migrated.')
+        print(f'Already migrated (version {before}).')
 except Exception as e:
     print('Failed:', e)
 finally:
-    conn.close()
+    database.close_all_connections()
@@ -17,8 +17,10 @@ from database import (get_all_market_rates, set_market_rate, get_all_duration_ra
                       search_loans, get_market_rate, create_customer, get_customer_by_nic, get_customer,
                       get_loan, get_sms_template,
                       create_loan, delete_loan, generate_ticket_no, add_audit_log,
-                      update_customer, add_cash_transaction, get_cash_balance, clear_cash_for_date)
-from sms_service import build_sms_context, render_template, send_sms
+                      update_customer, add_cash_transaction, get_cash_balance, clear_cash_for_date,
+                      DEFAULT_SLOW_QUERY_MS, enable_query_profiling, disable_query_profiling,
+                      query_profiling_enabled, reset_query_profile, get_query_profile, export_query_profile)
+from sms_service import build_sms_context, invalidate_sms_settings, queue_sms, render_template
 from utils import (format_currency, calculate_market_value, calculate_assessed_value,
                    calculate_interest, get_expire_date)
 from backup_manager import get_backup_manager, BackupManager
@@ -73,6 +75,7 @@ class AdminSettingsPage:
             ('🏢 Company Settings', self._show_company_settings),
             (' Backup & Restore', self._show_backup_restore),
             ('☁️ Backup & Sync', self._show_backup_sync),
+            ('🔎 Query Profiler', self._show_query_profiler),
         ]
         tabs1 = tabs[:4]
         tabs2 = tabs[4:8]
@@ -698,6 +701,7 @@ class AdminSettingsPage:
             messagebox.showerror('Error', f'Could not add loan.\n\n{exc}')
             return
 
+        ticket_no = loan_data['ticket_no']
         add_audit_log(self.user['id'], 'CREATE_LOAN', 'loan', loan_id,
                       f'Admin historical add: {ticket_no} ({issue_date})')
 
@@ -714,13 +718,14 @@ class AdminSettingsPage:
                         message='Your gold loan has been created successfully.',
                     )
                     sms_message = render_template(sms_body, sms_context)
-                    send_sms(
+                    queue_sms(
                         customer.get('phone', ''),
                         sms_message,
                         customer=customer,
                         loan=loan_record or loan_data,
                         category='auto',
                         sent_by=self.user['id'],
+                        idempotency_key=f'new_loan:{loan_id}',
                     )
         except Exception:
             pass
@@ -932,6 +937,7 @@ class AdminSettingsPage:
                     set_setting(key, '1' if var.get() else '0', user_id=self.user['id'])
                 else:
                     set_setting(key, var.get().strip(), user_id=self.user['id'])
+            invalidate_sms_settings()
             messagebox.showinfo('Success', 'SMS settings saved.')
 
         btn_row = tk.Frame(card.inner, bg=self.theme.palette.bg_surface)
@@ -2158,3 +2164,120 @@ class AdminSettingsPage:
     def _show_backup_sync(self):
         """Navigate to backup sync settings page"""
         self.navigate('backup_settings')
+
+    # ── Query Profiler ──
+    def _show_query_profiler(self):
+        self._clear_tab()
+        pal = self.theme.palette
+        card = self.theme.make_card(self.tab_content, bg=pal.bg_surface)
+        card.pack(fill=tk.BOTH, expand=True)
+
+        tk.Label(card.inner, text='Query Profiler', font=self.theme.fonts.h3,
+                 bg=pal.bg_surface, fg=pal.text_primary).pack(anchor='w', padx=14, pady=(10, 4))
+        tk.Label(card.inner, text='Record how long each database function and SQL statement takes on this '
+                                  'shop\'s data. Leave it off unless you are looking for a slow screen.',
+                 font=self.theme.fonts.body, bg=pal.bg_surface, fg=pal.text_muted,
+                 wraplength=820, justify='left').pack(anchor='w', padx=14, pady=(0, 12))
+
+        controls = tk.Frame(card.inner, bg=pal.bg_surface)
+        controls.pack(fill=tk.X, padx=14, pady=(0, 8))
+        self.profiler_enabled_var = tk.BooleanVar(value=query_profiling_enabled())
+        current = get_query_profile()
+        slow_ms = current['slow_query_ms'] if current else get_setting('db_slow_query_ms', str(DEFAULT_SLOW_QUERY_MS))
+        self.profiler_slow_ms_var = tk.StringVar(value=f'{float(slow_ms):g}')
+        tk.Checkbutton(controls, text='Record query timings', variable=self.profiler_enabled_var,
+                       bg=pal.bg_surface, fg=pal.text_primary, selectcolor=pal.bg_surface,
+                       font=self.theme.fonts.body).pack(side=tk.LEFT)
+        tk.Label(controls, text='Slow query (ms):', font=self.theme.fonts.body_bold,
+                 bg=pal.bg_surface, fg=pal.text_primary).pack(side=tk.LEFT, padx=(16, 6))
+        self.theme.make_entry(controls, variable=self.profiler_slow_ms_var, width=8).pack(side=tk.LEFT)
+        for text, cmd, kind in [
+            ('💾 Apply', self._apply_query_profiler, 'primary'),
+            ('🔄 Refresh', self._show_query_profiler, 'ghost'),
+            ('🧹 Reset', self._reset_query_profiler, 'ghost'),
+            ('📤 Export JSON', self._export_query_profiler, 'ghost'),
+        ]:
+            self.theme.make_button(controls, text=text, command=cmd, kind=kind,
+                                   width=14, pady=6).pack(side=tk.LEFT, padx=(8, 0))
+
+        if not current:
+            tk.Label(card.inner, text='No timings recorded yet. Tick "Record query timings" and press Apply.',
+                     font=self.theme.fonts.body, bg=pal.bg_surface,
+                     fg=pal.text_muted).pack(anchor='w', padx=14, pady=10)
+            return
+
+        state = 'recording' if current['enabled'] else 'stopped'
+        tk.Label(card.inner,
+                 text=f"Since {current['started_at']} ({state}) · {len(current['statements'])} statements · "
+                      f"{len(current['slow_queries'])} slower than {current['slow_query_ms']:g} ms",
+                 font=self.theme.fonts.small, bg=pal.bg_surface,
+                 fg=pal.text_muted).pack(anchor='w', padx=14, pady=(0, 6))
+
+        notebook = ttk.Notebook(card.inner)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=14, pady=(0, 14))
+        timing_cols = [('calls', 'Calls', 70), ('rows', 'Rows', 80), ('total_ms', 'Total ms', 90),
+                       ('mean_ms', 'Mean ms', 80), ('p95_ms', 'p95 ms', 80), ('max_ms', 'Max ms', 80)]
+        self._profiler_table(notebook, 'By Function', [('name', 'Function', 300)] + timing_cols,
+                             current['functions'])
+        self._profiler_table(notebook, 'By Statement', [('statement', 'Statement', 420)] + timing_cols,
+                             current['statements'])
+        slow_rows = [dict(entry, plan=' | '.join(entry['plan'] or [])) for entry in current['slow_queries']]
+        self._profiler_table(notebook, 'Slow Queries',
+                             [('ms', 'ms', 70), ('at', 'When', 130), ('function', 'Function', 220),
+                              ('rows', 'Rows', 60), ('statement', 'Statement', 320), ('plan', 'Query Plan', 360)],
+                             slow_rows)
+
+    def _profiler_table(self, notebook, title, columns, rows):
+        frame = tk.Frame(notebook, bg=self.theme.palette.bg_surface)
+        notebook.add(frame, text=title)
+        keys = [key for key, _, _ in columns]
+        tree = ttk.Treeview(frame, columns=keys, show='headings', height=14)
+        for key, heading, width in columns:
+            numeric = key not in ('name', 'statement', 'function', 'plan', 'at')
+            tree.heading(key, text=heading)
+            tree.column(key, width=width, anchor='e' if numeric else 'w', stretch=not numeric)
+        vbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        hbar = ttk.Scrollbar(frame, orient=tk.HORIZONTAL, command=tree.xview)
+        tree.configure(yscrollcommand=vbar.set, xscrollcommand=hbar.set)
+        vbar.pack(side=tk.RIGHT, fill=tk.Y)
+        hbar.pack(side=tk.BOTTOM, fill=tk.X)
+        tree.pack(fill=tk.BOTH, expand=True)
+        for row in rows:
+            tree.insert('', tk.END, values=[row.get(key, '') for key in keys])
+
+    def _apply_query_profiler(self):
+        try:
+            slow_ms = float(self.profiler_slow_ms_var.get().strip())
+        except ValueError:
+            messagebox.showerror('Invalid Value', 'Slow query threshold must be a number of milliseconds.')
+            return
+        enabled = self.profiler_enabled_var.get()
+        set_setting('db_profile_queries', '1' if enabled else '0', user_id=self.user['id'])
+        set_setting('db_slow_query_ms', f'{slow_ms:g}', user_id=self.user['id'])
+        if enabled:
+            enable_query_profiling(slow_ms)
+        else:
+            disable_query_profiling()
+        self._show_query_profiler()
+
+    def _reset_query_profiler(self):
+        reset_query_profile()
+        self._show_query_profiler()
+
+    def _export_query_profiler(self):
+        if not get_query_profile():
+            messagebox.showinfo('Export', 'No query timings recorded yet.')
+            return
+        path = filedialog.asksaveasfilename(
+            title='Export Query Profile as JSON',
+            initialfile=f"query_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            defaultextension='.json',
+            filetypes=[('JSON files', '*.json')],
+        )
+        if not path:
+            return
+        try:
+            export_query_profile(path)
+            messagebox.showinfo('Export', f'Query profile saved to:\n{path}')
+        except Exception as e:
+            messagebox.showerror('Export Error', str(e))
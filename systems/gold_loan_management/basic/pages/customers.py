@@ -2,10 +2,15 @@
 
 import tkinter as tk
 from tkinter import messagebox, ttk
-from database import search_customers, create_customer, update_customer, get_customer, search_loans
+from database import (search_customers, count_customers, get_customer_stats, create_customer, update_customer,
+                      get_customer, search_loans)
 from utils import format_currency, format_date
 
 
+# Customers fetched per page; further pages load as the list is scrolled.
+CUSTOMER_PAGE_SIZE = 200
+
+
 class CustomersPage:
     def __init__(self, container, theme, user, navigate_fn):
         self.container = container
@@ -27,6 +32,7 @@ class CustomersPage:
 
         self.stats_wrap = tk.Frame(view, bg=self.theme.palette.bg_app)
         self.stats_wrap.pack(fill=tk.X, pady=(0, 10))
+        self._stat_value_labels = []
 
         # Search & Add bar
         bar_card = self.theme.make_card(view, bg=self.theme.palette.bg_surface)
@@ -51,28 +57,54 @@ class CustomersPage:
         self.results_card = self.theme.make_card(view, bg=self.theme.palette.bg_surface)
         self.results_card.pack(fill=tk.BOTH, expand=True)
         self.results_frame = self.results_card.inner
+        self.results_label = tk.Label(self.results_frame, text='', font=self.theme.fonts.body,
+                                      bg=self.theme.palette.bg_surface, fg=self.theme.palette.text_muted)
+        self.results_label.pack(anchor='w', padx=14, pady=(10, 6))
+
+        cols = [('NIC', 14), ('Name', 18), ('Phone', 12), ('Birthday', 12), ('Address', 20)]
+        self.results_grid = self.theme.make_data_grid(
+            self.results_frame,
+            cols,
+            height=18,
+            on_open=self._show_customer_details,
+            actions=[
+                ('👁 View', self._show_customer_details, None),
+                ('✏️ Edit', self._show_edit_form, None),
+                ('📋 Loans', self._show_customer_loans, None),
+            ],
+            on_more=self._load_more,
+            empty_text='No customers found.',
+        )
+        self.results_grid.pack(fill=tk.BOTH, expand=True, padx=14, pady=(0, 14))
         self._search_after_id = None
         self._do_search()
 
-    def _render_stats(self, customers, all_customers, active_loans):
-        for w in self.stats_wrap.winfo_children():
-            w.destroy()
-
-        active_customer_nics = {str(loan.get('customer_nic', '')).strip() for loan in active_loans if loan.get('customer_nic')}
+    def _render_stats(self, matched_count, totals):
         stats = [
-            ('Total Customers', str(len(all_customers)), self.theme.palette.accent),
-            ('Matched Results', str(len(customers)), self.theme.palette.info),
-            ('Birthdays Added', str(sum(1 for c in all_customers if (c.get('birthday') or '').strip())), self.theme.palette.success),
-            ('Customers With Active Loans', str(sum(1 for c in all_customers if str(c.get('nic', '')).strip() in active_customer_nics)), self.theme.palette.warning),
+            ('Total Customers', str(totals['total_customers']), self.theme.palette.accent),
+            ('Matched Results', str(matched_count), self.theme.palette.info),
+            ('Birthdays Added', str(totals['with_birthday']), self.theme.palette.success),
+            ('Customers With Active Loans', str(totals['with_active_loans']), self.theme.palette.warning),
         ]
 
+        # Cards are built once per page render; searches only update the numbers.
+        if self._stat_value_labels:
+            for label, (_title, value, _color) in zip(self._stat_value_labels, stats):
+                label.configure(text=value)
+            return
+
+        for w in self.stats_wrap.winfo_children():
+            w.destroy()
+        self._stat_value_labels = []
         for title, value, color in stats:
             card = self.theme.make_card(self.stats_wrap, bg=self.theme.palette.bg_surface)
             card.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 8))
             tk.Label(card.inner, text=title, font=self.theme.fonts.small,
                      bg=self.theme.palette.bg_surface, fg=self.theme.palette.text_muted).pack(anchor='w', padx=12, pady=(8, 2))
-            tk.Label(card.inner, text=value, font=self.theme.fonts.h2,
-                     bg=self.theme.palette.bg_surface, fg=color).pack(anchor='w', padx=12, pady=(0, 8))
+            value_label = tk.Label(card.inner, text=value, font=self.theme.fonts.h2,
+                                   bg=self.theme.palette.bg_surface, fg=color)
+            value_label.pack(anchor='w', padx=12, pady=(0, 8))
+            self._stat_value_labels.append(value_label)
 
     def _on_search_change(self, *_args):
         if self._search_after_id is not None:
@@ -81,99 +113,35 @@ class CustomersPage:
 
     def _do_search(self):
         self._search_after_id = None
-        for w in self.results_frame.winfo_children():
-            w.destroy()
-
-        customers = search_customers(self.search_var.get().strip())
-        all_customers = search_customers('')
-        active_loans = search_loans(status='active')
-        self._render_stats(customers, all_customers, active_loans)
-
-        tk.Label(self.results_frame, text=f'Found {len(customers)} customer(s)',
-                 font=self.theme.fonts.body, bg=self.theme.palette.bg_surface,
-                 fg=self.theme.palette.text_muted).pack(anchor='w', padx=14, pady=(10, 6))
-
-        tbl = tk.Frame(self.results_frame, bg=self.theme.palette.bg_surface)
-        tbl.pack(fill=tk.BOTH, expand=True, padx=14, pady=(0, 14))
-
-        cols = ['NIC', 'Name', 'Phone', 'Birthday', 'Address', 'Actions']
-        col_widths = [14, 18, 12, 12, 20, 28]  # Character widths
-
-        def _clip_text(text, max_chars):
-            text = str(text or '')
-            if len(text) <= max_chars:
-                return text
-            return text[: max(0, max_chars - 3)] + '...'
-
-        # Configure grid columns for the table
-        for i in range(len(cols)):
-            tbl.grid_columnconfigure(i, minsize=col_widths[i] * 8, weight=0)
-
-        hdr = tk.Frame(tbl, bg=self.theme.palette.bg_surface_alt)
-        hdr.pack(fill=tk.X)
-        for i, col in enumerate(cols):
-            hdr.grid_columnconfigure(i, minsize=col_widths[i] * 8, weight=0)
-            tk.Label(hdr, text=col, font=self.theme.fonts.body_bold,
-                     bg=self.theme.palette.bg_surface_alt, fg=self.theme.palette.text_muted,
-                     anchor='w').grid(row=0, column=i, sticky='w', padx=6, pady=6)
-
+        self._query = self.search_var.get().strip()
+
+        matched_count = count_customers(self._query)
+        self._render_stats(matched_count, get_customer_stats())
+        self.results_label.configure(text=f'Found {matched_count} customer(s)')
+
+        customers = search_customers(self._query, page_size=CUSTOMER_PAGE_SIZE)
+        self.results_grid.set_rows(self._customer_rows(customers), customers,
+                                   has_more=len(customers) == CUSTOMER_PAGE_SIZE)
+
+    def _load_more(self):
+        last = self.results_grid.last_record
+        customers = search_customers(self._query, after_id=last['id'] if last else None,
+                                     page_size=CUSTOMER_PAGE_SIZE)
+        self.results_grid.append_rows(self._customer_rows(customers), customers,
+                                      has_more=len(customers) == CUSTOMER_PAGE_SIZE)
+
+    @staticmethod
+    def _customer_rows(customers):
+        rows = []
         for cust in customers:
-            row = tk.Frame(tbl, bg=self.theme.palette.bg_surface)
-            row.pack(fill=tk.X)
-            tk.Frame(tbl, bg=self.theme.palette.border, height=1).pack(fill=tk.X)
-
-            for i in range(len(cols)):
-                row.grid_columnconfigure(i, minsize=col_widths[i] * 8, weight=0)
-
-            vals = [
+            rows.append([
                 cust['nic'],
                 cust['name'],
                 cust['phone'],
                 cust.get('birthday', '') or '-',
-                _clip_text(cust.get('address', '') or '-', col_widths[4]),
-            ]
-            for i, val in enumerate(vals):
-                tk.Label(row, text=val, font=self.theme.fonts.body,
-                         bg=self.theme.palette.bg_surface, fg=self.theme.palette.text_primary,
-                         anchor='w', width=col_widths[i]).grid(row=0, column=i, sticky='w', padx=6, pady=5)
-
-            # Actions column
-            af = tk.Frame(row, bg=self.theme.palette.bg_surface, width=(col_widths[5] * 8) - 12, height=28)
-            af.grid(row=0, column=5, sticky='nsew', padx=6, pady=4)
-            af.grid_propagate(False)
-            af.grid_columnconfigure(0, weight=1, uniform='customer-actions')
-            af.grid_columnconfigure(1, weight=1, uniform='customer-actions')
-            af.grid_columnconfigure(2, weight=1, uniform='customer-actions')
-
-            def _make_action_badge(parent, text, bg_color):
-                return tk.Label(
-                    parent,
-                    text=text,
-                    font=self.theme.fonts.small,
-                    cursor='hand2',
-                    bg=bg_color,
-                    fg=self.theme.palette.text_inverse,
-                    padx=4,
-                    pady=2,
-                    anchor='center',
-                    width=9,
-                )
-
-            view_lbl = _make_action_badge(af, '👁 View', self.theme.palette.accent)
-            view_lbl.grid(row=0, column=0, sticky='ew', padx=(0, 4))
-            view_lbl.bind('<Button-1>', lambda e, c=cust: self._show_customer_details(c))
-
-            edit_lbl = _make_action_badge(af, '✏️ Edit', self.theme.palette.info)
-            edit_lbl.grid(row=0, column=1, sticky='ew', padx=(0, 4))
-            edit_lbl.bind('<Button-1>', lambda e, c=cust: self._show_edit_form(c))
-
-            loans_lbl = _make_action_badge(af, '📋 Loans', self.theme.palette.success)
-            loans_lbl.grid(row=0, column=2, sticky='ew')
-            loans_lbl.bind('<Button-1>', lambda e, c=cust: self._show_customer_loans(c))
-
-        if not customers:
-            tk.Label(tbl, text='No customers found.', font=self.theme.fonts.body,
-                     bg=self.theme.palette.bg_surface, fg=self.theme.palette.text_muted).pack(pady=30)
+                cust.get('address', '') or '-',
+            ])
+        return rows
 
     def _show_add_form(self):
         self._show_form()
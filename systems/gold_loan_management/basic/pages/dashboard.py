@@ -238,7 +238,7 @@ class DashboardPage:
                      bg=self.theme.palette.bg_surface_alt, fg=self.theme.palette.text_muted,
                      anchor='w').grid(row=0, column=i, sticky='w', padx=6, pady=8)
 
-        loans = search_loans(status='all')[:10]
+        loans = search_loans(status='all', page_size=10)
         from utils import get_status_text, get_status_color, format_date
 
         for loan in loans:
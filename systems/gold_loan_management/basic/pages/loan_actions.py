@@ -6,7 +6,7 @@ from tkinter import messagebox
 from database import (get_loan, renew_loan, redeem_loan, get_loan_renewals,
                       get_duration_rate, add_audit_log, create_approval_request, get_setting, get_sms_template,
                       repawn_loan, restock_repawned_loan, get_repawn_history)
-from sms_service import build_sms_context, render_template, send_sms
+from sms_service import build_sms_context, queue_sms, render_template
 from utils import (format_currency, format_date, calculate_total_payable,
                    calculate_interest, get_expire_date, is_overdue)
 from database import add_cash_transaction, get_cash_balance
@@ -138,7 +138,7 @@ def _send_auto_sms_for_loan(loan, *, event_message, setting_key, user_id):
     sms_body = template['body'] if template else 'Dear {{customer_name}},\n\n{{message}}\n\nTicket: {{ticket_no}}\n{{company_name}}'
     sms_context = build_sms_context(customer=customer, loan=loan_context, message=event_message)
     sms_message = render_template(sms_body, sms_context)
-    send_sms(
+    queue_sms(
         customer.get('phone', ''),
         sms_message,
         customer=customer,
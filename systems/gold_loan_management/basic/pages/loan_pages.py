@@ -2,7 +2,7 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from database import (search_loans, get_loan, get_loan_items, get_loan_renewals,
+from database import (search_loans, get_loan_search_totals, get_loan, get_loan_items, get_loan_renewals,
                       get_loan_payments, update_loan_status, get_approval_request_by_loan, get_duration_rate,
                       get_setting, list_customer_letters, list_sms_messages_filtered,
                       repawn_loan, restock_repawned_loan, get_repawn_history)
@@ -10,6 +10,10 @@ from utils import (format_currency, format_date, get_status_text, get_status_col
                    calculate_total_payable, is_overdue)
 
 
+# Loans fetched per page; further pages load as the list is scrolled.
+LOAN_PAGE_SIZE = 200
+
+
 class LoanListPage:
     def __init__(self, container, theme, user, navigate_fn):
         self.container = container
@@ -81,25 +85,42 @@ class LoanListPage:
         self.table_card = self.theme.make_card(view, bg=self.theme.palette.bg_surface)
         self.table_card.pack(fill=tk.BOTH, expand=True)
         self.table_frame = self.table_card.inner
+        self.results_label = tk.Label(self.table_frame, text='', font=self.theme.fonts.body,
+                                      bg=self.theme.palette.bg_surface, fg=self.theme.palette.text_muted)
+        self.results_label.pack(anchor='w', padx=14, pady=(10, 6))
+
+        cols = [('Ticket #', 10), ('Customer', 16), ('NIC', 12), ('Amount', 12),
+                ('Status', 10), ('Issue', 10), ('Expire', 10)]
+        self.results_grid = self.theme.make_data_grid(
+            self.table_frame,
+            cols,
+            height=18,
+            on_open=lambda loan: self.navigate('loan_detail', loan['id']),
+            row_color=self._status_color,
+            actions=[
+                ('👁 View', lambda loan: self.navigate('loan_detail', loan['id']), None),
+                ('🔄 Renew', lambda loan: self.navigate('renew_loan', loan['id']), self._is_active),
+                ('✅ Redeem', lambda loan: self.navigate('redeem_loan', loan['id']), self._is_active),
+                ('📦 Restock', lambda loan: self._do_restock(loan['id'], loan['ticket_no']),
+                 lambda loan: loan.get('status') == 'repawned'),
+            ],
+            on_more=self._load_more,
+            empty_text='No loans found.',
+        )
+        self.results_grid.pack(fill=tk.BOTH, expand=True, padx=14, pady=(0, 14))
         self._search_after_id = None
         self._do_search()
 
-    def _render_stats(self, loans):
+    def _render_stats(self, totals):
         for w in self.stats_wrap.winfo_children():
             w.destroy()
 
-        shown_count = len(loans)
-        active_count = sum(1 for loan in loans if loan.get('status') in ('active', 'renewed'))
-        overdue_count = sum(1 for loan in loans if loan.get('status') in ('active', 'renewed') and is_overdue(loan.get('expire_date', '')))
-        repawned_count = sum(1 for loan in loans if loan.get('status') == 'repawned')
-        total_amount = sum(float(loan.get('loan_amount') or 0) for loan in loans)
-
         stats = [
-            ('Loans Shown', str(shown_count), self.theme.palette.accent),
-            ('Active Loans', str(active_count), self.theme.palette.success),
-            ('Overdue Active', str(overdue_count), self.theme.palette.danger),
-            ('Repawned', str(repawned_count), '#a855f7'),
-            ('Shown Amount', format_currency(total_amount), self.theme.palette.info),
+            ('Matching Loans', str(totals['count']), self.theme.palette.accent),
+            ('Active Loans', str(totals['active_count']), self.theme.palette.success),
+            ('Overdue Active', str(totals['overdue_count']), self.theme.palette.danger),
+            ('Repawned', str(totals['repawned_count']), '#a855f7'),
+            ('Matching Amount', format_currency(totals['total_amount']), self.theme.palette.info),
         ]
 
         for title, value, color in stats:
@@ -124,104 +145,54 @@ class LoanListPage:
 
     def _do_search(self):
         self._search_after_id = None
-        for w in self.table_frame.winfo_children():
-            w.destroy()
-
-        loans = search_loans(self.search_var.get().strip(), self.status_var.get(),
-                             sort_overdue=(self.status_var.get() == 'overdue' and
-                                          self.sort_var.get() == 'most_overdue'))
-        self._render_stats(loans)
-
-        tk.Label(self.table_frame, text=f'Results: {len(loans)} loan(s)', font=self.theme.fonts.body,
-                 bg=self.theme.palette.bg_surface, fg=self.theme.palette.text_muted).pack(anchor='w', padx=14, pady=(10, 6))
-
-        # Table
-        cols = ['Ticket #', 'Customer', 'NIC', 'Amount', 'Status', 'Issue', 'Expire', 'Actions']
-        col_widths = [90, 140, 100, 100, 80, 80, 80, 220]
-
-        tbl = tk.Frame(self.table_frame, bg=self.theme.palette.bg_surface)
-        tbl.pack(fill=tk.BOTH, expand=True, padx=14, pady=(0, 14))
-
-        hdr = tk.Frame(tbl, bg=self.theme.palette.bg_surface_alt)
-        hdr.pack(fill=tk.X)
-        for idx, (col, width_px) in enumerate(zip(cols, col_widths)):
-            hdr.grid_columnconfigure(idx, minsize=width_px, weight=0)
-            tk.Label(hdr, text=col, font=self.theme.fonts.body_bold, anchor='w',
-                     bg=self.theme.palette.bg_surface_alt, fg=self.theme.palette.text_muted).grid(
-                        row=0, column=idx, sticky='w', padx=6, pady=6
-                     )
-
+        query = self.search_var.get().strip()
+        status = self.status_var.get()
+        self._search_args = {
+            'query': query,
+            'status': status,
+            'sort_overdue': status == 'overdue' and self.sort_var.get() == 'most_overdue',
+        }
+
+        totals = get_loan_search_totals(query, status)
+        self._render_stats(totals)
+        self.results_label.configure(text=f'Results: {totals["count"]} loan(s)')
+
+        loans = search_loans(**self._search_args, page_size=LOAN_PAGE_SIZE)
+        self.results_grid.set_rows(self._loan_rows(loans), loans, has_more=len(loans) == LOAN_PAGE_SIZE)
+
+    def _load_more(self):
+        last = self.results_grid.last_record
+        loans = search_loans(**self._search_args, after_id=last['id'] if last else None,
+                             page_size=LOAN_PAGE_SIZE)
+        self.results_grid.append_rows(self._loan_rows(loans), loans, has_more=len(loans) == LOAN_PAGE_SIZE)
+
+    @staticmethod
+    def _loan_rows(loans):
+        rows = []
         for loan in loans:
-            row_bg = self.theme.palette.bg_surface
-            row = tk.Frame(tbl, bg=row_bg)
-            row.pack(fill=tk.X)
-            tk.Frame(tbl, bg=self.theme.palette.border, height=1).pack(fill=tk.X)
-
-            for idx, width_px in enumerate(col_widths):
-                row.grid_columnconfigure(idx, minsize=width_px, weight=0)
-
             effective_status = 'active' if loan.get('status') == 'renewed' else loan.get('status')
-            status_text = get_status_text(effective_status, loan['expire_date'])
-            status_color = get_status_color(effective_status, loan['expire_date'])
-
-            vals = [
-                (loan['ticket_no'], self.theme.palette.accent),
-                (loan['customer_name'], self.theme.palette.text_primary),
-                (loan['customer_nic'], self.theme.palette.text_muted),
-                (format_currency(loan['loan_amount']), self.theme.palette.text_primary),
-                (status_text, status_color),
-                (format_date(loan['issue_date']), self.theme.palette.text_muted),
-                (format_date(loan['expire_date']), self.theme.palette.text_muted),
-            ]
-
-            for col_idx, (val, fg) in enumerate(vals):
-                lbl = tk.Label(row, text=val, font=self.theme.fonts.body, anchor='w',
-                               bg=row_bg, fg=fg, cursor='hand2')
-                lbl.grid(row=0, column=col_idx, sticky='w', padx=6, pady=5)
-                lbl.bind('<Button-1>', lambda e, lid=loan['id']: self.navigate('loan_detail', lid))
-
-            # Action buttons
-            act_frame = tk.Frame(row, bg=row_bg, width=col_widths[7] - 12, height=28)
-            act_frame.grid(row=0, column=7, sticky='ew', padx=6)
-            act_frame.grid_propagate(False)
-            act_frame.grid_columnconfigure(0, weight=1, uniform='loan-actions')
-            act_frame.grid_columnconfigure(1, weight=1, uniform='loan-actions')
-            act_frame.grid_columnconfigure(2, weight=1, uniform='loan-actions')
-
-            def _make_action_badge(parent, text, bg_color):
-                return tk.Label(
-                    parent,
-                    text=text,
-                    font=self.theme.fonts.small,
-                    bg=bg_color,
-                    fg=self.theme.palette.text_inverse,
-                    cursor='hand2',
-                    padx=4,
-                    pady=2,
-                    anchor='center',
-                )
-
-            view_lbl = _make_action_badge(act_frame, '👁 View', self.theme.palette.accent)
-            view_lbl.grid(row=0, column=0, sticky='ew', padx=(0, 4))
-            view_lbl.bind('<Button-1>', lambda e, lid=loan['id']: self.navigate('loan_detail', lid))
-
-            if effective_status == 'active':
-                ren_lbl = _make_action_badge(act_frame, '🔄 Renew', self.theme.palette.info)
-                ren_lbl.grid(row=0, column=1, sticky='ew', padx=(0, 4))
-                ren_lbl.bind('<Button-1>', lambda e, lid=loan['id']: self.navigate('renew_loan', lid))
-
-                red_lbl = _make_action_badge(act_frame, '✅ Redeem', self.theme.palette.success)
-                red_lbl.grid(row=0, column=2, sticky='ew')
-                red_lbl.bind('<Button-1>', lambda e, lid=loan['id']: self.navigate('redeem_loan', lid))
-
-            elif effective_status == 'repawned':
-                restock_lbl = _make_action_badge(act_frame, '📦 Restock', '#a855f7')
-                restock_lbl.grid(row=0, column=1, columnspan=2, sticky='ew', padx=(0, 0))
-                restock_lbl.bind('<Button-1>', lambda e, lid=loan['id'], tno=loan['ticket_no']: self._do_restock(lid, tno))
-
-        if not loans:
-            tk.Label(tbl, text='No loans found.', font=self.theme.fonts.body,
-                     bg=self.theme.palette.bg_surface, fg=self.theme.palette.text_muted).pack(pady=30)
+            rows.append([
+                loan['ticket_no'],
+                loan['customer_name'],
+                loan['customer_nic'],
+                format_currency(loan['loan_amount']),
+                get_status_text(effective_status, loan['expire_date']),
+                format_date(loan['issue_date']),
+                format_date(loan['expire_date']),
+            ])
+        return rows
+
+    @staticmethod
+    def _is_active(loan):
+        return loan.get('status') in ('active', 'renewed')
+
+    @staticmethod
+    def _status_color(loan):
+        # Tint only the rows that need attention; healthy active loans keep the normal text colour.
+        effective_status = 'active' if loan.get('status') == 'renewed' else loan.get('status')
+        if effective_status == 'active' and not is_overdue(loan['expire_date']):
+            return None
+        return get_status_color(effective_status, loan['expire_date'])
 
     def _do_restock(self, loan_id, ticket_no):
         if not messagebox.askyesno('Confirm Restock',
@@ -1,7 +1,7 @@
 """Morning SMS Popup — shown once per day on first launch.
 Lists pending monthly loan reminders and birthday wishes.
 User can check/uncheck each, then Send Selected or Skip.
-Failed sends are logged via log_sms_message (status='failed') → visible in SMS Center > Failed tab.
+Selected messages go to the SMS outbox; failed sends end up as status='failed' → visible in SMS Center > Failed tab.
 """
 
 import tkinter as tk
@@ -14,15 +14,15 @@ from database import (
     set_setting,
     get_due_reminder_loans,
     get_due_birthday_customers,
-    mark_reminder_sent,
-    mark_birthday_wish_sent,
+    mark_reminder_sent_many,
+    mark_birthday_wish_sent_many,
     get_wished_customer_ids_this_year,
     get_reminder_sent_months,
     list_sms_templates,
     log_sms_message,
     save_sms_template,
 )
-from sms_service import build_sms_context, render_template, send_sms
+from sms_service import build_sms_contexts, compile_template, queue_sms, render_template
 
 
 def _should_show_today(db_path=None):
@@ -451,16 +451,32 @@ class _MorningSmsPopup:
             return
 
         self.send_btn.config(state='disabled')
-        self.status_var.set('Sending…')
+        self.status_var.set('Queueing…')
 
         def _do_send():
             sent_ok = 0
             sent_fail = 0
             sent_rem_ids = set()
             sent_bday_ids = set()
-
-            # Reminders
-            for loan in rem_selected:
+            reminder_marks = []
+            wished_ids = []
+
+            # Reminders — contexts for the whole selection in a few queries.
+            reminder_tpl = compile_template(self.reminder_tpl)
+            rem_customers = [
+                None if loan.get('is_custom', False) else {
+                    'id': loan.get('customer_id'),
+                    'name': loan.get('customer_name', ''),
+                    'nic': loan.get('customer_nic', ''),
+                    'phone': loan.get('customer_phone') or loan.get('phone', ''),
+                }
+                for loan in rem_selected
+            ]
+            rem_contexts = build_sms_contexts(
+                [(customer, loan if customer else None) for customer, loan in zip(rem_customers, rem_selected)],
+                db_path=self.db_path,
+            )
+            for loan, customer, ctx in zip(rem_selected, rem_customers, rem_contexts):
                 recipient = loan.get('customer_phone') or loan.get('phone', '')
                 is_custom = loan.get('is_custom', False)
                 
@@ -479,30 +495,22 @@ class _MorningSmsPopup:
 
                 if is_custom:
                     # For custom numbers, use generic context
-                    ctx = build_sms_context()
                     ctx['customer_name'] = 'Valued Customer'
                     ctx['customer_phone'] = recipient
-                else:
-                    customer = {
-                        'id': loan.get('customer_id'),
-                        'name': loan.get('customer_name', ''),
-                        'nic': loan.get('customer_nic', ''),
-                        'phone': recipient,
-                    }
-                    ctx = build_sms_context(customer=customer, loan=loan)
-                
-                msg = render_template(self.reminder_tpl, ctx)
-                ok, _, __ = send_sms(
+
+                msg = reminder_tpl.render(ctx)
+                ok, _, __ = queue_sms(
                     recipient, msg,
                     customer=None if is_custom else customer,
                     loan=None if is_custom else loan,
                     category='auto_reminder',
                     sent_by=self.user.get('id'),
+                    idempotency_key=None if is_custom else f"reminder:{loan['id']}:{loan['reminder_month']}",
                     db_path=self.db_path,
                 )
                 if ok:
                     if not is_custom:
-                        mark_reminder_sent(loan['id'], loan['reminder_month'], db_path=self.db_path)
+                        reminder_marks.append((loan['id'], loan['reminder_month']))
                         sent_rem_ids.add(str(loan['id']))
                     else:
                         sent_rem_ids.add(f'custom_{recipient}')
@@ -510,8 +518,15 @@ class _MorningSmsPopup:
                 else:
                     sent_fail += 1
 
+            mark_reminder_sent_many(reminder_marks, db_path=self.db_path)
+
             # Birthdays
-            for cust in bday_selected:
+            birthday_tpl = compile_template(self.birthday_tpl)
+            bday_contexts = build_sms_contexts(
+                [(None if cust.get('is_custom', False) else cust, None) for cust in bday_selected],
+                db_path=self.db_path,
+            )
+            for cust, ctx in zip(bday_selected, bday_contexts):
                 recipient = cust.get('phone', '')
                 is_custom = cust.get('is_custom', False)
                 
@@ -528,23 +543,21 @@ class _MorningSmsPopup:
 
                 if is_custom:
                     # For custom numbers, use generic context
-                    ctx = build_sms_context()
                     ctx['customer_name'] = 'Valued Customer'
                     ctx['customer_phone'] = recipient
-                else:
-                    ctx = build_sms_context(customer=cust)
-                
-                msg = render_template(self.birthday_tpl, ctx)
-                ok, _, __ = send_sms(
+
+                msg = birthday_tpl.render(ctx)
+                ok, _, __ = queue_sms(
                     recipient, msg,
                     customer=None if is_custom else cust,
                     category='birthday',
                     sent_by=self.user.get('id'),
+                    idempotency_key=None if is_custom else f"birthday:{cust['id']}:{datetime.now().year}",
                     db_path=self.db_path,
                 )
                 if ok:
                     if not is_custom:
-                        mark_birthday_wish_sent(cust['id'], db_path=self.db_path)
+                        wished_ids.append(cust['id'])
                         sent_bday_ids.add(cust.get('_tree_key') or str(cust.get('id', '')))
                     else:
                         sent_bday_ids.add(f'custom_{recipient}')
@@ -552,6 +565,8 @@ class _MorningSmsPopup:
                 else:
                     sent_fail += 1
 
+            mark_birthday_wish_sent_many(wished_ids, db_path=self.db_path)
+
             def _done():
                 # Remove successfully sent rows directly from checks dict AND tree
                 for key in list(sent_rem_ids):
@@ -576,7 +591,7 @@ class _MorningSmsPopup:
 
                 parts = []
                 if sent_ok:
-                    parts.append(f'{sent_ok} sent ✅')
+                    parts.append(f'{sent_ok} queued ✅')
                 if sent_fail:
                     parts.append(f'{sent_fail} failed ❌ (see SMS Center > Failed tab)')
                 self.status_var.set('  •  '.join(parts))
@@ -11,7 +11,7 @@ from database import (get_customer_by_nic, create_customer, create_loan,
                  search_recent_descriptions, create_approval_request,
                get_article_types, get_setting, get_customer, get_loan, get_sms_template, search_recent_customer_jobs,
                   update_customer)
-from sms_service import build_sms_context, render_template, send_sms
+from sms_service import build_sms_context, queue_sms, render_template
 from utils import (format_currency, calculate_market_value, calculate_assessed_value,
                          calculate_interest, get_expire_date, ARTICLE_TYPES, CARAT_OPTIONS)
 
@@ -1582,13 +1582,14 @@ class NewTicketPage:
                         message='Your new gold loan has been created successfully.',
                     )
                     sms_message = render_template(sms_body, sms_context)
-                    send_sms(
+                    queue_sms(
                         customer.get('phone', ''),
                         sms_message,
                         customer=customer,
                         loan=loan_record or loan_data,
                         category='auto',
                         sent_by=self.user['id'],
+                        idempotency_key=f'new_loan:{loan_id}',
                     )
         except Exception:
             pass
@@ -1,15 +1,290 @@
 """Comprehensive admin reports page for Gold Loan System."""
 
 import csv
+import os
+import sqlite3
+import sys
+import threading
 import tkinter as tk
-import tkinter.font as tkfont
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 
-from database import get_connection, get_dashboard_stats, get_duration_rate, get_repawn_history
+from database import date_range_params, date_range_sql, get_connection, get_dashboard_stats, get_repawn_history
+from database import REPORT_DATA_TABLES, get_data_versions, get_gold_in_vault, interest_collected_sql, rollup_source
 from utils import format_currency, format_date, get_status_text
-from utils import calculate_total_payable
+from utils import calculate_total_payable_batch
+
+
+class ReportCancelled(Exception):
+    """Raised inside a report worker once its run has been superseded."""
+
+
+class _ReportRun:
+    def __init__(self, on_done, on_error, on_progress):
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.cancelled = False
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self.cancelled = True
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            try:
+                # Thread-safe: aborts the statement the worker is stepping.
+                conn.interrupt()
+            except sqlite3.Error:
+                pass
+
+    def check(self):
+        if self.cancelled:
+            raise ReportCancelled()
+
+
+class ReportExecutor:
+    """Runs report queries on a worker thread; only the latest run reaches the UI.
+
+    submit() starts load() on a daemon thread and hands its result to on_done
+    on the Tk thread via widget.after(). Submitting again (another report, a new
+    date range) or cancel() supersedes the previous run: its result is dropped
+    and any SQLite statement it has in flight is interrupted.
+    """
+
+    def __init__(self, widget):
+        self.widget = widget
+        self._run = None
+        self._local = threading.local()
+
+    @property
+    def busy(self):
+        return self._run is not None
+
+    def submit(self, load, on_done, on_error=None, on_progress=None):
+        self.cancel()
+        run = self._run = _ReportRun(on_done, on_error, on_progress)
+        threading.Thread(target=self._work, args=(run, load), daemon=True).start()
+        return run
+
+    def cancel(self):
+        run, self._run = self._run, None
+        if run is not None:
+            run.cancel()
+
+    def progress(self, text):
+        """Report a progress message from inside load(); also a cancellation point."""
+        run = getattr(self._local, 'run', None)
+        if run is None:
+            return
+        run.check()
+        if run.on_progress:
+            self._deliver(run, run.on_progress, text, final=False)
+
+    @contextmanager
+    def watch(self, conn):
+        """Let cancel() interrupt statements run on conn inside load()."""
+        run = getattr(self._local, 'run', None)
+        if run is None:
+            yield conn
+            return
+        run.check()
+        with run._lock:
+            run._connections.append(conn)
+        try:
+            yield conn
+        except sqlite3.OperationalError:
+            if run.cancelled:
+                raise ReportCancelled()
+            raise
+        finally:
+            with run._lock:
+                run._connections.remove(conn)
+
+    def _work(self, run, load):
+        self._local.run = run
+        try:
+            result = load()
+        except ReportCancelled:
+            return
+        except Exception as e:
+            if not run.cancelled and run.on_error:
+                self._deliver(run, run.on_error, e)
+            return
+        finally:
+            self._local.run = None
+        self._deliver(run, run.on_done, result)
+
+    def _deliver(self, run, callback, payload, final=True):
+        def deliver():
+            if run is not self._run:
+                return
+            if final:
+                self._run = None
+            callback(payload)
+
+        if run.cancelled:
+            return
+        try:
+            self.widget.after(0, deliver)
+        except (RuntimeError, tk.TclError):
+            # Window already closed.
+            pass
+
+
+# ── Result cache ──
+# Finished report loads, keyed on the report, its date range and filters, the
+# day, and the data_versions counters of every table the reports read. Writes
+# bump the counters through triggers, so a result is never served after the
+# data under it changed; switching back to a report seen since then is a dict
+# lookup. Least recently used results go first once the cache passes
+# REPORT_CACHE_MAX_BYTES.
+
+REPORT_CACHE_MAX_BYTES = 32 * 2 ** 20
+
+_MISS = object()
+
+
+def _approx_size(value, sample=200):
+    """Rough deep size in bytes of a report result; long sequences are sampled."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        return size + sum(_approx_size(k) + _approx_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)) and value:
+        head = value[:sample]
+        return size + sum(_approx_size(v) for v in head) * len(value) // len(head)
+    return size
+
+
+def _older_versions(versions, current):
+    """True if versions (from get_data_versions()) was read before current.
+
+    The last item is the pool generation; within one generation every
+    counter only grows, so one smaller counter means an older read.
+    """
+    if versions[-1] != current[-1]:
+        return versions[-1] < current[-1]
+    return any(a < b for a, b in zip(versions, current))
+
+
+class ReportCache:
+    """Thread-safe LRU of report results with a byte budget.
+
+    Keys are (data versions, report key). Results built at older versions can
+    never match again, so a put() at new versions drops them all at once, and
+    a put() from a worker that read older versions is ignored.
+    """
+
+    def __init__(self, max_bytes=REPORT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._versions = None
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, result):
+        size = _approx_size(result)
+        with self._lock:
+            versions = key[0]
+            if self._versions is not None and _older_versions(versions, self._versions):
+                return
+            if versions != self._versions:
+                self._entries.clear()
+                self._bytes = 0
+                self._versions = versions
+            if size > self.max_bytes:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._versions = None
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Shared by every ReportsPage, so results survive leaving and reopening Reports.
+REPORT_CACHE = ReportCache()
+
+
+# ── Export ──
+# Exports are written on a worker thread. A report whose table comes from one
+# query registers it (see _render_table's export_query), so the file is
+# streamed from the cursor batch by batch instead of from the rendered rows.
+
+EXPORT_BATCH_ROWS = 2000
+
+
+def write_export(path, kind, columns, rows, progress=None):
+    """Write columns and an iterable of rows to a CSV or .xlsx file; returns the row count.
+
+    Rows are consumed one at a time (openpyxl in write-only mode for .xlsx),
+    so memory stays flat however many there are. progress(count) is called
+    every EXPORT_BATCH_ROWS rows. The file only appears at path once
+    complete; an error or cancellation leaves nothing behind.
+    """
+    part = f'{path}.part'
+    count = 0
+    try:
+        if kind == 'xlsx':
+            from openpyxl import Workbook
+
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet('Report')
+            ws.append(list(columns))
+            for row in rows:
+                ws.append(list(row))
+                count += 1
+                if progress and count % EXPORT_BATCH_ROWS == 0:
+                    progress(count)
+            wb.save(part)
+        else:
+            with open(part, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+                    if progress and count % EXPORT_BATCH_ROWS == 0:
+                        progress(count)
+        os.replace(part, path)
+    except BaseException:
+        try:
+            os.remove(part)
+        except OSError:
+            pass
+        raise
+    return count
 
 
 class ReportsPage:
@@ -20,6 +295,7 @@ class ReportsPage:
         self.navigate = navigate_fn
         self._export_columns = []
         self._export_rows = []
+        self._export_query = None
         self._report_title = 'report'
         self._active_report_handler = None
         today = datetime.now().date()
@@ -27,6 +303,8 @@ class ReportsPage:
         self._date_from_var = tk.StringVar(value=(today - timedelta(days=90)).strftime('%Y-%m-%d'))
         self._gold_inventory_scope_var = tk.StringVar(value='active')
         self._date_field_var = tk.StringVar(value='Issue Date')
+        self._executor = ReportExecutor(container)
+        self._export_executor = ReportExecutor(container)
 
     def render(self):
         for w in self.container.winfo_children():
@@ -140,6 +418,22 @@ class ReportsPage:
             width=14,
             pady=6,
         ).pack(side=tk.RIGHT, padx=(0, 8))
+        self._export_cancel_btn = self.theme.make_button(
+            export_wrap,
+            text='Cancel Export',
+            command=self._cancel_export,
+            kind='ghost',
+            width=12,
+            pady=6,
+        )
+        self._export_status = tk.Label(
+            export_wrap,
+            text='',
+            font=self.theme.fonts.small,
+            bg=self.theme.palette.bg_app,
+            fg=self.theme.palette.text_muted,
+        )
+        self._export_status.pack(side=tk.RIGHT, padx=(0, 12))
 
         btn_wrap = tk.Frame(view, bg=self.theme.palette.bg_app)
         btn_wrap.pack(fill=tk.X, pady=(0, 10))
@@ -208,16 +502,36 @@ class ReportsPage:
         self._active_report_handler()
 
     def _get_date_field_col(self):
-        """Return the SQL column expression matching the selected date field dropdown."""
+        """Return (status condition, column) matching the selected date field dropdown."""
         mapping = {
-            'Issue Date':     'l.issue_date',
-            'Redeem Date':    "CASE WHEN l.status='redeemed' THEN l.updated_at ELSE NULL END",
-            'Forfeited Date': "CASE WHEN l.status='forfeited' THEN l.updated_at ELSE NULL END",
-            'Repawned Date':  "CASE WHEN l.status='repawned' THEN l.updated_at ELSE NULL END",
-            'Restocked Date': 'l.updated_at',   # restocked = repawned → active, so updated_at
-            'Created Date':   'l.created_at',
+            'Issue Date':     (None, 'l.issue_date'),
+            'Redeem Date':    ("l.status='redeemed'", 'l.updated_at'),
+            'Forfeited Date': ("l.status='forfeited'", 'l.updated_at'),
+            'Repawned Date':  ("l.status='repawned'", 'l.updated_at'),
+            'Restocked Date': (None, 'l.updated_at'),   # restocked = repawned → active, so updated_at
+            'Created Date':   (None, 'l.created_at'),
         }
-        return mapping.get(self._date_field_var.get(), 'l.issue_date')
+        return mapping.get(self._date_field_var.get(), (None, 'l.issue_date'))
+
+    def _date_field_filter(self, lower=True, upper=True):
+        """Index-friendly range filter on the selected date field; bind date_range_params()."""
+        status_sql, column = self._get_date_field_col()
+        range_sql = date_range_sql(column, lower, upper)
+        return f"({status_sql} AND {range_sql})" if status_sql else range_sql
+
+    def _uses_issue_rollups(self):
+        """True when the selected date field is the one the loan and gold rollups are keyed on."""
+        return self._get_date_field_col() == (None, 'l.issue_date')
+
+    def _rollup_query(self, kind, select, date_from, date_to, where='', params=(), group_by='', having='',
+                      order_by=''):
+        """Run SELECT select FROM the kind rollup rows between the dates, plus the optional clauses."""
+        source, source_params = rollup_source(kind, date_from, date_to)
+        sql = f"SELECT {select} FROM {source} r"
+        for clause, value in (('WHERE', where), ('GROUP BY', group_by), ('HAVING', having), ('ORDER BY', order_by)):
+            if value:
+                sql += f" {clause} {value}"
+        return self._query(sql, (*source_params, *params))
 
     def _render_access_denied(self):
         tk.Label(
@@ -228,20 +542,135 @@ class ReportsPage:
             fg=self.theme.palette.danger,
         ).pack(pady=40)
 
-    def _clear(self):
-        for w in self.report_content.winfo_children():
+    def _clear(self, target=None):
+        for w in (target or self.report_content).winfo_children():
             w.destroy()
 
+    def _report_cache_key(self, filters):
+        """REPORT_CACHE key for the active report with the current range, filters and data."""
+        handler = self._active_report_handler
+        if handler is None:
+            return None
+        try:
+            versions = get_data_versions(REPORT_DATA_TABLES)
+        except sqlite3.Error:
+            return None
+        return versions, (
+            getattr(handler, '__name__', repr(handler)),
+            (self._date_from_var.get() or '').strip(),
+            (self._date_to_var.get() or '').strip(),
+            self._date_field_var.get(),
+            datetime.now().strftime('%Y-%m-%d'),
+            tuple(filters),
+        )
+
+    def _run_report(self, load, render, target=None, filters=()):
+        """Run load() on the report worker, then render(result) on the Tk thread.
+
+        load() must not touch Tk widgets or variables; read filters before
+        calling this and pass the report's own ones (beyond the shared date
+        range and date field) as filters, as they key REPORT_CACHE. A cached
+        result renders straight away. A newer _run_report() call cancels this one.
+        """
+        target = target or self.report_content
+        self._export_columns = []
+        self._export_rows = []
+        self._export_query = None
+        cache_key = self._report_cache_key(filters)
+        if cache_key is not None:
+            cached = REPORT_CACHE.get(cache_key)
+            if cached is not _MISS:
+                self._executor.cancel()
+                self._clear(target)
+                render(cached)
+                return
+
+        self._clear(target)
+        status_label = self._render_progress(target)
+
+        def cached_load():
+            result = load()
+            if cache_key is not None:
+                REPORT_CACHE.put(cache_key, result)
+            return result
+
+        def on_done(result):
+            if not target.winfo_exists():
+                return
+            self._clear(target)
+            render(result)
+
+        def on_error(exc):
+            if not target.winfo_exists():
+                return
+            self._clear(target)
+            tk.Label(
+                target,
+                text=f'Report failed: {exc}',
+                font=self.theme.fonts.body,
+                bg=self.theme.palette.bg_app,
+                fg=self.theme.palette.danger,
+            ).pack(anchor='w', padx=14, pady=20)
+
+        def on_progress(text):
+            if status_label.winfo_exists():
+                status_label.configure(text=text)
+
+        self._executor.submit(cached_load, on_done, on_error, on_progress)
+
+    def _render_progress(self, target):
+        box = tk.Frame(target, bg=self.theme.palette.bg_app)
+        box.pack(fill=tk.X, padx=14, pady=24)
+        status_label = tk.Label(
+            box,
+            text='Loading report...',
+            font=self.theme.fonts.body,
+            bg=self.theme.palette.bg_app,
+            fg=self.theme.palette.text_muted,
+        )
+        status_label.pack(anchor='w')
+        bar = ttk.Progressbar(box, mode='indeterminate', length=320)
+        bar.pack(anchor='w', pady=(6, 8))
+        bar.start(12)
+        self.theme.make_button(
+            box,
+            text='Cancel',
+            command=lambda: self._cancel_report(target),
+            kind='ghost',
+            width=10,
+            pady=4,
+        ).pack(anchor='w')
+        return status_label
+
+    def _cancel_report(self, target):
+        self._executor.cancel()
+        if not target.winfo_exists():
+            return
+        self._clear(target)
+        tk.Label(
+            target,
+            text='Report cancelled. Pick a report or press Apply Range to run it again.',
+            font=self.theme.fonts.body,
+            bg=self.theme.palette.bg_app,
+            fg=self.theme.palette.text_muted,
+        ).pack(anchor='w', padx=14, pady=20)
+
     def _query(self, sql, params=()):
         conn = get_connection()
-        rows = conn.execute(sql, params).fetchall()
-        conn.close()
+        try:
+            with self._executor.watch(conn):
+                rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
         return [dict(r) for r in rows]
 
     def _scalar(self, sql, params=(), default=0):
         conn = get_connection()
-        row = conn.execute(sql, params).fetchone()
-        conn.close()
+        try:
+            with self._executor.watch(conn):
+                row = conn.execute(sql, params).fetchone()
+        finally:
+            conn.close()
         if not row:
             return default
         try:
@@ -297,111 +726,33 @@ class ReportsPage:
                 fg=color,
             ).pack(anchor='w', padx=10, pady=(0, 8))
 
-    def _render_table(self, parent, columns, rows, ticket_col=None, max_rows=180):
+    def _render_table(self, parent, columns, rows, ticket_col=None, height=18, export_query=None):
+        """Show rows in a data grid and make them the export data.
+
+        export_query=(sql, params, format_row) lets exports re-run the query
+        and stream format_row(dict(row)) for each result instead of copying rows.
+        """
         wrap = tk.Frame(parent, bg=self.theme.palette.bg_surface)
         wrap.pack(fill=tk.BOTH, expand=True, padx=14, pady=(0, 14))
 
-        body_font = tkfont.Font(font=self.theme.fonts.body)
-        header_font = tkfont.Font(font=self.theme.fonts.body_bold)
-
-        shown_rows = rows[:max_rows]
-
-        # One shared pixel-based column layout keeps headers and row cells perfectly aligned.
-        px_widths = []
-        for col_idx, (title, width_chars) in enumerate(columns):
-            by_chars = body_font.measure('0') * int(width_chars) + 20
-            by_header = header_font.measure(str(title)) + 20
-            by_content = 0
-            for row_data in shown_rows[:200]:
-                raw_val = '' if col_idx >= len(row_data) else row_data[col_idx]
-                text_val = str(raw_val)
-                if len(text_val) > 200:
-                    text_val = text_val[:200]
-                by_content = max(by_content, body_font.measure(text_val) + 20)
-            px_widths.append(max(72, by_chars, by_header, by_content))
+        # Virtual grid: every row stays reachable (no truncation) at constant render cost.
+        def on_open(row):
+            self._open_ticket(str(row[ticket_col]))
 
-        table_canvas = tk.Canvas(wrap, bg=self.theme.palette.bg_surface, highlightthickness=0, bd=0)
-        table_canvas.pack(fill=tk.X, expand=False)
-
-        xbar = tk.Scrollbar(wrap, orient=tk.HORIZONTAL, command=table_canvas.xview)
-        xbar.pack(fill=tk.X)
-        table_canvas.configure(xscrollcommand=xbar.set)
-
-        grid = tk.Frame(table_canvas, bg=self.theme.palette.bg_surface)
-        grid_window = table_canvas.create_window((0, 0), window=grid, anchor='nw')
-
-        def _sync_table_size(_event=None):
-            table_canvas.configure(scrollregion=table_canvas.bbox('all'))
-            req_h = max(1, grid.winfo_reqheight())
-            if int(float(table_canvas.cget('height'))) != req_h:
-                table_canvas.configure(height=req_h)
-
-        def _sync_window_width(_event):
-            # Keep grid at content width so extra viewport area uses canvas bg (white surface).
-            table_canvas.itemconfigure(grid_window, width=max(1, grid.winfo_reqwidth()))
-
-        grid.bind('<Configure>', _sync_table_size)
-        table_canvas.bind('<Configure>', _sync_window_width)
-
-        for idx, px in enumerate(px_widths):
-            grid.grid_columnconfigure(idx, minsize=px, weight=0)
-
-        for idx, (title, _) in enumerate(columns):
-            tk.Label(
-                grid,
-                text=title,
-                font=self.theme.fonts.body_bold,
-                anchor='w',
-                padx=6,
-                bg=self.theme.palette.bg_surface_alt,
-                fg=self.theme.palette.text_muted,
-            ).grid(row=0, column=idx, sticky='nsew', padx=(0, 1), pady=(0, 1))
-
-        for r_idx, row_data in enumerate(shown_rows, start=1):
-            row_bg = self.theme.palette.bg_surface if r_idx % 2 == 1 else self.theme.palette.bg_surface_alt
-
-            for c_idx, _ in enumerate(columns):
-                value = '' if c_idx >= len(row_data) else row_data[c_idx]
-                is_ticket = ticket_col is not None and c_idx == ticket_col
-                text_color = self.theme.palette.accent if is_ticket else self.theme.palette.text_primary
-                label = tk.Label(
-                    grid,
-                    text=value,
-                    font=self.theme.fonts.body,
-                    anchor='w',
-                    padx=6,
-                    bg=row_bg,
-                    fg=text_color,
-                    cursor='hand2' if is_ticket else 'arrow',
-                )
-                label.grid(row=r_idx, column=c_idx, sticky='nsew', padx=(0, 1), pady=(0, 1))
-
-                if is_ticket:
-                    ticket_no = str(value)
-                    label.bind('<Button-1>', lambda _e, t=ticket_no: self._open_ticket(t))
-
-        if not rows:
-            tk.Label(
-                wrap,
-                text='No records found for this report.',
-                font=self.theme.fonts.body,
-                bg=self.theme.palette.bg_surface,
-                fg=self.theme.palette.text_muted,
-            ).pack(pady=20)
-            return
-
-        if len(rows) > max_rows:
-            tk.Label(
-                wrap,
-                text=f'Showing first {max_rows} rows of {len(rows)} records.',
-                font=self.theme.fonts.small,
-                bg=self.theme.palette.bg_surface,
-                fg=self.theme.palette.warning,
-            ).pack(anchor='e', pady=(6, 0))
+        self.theme.make_data_grid(
+            wrap,
+            columns,
+            rows,
+            height=min(max(len(rows), 3), height),
+            on_open=on_open if ticket_col is not None else None,
+            link_column=ticket_col,
+            empty_text='No records found for this report.',
+        ).pack(fill=tk.BOTH, expand=True)
 
         # Keep latest table dataset available for exports.
         self._export_columns = [c[0] for c in columns]
-        self._export_rows = [list(r) for r in rows]
+        self._export_rows = rows
+        self._export_query = export_query if rows else None
 
     def _render_bar_chart(self, parent, title, data_pairs, color):
         card = tk.Frame(
@@ -465,61 +816,90 @@ class ReportsPage:
                                font=('Segoe UI', 8), fill=self.theme.palette.text_primary)
 
     def _export_csv(self):
-        if not self._export_columns or not self._export_rows:
-            messagebox.showinfo('Export CSV', 'No table data available to export in this report view.')
-            return
-
-        filename = f"{self._report_title.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        path = filedialog.asksaveasfilename(
-            title='Export Report as CSV',
-            initialfile=filename,
-            defaultextension='.csv',
-            filetypes=[('CSV files', '*.csv')],
-        )
-        if not path:
-            return
-
-        with open(path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(self._export_columns)
-            writer.writerows(self._export_rows)
-
-        messagebox.showinfo('Export CSV', f'Report exported successfully:\n{path}')
+        self._start_export('csv')
 
     def _export_excel(self):
+        self._start_export('xlsx')
+
+    def _start_export(self, kind):
+        title = 'Export Excel' if kind == 'xlsx' else 'Export CSV'
         if not self._export_columns or not self._export_rows:
-            messagebox.showinfo('Export Excel', 'No table data available to export in this report view.')
+            messagebox.showinfo(title, 'No table data available to export in this report view.')
             return
 
-        try:
-            from openpyxl import Workbook
-        except Exception:
-            messagebox.showwarning(
-                'Export Excel',
-                'Excel export requires openpyxl.\nInstall with: pip install openpyxl\n\nUsing CSV export instead.'
-            )
-            self._export_csv()
-            return
+        if kind == 'xlsx':
+            try:
+                import openpyxl  # noqa: F401
+            except Exception:
+                messagebox.showwarning(
+                    'Export Excel',
+                    'Excel export requires openpyxl.\nInstall with: pip install openpyxl\n\nUsing CSV export instead.'
+                )
+                self._start_export('csv')
+                return
 
-        filename = f"{self._report_title.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"{self._report_title.lower().replace(' ', '_')}_{stamp}.{kind}"
         path = filedialog.asksaveasfilename(
-            title='Export Report as Excel',
+            title='Export Report as Excel' if kind == 'xlsx' else 'Export Report as CSV',
             initialfile=filename,
-            defaultextension='.xlsx',
-            filetypes=[('Excel Workbook', '*.xlsx')],
+            defaultextension=f'.{kind}',
+            filetypes=[('Excel Workbook', '*.xlsx')] if kind == 'xlsx' else [('CSV files', '*.csv')],
         )
         if not path:
             return
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = 'Report'
-        ws.append(self._export_columns)
-        for row in self._export_rows:
-            ws.append(row)
-        wb.save(path)
+        columns, rows, query = self._export_columns, self._export_rows, self._export_query
 
-        messagebox.showinfo('Export Excel', f'Report exported successfully:\n{path}')
+        def load():
+            source = self._stream_export_rows(*query) if query else rows
+            try:
+                return write_export(path, kind, columns, source,
+                                    progress=lambda n: self._export_executor.progress(f'Exporting... {n:,} rows'))
+            finally:
+                if query:
+                    source.close()
+
+        def on_done(count):
+            self._finish_export()
+            messagebox.showinfo(title, f'Report exported successfully ({count:,} rows):\n{path}')
+
+        def on_error(exc):
+            self._finish_export()
+            messagebox.showerror(title, f'Export failed:\n{exc}')
+
+        def on_progress(text):
+            if self._export_status.winfo_exists():
+                self._export_status.configure(text=text)
+
+        on_progress('Exporting...')
+        if not self._export_cancel_btn.winfo_ismapped():
+            self._export_cancel_btn.pack(side=tk.RIGHT, padx=(0, 8), before=self._export_status)
+        self._export_executor.submit(load, on_done, on_error, on_progress)
+
+    def _stream_export_rows(self, sql, params, format_row):
+        """Yield format_row(dict(row)) for each result of sql, fetched in batches."""
+        conn = get_connection()
+        try:
+            with self._export_executor.watch(conn):
+                cursor = conn.execute(sql, params)
+                while True:
+                    batch = cursor.fetchmany(EXPORT_BATCH_ROWS)
+                    if not batch:
+                        break
+                    for row in batch:
+                        yield format_row(dict(row))
+        finally:
+            conn.close()
+
+    def _cancel_export(self):
+        self._export_executor.cancel()
+        self._finish_export()
+
+    def _finish_export(self):
+        if self._export_status.winfo_exists():
+            self._export_status.configure(text='')
+            self._export_cancel_btn.pack_forget()
 
     def _show_analytics(self):
         self._clear()
@@ -553,155 +933,186 @@ class ReportsPage:
         content.pack(fill=tk.BOTH, expand=True)
 
         def refresh_dashboard():
-            for w in content.winfo_children():
-                w.destroy()
-
             date_from, date_to = self._get_date_range(show_error=False)
             if not date_from or not date_to:
                 date_to = datetime.now().strftime('%Y-%m-%d')
                 date_from = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
+            _range = date_range_params(date_from, date_to)
+            date_filter = self._date_field_filter()
+            period = period_var.get()
+            status_filter = status_var.get()
+            min_amount_text = min_amount_var.get()
+            use_rollups = self._uses_issue_rollups()
+
+            def load():
+                rows = self._query(
+                    f'''SELECT l.ticket_no, c.name AS customer_name, l.loan_amount, l.status,
+                              l.issue_date, l.expire_date, l.duration_months, l.interest_rate
+                       FROM loans l
+                       JOIN customers c ON l.customer_id=c.id
+                       WHERE {date_filter}
+                       ORDER BY l.id DESC''',
+                    _range,
+                )
 
-            rows = self._query(
-                f'''SELECT l.ticket_no, c.name AS customer_name, l.loan_amount, l.status,
-                          l.issue_date, l.expire_date, l.duration_months, l.interest_rate
-                   FROM loans l
-                   JOIN customers c ON l.customer_id=c.id
-                   WHERE date({self._get_date_field_col()}) BETWEEN ? AND ?
-                   ORDER BY l.id DESC''',
-                (date_from, date_to),
-            )
-
-            now = datetime.now().date()
-            period_days = {
-                '7d': 7,
-                '30d': 30,
-                '90d': 90,
-                '365d': 365,
-                'all': None,
-            }.get(period_var.get(), 90)
-
-            filtered = []
-            try:
-                min_amount = float(min_amount_var.get() or 0)
-            except ValueError:
-                min_amount = 0
+                now = datetime.now().date()
+                period_days = {
+                    '7d': 7,
+                    '30d': 30,
+                    '90d': 90,
+                    '365d': 365,
+                    'all': None,
+                }.get(period, 90)
 
-            for r in rows:
-                issue_raw = (r.get('issue_date') or '')[:10]
+                filtered = []
                 try:
-                    issue_dt = datetime.strptime(issue_raw, '%Y-%m-%d').date()
+                    min_amount = float(min_amount_text or 0)
                 except ValueError:
-                    issue_dt = now
-
-                if period_days is not None and (now - issue_dt).days > period_days:
-                    continue
-                if status_var.get() != 'all' and (r.get('status') or '') != status_var.get():
-                    continue
-                if float(r.get('loan_amount') or 0) < min_amount:
-                    continue
-                filtered.append(r)
-
-            total_issued = sum(float(r.get('loan_amount') or 0) for r in filtered)
-            active_count = sum(1 for r in filtered if r.get('status') == 'active')
-            redeemed_count = sum(1 for r in filtered if r.get('status') == 'redeemed')
-            forfeited_count = sum(1 for r in filtered if r.get('status') == 'forfeited')
-            avg_ticket = (total_issued / len(filtered)) if filtered else 0
+                    min_amount = 0
+
+                for r in rows:
+                    issue_raw = (r.get('issue_date') or '')[:10]
+                    try:
+                        issue_dt = datetime.strptime(issue_raw, '%Y-%m-%d').date()
+                    except ValueError:
+                        issue_dt = now
+
+                    if period_days is not None and (now - issue_dt).days > period_days:
+                        continue
+                    if status_filter != 'all' and (r.get('status') or '') != status_filter:
+                        continue
+                    if float(r.get('loan_amount') or 0) < min_amount:
+                        continue
+                    filtered.append(r)
+
+                total_issued = sum(float(r.get('loan_amount') or 0) for r in filtered)
+                active_count = sum(1 for r in filtered if r.get('status') == 'active')
+                redeemed_count = sum(1 for r in filtered if r.get('status') == 'redeemed')
+                forfeited_count = sum(1 for r in filtered if r.get('status') == 'forfeited')
+                avg_ticket = (total_issued / len(filtered)) if filtered else 0
+
+                if use_rollups and min_amount <= 0:
+                    # The monthly trend comes straight from the rollups; only
+                    # an amount filter needs the individual loans.
+                    trend_from = date_from
+                    if period_days is not None:
+                        trend_from = max(date_from, (now - timedelta(days=period_days)).strftime('%Y-%m-%d'))
+                    month_map = {
+                        r['month']: int(r['loans'] or 0)
+                        for r in self._rollup_query(
+                            'loans', 'substr(period, 1, 7) AS month, SUM(loans) AS loans', trend_from, date_to,
+                            where='status = ?' if status_filter != 'all' else '',
+                            params=(status_filter,) if status_filter != 'all' else (),
+                            group_by='month',
+                            having='SUM(loans) > 0',
+                        )
+                        if r['month']
+                    }
+                else:
+                    month_map = {}
+                    for r in filtered:
+                        issue_raw = (r.get('issue_date') or '')[:10]
+                        key = issue_raw[:7] if len(issue_raw) >= 7 else issue_raw
+                        if not key:
+                            continue
+                        month_map[key] = month_map.get(key, 0) + 1
+                month_pairs = sorted(month_map.items())[-6:]
+
+                table_rows = [
+                    [
+                        r.get('ticket_no', '-'),
+                        r.get('customer_name', '-'),
+                        format_currency(r.get('loan_amount', 0)),
+                        get_status_text(r.get('status', 'active'), r.get('expire_date', '')),
+                        format_date(r.get('issue_date', '')),
+                        format_date(r.get('expire_date', '')),
+                        str(r.get('duration_months', '-')),
+                        f"{float(r.get('interest_rate') or 0):.2f}",
+                    ]
+                    for r in filtered
+                ]
+                return (len(filtered), total_issued, active_count, redeemed_count, forfeited_count,
+                        avg_ticket, month_pairs, table_rows)
+
+            def render(data):
+                (filtered_count, total_issued, active_count, redeemed_count, forfeited_count,
+                 avg_ticket, month_pairs, table_rows) = data
+
+                self._render_kpis(
+                    content,
+                    [
+                        ('Filtered Loans', str(filtered_count), self.theme.palette.text_primary),
+                        ('Total Issued', format_currency(total_issued), self.theme.palette.accent),
+                        ('Average Ticket', format_currency(avg_ticket), self.theme.palette.info),
+                        ('Active', str(active_count), self.theme.palette.success),
+                        ('Redeemed', str(redeemed_count), self.theme.palette.warning),
+                        ('Forfeited', str(forfeited_count), self.theme.palette.danger),
+                    ],
+                    columns=3,
+                )
 
-            self._render_kpis(
-                content,
-                [
-                    ('Filtered Loans', str(len(filtered)), self.theme.palette.text_primary),
-                    ('Total Issued', format_currency(total_issued), self.theme.palette.accent),
-                    ('Average Ticket', format_currency(avg_ticket), self.theme.palette.info),
-                    ('Active', str(active_count), self.theme.palette.success),
-                    ('Redeemed', str(redeemed_count), self.theme.palette.warning),
-                    ('Forfeited', str(forfeited_count), self.theme.palette.danger),
-                ],
-                columns=3,
-            )
+                charts_row = tk.Frame(content, bg=self.theme.palette.bg_surface)
+                charts_row.pack(fill=tk.X, padx=10, pady=(0, 8))
 
-            charts_row = tk.Frame(content, bg=self.theme.palette.bg_surface)
-            charts_row.pack(fill=tk.X, padx=10, pady=(0, 8))
+                status_chart = [
+                    ('Active', active_count),
+                    ('Redeemed', redeemed_count),
+                    ('Forfeited', forfeited_count),
+                ]
+                self._render_bar_chart(charts_row, 'Status Distribution', status_chart, self.theme.palette.accent)
+                self._render_bar_chart(charts_row, 'Loan Issuance Trend (Monthly)', month_pairs, self.theme.palette.success)
 
-            status_chart = [
-                ('Active', active_count),
-                ('Redeemed', redeemed_count),
-                ('Forfeited', forfeited_count),
-            ]
-            self._render_bar_chart(charts_row, 'Status Distribution', status_chart, self.theme.palette.accent)
-
-            month_map = {}
-            for r in filtered:
-                issue_raw = (r.get('issue_date') or '')[:10]
-                key = issue_raw[:7] if len(issue_raw) >= 7 else issue_raw
-                if not key:
-                    continue
-                month_map[key] = month_map.get(key, 0) + 1
-            month_pairs = sorted(month_map.items())[-6:]
-            self._render_bar_chart(charts_row, 'Loan Issuance Trend (Monthly)', month_pairs, self.theme.palette.success)
-
-            suggestion_card = tk.Frame(
-                content,
-                bg=self.theme.palette.bg_surface_alt,
-                highlightbackground=self.theme.palette.border,
-                highlightthickness=1,
-            )
-            suggestion_card.pack(fill=tk.X, padx=14, pady=(0, 8))
-            tk.Label(
-                suggestion_card,
-                text='Suggestions & Insights',
-                font=self.theme.fonts.body_bold,
-                bg=self.theme.palette.bg_surface_alt,
-                fg=self.theme.palette.text_primary,
-            ).pack(anchor='w', padx=10, pady=(8, 6))
-
-            insights = []
-            if len(filtered) == 0:
-                insights.append('No records match current filters. Widen period or reduce minimum amount.')
-            if forfeited_count > 0:
-                insights.append('Forfeited loans detected. Review recovery workflow and customer reminders.')
-            if active_count > redeemed_count and active_count > 10:
-                insights.append('Active loans are high relative to redemptions. Consider targeted renewal/redeem campaigns.')
-            if avg_ticket > 250000:
-                insights.append('Average ticket size is high. Monitor concentration risk and overdue exposure carefully.')
-            if not insights:
-                insights.append('Portfolio mix looks balanced for current filters. Keep tracking overdue and forfeited trends weekly.')
-
-            for item in insights:
+                suggestion_card = tk.Frame(
+                    content,
+                    bg=self.theme.palette.bg_surface_alt,
+                    highlightbackground=self.theme.palette.border,
+                    highlightthickness=1,
+                )
+                suggestion_card.pack(fill=tk.X, padx=14, pady=(0, 8))
                 tk.Label(
                     suggestion_card,
-                    text=f'• {item}',
-                    font=self.theme.fonts.body,
+                    text='Suggestions & Insights',
+                    font=self.theme.fonts.body_bold,
                     bg=self.theme.palette.bg_surface_alt,
                     fg=self.theme.palette.text_primary,
-                    wraplength=980,
-                    justify='left',
-                ).pack(anchor='w', padx=10, pady=(0, 4))
-
-            columns = [
-                ('Ticket', 10),
-                ('Customer', 16),
-                ('Amount', 11),
-                ('Status', 10),
-                ('Issue', 10),
-                ('Expire', 10),
-                ('Duration', 8),
-                ('Rate%', 8),
-            ]
-            table_rows = [
-                [
-                    r.get('ticket_no', '-'),
-                    r.get('customer_name', '-'),
-                    format_currency(r.get('loan_amount', 0)),
-                    get_status_text(r.get('status', 'active'), r.get('expire_date', '')),
-                    format_date(r.get('issue_date', '')),
-                    format_date(r.get('expire_date', '')),
-                    str(r.get('duration_months', '-')),
-                    f"{float(r.get('interest_rate') or 0):.2f}",
+                ).pack(anchor='w', padx=10, pady=(8, 6))
+
+                insights = []
+                if filtered_count == 0:
+                    insights.append('No records match current filters. Widen period or reduce minimum amount.')
+                if forfeited_count > 0:
+                    insights.append('Forfeited loans detected. Review recovery workflow and customer reminders.')
+                if active_count > redeemed_count and active_count > 10:
+                    insights.append('Active loans are high relative to redemptions. Consider targeted renewal/redeem campaigns.')
+                if avg_ticket > 250000:
+                    insights.append('Average ticket size is high. Monitor concentration risk and overdue exposure carefully.')
+                if not insights:
+                    insights.append('Portfolio mix looks balanced for current filters. Keep tracking overdue and forfeited trends weekly.')
+
+                for item in insights:
+                    tk.Label(
+                        suggestion_card,
+                        text=f'• {item}',
+                        font=self.theme.fonts.body,
+                        bg=self.theme.palette.bg_surface_alt,
+                        fg=self.theme.palette.text_primary,
+                        wraplength=980,
+                        justify='left',
+                    ).pack(anchor='w', padx=10, pady=(0, 4))
+
+                columns = [
+                    ('Ticket', 10),
+                    ('Customer', 16),
+                    ('Amount', 11),
+                    ('Status', 10),
+                    ('Issue', 10),
+                    ('Expire', 10),
+                    ('Duration', 8),
+                    ('Rate%', 8),
                 ]
-                for r in filtered
-            ]
-            self._render_table(content, columns, table_rows, ticket_col=0)
+                self._render_table(content, columns, table_rows, ticket_col=0)
+
+            self._run_report(load, render, target=content, filters=(period, status_filter, min_amount_text))
 
         self.theme.make_button(
             controls,
@@ -728,372 +1139,371 @@ class ReportsPage:
             self.navigate('loan_detail', row[0]['id'])
 
     def _show_summary(self):
-        self._clear()
         date_from, date_to = self._get_date_range(show_error=False)
         if not date_from or not date_to:
             date_to = datetime.now().strftime('%Y-%m-%d')
             date_from = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
 
-        _dc = self._get_date_field_col()   # dynamic date column
-
-        total_loans = self._scalar(
-            f"SELECT COUNT(*) FROM loans l WHERE date({_dc}) BETWEEN ? AND ?",
-            (date_from, date_to),
-        )
-        total_active = self._scalar(
-            f"SELECT COUNT(*) FROM loans l WHERE status='active' AND date({_dc}) BETWEEN ? AND ?",
-            (date_from, date_to),
-        )
-        total_redeemed = self._scalar(
-            f"SELECT COUNT(*) FROM loans l WHERE status='redeemed' AND date({_dc}) BETWEEN ? AND ?",
-            (date_from, date_to),
-        )
-        overdue_count = self._scalar(
-            f"SELECT COUNT(*) FROM loans l WHERE status='active' AND expire_date < ? AND date({_dc}) BETWEEN ? AND ?",
-            (date_to, date_from, date_to),
-        )
-        total_customers = self._scalar(
-            "SELECT COUNT(*) FROM customers WHERE date(created_at) BETWEEN ? AND ?",
-            (date_from, date_to),
-        )
-        active_loan_amount = self._scalar(
-            f"SELECT COALESCE(SUM(loan_amount),0) FROM loans l WHERE status='active' AND date({_dc}) BETWEEN ? AND ?",
-            (date_from, date_to),
-        )
-        today_loans = self._scalar(
-            f"SELECT COUNT(*) FROM loans l WHERE date({_dc})=?",
-            (date_to,),
-        )
-        today_revenue = self._scalar(
-            "SELECT COALESCE(SUM(amount),0) FROM loan_payments WHERE date(payment_date)=?",
-            (date_to,),
-        )
-
-        total_payments = self._scalar(
-            'SELECT COALESCE(SUM(amount), 0) FROM loan_payments WHERE date(payment_date) BETWEEN ? AND ?',
-            (date_from, date_to),
-        )
-        total_interest_collected = self._scalar(
-            '''SELECT COALESCE(SUM(CASE
-                    WHEN lp.payment_type='interest' THEN lp.amount
-                    WHEN lp.payment_type='penalty' THEN lp.amount
-                    WHEN lp.payment_type='redemption' THEN
-                        CASE
-                            WHEN (COALESCE(lp.interest_amount,0) + COALESCE(lp.overdue_interest_amount,0)) > 0
-                                THEN COALESCE(lp.interest_amount,0) + COALESCE(lp.overdue_interest_amount,0)
-                            ELSE MAX(
-                                0,
-                                COALESCE(lp.amount,0)
-                                - COALESCE(NULLIF(lp.principal_amount,0), COALESCE(l.interest_principal_amount, l.loan_amount, 0))
-                                - COALESCE(lp.other_charges_amount,0)
-                            )
-                        END
-                    ELSE 0 END), 0)
-               FROM loan_payments lp
-               JOIN loans l ON l.id=lp.loan_id
-               WHERE date(lp.payment_date) BETWEEN ? AND ?''',
-            (date_from, date_to),
-        )
-
-        active_interest_rows = self._query(
-            f'''SELECT id, loan_amount, interest_principal_amount, interest_rate,
-                      overdue_interest_rate, duration_months, issue_date,
-                      renew_date, expire_date
-               FROM loans l
-               WHERE status='active' AND date({_dc}) BETWEEN ? AND ?''',
-            (date_from, date_to),
-        )
-        active_collections = self._query(
-            '''SELECT loan_id,
-                      COALESCE(SUM(CASE
-                        WHEN payment_type='interest' THEN amount
-                        WHEN payment_type='penalty' THEN amount
-                        ELSE 0 END), 0) AS collected_interest
-               FROM loan_payments
-               WHERE date(payment_date) <= ?
-               GROUP BY loan_id''',
-            (date_to,),
-        )
-        collected_by_loan = {
-            int(r.get('loan_id')): float(r.get('collected_interest') or 0)
-            for r in active_collections
-            if r.get('loan_id') is not None
-        }
+        _dc = self._date_field_filter()   # dynamic date column
+        _range = date_range_params(date_from, date_to)
+
+        use_rollups = self._uses_issue_rollups()
+
+        def load():
+            if use_rollups:
+                by_status = {
+                    r['status']: r
+                    for r in self._rollup_query('loans', 'status, SUM(loans) AS loans, SUM(issued_amount) AS amount',
+                                                date_from, date_to, group_by='status')
+                }
+                total_loans = sum(int(r['loans'] or 0) for r in by_status.values())
+                total_active = int((by_status.get('active') or {}).get('loans') or 0)
+                total_redeemed = int((by_status.get('redeemed') or {}).get('loans') or 0)
+                active_loan_amount = float((by_status.get('active') or {}).get('amount') or 0)
+                today_loans = self._rollup_query('loans', 'COALESCE(SUM(loans), 0) AS loans',
+                                                 date_to, date_to)[0]['loans']
+            else:
+                total_loans = self._scalar(
+                    f"SELECT COUNT(*) FROM loans l WHERE {_dc}",
+                    _range,
+                )
+                total_active = self._scalar(
+                    f"SELECT COUNT(*) FROM loans l WHERE status='active' AND {_dc}",
+                    _range,
+                )
+                total_redeemed = self._scalar(
+                    f"SELECT COUNT(*) FROM loans l WHERE status='redeemed' AND {_dc}",
+                    _range,
+                )
+                active_loan_amount = self._scalar(
+                    f"SELECT COALESCE(SUM(loan_amount),0) FROM loans l WHERE status='active' AND {_dc}",
+                    _range,
+                )
+                today_loans = self._scalar(
+                    f"SELECT COUNT(*) FROM loans l WHERE {_dc}",
+                    date_range_params(date_to, date_to),
+                )
+            overdue_count = self._scalar(
+                f"SELECT COUNT(*) FROM loans l WHERE status='active' AND expire_date < ? AND {_dc}",
+                (date_to, *_range),
+            )
+            total_customers = self._scalar(
+                f"SELECT COUNT(*) FROM customers WHERE {date_range_sql('created_at')}",
+                _range,
+            )
+            today_revenue = self._rollup_query('payments', 'COALESCE(SUM(amount), 0) AS amount',
+                                               date_to, date_to)[0]['amount']
+
+            self._executor.progress('Summing payments and interest...')
+            payments = self._rollup_query(
+                'payments',
+                'COALESCE(SUM(amount), 0) AS amount, COALESCE(SUM(interest_collected), 0) AS interest',
+                date_from, date_to,
+            )[0]
+            total_payments = payments['amount']
+            total_interest_collected = payments['interest']
+
+            active_interest_rows = self._query(
+                f'''SELECT id, loan_amount, interest_principal_amount, interest_rate,
+                          overdue_interest_rate, duration_months, issue_date,
+                          renew_date, expire_date
+                   FROM loans l
+                   WHERE status='active' AND {_dc}''',
+                _range,
+            )
+            active_collections = self._query(
+                f'''SELECT loan_id,
+                          COALESCE(SUM(CASE
+                            WHEN payment_type='interest' THEN amount
+                            WHEN payment_type='penalty' THEN amount
+                            ELSE 0 END), 0) AS collected_interest
+                   FROM loan_payments
+                   WHERE {date_range_sql('payment_date', lower=False)}
+                   GROUP BY loan_id''',
+                date_range_params(date_to=date_to, lower=False),
+            )
+            collected_by_loan = {
+                int(r.get('loan_id')): float(r.get('collected_interest') or 0)
+                for r in active_collections
+                if r.get('loan_id') is not None
+            }
 
-        total_current_active_interest_non_collected = 0.0
-        for loan in active_interest_rows:
-            principal_base = float(loan.get('interest_principal_amount') or loan.get('loan_amount') or 0)
-            dur_rate = get_duration_rate(loan.get('duration_months') or 1)
-            max_interest_months = dur_rate.get('max_interest_months', 3) if dur_rate else 3
-            payable = self._calculate_total_payable_as_of(
-                date_to,
-                principal_base,
-                loan.get('interest_rate') or 0,
-                loan.get('duration_months') or 1,
-                loan.get('overdue_interest_rate') or 0,
-                loan.get('expire_date') or '',
-                loan.get('renew_date') or loan.get('issue_date') or '',
-                max_interest_months,
+            payable = calculate_total_payable_batch(
+                [float(loan.get('interest_principal_amount') or loan.get('loan_amount') or 0)
+                 for loan in active_interest_rows],
+                [loan.get('interest_rate') or 0 for loan in active_interest_rows],
+                [loan.get('overdue_interest_rate') or 0 for loan in active_interest_rows],
+                [loan.get('expire_date') or '' for loan in active_interest_rows],
+                [loan.get('renew_date') or loan.get('issue_date') or '' for loan in active_interest_rows],
+                as_of_date=date_to,
+            )
+            total_current_active_interest_non_collected = 0.0
+            for loan, interest, overdue_interest in zip(active_interest_rows, payable['interest'],
+                                                        payable['overdue_interest']):
+                accrued_interest = float(interest or 0) + float(overdue_interest or 0)
+                collected_interest = float(collected_by_loan.get(int(loan.get('id') or 0), 0))
+                total_current_active_interest_non_collected += max(0.0, accrued_interest - collected_interest)
+
+            self._executor.progress('Counting renewals, approvals and gold items...')
+            total_renewals = self._scalar(
+                f'SELECT COUNT(*) FROM loan_renewals WHERE {date_range_sql("renewed_at")}',
+                _range,
+            )
+            total_renewal_collections = self._scalar(
+                f'SELECT COALESCE(SUM(payment_amount), 0) FROM loan_renewals WHERE {date_range_sql("renewed_at")}',
+                _range,
+            )
+            total_principal_reduction = self._scalar(
+                f'SELECT COALESCE(SUM(principal_reduction), 0) FROM loan_renewals WHERE {date_range_sql("renewed_at")}',
+                _range,
+            )
+            pending_approvals = self._scalar(
+                f"SELECT COUNT(*) FROM loan_approval_requests WHERE status='pending' AND {date_range_sql('created_at')}",
+                _range,
+            )
+            letters_created = self._scalar(
+                f'SELECT COUNT(*) FROM customer_letters WHERE {date_range_sql("created_at")}',
+                _range,
+            )
+            if use_rollups:
+                gold = self._rollup_query(
+                    'gold', 'COALESCE(SUM(items), 0) AS items, COALESCE(SUM(gold_weight), 0) AS gold_weight',
+                    date_from, date_to, where="status='active'",
+                )[0]
+                active_items, active_gold_weight = gold['items'], gold['gold_weight']
+            else:
+                active_items = self._scalar(
+                    f"""SELECT COUNT(*) FROM loan_items li
+                       JOIN loans l ON li.loan_id=l.id
+                       WHERE l.status='active' AND {_dc}""",
+                    _range,
+                )
+                active_gold_weight = self._scalar(
+                    f"""SELECT COALESCE(SUM(li.gold_weight),0) FROM loan_items li
+                       JOIN loans l ON li.loan_id=l.id
+                       WHERE l.status='active' AND {_dc}""",
+                    _range,
+                )
+            return (total_loans, total_active, total_redeemed, overdue_count, total_customers,
+                    active_loan_amount, today_loans, today_revenue, total_payments, total_interest_collected,
+                    total_current_active_interest_non_collected, total_renewals, total_renewal_collections,
+                    total_principal_reduction, pending_approvals, letters_created, active_items,
+                    active_gold_weight)
+
+        def render(data):
+            (total_loans, total_active, total_redeemed, overdue_count, total_customers,
+             active_loan_amount, today_loans, today_revenue, total_payments, total_interest_collected,
+             total_current_active_interest_non_collected, total_renewals, total_renewal_collections,
+             total_principal_reduction, pending_approvals, letters_created, active_items,
+             active_gold_weight) = data
+
+            card = self._make_card('System Summary Report')
+            self._render_kpis(
+                card.inner,
+                [
+                    ('Total Loans', str(total_loans), self.theme.palette.text_primary),
+                    ('Active Loans', str(total_active), self.theme.palette.accent),
+                    ('Redeemed Loans', str(total_redeemed), self.theme.palette.success),
+                    ('Overdue Loans', str(overdue_count), self.theme.palette.danger),
+                    ('Total Customers', str(total_customers), self.theme.palette.info),
+                    ('Active Portfolio', format_currency(active_loan_amount), self.theme.palette.warning),
+                    ('Today Revenue', format_currency(today_revenue), self.theme.palette.success),
+                    ('Today Loans', str(today_loans), self.theme.palette.accent),
+                    ('Total Payments Collected', format_currency(total_payments), self.theme.palette.success),
+                    ('Total Interest Collected', format_currency(total_interest_collected), self.theme.palette.success),
+                    ('Current Active Interests', format_currency(total_current_active_interest_non_collected), self.theme.palette.warning),
+                    ('Total Renewals', str(total_renewals), self.theme.palette.info),
+                    ('Renewal Collections', format_currency(total_renewal_collections), self.theme.palette.warning),
+                    ('Principal Reduction', format_currency(total_principal_reduction), self.theme.palette.accent),
+                    ('Pending Approvals', str(pending_approvals), self.theme.palette.danger),
+                    ('Letters Generated', str(letters_created), self.theme.palette.info),
+                    ('Active Gold Items', str(active_items), self.theme.palette.text_primary),
+                    ('Active Gold Weight (g)', f'{float(active_gold_weight):.3f}', self.theme.palette.warning),
+                ],
+                columns=4,
             )
-            accrued_interest = float(payable.get('interest') or 0) + float(payable.get('overdue_interest') or 0)
-            collected_interest = float(collected_by_loan.get(int(loan.get('id') or 0), 0))
-            total_current_active_interest_non_collected += max(0.0, accrued_interest - collected_interest)
-        total_renewals = self._scalar(
-            'SELECT COUNT(*) FROM loan_renewals WHERE date(renewed_at) BETWEEN ? AND ?',
-            (date_from, date_to),
-        )
-        total_renewal_collections = self._scalar(
-            'SELECT COALESCE(SUM(payment_amount), 0) FROM loan_renewals WHERE date(renewed_at) BETWEEN ? AND ?',
-            (date_from, date_to),
-        )
-        total_principal_reduction = self._scalar(
-            'SELECT COALESCE(SUM(principal_reduction), 0) FROM loan_renewals WHERE date(renewed_at) BETWEEN ? AND ?',
-            (date_from, date_to),
-        )
-        pending_approvals = self._scalar(
-            "SELECT COUNT(*) FROM loan_approval_requests WHERE status='pending' AND date(created_at) BETWEEN ? AND ?",
-            (date_from, date_to),
-        )
-        letters_created = self._scalar(
-            'SELECT COUNT(*) FROM customer_letters WHERE date(created_at) BETWEEN ? AND ?',
-            (date_from, date_to),
-        )
-        active_items = self._scalar(
-            f"""SELECT COUNT(*) FROM loan_items li
-               JOIN loans l ON li.loan_id=l.id
-               WHERE l.status='active' AND date({_dc}) BETWEEN ? AND ?""",
-            (date_from, date_to),
-        )
-        active_gold_weight = self._scalar(
-            f"""SELECT COALESCE(SUM(li.gold_weight),0) FROM loan_items li
-               JOIN loans l ON li.loan_id=l.id
-               WHERE l.status='active' AND date({_dc}) BETWEEN ? AND ?""",
-            (date_from, date_to),
-        )
 
-        card = self._make_card('System Summary Report')
-        self._render_kpis(
-            card.inner,
-            [
-                ('Total Loans', str(total_loans), self.theme.palette.text_primary),
-                ('Active Loans', str(total_active), self.theme.palette.accent),
-                ('Redeemed Loans', str(total_redeemed), self.theme.palette.success),
-                ('Overdue Loans', str(overdue_count), self.theme.palette.danger),
-                ('Total Customers', str(total_customers), self.theme.palette.info),
-                ('Active Portfolio', format_currency(active_loan_amount), self.theme.palette.warning),
-                ('Today Revenue', format_currency(today_revenue), self.theme.palette.success),
-                ('Today Loans', str(today_loans), self.theme.palette.accent),
-                ('Total Payments Collected', format_currency(total_payments), self.theme.palette.success),
-                ('Total Interest Collected', format_currency(total_interest_collected), self.theme.palette.success),
-                ('Current Active Interests', format_currency(total_current_active_interest_non_collected), self.theme.palette.warning),
-                ('Total Renewals', str(total_renewals), self.theme.palette.info),
-                ('Renewal Collections', format_currency(total_renewal_collections), self.theme.palette.warning),
-                ('Principal Reduction', format_currency(total_principal_reduction), self.theme.palette.accent),
-                ('Pending Approvals', str(pending_approvals), self.theme.palette.danger),
-                ('Letters Generated', str(letters_created), self.theme.palette.info),
-                ('Active Gold Items', str(active_items), self.theme.palette.text_primary),
-                ('Active Gold Weight (g)', f'{float(active_gold_weight):.3f}', self.theme.palette.warning),
-            ],
-            columns=4,
-        )
+            self._export_columns = ['Metric', 'Value']
+            self._export_rows = [
+                ['From', date_from],
+                ['To', date_to],
+                ['Total Loans', str(total_loans)],
+                ['Active Loans', str(total_active)],
+                ['Redeemed Loans', str(total_redeemed)],
+                ['Overdue Loans', str(overdue_count)],
+                ['Total Customers', str(total_customers)],
+                ['Active Portfolio', format_currency(active_loan_amount)],
+                ['Today Revenue', format_currency(today_revenue)],
+                ['Today Loans', str(today_loans)],
+                ['Total Payments Collected', format_currency(total_payments)],
+                ['Total Interest Collected', format_currency(total_interest_collected)],
+                ['Current Active Interests (Non-Collected)', format_currency(total_current_active_interest_non_collected)],
+                ['Total Renewals', str(total_renewals)],
+                ['Renewal Collections', format_currency(total_renewal_collections)],
+                ['Principal Reduction', format_currency(total_principal_reduction)],
+                ['Pending Approvals', str(pending_approvals)],
+                ['Letters Generated', str(letters_created)],
+                ['Active Gold Items', str(active_items)],
+                ['Active Gold Weight (g)', f'{float(active_gold_weight):.3f}'],
+            ]
 
-        self._export_columns = ['Metric', 'Value']
-        self._export_rows = [
-            ['From', date_from],
-            ['To', date_to],
-            ['Total Loans', str(total_loans)],
-            ['Active Loans', str(total_active)],
-            ['Redeemed Loans', str(total_redeemed)],
-            ['Overdue Loans', str(overdue_count)],
-            ['Total Customers', str(total_customers)],
-            ['Active Portfolio', format_currency(active_loan_amount)],
-            ['Today Revenue', format_currency(today_revenue)],
-            ['Today Loans', str(today_loans)],
-            ['Total Payments Collected', format_currency(total_payments)],
-            ['Total Interest Collected', format_currency(total_interest_collected)],
-            ['Current Active Interests (Non-Collected)', format_currency(total_current_active_interest_non_collected)],
-            ['Total Renewals', str(total_renewals)],
-            ['Renewal Collections', format_currency(total_renewal_collections)],
-            ['Principal Reduction', format_currency(total_principal_reduction)],
-            ['Pending Approvals', str(pending_approvals)],
-            ['Letters Generated', str(letters_created)],
-            ['Active Gold Items', str(active_items)],
-            ['Active Gold Weight (g)', f'{float(active_gold_weight):.3f}'],
-        ]
+        self._run_report(load, render)
 
     def _show_loan_ledger(self):
-        self._clear()
         date_from, date_to = self._get_date_range(show_error=False)
-        loans = self._query(
-            f'''SELECT l.id, l.ticket_no, c.name AS customer_name, l.loan_amount,
+        _range = date_range_params(date_from, date_to)
+        date_filter = self._date_field_filter()
+        sql = f'''SELECT l.id, l.ticket_no, c.name AS customer_name, l.loan_amount,
                       l.assessed_value, l.market_value, l.interest_rate,
                       l.overdue_interest_rate, l.duration_months, l.issue_date,
                       l.renew_date, l.expire_date, l.status, l.total_gold_weight,
                       l.total_item_weight
                FROM loans l
                JOIN customers c ON l.customer_id=c.id
-               WHERE date({self._get_date_field_col()}) BETWEEN ? AND ?
-               ORDER BY l.id DESC''',
-            (date_from, date_to),
-        )
-
-        total_issued = sum(float(r['loan_amount'] or 0) for r in loans)
-        avg_ticket = (total_issued / len(loans)) if loans else 0
-        active_exposure = sum(float(r['loan_amount'] or 0) for r in loans if r['status'] == 'active')
-
-        card = self._make_card('Loan Ledger Report')
-        self._render_kpis(
-            card.inner,
-            [
-                ('Total Loan Records', str(len(loans)), self.theme.palette.text_primary),
-                ('Total Principal Issued', format_currency(total_issued), self.theme.palette.accent),
-                ('Average Ticket Size', format_currency(avg_ticket), self.theme.palette.info),
-                ('Active Principal Exposure', format_currency(active_exposure), self.theme.palette.warning),
-            ],
-            columns=4,
-        )
+               WHERE {date_filter}
+               ORDER BY l.id DESC'''
 
-        columns = [
-            ('Ticket', 10),
-            ('Customer', 15),
-            ('Amount', 10),
-            ('Status', 10),
-            ('Rate%', 8),
-            ('OD%', 8),
-            ('Issue', 10),
-            ('Renew', 10),
-            ('Expire', 10),
-            ('Gold(g)', 9),
-        ]
-        rows = []
-        for r in loans:
-            status_text = get_status_text(r['status'], r['expire_date'])
-            rows.append([
+        def format_row(r):
+            return [
                 r['ticket_no'],
                 r['customer_name'],
                 format_currency(r['loan_amount']),
-                status_text,
+                get_status_text(r['status'], r['expire_date']),
                 f"{float(r['interest_rate'] or 0):.2f}",
                 f"{float(r['overdue_interest_rate'] or 0):.2f}",
                 format_date(r['issue_date']),
                 format_date(r['renew_date']) if r['renew_date'] else '-',
                 format_date(r['expire_date']),
                 f"{float(r['total_gold_weight'] or 0):.3f}",
-            ])
-        self._render_table(card.inner, columns, rows, ticket_col=0)
+            ]
+
+        def load():
+            loans = self._query(sql, _range)
+
+            total_issued = sum(float(r['loan_amount'] or 0) for r in loans)
+            avg_ticket = (total_issued / len(loans)) if loans else 0
+            active_exposure = sum(float(r['loan_amount'] or 0) for r in loans if r['status'] == 'active')
+            return len(loans), total_issued, avg_ticket, active_exposure, [format_row(r) for r in loans]
+
+        def render(data):
+            loan_count, total_issued, avg_ticket, active_exposure, rows = data
+
+            card = self._make_card('Loan Ledger Report')
+            self._render_kpis(
+                card.inner,
+                [
+                    ('Total Loan Records', str(loan_count), self.theme.palette.text_primary),
+                    ('Total Principal Issued', format_currency(total_issued), self.theme.palette.accent),
+                    ('Average Ticket Size', format_currency(avg_ticket), self.theme.palette.info),
+                    ('Active Principal Exposure', format_currency(active_exposure), self.theme.palette.warning),
+                ],
+                columns=4,
+            )
+
+            columns = [
+                ('Ticket', 10),
+                ('Customer', 15),
+                ('Amount', 10),
+                ('Status', 10),
+                ('Rate%', 8),
+                ('OD%', 8),
+                ('Issue', 10),
+                ('Renew', 10),
+                ('Expire', 10),
+                ('Gold(g)', 9),
+            ]
+            self._render_table(card.inner, columns, rows, ticket_col=0, export_query=(sql, _range, format_row))
+
+        self._run_report(load, render)
 
     def _show_overdue(self):
-        self._clear()
         date_from, date_to = self._get_date_range(show_error=False)
-        rows = self._query(
-            f'''SELECT l.id, l.ticket_no, c.name AS customer_name, c.phone,
+        _range = date_range_params(date_from, date_to)
+        date_filter = self._date_field_filter()
+        sql = f'''SELECT l.id, l.ticket_no, c.name AS customer_name, c.phone,
                       l.loan_amount, l.expire_date, l.interest_rate,
                       l.overdue_interest_rate, l.renew_date
                FROM loans l
                JOIN customers c ON l.customer_id=c.id
                WHERE l.status='active' AND l.expire_date < ?
-                 AND date({self._get_date_field_col()}) BETWEEN ? AND ?
-               ORDER BY l.expire_date ASC''',
-            (date_to, date_from, date_to),
-        )
+                 AND {date_filter}
+               ORDER BY l.expire_date ASC'''
+        params = (date_to, *_range)
 
-        total_principal = sum(float(r['loan_amount'] or 0) for r in rows)
-        days = [max(0, (datetime.now().date() - datetime.strptime(r['expire_date'][:10], '%Y-%m-%d').date()).days) for r in rows]
-        avg_overdue = (sum(days) / len(days)) if days else 0
-        max_overdue = max(days) if days else 0
+        def overdue_days(r):
+            return max(0, (datetime.now().date() - datetime.strptime(r['expire_date'][:10], '%Y-%m-%d').date()).days)
 
-        card = self._make_card('Overdue Loan Analysis Report')
-        self._render_kpis(
-            card.inner,
-            [
-                ('Overdue Accounts', str(len(rows)), self.theme.palette.danger),
-                ('Overdue Principal', format_currency(total_principal), self.theme.palette.warning),
-                ('Avg Overdue Days', f'{avg_overdue:.1f}', self.theme.palette.info),
-                ('Max Overdue Days', str(max_overdue), self.theme.palette.danger),
-            ],
-            columns=4,
-        )
-
-        columns = [
-            ('Ticket', 10),
-            ('Customer', 16),
-            ('Phone', 12),
-            ('Principal', 11),
-            ('Expire', 10),
-            ('Days', 7),
-            ('Rate%', 8),
-            ('OD%', 8),
-            ('Status', 10),
-        ]
-        table_rows = []
-        for r, overdue_days in zip(rows, days):
-            status_text = get_status_text('active', r['expire_date'])
-            table_rows.append([
+        def format_row(r):
+            return [
                 r['ticket_no'],
                 r['customer_name'],
                 r['phone'] or '-',
                 format_currency(r['loan_amount']),
                 format_date(r['expire_date']),
-                str(overdue_days),
+                str(overdue_days(r)),
                 f"{float(r['interest_rate'] or 0):.2f}",
                 f"{float(r['overdue_interest_rate'] or 0):.2f}",
-                status_text,
-            ])
-        self._render_table(card.inner, columns, table_rows, ticket_col=0)
+                get_status_text('active', r['expire_date']),
+            ]
 
-    def _show_renewals(self):
-        self._clear()
-        date_from, date_to = self._get_date_range(show_error=False)
-        rows = self._query(
-            '''SELECT lr.renewed_at, l.ticket_no, c.name AS customer_name,
-                      lr.old_expire_date, lr.new_expire_date, lr.new_duration_months,
-                      lr.payment_amount, lr.interest_paid, lr.normal_interest_due,
-                      lr.overdue_interest_due, lr.principal_reduction,
-                      lr.new_loan_amount, u.full_name AS renewed_by_name
-               FROM loan_renewals lr
-               JOIN loans l ON lr.loan_id=l.id
-               JOIN customers c ON l.customer_id=c.id
-               LEFT JOIN users u ON lr.renewed_by=u.id
-               WHERE date(lr.renewed_at) BETWEEN ? AND ?
-               ORDER BY lr.id DESC'''
-            ,(date_from, date_to),
-        )
+        def load():
+            rows = self._query(sql, params)
 
-        total_payment = sum(float(r['payment_amount'] or 0) for r in rows)
-        total_interest_paid = sum(float(r['interest_paid'] or 0) for r in rows)
-        total_normal_due = sum(float(r['normal_interest_due'] or 0) for r in rows)
-        total_overdue_due = sum(float(r['overdue_interest_due'] or 0) for r in rows)
-        total_principal_red = sum(float(r['principal_reduction'] or 0) for r in rows)
+            total_principal = sum(float(r['loan_amount'] or 0) for r in rows)
+            days = [overdue_days(r) for r in rows]
+            avg_overdue = (sum(days) / len(days)) if days else 0
+            max_overdue = max(days) if days else 0
+            table_rows = [format_row(r) for r in rows]
+            return len(rows), total_principal, avg_overdue, max_overdue, table_rows
 
-        card = self._make_card('Loan Renewal Report')
-        self._render_kpis(
-            card.inner,
-            [
-                ('Renewal Transactions', str(len(rows)), self.theme.palette.info),
-                ('Renewal Payments', format_currency(total_payment), self.theme.palette.success),
-                ('Interest Paid', format_currency(total_interest_paid), self.theme.palette.accent),
-                ('Normal Interest Due', format_currency(total_normal_due), self.theme.palette.warning),
-                ('Overdue Interest Due', format_currency(total_overdue_due), self.theme.palette.danger),
-                ('Principal Reduction', format_currency(total_principal_red), self.theme.palette.accent),
-            ],
-            columns=3,
-        )
+        def render(data):
+            overdue_accounts, total_principal, avg_overdue, max_overdue, table_rows = data
 
-        columns = [
-            ('Date', 10),
-            ('Ticket', 10),
-            ('Customer', 14),
-            ('Old Exp', 10),
-            ('New Exp', 10),
-            ('Months', 7),
-            ('Paid', 10),
-            ('Int Paid', 10),
-            ('OD Due', 10),
-            ('By', 12),
-        ]
-        table_rows = []
-        for r in rows:
-            table_rows.append([
+            card = self._make_card('Overdue Loan Analysis Report')
+            self._render_kpis(
+                card.inner,
+                [
+                    ('Overdue Accounts', str(overdue_accounts), self.theme.palette.danger),
+                    ('Overdue Principal', format_currency(total_principal), self.theme.palette.warning),
+                    ('Avg Overdue Days', f'{avg_overdue:.1f}', self.theme.palette.info),
+                    ('Max Overdue Days', str(max_overdue), self.theme.palette.danger),
+                ],
+                columns=4,
+            )
+
+            columns = [
+                ('Ticket', 10),
+                ('Customer', 16),
+                ('Phone', 12),
+                ('Principal', 11),
+                ('Expire', 10),
+                ('Days', 7),
+                ('Rate%', 8),
+                ('OD%', 8),
+                ('Status', 10),
+            ]
+            self._render_table(card.inner, columns, table_rows, ticket_col=0, export_query=(sql, params, format_row))
+
+        self._run_report(load, render)
+
+    def _show_renewals(self):
+        date_from, date_to = self._get_date_range(show_error=False)
+        _range = date_range_params(date_from, date_to)
+
+        sql = f'''SELECT lr.renewed_at, l.ticket_no, c.name AS customer_name,
+                      lr.old_expire_date, lr.new_expire_date, lr.new_duration_months,
+                      lr.payment_amount, lr.interest_paid, lr.normal_interest_due,
+                      lr.overdue_interest_due, lr.principal_reduction,
+                      lr.new_loan_amount, u.full_name AS renewed_by_name
+               FROM loan_renewals lr
+               JOIN loans l ON lr.loan_id=l.id
+               JOIN customers c ON l.customer_id=c.id
+               LEFT JOIN users u ON lr.renewed_by=u.id
+               WHERE {date_range_sql('lr.renewed_at')}
+               ORDER BY lr.id DESC'''
+
+        def format_row(r):
+            return [
                 format_date(r['renewed_at']),
                 r['ticket_no'],
                 r['customer_name'],
@@ -1104,61 +1514,71 @@ class ReportsPage:
                 format_currency(r['interest_paid']),
                 format_currency(r['overdue_interest_due']),
                 r['renewed_by_name'] or '-',
-            ])
-        self._render_table(card.inner, columns, table_rows, ticket_col=1)
+            ]
+
+        def load():
+            rows = self._query(sql, _range)
+
+            totals = (
+                sum(float(r['payment_amount'] or 0) for r in rows),
+                sum(float(r['interest_paid'] or 0) for r in rows),
+                sum(float(r['normal_interest_due'] or 0) for r in rows),
+                sum(float(r['overdue_interest_due'] or 0) for r in rows),
+                sum(float(r['principal_reduction'] or 0) for r in rows),
+            )
+
+            return len(rows), totals, [format_row(r) for r in rows]
+
+        def render(data):
+            renewal_count, totals, table_rows = data
+            total_payment, total_interest_paid, total_normal_due, total_overdue_due, total_principal_red = totals
+
+            card = self._make_card('Loan Renewal Report')
+            self._render_kpis(
+                card.inner,
+                [
+                    ('Renewal Transactions', str(renewal_count), self.theme.palette.info),
+                    ('Renewal Payments', format_currency(total_payment), self.theme.palette.success),
+                    ('Interest Paid', format_currency(total_interest_paid), self.theme.palette.accent),
+                    ('Normal Interest Due', format_currency(total_normal_due), self.theme.palette.warning),
+                    ('Overdue Interest Due', format_currency(total_overdue_due), self.theme.palette.danger),
+                    ('Principal Reduction', format_currency(total_principal_red), self.theme.palette.accent),
+                ],
+                columns=3,
+            )
+
+            columns = [
+                ('Date', 10),
+                ('Ticket', 10),
+                ('Customer', 14),
+                ('Old Exp', 10),
+                ('New Exp', 10),
+                ('Months', 7),
+                ('Paid', 10),
+                ('Int Paid', 10),
+                ('OD Due', 10),
+                ('By', 12),
+            ]
+            self._render_table(card.inner, columns, table_rows, ticket_col=1, export_query=(sql, _range, format_row))
+
+        self._run_report(load, render)
 
     def _show_payments(self):
-        self._clear()
         date_from, date_to = self._get_date_range(show_error=False)
-        rows = self._query(
-            '''SELECT lp.payment_date, l.ticket_no, c.name AS customer_name,
+        _range = date_range_params(date_from, date_to)
+
+        sql = f'''SELECT lp.payment_date, l.ticket_no, c.name AS customer_name,
                       lp.payment_type, lp.amount, u.full_name AS received_by_name,
                       lp.remarks
                FROM loan_payments lp
                JOIN loans l ON lp.loan_id=l.id
                JOIN customers c ON l.customer_id=c.id
                LEFT JOIN users u ON lp.received_by=u.id
-               WHERE date(lp.payment_date) BETWEEN ? AND ?
+               WHERE {date_range_sql('lp.payment_date')}
                ORDER BY lp.id DESC'''
-            ,(date_from, date_to),
-        )
-
-        totals = {'interest': 0.0, 'redemption': 0.0, 'partial': 0.0, 'penalty': 0.0}
-        for r in rows:
-            ptype = (r['payment_type'] or '').lower()
-            if ptype in totals:
-                totals[ptype] += float(r['amount'] or 0)
-
-        total_collected = sum(float(r['amount'] or 0) for r in rows)
-        avg_collection = (total_collected / len(rows)) if rows else 0
-
-        card = self._make_card('Payment Collection Report')
-        self._render_kpis(
-            card.inner,
-            [
-                ('Payment Entries', str(len(rows)), self.theme.palette.text_primary),
-                ('Total Collected', format_currency(total_collected), self.theme.palette.success),
-                ('Average Payment', format_currency(avg_collection), self.theme.palette.info),
-                ('Interest Collections', format_currency(totals['interest']), self.theme.palette.accent),
-                ('Redemption Collections', format_currency(totals['redemption']), self.theme.palette.success),
-                ('Partial Payments', format_currency(totals['partial']), self.theme.palette.warning),
-                ('Penalty Collections', format_currency(totals['penalty']), self.theme.palette.danger),
-            ],
-            columns=4,
-        )
 
-        columns = [
-            ('Date', 10),
-            ('Ticket', 10),
-            ('Customer', 14),
-            ('Type', 10),
-            ('Amount', 11),
-            ('Received By', 13),
-            ('Remarks', 22),
-        ]
-        table_rows = []
-        for r in rows:
-            table_rows.append([
+        def format_row(r):
+            return [
                 format_date(r['payment_date']),
                 r['ticket_no'],
                 r['customer_name'],
@@ -1166,715 +1586,780 @@ class ReportsPage:
                 format_currency(r['amount']),
                 r['received_by_name'] or '-',
                 r['remarks'] or '-',
-            ])
-        self._render_table(card.inner, columns, table_rows, ticket_col=1)
-
-    def _show_interest_report(self):
-        self._clear()
-        date_from, date_to = self._get_date_range(show_error=False)
+            ]
 
-        _dc = self._get_date_field_col()
-        loans = self._query(
-            f'''SELECT l.id, l.ticket_no, l.customer_id, c.name AS customer_name,
-                      l.status, l.loan_amount, l.interest_principal_amount,
-                      l.interest_rate, l.overdue_interest_rate, l.duration_months,
-                      l.issue_date, l.renew_date, l.expire_date,
-                      COALESCE(SUM(CASE
-                        WHEN date(lp.payment_date) BETWEEN ? AND ? AND lp.payment_type='interest' THEN lp.amount
-                        WHEN date(lp.payment_date) BETWEEN ? AND ? AND lp.payment_type='penalty' THEN lp.amount
-                        WHEN date(lp.payment_date) BETWEEN ? AND ? AND lp.payment_type='redemption' THEN
-                            CASE
-                                WHEN (COALESCE(lp.interest_amount,0) + COALESCE(lp.overdue_interest_amount,0)) > 0
-                                    THEN COALESCE(lp.interest_amount,0) + COALESCE(lp.overdue_interest_amount,0)
-                                ELSE MAX(
-                                    0,
-                                    COALESCE(lp.amount,0)
-                                    - COALESCE(NULLIF(lp.principal_amount,0), COALESCE(l.interest_principal_amount, l.loan_amount, 0))
-                                    - COALESCE(lp.other_charges_amount,0)
-                                )
-                            END
-                        ELSE 0 END), 0) AS collected_interest
-               FROM loans l
-               JOIN customers c ON l.customer_id=c.id
-               LEFT JOIN loan_payments lp ON lp.loan_id=l.id
-                    WHERE date({_dc}) <= ?
-                      AND (
-                          date({_dc}) BETWEEN ? AND ?
-                          OR EXISTS (
-                                SELECT 1 FROM loan_payments lp2
-                                WHERE lp2.loan_id=l.id AND date(lp2.payment_date) BETWEEN ? AND ?
-                          )
-                          OR l.status='active'
-                      )
-               GROUP BY l.id
-               ORDER BY l.id DESC''',
-                (date_from, date_to, date_from, date_to, date_from, date_to, date_to, date_from, date_to, date_from, date_to),
-        )
+        def load():
+            rows = self._query(sql, _range)
 
-        total_collected_interest = 0.0
-        total_current_interest = 0.0
-        detail_rows = []
-
-        for loan in loans:
-            principal_base = float(loan.get('interest_principal_amount') or loan.get('loan_amount') or 0)
-            collected_interest = float(loan.get('collected_interest') or 0)
-
-            current_interest = 0.0
-            overdue_interest = 0.0
-            if loan.get('status') == 'active':
-                accrual_start = loan.get('renew_date') or loan.get('issue_date')
-                dur_rate = get_duration_rate(loan.get('duration_months') or 1)
-                max_interest_months = dur_rate.get('max_interest_months', 3) if dur_rate else 3
-                payable = self._calculate_total_payable_as_of(
-                    date_to,
-                    principal_base,
-                    loan.get('interest_rate') or 0,
-                    loan.get('duration_months') or 1,
-                    loan.get('overdue_interest_rate') or 0,
-                    loan.get('expire_date') or '',
-                    accrual_start,
-                    max_interest_months,
-                )
-                current_interest = float(payable.get('interest') or 0)
-                overdue_interest = float(payable.get('overdue_interest') or 0)
-
-            current_total = current_interest + overdue_interest
-            all_interest = collected_interest + current_total
-
-            total_collected_interest += collected_interest
-            total_current_interest += current_total
-
-            detail_rows.append([
-                loan.get('ticket_no') or '-',
-                loan.get('customer_name') or '-',
-                get_status_text(loan.get('status') or 'active', loan.get('expire_date') or ''),
-                format_currency(principal_base),
-                format_currency(collected_interest),
-                format_currency(current_interest),
-                format_currency(overdue_interest),
-                format_currency(all_interest),
-                format_date(loan.get('issue_date') or ''),
-                format_date(loan.get('expire_date') or ''),
-            ])
+            totals = {'interest': 0.0, 'redemption': 0.0, 'partial': 0.0, 'penalty': 0.0}
+            for r in rows:
+                ptype = (r['payment_type'] or '').lower()
+                if ptype in totals:
+                    totals[ptype] += float(r['amount'] or 0)
 
-        total_all_interest = total_collected_interest + total_current_interest
+            total_collected = sum(float(r['amount'] or 0) for r in rows)
+            avg_collection = (total_collected / len(rows)) if rows else 0
 
-        card = self._make_card('Interest Report')
-        self._render_kpis(
-            card.inner,
-            [
-                ('Loans (Filtered)', str(len(loans)), self.theme.palette.text_primary),
-                ('Collected Interest', format_currency(total_collected_interest), self.theme.palette.success),
-                (f'Current Interest (As Of {date_to})', format_currency(total_current_interest), self.theme.palette.warning),
-                ('All Interest', format_currency(total_all_interest), self.theme.palette.accent),
-            ],
-            columns=4,
-        )
+            return len(rows), totals, total_collected, avg_collection, [format_row(r) for r in rows]
 
-        columns = [
-            ('Ticket', 10),
-            ('Customer', 15),
-            ('Status', 12),
-            ('Principal', 11),
-            ('Collected Int', 12),
-            ('Current Int', 12),
-            ('Overdue Int', 12),
-            ('All Int', 11),
-            ('Issue', 10),
-            ('Expire', 10),
-        ]
-        self._render_table(card.inner, columns, detail_rows, ticket_col=0)
+        def render(data):
+            payment_count, totals, total_collected, avg_collection, table_rows = data
 
-    def _calculate_total_payable_as_of(self, as_of_date_str, loan_amount, interest_rate, duration_months, overdue_rate, expire_date_str, issue_date_str, max_interest_months=3):
-        """Calculate payable snapshot as of a specific date (YYYY-MM-DD)."""
-        try:
-            issue = datetime.strptime(str(issue_date_str).split(' ')[0], '%Y-%m-%d')
-            expire = datetime.strptime(str(expire_date_str).split(' ')[0], '%Y-%m-%d')
-            as_of = datetime.strptime(str(as_of_date_str).split(' ')[0], '%Y-%m-%d')
+            card = self._make_card('Payment Collection Report')
+            self._render_kpis(
+                card.inner,
+                [
+                    ('Payment Entries', str(payment_count), self.theme.palette.text_primary),
+                    ('Total Collected', format_currency(total_collected), self.theme.palette.success),
+                    ('Average Payment', format_currency(avg_collection), self.theme.palette.info),
+                    ('Interest Collections', format_currency(totals['interest']), self.theme.palette.accent),
+                    ('Redemption Collections', format_currency(totals['redemption']), self.theme.palette.success),
+                    ('Partial Payments', format_currency(totals['partial']), self.theme.palette.warning),
+                    ('Penalty Collections', format_currency(totals['penalty']), self.theme.palette.danger),
+                ],
+                columns=4,
+            )
 
-            total_days = max(0, (as_of - issue).days)
-            overdue_days = max(0, (as_of - expire).days)
+            columns = [
+                ('Date', 10),
+                ('Ticket', 10),
+                ('Customer', 14),
+                ('Type', 10),
+                ('Amount', 11),
+                ('Received By', 13),
+                ('Remarks', 22),
+            ]
+            self._render_table(card.inner, columns, table_rows, ticket_col=1, export_query=(sql, _range, format_row))
 
-            daily_rate = float(interest_rate) / 30.0
-            overdue_daily_rate = float(overdue_rate) / 30.0
+        self._run_report(load, render)
 
-            if overdue_days <= 0:
-                interest = round(float(loan_amount) * (daily_rate / 100.0) * total_days, 2)
-                overdue_base_interest = 0.0
-                overdue_penalty_interest = 0.0
-                overdue_interest = 0.0
-            else:
-                days_until_expire = max(0, (expire - issue).days)
-                interest = round(float(loan_amount) * (daily_rate / 100.0) * min(total_days, days_until_expire), 2)
-                overdue_base_interest = round(float(loan_amount) * (daily_rate / 100.0) * overdue_days, 2)
-                overdue_penalty_interest = round(float(loan_amount) * (overdue_daily_rate / 100.0) * overdue_days, 2)
-                overdue_interest = round(overdue_base_interest + overdue_penalty_interest, 2)
-
-            total = float(loan_amount) + interest + overdue_interest
-            return {
-                'loan_amount': float(loan_amount),
-                'interest': interest,
-                'overdue_days': overdue_days,
-                'overdue_base_interest': overdue_base_interest,
-                'overdue_penalty_interest': overdue_penalty_interest,
-                'overdue_interest': overdue_interest,
-                'total': round(total, 2),
-                'days_passed': total_days,
-                'overdue_months': round(overdue_days / 30.0, 2) if overdue_days > 0 else 0,
-                'effective_overdue_months': 1 if overdue_days > 0 else 0,
-            }
-        except Exception:
-            return {
-                'loan_amount': float(loan_amount),
-                'interest': 0,
-                'overdue_days': 0,
-                'overdue_base_interest': 0,
-                'overdue_penalty_interest': 0,
-                'overdue_interest': 0,
-                'total': float(loan_amount),
-                'days_passed': 0,
+    def _show_interest_report(self):
+        date_from, date_to = self._get_date_range(show_error=False)
+        _range = date_range_params(date_from, date_to)
+
+        _dc = self._date_field_filter()
+        _dc_upper = self._date_field_filter(lower=False)
+        _collected = interest_collected_sql('lp', 'COALESCE(l.interest_principal_amount, l.loan_amount, 0)')
+
+        def load():
+            # Payments in range are summed per loan in one pass; a loan with any
+            # of them is in the report even when its date field is out of range.
+            loans = self._query(
+                f'''WITH paid AS (
+                       SELECT lp.loan_id, COALESCE(SUM({_collected}), 0) AS collected_interest
+                       FROM loan_payments lp
+                       JOIN loans l ON l.id=lp.loan_id
+                       WHERE {date_range_sql('lp.payment_date')}
+                       GROUP BY lp.loan_id
+                   )
+                   SELECT l.id, l.ticket_no, l.customer_id, c.name AS customer_name,
+                          l.status, l.loan_amount, l.interest_principal_amount,
+                          l.interest_rate, l.overdue_interest_rate, l.duration_months,
+                          l.issue_date, l.renew_date, l.expire_date,
+                          COALESCE(p.collected_interest, 0) AS collected_interest
+                   FROM loans l
+                   JOIN customers c ON l.customer_id=c.id
+                   LEFT JOIN paid p ON p.loan_id=l.id
+                   WHERE {_dc_upper}
+                     AND ({_dc} OR p.loan_id IS NOT NULL OR l.status='active')
+                   ORDER BY l.id DESC''',
+                (*_range, *date_range_params(date_to=date_to, lower=False), *_range),
+            )
+            self._executor.progress(f'Accruing interest on {len(loans)} loans...')
+
+            active = [loan for loan in loans if loan.get('status') == 'active']
+            # Without an as-of date every accrual falls back to zero, as the scalar path did.
+            payable = calculate_total_payable_batch(
+                [float(loan.get('interest_principal_amount') or loan.get('loan_amount') or 0) for loan in active],
+                [loan.get('interest_rate') or 0 for loan in active],
+                [loan.get('overdue_interest_rate') or 0 for loan in active],
+                [(loan.get('expire_date') or '') if date_to else '' for loan in active],
+                [(loan.get('renew_date') or loan.get('issue_date') or '') if date_to else '' for loan in active],
+                as_of_date=date_to,
+            )
+            accrued = {
+                loan['id']: (float(interest or 0), float(overdue_interest or 0))
+                for loan, interest, overdue_interest in zip(active, payable['interest'], payable['overdue_interest'])
             }
 
+            total_collected_interest = 0.0
+            total_current_interest = 0.0
+            detail_rows = []
+            for loan in loans:
+                principal_base = float(loan.get('interest_principal_amount') or loan.get('loan_amount') or 0)
+                collected_interest = float(loan.get('collected_interest') or 0)
+                current_interest, overdue_interest = accrued.get(loan['id'], (0.0, 0.0))
+
+                current_total = current_interest + overdue_interest
+                all_interest = collected_interest + current_total
+
+                total_collected_interest += collected_interest
+                total_current_interest += current_total
+
+                detail_rows.append([
+                    loan.get('ticket_no') or '-',
+                    loan.get('customer_name') or '-',
+                    get_status_text(loan.get('status') or 'active', loan.get('expire_date') or ''),
+                    format_currency(principal_base),
+                    format_currency(collected_interest),
+                    format_currency(current_interest),
+                    format_currency(overdue_interest),
+                    format_currency(all_interest),
+                    format_date(loan.get('issue_date') or ''),
+                    format_date(loan.get('expire_date') or ''),
+                ])
+            return len(loans), total_collected_interest, total_current_interest, detail_rows
+
+        def render(data):
+            loan_count, total_collected_interest, total_current_interest, detail_rows = data
+            total_all_interest = total_collected_interest + total_current_interest
+
+            card = self._make_card('Interest Report')
+            self._render_kpis(
+                card.inner,
+                [
+                    ('Loans (Filtered)', str(loan_count), self.theme.palette.text_primary),
+                    ('Collected Interest', format_currency(total_collected_interest), self.theme.palette.success),
+                    (f'Current Interest (As Of {date_to})', format_currency(total_current_interest), self.theme.palette.warning),
+                    ('All Interest', format_currency(total_all_interest), self.theme.palette.accent),
+                ],
+                columns=4,
+            )
+
+            columns = [
+                ('Ticket', 10),
+                ('Customer', 15),
+                ('Status', 12),
+                ('Principal', 11),
+                ('Collected Int', 12),
+                ('Current Int', 12),
+                ('Overdue Int', 12),
+                ('All Int', 11),
+                ('Issue', 10),
+                ('Expire', 10),
+            ]
+            self._render_table(card.inner, columns, detail_rows, ticket_col=0)
+
+        self._run_report(load, render)
+
     def _show_customers(self):
-        self._clear()
         date_from, date_to = self._get_date_range(show_error=False)
-        rows = self._query(
-            f'''SELECT c.id, c.name, c.nic, c.phone, c.job,
-                      COUNT(l.id) AS total_loans,
-                      SUM(CASE WHEN l.status='active' THEN 1 ELSE 0 END) AS active_loans,
-                      SUM(CASE WHEN l.status='redeemed' THEN 1 ELSE 0 END) AS redeemed_loans,
-                      COALESCE(SUM(l.loan_amount),0) AS total_borrowed,
-                      COALESCE(SUM(CASE WHEN l.status='active' THEN l.loan_amount ELSE 0 END),0) AS active_exposure,
-                      MAX(l.issue_date) AS last_loan_date
-               FROM customers c
-                             LEFT JOIN loans l ON c.id=l.customer_id AND date({self._get_date_field_col()}) BETWEEN ? AND ?
-               GROUP BY c.id
-               ORDER BY active_exposure DESC, total_borrowed DESC'''
-                        ,(date_from, date_to),
-        )
+        _range = date_range_params(date_from, date_to)
+        date_filter = self._date_field_filter()
 
-        total_customers = len(rows)
-        active_borrowers = sum(1 for r in rows if int(r['active_loans'] or 0) > 0)
-        total_exposure = sum(float(r['active_exposure'] or 0) for r in rows)
-        top_exposure = float(rows[0]['active_exposure']) if rows else 0
+        def load():
+            rows = self._query(
+                f'''SELECT c.id, c.name, c.nic, c.phone, c.job,
+                          COUNT(l.id) AS total_loans,
+                          SUM(CASE WHEN l.status='active' THEN 1 ELSE 0 END) AS active_loans,
+                          SUM(CASE WHEN l.status='redeemed' THEN 1 ELSE 0 END) AS redeemed_loans,
+                          COALESCE(SUM(l.loan_amount),0) AS total_borrowed,
+                          COALESCE(SUM(CASE WHEN l.status='active' THEN l.loan_amount ELSE 0 END),0) AS active_exposure,
+                          MAX(l.issue_date) AS last_loan_date
+                   FROM customers c
+                                 LEFT JOIN loans l ON c.id=l.customer_id AND {date_filter}
+                   GROUP BY c.id
+                   ORDER BY active_exposure DESC, total_borrowed DESC'''
+                            ,_range,
+            )
 
-        card = self._make_card('Customer Portfolio Report')
-        self._render_kpis(
-            card.inner,
-            [
-                ('Total Customers', str(total_customers), self.theme.palette.info),
-                ('Active Borrowers', str(active_borrowers), self.theme.palette.accent),
-                ('Total Active Exposure', format_currency(total_exposure), self.theme.palette.warning),
-                ('Top Customer Exposure', format_currency(top_exposure), self.theme.palette.danger),
-            ],
-            columns=4,
-        )
+            active_borrowers = sum(1 for r in rows if int(r['active_loans'] or 0) > 0)
+            total_exposure = sum(float(r['active_exposure'] or 0) for r in rows)
+            top_exposure = float(rows[0]['active_exposure']) if rows else 0
 
-        columns = [
-            ('Customer', 15),
-            ('NIC', 13),
-            ('Phone', 12),
-            ('Job', 12),
-            ('Loans', 7),
-            ('Active', 7),
-            ('Redeemed', 9),
-            ('Borrowed', 11),
-            ('Exposure', 11),
-            ('Last Loan', 10),
-        ]
-        table_rows = []
-        for r in rows:
-            table_rows.append([
-                r['name'] or '-',
-                r['nic'] or '-',
-                r['phone'] or '-',
-                r['job'] or '-',
-                str(r['total_loans'] or 0),
-                str(r['active_loans'] or 0),
-                str(r['redeemed_loans'] or 0),
-                format_currency(r['total_borrowed']),
-                format_currency(r['active_exposure']),
-                format_date(r['last_loan_date']) if r['last_loan_date'] else '-',
-            ])
-        self._render_table(card.inner, columns, table_rows)
+            table_rows = []
+            for r in rows:
+                table_rows.append([
+                    r['name'] or '-',
+                    r['nic'] or '-',
+                    r['phone'] or '-',
+                    r['job'] or '-',
+                    str(r['total_loans'] or 0),
+                    str(r['active_loans'] or 0),
+                    str(r['redeemed_loans'] or 0),
+                    format_currency(r['total_borrowed']),
+                    format_currency(r['active_exposure']),
+                    format_date(r['last_loan_date']) if r['last_loan_date'] else '-',
+                ])
+            return len(rows), active_borrowers, total_exposure, top_exposure, table_rows
+
+        def render(data):
+            total_customers, active_borrowers, total_exposure, top_exposure, table_rows = data
+
+            card = self._make_card('Customer Portfolio Report')
+            self._render_kpis(
+                card.inner,
+                [
+                    ('Total Customers', str(total_customers), self.theme.palette.info),
+                    ('Active Borrowers', str(active_borrowers), self.theme.palette.accent),
+                    ('Total Active Exposure', format_currency(total_exposure), self.theme.palette.warning),
+                    ('Top Customer Exposure', format_currency(top_exposure), self.theme.palette.danger),
+                ],
+                columns=4,
+            )
+
+            columns = [
+                ('Customer', 15),
+                ('NIC', 13),
+                ('Phone', 12),
+                ('Job', 12),
+                ('Loans', 7),
+                ('Active', 7),
+                ('Redeemed', 9),
+                ('Borrowed', 11),
+                ('Exposure', 11),
+                ('Last Loan', 10),
+            ]
+            self._render_table(card.inner, columns, table_rows)
+
+        self._run_report(load, render)
 
     def _show_gold_inventory(self):
-        self._clear()
         date_from, date_to = self._get_date_range(show_error=False)
+        _range = date_range_params(date_from, date_to)
 
         scope = (self._gold_inventory_scope_var.get() or 'active').strip().lower()
         status_filter_sql = "AND l.status='active'" if scope == 'active' else ''
+        date_filter = self._date_field_filter()
+
+        def load():
+            # Redemption date once per loan, joined in; summary, totals and
+            # details all come out of one pass over the item rows.
+            item_details = self._query(
+                f'''WITH scoped AS (
+                    SELECT l.id FROM loans l
+                    WHERE {date_filter}
+                    {status_filter_sql}
+                ),
+                redeemed AS (
+                    SELECT lp.loan_id, MAX(lp.payment_date) AS redeem_date
+                    FROM scoped s
+                    JOIN loan_payments lp ON lp.loan_id=s.id
+                    WHERE lp.payment_type='redemption'
+                    GROUP BY lp.loan_id
+                )
+                SELECT l.ticket_no, c.name AS customer_name, li.article_type,
+                li.description, li.quantity, li.total_weight,
+                li.gold_weight, li.carat, li.estimated_value,
+                l.status AS loan_status, l.issue_date, l.updated_at,
+                l.advance_amount, l.loan_amount, rd.redeem_date
+                FROM scoped s
+                JOIN loans l ON l.id=s.id
+                JOIN loan_items li ON li.loan_id=l.id
+                JOIN customers c ON l.customer_id=c.id
+                LEFT JOIN redeemed rd ON rd.loan_id=l.id
+                ORDER BY li.id DESC''',
+                _range,
+            )
+            vault = get_gold_in_vault()
+
+            by_article = {}
+            total_items = 0
+            total_gold_weight = total_item_weight = total_est_value = 0.0
+            active_item_weight = redeemed_item_weight = active_gold_weight = 0.0
+            for r in item_details:
+                item_weight = float(r['total_weight'] or 0)
+                gold_weight = float(r['gold_weight'] or 0)
+                est_value = float(r['estimated_value'] or 0)
+                total_items += 1
+                total_item_weight += item_weight
+                total_gold_weight += gold_weight
+                total_est_value += est_value
+
+                article = by_article.setdefault(r['article_type'], [0, 0, 0.0, 0.0, 0.0, 0, 0])
+                article[0] += 1
+                article[1] += int(r['quantity'] or 0)
+                article[2] += item_weight
+                article[3] += gold_weight
+                article[4] += est_value
+                if r['carat'] is not None:
+                    article[5] += r['carat']
+                    article[6] += 1
+
+                loan_status = (r['loan_status'] or '').lower()
+                redeem_day = str(r['redeem_date'] or '')[:10]
+                if loan_status == 'active' or (loan_status == 'redeemed' and (not redeem_day or redeem_day > date_to)):
+                    active_item_weight += item_weight
+                    active_gold_weight += gold_weight
+                elif loan_status == 'redeemed' and date_from <= redeem_day <= date_to:
+                    redeemed_item_weight += item_weight
+
+            active_items = [
+                {
+                    'article_type': article_type, 'item_count': a[0], 'total_qty': a[1],
+                    'total_item_weight': a[2], 'total_gold_weight': a[3], 'total_est_value': a[4],
+                    'avg_carat': round(a[5] / a[6], 2) if a[6] else None,
+                }
+                for article_type, a in by_article.items()
+            ]
+            active_items.sort(key=lambda r: r['total_gold_weight'], reverse=True)
+
+            summary_rows = []
+            for r in active_items:
+                summary_rows.append([
+                    r['article_type'] or '-',
+                    str(r['item_count'] or 0),
+                    str(r['total_qty'] or 0),
+                    f"{float(r['total_item_weight'] or 0):.3f}",
+                    f"{float(r['total_gold_weight'] or 0):.3f}",
+                    f"{float(r['avg_carat'] or 0):.2f}",
+                    format_currency(r['total_est_value']),
+                ])
 
-        summary_sql = f'''SELECT li.article_type, COUNT(*) AS item_count,
-                COALESCE(SUM(li.quantity),0) AS total_qty,
-                COALESCE(SUM(li.total_weight),0) AS total_item_weight,
-                COALESCE(SUM(li.gold_weight),0) AS total_gold_weight,
-                COALESCE(SUM(li.estimated_value),0) AS total_est_value,
-                ROUND(AVG(li.carat), 2) AS avg_carat
-            FROM loan_items li
-            JOIN loans l ON li.loan_id=l.id
-            WHERE date({self._get_date_field_col()}) BETWEEN ? AND ?
-            {status_filter_sql}
-            GROUP BY li.article_type
-            ORDER BY total_gold_weight DESC'''
-
-        active_items = self._query(summary_sql, (date_from, date_to))
-
-        detail_sql = f'''SELECT l.ticket_no, c.name AS customer_name, li.article_type,
-            li.description, li.quantity, li.total_weight,
-            li.gold_weight, li.carat, li.estimated_value,
-            l.status AS loan_status, l.issue_date, l.updated_at,
-            l.advance_amount, l.loan_amount,
-            (SELECT MAX(lp.payment_date)
-             FROM loan_payments lp
-             WHERE lp.loan_id=l.id AND lp.payment_type='redemption') AS redeem_date
-            FROM loan_items li
-            JOIN loans l ON li.loan_id=l.id
-            JOIN customers c ON l.customer_id=c.id
-            WHERE date({self._get_date_field_col()}) BETWEEN ? AND ?
-            {status_filter_sql}
-            ORDER BY li.id DESC'''
-
-        item_details = self._query(detail_sql, (date_from, date_to))
-
-        total_items = sum(int(r['item_count'] or 0) for r in active_items)
-        total_gold_weight = sum(float(r['total_gold_weight'] or 0) for r in active_items)
-        total_item_weight = sum(float(r['total_item_weight'] or 0) for r in active_items)
-        total_est_value = sum(float(r['total_est_value'] or 0) for r in active_items)
-
-        def _is_redeemed_in_range(row):
-            loan_status = (row.get('loan_status') or '').lower()
-            redeem_day = str(row.get('redeem_date') or '')[:10]
-            return loan_status == 'redeemed' and bool(redeem_day) and date_from <= redeem_day <= date_to
-
-        def _is_active_in_range(row):
-            loan_status = (row.get('loan_status') or '').lower()
-            redeem_day = str(row.get('redeem_date') or '')[:10]
-            if loan_status == 'active':
-                return True
-            if loan_status == 'redeemed':
-                return (not redeem_day) or (redeem_day > date_to)
-            return False
-
-        active_item_weight = sum(
-            float(r.get('total_weight') or 0)
-            for r in item_details
-            if _is_active_in_range(r)
-        )
-        redeemed_item_weight = sum(
-            float(r.get('total_weight') or 0)
-            for r in item_details
-            if _is_redeemed_in_range(r)
-        )
-        active_gold_weight = sum(
-            float(r.get('gold_weight') or 0)
-            for r in item_details
-            if _is_active_in_range(r)
-        )
+            detail_rows = []
+            for r in item_details:
+                row_values = [
+                    r['ticket_no'],
+                    r['customer_name'] or '-',
+                    r['article_type'] or '-',
+                    r['description'] or '-',
+                ]
 
-        card = self._make_card('Gold Inventory and Article Report')
+                if scope == 'all':
+                    issue_day = str(r.get('issue_date') or '')[:10]
+                    status_day = str(r.get('redeem_date') or r.get('updated_at') or '')[:10]
+                    loan_status = (r.get('loan_status') or '').lower()
+                    redeem_date = str(r.get('redeem_date') or '')[:10]
+
+                    if loan_status == 'redeemed':
+                        if status_day and status_day < date_from:
+                            day_status = f"Redeemed before range ({status_day})"
+                        elif status_day and date_from <= status_day <= date_to:
+                            day_status = f"Redeemed"
+                        elif status_day and status_day > date_to:
+                            day_status = 'Active'
+                        else:
+                            day_status = 'Redeemed'
+                    elif loan_status == 'active':
+                        day_status = 'Active'
+                    else:
+                        day_status = f"{(r.get('loan_status') or '-').upper()}"
+
+                    row_values.extend([
+                        format_date(issue_day) if issue_day else '-',
+                        day_status,
+                        (r.get('loan_status') or '-').upper(),
+                        format_date(redeem_date) if redeem_date else '-',
+                    ])
+                else:
+                    row_values.append((r.get('loan_status') or '-').upper())
 
-        filter_row = tk.Frame(card.inner, bg=self.theme.palette.bg_surface)
-        filter_row.pack(fill=tk.X, padx=14, pady=(0, 8))
-        tk.Label(
-            filter_row,
-            text='Inventory Scope:',
-            font=self.theme.fonts.body_bold,
-            bg=self.theme.palette.bg_surface,
-            fg=self.theme.palette.text_primary,
-        ).pack(side=tk.LEFT)
-        scope_combo = tk.OptionMenu(
-            filter_row,
-            self._gold_inventory_scope_var,
-            'active',
-            'all',
-            command=lambda _v: self._show_gold_inventory(),
-        )
-        scope_combo.config(width=14)
-        scope_combo.pack(side=tk.LEFT, padx=(8, 8))
-        scope_label = 'Active Items Only' if scope == 'active' else 'All Items (Active + Redeemed + Others)'
-        tk.Label(
-            filter_row,
-            text=scope_label,
-            font=self.theme.fonts.body,
-            bg=self.theme.palette.bg_surface,
-            fg=self.theme.palette.text_muted,
-        ).pack(side=tk.LEFT)
+                row_values.extend([
+                    str(r['quantity'] or 0),
+                    f"{float(r['total_weight'] or 0):.3f}",
+                    f"{float(r['gold_weight'] or 0):.3f}",
+                    str(r['carat'] or '-'),
+                    format_currency(r.get('advance_amount') if r.get('advance_amount') is not None else r.get('loan_amount', 0)),
+                    format_currency(r['estimated_value']),
+                ])
+                detail_rows.append(row_values)
+            vault_rows = [
+                [
+                    str(v['carat']),
+                    v['article_type'] or '-',
+                    str(v['items']),
+                    str(v['quantity']),
+                    f"{float(v['total_weight']):.3f}",
+                    f"{float(v['gold_weight']):.3f}",
+                    format_currency(v['estimated_value']),
+                ]
+                for v in vault
+            ]
+            return (total_items, total_gold_weight, total_item_weight, total_est_value,
+                    active_item_weight, redeemed_item_weight, active_gold_weight,
+                    summary_rows, vault_rows, detail_rows)
 
-        item_entry_title = 'Active Item Entries' if scope == 'active' else 'All Item Entries'
-        kpi_items = [
-            (item_entry_title, str(total_items), self.theme.palette.text_primary),
-            ('Total Gold Weight (g)', f'{total_gold_weight:.3f}', self.theme.palette.warning),
-            ('Total Item Weight (g)', f'{total_item_weight:.3f}', self.theme.palette.info),
-            ('Total Estimated Value', format_currency(total_est_value), self.theme.palette.accent),
-        ]
-        if scope == 'all':
-            kpi_items.append(('Active Item Weight (g)', f'{active_item_weight:.3f}', self.theme.palette.info))
-            kpi_items.append(('Active Gold Weight (g)', f'{active_gold_weight:.3f}', self.theme.palette.success))
-            kpi_items.append(('Redeemed Item Weight (g)', f'{redeemed_item_weight:.3f}', self.theme.palette.warning))
+        def render(data):
+            (total_items, total_gold_weight, total_item_weight, total_est_value,
+             active_item_weight, redeemed_item_weight, active_gold_weight,
+             summary_rows, vault_rows, detail_rows) = data
 
-        self._render_kpis(
-            card.inner,
-            kpi_items,
-            columns=4,
-        )
+            card = self._make_card('Gold Inventory and Article Report')
 
-        tk.Label(
-            card.inner,
-            text='Article Type Summary',
-            font=self.theme.fonts.body_bold,
-            bg=self.theme.palette.bg_surface,
-            fg=self.theme.palette.text_primary,
-        ).pack(anchor='w', padx=14, pady=(4, 6))
-
-        summary_columns = [
-            ('Article', 14),
-            ('Items', 7),
-            ('Qty', 7),
-            ('Item Wt(g)', 10),
-            ('Gold Wt(g)', 10),
-            ('Avg Carat', 9),
-            ('Est Value', 12),
-        ]
-        summary_rows = []
-        for r in active_items:
-            summary_rows.append([
-                r['article_type'] or '-',
-                str(r['item_count'] or 0),
-                str(r['total_qty'] or 0),
-                f"{float(r['total_item_weight'] or 0):.3f}",
-                f"{float(r['total_gold_weight'] or 0):.3f}",
-                f"{float(r['avg_carat'] or 0):.2f}",
-                format_currency(r['total_est_value']),
-            ])
-        self._render_table(card.inner, summary_columns, summary_rows, max_rows=80)
+            filter_row = tk.Frame(card.inner, bg=self.theme.palette.bg_surface)
+            filter_row.pack(fill=tk.X, padx=14, pady=(0, 8))
+            tk.Label(
+                filter_row,
+                text='Inventory Scope:',
+                font=self.theme.fonts.body_bold,
+                bg=self.theme.palette.bg_surface,
+                fg=self.theme.palette.text_primary,
+            ).pack(side=tk.LEFT)
+            scope_combo = tk.OptionMenu(
+                filter_row,
+                self._gold_inventory_scope_var,
+                'active',
+                'all',
+                command=lambda _v: self._show_gold_inventory(),
+            )
+            scope_combo.config(width=14)
+            scope_combo.pack(side=tk.LEFT, padx=(8, 8))
+            scope_label = 'Active Items Only' if scope == 'active' else 'All Items (Active + Redeemed + Others)'
+            tk.Label(
+                filter_row,
+                text=scope_label,
+                font=self.theme.fonts.body,
+                bg=self.theme.palette.bg_surface,
+                fg=self.theme.palette.text_muted,
+            ).pack(side=tk.LEFT)
+
+            item_entry_title = 'Active Item Entries' if scope == 'active' else 'All Item Entries'
+            kpi_items = [
+                (item_entry_title, str(total_items), self.theme.palette.text_primary),
+                ('Total Gold Weight (g)', f'{total_gold_weight:.3f}', self.theme.palette.warning),
+                ('Total Item Weight (g)', f'{total_item_weight:.3f}', self.theme.palette.info),
+                ('Total Estimated Value', format_currency(total_est_value), self.theme.palette.accent),
+            ]
+            if scope == 'all':
+                kpi_items.append(('Active Item Weight (g)', f'{active_item_weight:.3f}', self.theme.palette.info))
+                kpi_items.append(('Active Gold Weight (g)', f'{active_gold_weight:.3f}', self.theme.palette.success))
+                kpi_items.append(('Redeemed Item Weight (g)', f'{redeemed_item_weight:.3f}', self.theme.palette.warning))
 
-        tk.Label(
-            card.inner,
-            text='Item Details' if scope == 'all' else 'Active Item Details',
-            font=self.theme.fonts.body_bold,
-            bg=self.theme.palette.bg_surface,
-            fg=self.theme.palette.text_primary,
-        ).pack(anchor='w', padx=14, pady=(10, 6))
+            self._render_kpis(
+                card.inner,
+                kpi_items,
+                columns=4,
+            )
 
-        detail_columns = [
-            ('Ticket', 10),
-            ('Customer', 12),
-            ('Type', 10),
-            ('Description', 16),
-        ]
-        if scope == 'all':
-            detail_columns.extend([
-                ('Issue Date', 10),
-                ('Range Status', 18),
-                ('Current Status', 11),
-                ('Redeem Date', 11),
-            ])
-        else:
-            detail_columns.append(('Current Status', 11))
-        detail_columns.extend([
-            ('Qty', 6),
-            ('Item(g)', 9),
-            ('Gold(g)', 9),
-            ('Carat', 7),
-            ('Advanced', 11),
-            ('Est Value', 11),
-        ])
-        detail_rows = []
-        for r in item_details:
-            row_values = [
-                r['ticket_no'],
-                r['customer_name'] or '-',
-                r['article_type'] or '-',
-                r['description'] or '-',
+            tk.Label(
+                card.inner,
+                text='Article Type Summary',
+                font=self.theme.fonts.body_bold,
+                bg=self.theme.palette.bg_surface,
+                fg=self.theme.palette.text_primary,
+            ).pack(anchor='w', padx=14, pady=(4, 6))
+
+            summary_columns = [
+                ('Article', 14),
+                ('Items', 7),
+                ('Qty', 7),
+                ('Item Wt(g)', 10),
+                ('Gold Wt(g)', 10),
+                ('Avg Carat', 9),
+                ('Est Value', 12),
             ]
+            self._render_table(card.inner, summary_columns, summary_rows)
 
-            if scope == 'all':
-                issue_day = str(r.get('issue_date') or '')[:10]
-                status_day = str(r.get('redeem_date') or r.get('updated_at') or '')[:10]
-                loan_status = (r.get('loan_status') or '').lower()
-                redeem_date = str(r.get('redeem_date') or '')[:10]
-
-                if loan_status == 'redeemed':
-                    if status_day and status_day < date_from:
-                        day_status = f"Redeemed before range ({status_day})"
-                    elif status_day and date_from <= status_day <= date_to:
-                        day_status = f"Redeemed"
-                    elif status_day and status_day > date_to:
-                        day_status = 'Active'
-                    else:
-                        day_status = 'Redeemed'
-                elif loan_status == 'active':
-                    day_status = 'Active'
-                else:
-                    day_status = f"{(r.get('loan_status') or '-').upper()}"
+            tk.Label(
+                card.inner,
+                text='Gold in Vault (all dates)',
+                font=self.theme.fonts.body_bold,
+                bg=self.theme.palette.bg_surface,
+                fg=self.theme.palette.text_primary,
+            ).pack(anchor='w', padx=14, pady=(10, 6))
+
+            vault_columns = [
+                ('Carat', 7),
+                ('Article', 14),
+                ('Items', 7),
+                ('Qty', 7),
+                ('Item Wt(g)', 10),
+                ('Gold Wt(g)', 10),
+                ('Est Value', 12),
+            ]
+            self._render_table(card.inner, vault_columns, vault_rows, height=8)
 
-                row_values.extend([
-                    format_date(issue_day) if issue_day else '-',
-                    day_status,
-                    (r.get('loan_status') or '-').upper(),
-                    format_date(redeem_date) if redeem_date else '-',
+            tk.Label(
+                card.inner,
+                text='Item Details' if scope == 'all' else 'Active Item Details',
+                font=self.theme.fonts.body_bold,
+                bg=self.theme.palette.bg_surface,
+                fg=self.theme.palette.text_primary,
+            ).pack(anchor='w', padx=14, pady=(10, 6))
+
+            detail_columns = [
+                ('Ticket', 10),
+                ('Customer', 12),
+                ('Type', 10),
+                ('Description', 16),
+            ]
+            if scope == 'all':
+                detail_columns.extend([
+                    ('Issue Date', 10),
+                    ('Range Status', 18),
+                    ('Current Status', 11),
+                    ('Redeem Date', 11),
                 ])
             else:
-                row_values.append((r.get('loan_status') or '-').upper())
-
-            row_values.extend([
-                str(r['quantity'] or 0),
-                f"{float(r['total_weight'] or 0):.3f}",
-                f"{float(r['gold_weight'] or 0):.3f}",
-                str(r['carat'] or '-'),
-                format_currency(r.get('advance_amount') if r.get('advance_amount') is not None else r.get('loan_amount', 0)),
-                format_currency(r['estimated_value']),
+                detail_columns.append(('Current Status', 11))
+            detail_columns.extend([
+                ('Qty', 6),
+                ('Item(g)', 9),
+                ('Gold(g)', 9),
+                ('Carat', 7),
+                ('Advanced', 11),
+                ('Est Value', 11),
             ])
-            detail_rows.append(row_values)
-        self._render_table(card.inner, detail_columns, detail_rows, ticket_col=0)
+            self._render_table(card.inner, detail_columns, detail_rows, ticket_col=0)
+
+        self._run_report(load, render, filters=(scope,))
 
     def _show_operations(self):
-        self._clear()
         date_from, date_to = self._get_date_range(show_error=False)
+        _range = date_range_params(date_from, date_to)
+
+        def load():
+            approvals = self._query(
+                f'''SELECT status, COUNT(*) AS count
+                   FROM loan_approval_requests
+                        WHERE {date_range_sql('created_at')}
+                   GROUP BY status'''
+                    ,_range,
+            )
+            letters = self._query(
+                f'''SELECT status, COUNT(*) AS count
+                   FROM customer_letters
+                        WHERE {date_range_sql('created_at')}
+                   GROUP BY status'''
+                    ,_range,
+            )
+            audits = self._query(
+                f'''SELECT a.created_at, u.full_name AS user_name, a.action,
+                          a.entity_type, a.entity_id
+                   FROM audit_log a
+                   LEFT JOIN users u ON a.user_id=u.id
+                        WHERE {date_range_sql('a.created_at')}
+                   ORDER BY a.id DESC'''
+                    ,_range,
+            )
 
-        approvals = self._query(
-            '''SELECT status, COUNT(*) AS count
-               FROM loan_approval_requests
-                    WHERE date(created_at) BETWEEN ? AND ?
-               GROUP BY status'''
-                ,(date_from, date_to),
-        )
-        letters = self._query(
-            '''SELECT status, COUNT(*) AS count
-               FROM customer_letters
-                    WHERE date(created_at) BETWEEN ? AND ?
-               GROUP BY status'''
-                ,(date_from, date_to),
-        )
-        audits = self._query(
-            '''SELECT a.created_at, u.full_name AS user_name, a.action,
-                      a.entity_type, a.entity_id
-               FROM audit_log a
-               LEFT JOIN users u ON a.user_id=u.id
-                    WHERE date(a.created_at) BETWEEN ? AND ?
-               ORDER BY a.id DESC'''
-                ,(date_from, date_to),
-        )
+            approval_map = {r['status']: int(r['count'] or 0) for r in approvals}
+            letter_map = {r['status']: int(r['count'] or 0) for r in letters}
+
+            rows = []
+            for r in audits:
+                rows.append([
+                    format_date(r['created_at']),
+                    r['user_name'] or '-',
+                    r['action'] or '-',
+                    r['entity_type'] or '-',
+                    str(r['entity_id'] or '-'),
+                ])
+            return approval_map, letter_map, len(audits), rows
 
-        approval_map = {r['status']: int(r['count'] or 0) for r in approvals}
-        letter_map = {r['status']: int(r['count'] or 0) for r in letters}
+        def render(data):
+            approval_map, letter_map, audit_count, rows = data
 
-        card = self._make_card('Operations and Compliance Report')
-        self._render_kpis(
-            card.inner,
-            [
-                ('Approvals Pending', str(approval_map.get('pending', 0)), self.theme.palette.danger),
-                ('Approvals Approved', str(approval_map.get('approved', 0)), self.theme.palette.success),
-                ('Approvals Declined', str(approval_map.get('declined', 0)), self.theme.palette.warning),
-                ('Letters Draft', str(letter_map.get('draft', 0)), self.theme.palette.info),
-                ('Letters Printed', str(letter_map.get('printed', 0)), self.theme.palette.accent),
-                ('Letters Sent', str(letter_map.get('sent', 0)), self.theme.palette.success),
-                ('Audit Events', str(len(audits)), self.theme.palette.text_primary),
-            ],
-            columns=4,
-        )
+            card = self._make_card('Operations and Compliance Report')
+            self._render_kpis(
+                card.inner,
+                [
+                    ('Approvals Pending', str(approval_map.get('pending', 0)), self.theme.palette.danger),
+                    ('Approvals Approved', str(approval_map.get('approved', 0)), self.theme.palette.success),
+                    ('Approvals Declined', str(approval_map.get('declined', 0)), self.theme.palette.warning),
+                    ('Letters Draft', str(letter_map.get('draft', 0)), self.theme.palette.info),
+                    ('Letters Printed', str(letter_map.get('printed', 0)), self.theme.palette.accent),
+                    ('Letters Sent', str(letter_map.get('sent', 0)), self.theme.palette.success),
+                    ('Audit Events', str(audit_count), self.theme.palette.text_primary),
+                ],
+                columns=4,
+            )
 
-        tk.Label(
-            card.inner,
-            text='Recent Audit Activity',
-            font=self.theme.fonts.body_bold,
-            bg=self.theme.palette.bg_surface,
-            fg=self.theme.palette.text_primary,
-        ).pack(anchor='w', padx=14, pady=(8, 6))
-
-        columns = [
-            ('Date', 10),
-            ('User', 14),
-            ('Action', 20),
-            ('Entity', 12),
-            ('Entity ID', 10),
-        ]
-        rows = []
-        for r in audits:
-            rows.append([
-                format_date(r['created_at']),
-                r['user_name'] or '-',
-                r['action'] or '-',
-                r['entity_type'] or '-',
-                str(r['entity_id'] or '-'),
-            ])
-        self._render_table(card.inner, columns, rows, max_rows=120)
+            tk.Label(
+                card.inner,
+                text='Recent Audit Activity',
+                font=self.theme.fonts.body_bold,
+                bg=self.theme.palette.bg_surface,
+                fg=self.theme.palette.text_primary,
+            ).pack(anchor='w', padx=14, pady=(8, 6))
+
+            columns = [
+                ('Date', 10),
+                ('User', 14),
+                ('Action', 20),
+                ('Entity', 12),
+                ('Entity ID', 10),
+            ]
+            self._render_table(card.inner, columns, rows)
+
+        self._run_report(load, render)
 
     def _show_repawning(self):
         """Repawning report: overview, history table, statistics, and currently repawned loans."""
-        self._clear()
         date_from, date_to = self._get_date_range(show_error=False)
 
-        # ── fetch data ──────────────────────────────────────────────────────────
-        all_history = get_repawn_history()
-
-        def _in_range(dt_str):
-            try:
-                d = (dt_str or '')[:10]
-                return date_from <= d <= date_to
-            except Exception:
-                return False
-
         # For repawning tab: choose the relevant date field from history records
         _field = self._date_field_var.get()
-        if _field == 'Restocked Date':
-            history_in_range = [rh for rh in all_history if _in_range(rh.get('restock_at', ''))]
-        else:
-            # Default: filter by repawned_at for all other field selections
-            history_in_range = [rh for rh in all_history if _in_range(rh.get('repawned_at', ''))]
-
-        currently_repawned = self._query(
-            '''SELECT l.ticket_no, l.loan_amount, l.interest_rate, l.duration_months,
-                      l.issue_date, l.expire_date, l.total_gold_weight,
-                      c.name AS customer_name, c.nic AS customer_nic,
-                      rh.repawned_at, rh.destination, rh.remarks,
-                      u.full_name AS repawned_by_name
-               FROM loans l
-               JOIN customers c ON l.customer_id=c.id
-               LEFT JOIN repawn_history rh ON rh.loan_id=l.id AND rh.status='repawned'
-               LEFT JOIN users u ON rh.repawned_by=u.id
-               WHERE l.status='repawned'
-               ORDER BY rh.repawned_at DESC'''
-        )
 
-        restocked_in_range   = [rh for rh in history_in_range if rh.get('status') == 'restocked']
-        repawned_in_range    = [rh for rh in history_in_range if rh.get('status') == 'repawned']
-        total_repawned       = len(repawned_in_range)
-        total_restocked      = len(restocked_in_range)
-        currently_repawned_count = len(currently_repawned)
-        total_loan_amount    = sum(float(rh.get('loan_amount') or 0) for rh in repawned_in_range)
-        total_gold_weight    = sum(float(r.get('total_gold_weight') or 0) for r in currently_repawned)
-        all_repawned_count   = sum(1 for rh in all_history if rh.get('status') == 'repawned')
-        all_restocked_count  = sum(1 for rh in all_history if rh.get('status') == 'restocked')
-
-        # ── 1. KPI overview — uses _make_card so it sits in report_content like other tabs ──
-        ov = self._make_card('♻ Repawning Overview')
-        ov.inner.configure(bg=self.theme.palette.bg_surface)
-        # override title label colour
-        for w in ov.inner.winfo_children():
-            try:
-                w.configure(fg='#a855f7')
-                break
-            except Exception:
-                pass
-        ov.pack(fill=tk.X, expand=False)
-
-        self._render_kpis(
-            ov.inner,
-            [
-                ('Repawned (Period)',           str(total_repawned),                  '#a855f7'),
-                ('Restocked (Period)',          str(total_restocked),                 self.theme.palette.success),
-                ('Currently Repawned',          str(currently_repawned_count),        self.theme.palette.danger),
-                ('Loan Amount Out',             format_currency(total_loan_amount),   self.theme.palette.warning),
-                ('Current Gold Weight (g)',     f'{total_gold_weight:.3f}',           self.theme.palette.info),
-                ('All-time Repawned',           str(all_repawned_count),              '#a855f7'),
-                ('All-time Restocked',          str(all_restocked_count),             self.theme.palette.success),
-                ('Still Out (All-time)',        str(max(0, all_repawned_count - all_restocked_count)),
-                                                                                      self.theme.palette.danger),
-            ],
-            columns=4,
-        )
+        def load():
+            # ── fetch data ──────────────────────────────────────────────────────────
+            all_history = get_repawn_history()
 
-        # ── 2. Statistics bar charts ─────────────────────────────────────────────
-        stat_card = self._make_card('📊 Repawning Statistics')
-        stat_card.pack(fill=tk.X, expand=False)
-
-        charts_row = tk.Frame(stat_card.inner, bg=self.theme.palette.bg_surface)
-        charts_row.pack(fill=tk.X, padx=10, pady=(0, 10))
-
-        month_repawn = {}
-        for rh in all_history:
-            if rh.get('status') == 'repawned':
-                key = (rh.get('repawned_at') or '')[:7]
-                if key:
-                    month_repawn[key] = month_repawn.get(key, 0) + 1
-        self._render_bar_chart(charts_row, 'Repawned Per Month',
-                               sorted(month_repawn.items())[-12:], '#a855f7')
-
-        dest_count = {}
-        for rh in all_history:
-            dest = (rh.get('destination') or 'Unknown').strip() or 'Unknown'
-            dest_count[dest] = dest_count.get(dest, 0) + 1
-        dest_pairs = sorted(dest_count.items(), key=lambda x: -x[1])[:8]
-        self._render_bar_chart(charts_row, 'Top Destinations', dest_pairs, self.theme.palette.info)
-
-        # ── 3. Currently repawned loans table ───────────────────────────────────
-        cur_card = self._make_card('📋 Currently Repawned Loans')
-        cur_card.pack(fill=tk.BOTH, expand=True)
-
-        cur_cols = [
-            ('Ticket #',     10), ('Customer', 15), ('NIC',        13),
-            ('Loan Amount',  12), ('Interest %', 10), ('Gold Wt (g)', 11),
-            ('Issue Date',   10), ('Expire Date', 10), ('Repawned On', 11),
-            ('Destination',  15), ('By',          14),
-        ]
-        cur_rows = []
-        for r in currently_repawned:
-            cur_rows.append([
-                r['ticket_no'],
-                r['customer_name'] or '-',
-                r['customer_nic'] or '-',
-                format_currency(r['loan_amount']),
-                f"{float(r['interest_rate']):.1f}%",
-                f"{float(r.get('total_gold_weight') or 0):.3f}",
-                format_date(r['issue_date']),
-                format_date(r['expire_date']),
-                format_date(r.get('repawned_at', '')),
-                r.get('destination') or '-',
-                r.get('repawned_by_name') or '-',
-            ])
-        self._render_table(cur_card.inner, cur_cols, cur_rows, ticket_col=0)
-        self._export_columns = [c[0] for c in cur_cols]
-        self._export_rows    = cur_rows
-        self._report_title   = 'repawning_current'
-
-        # ── 4. History filtered by date range ───────────────────────────────────
-        hist_card = self._make_card('📜 Repawn History (Date Range)')
-        hist_card.pack(fill=tk.BOTH, expand=True)
-
-        hist_cols = [
-            ('Ticket #',    10), ('Customer',    15), ('Loan Amount', 12),
-            ('Repawned On', 11), ('Restocked On', 11), ('Status',     10),
-            ('Destination', 15), ('By',           14), ('Remarks',    20),
-        ]
-        hist_rows = []
-        for rh in history_in_range:
-            hist_rows.append([
-                rh.get('ticket_no', '-'),
-                rh.get('customer_name', '-'),
-                format_currency(rh.get('loan_amount', 0)),
-                format_date(rh.get('repawned_at', '')),
-                format_date(rh.get('restock_at', '')) if rh.get('restock_at') else '-',
-                (rh.get('status') or '').upper(),
-                rh.get('destination') or '-',
-                rh.get('repawned_by_name') or '-',
-                rh.get('remarks') or '-',
-            ])
-        self._render_table(hist_card.inner, hist_cols, hist_rows, ticket_col=0)
+            def _in_range(dt_str):
+                try:
+                    d = (dt_str or '')[:10]
+                    return date_from <= d <= date_to
+                except Exception:
+                    return False
 
-        # ── 5. Full all-time history table ───────────────────────────────────────
-        full_card = self._make_card('📑 Full Repawn History (All Time)')
-        full_card.pack(fill=tk.BOTH, expand=True)
+            if _field == 'Restocked Date':
+                history_in_range = [rh for rh in all_history if _in_range(rh.get('restock_at', ''))]
+            else:
+                # Default: filter by repawned_at for all other field selections
+                history_in_range = [rh for rh in all_history if _in_range(rh.get('repawned_at', ''))]
+
+            currently_repawned = self._query(
+                '''SELECT l.ticket_no, l.loan_amount, l.interest_rate, l.duration_months,
+                          l.issue_date, l.expire_date, l.total_gold_weight,
+                          c.name AS customer_name, c.nic AS customer_nic,
+                          rh.repawned_at, rh.destination, rh.remarks,
+                          u.full_name AS repawned_by_name
+                   FROM loans l
+                   JOIN customers c ON l.customer_id=c.id
+                   LEFT JOIN repawn_history rh ON rh.loan_id=l.id AND rh.status='repawned'
+                   LEFT JOIN users u ON rh.repawned_by=u.id
+                   WHERE l.status='repawned'
+                   ORDER BY rh.repawned_at DESC'''
+            )
 
-        full_cols = [
-            ('Ticket #',     10), ('Customer',    15), ('Loan Amount',  12),
-            ('Repawned On',  11), ('Restocked On', 11), ('Status',      10),
-            ('Destination',  15), ('Repawned By',  14), ('Restocked By', 14),
-            ('Remarks',      20),
-        ]
-        full_rows = []
-        for rh in all_history:
-            full_rows.append([
-                rh.get('ticket_no', '-'),
-                rh.get('customer_name', '-'),
-                format_currency(rh.get('loan_amount', 0)),
-                format_date(rh.get('repawned_at', '')),
-                format_date(rh.get('restock_at', '')) if rh.get('restock_at') else '-',
-                (rh.get('status') or '').upper(),
-                rh.get('destination') or '-',
-                rh.get('repawned_by_name') or '-',
-                rh.get('restock_by_name') or '-',
-                rh.get('remarks') or '-',
-            ])
-        self._render_table(full_card.inner, full_cols, full_rows, ticket_col=0)
+            restocked_in_range   = [rh for rh in history_in_range if rh.get('status') == 'restocked']
+            repawned_in_range    = [rh for rh in history_in_range if rh.get('status') == 'repawned']
+            total_repawned       = len(repawned_in_range)
+            total_restocked      = len(restocked_in_range)
+            currently_repawned_count = len(currently_repawned)
+            total_loan_amount    = sum(float(rh.get('loan_amount') or 0) for rh in repawned_in_range)
+            total_gold_weight    = sum(float(r.get('total_gold_weight') or 0) for r in currently_repawned)
+            all_repawned_count   = sum(1 for rh in all_history if rh.get('status') == 'repawned')
+            all_restocked_count  = sum(1 for rh in all_history if rh.get('status') == 'restocked')
+
+            return (all_history, history_in_range, currently_repawned, total_repawned, total_restocked,
+                    currently_repawned_count, total_loan_amount, total_gold_weight, all_repawned_count,
+                    all_restocked_count)
+
+        def render(data):
+            (all_history, history_in_range, currently_repawned, total_repawned, total_restocked,
+             currently_repawned_count, total_loan_amount, total_gold_weight, all_repawned_count,
+             all_restocked_count) = data
+
+            # ── 1. KPI overview — uses _make_card so it sits in report_content like other tabs ──
+            ov = self._make_card('♻ Repawning Overview')
+            ov.inner.configure(bg=self.theme.palette.bg_surface)
+            # override title label colour
+            for w in ov.inner.winfo_children():
+                try:
+                    w.configure(fg='#a855f7')
+                    break
+                except Exception:
+                    pass
+            ov.pack(fill=tk.X, expand=False)
+
+            self._render_kpis(
+                ov.inner,
+                [
+                    ('Repawned (Period)',           str(total_repawned),                  '#a855f7'),
+                    ('Restocked (Period)',          str(total_restocked),                 self.theme.palette.success),
+                    ('Currently Repawned',          str(currently_repawned_count),        self.theme.palette.danger),
+                    ('Loan Amount Out',             format_currency(total_loan_amount),   self.theme.palette.warning),
+                    ('Current Gold Weight (g)',     f'{total_gold_weight:.3f}',           self.theme.palette.info),
+                    ('All-time Repawned',           str(all_repawned_count),              '#a855f7'),
+                    ('All-time Restocked',          str(all_restocked_count),             self.theme.palette.success),
+                    ('Still Out (All-time)',        str(max(0, all_repawned_count - all_restocked_count)),
+                                                                                          self.theme.palette.danger),
+                ],
+                columns=4,
+            )
+
+            # ── 2. Statistics bar charts ─────────────────────────────────────────────
+            stat_card = self._make_card('📊 Repawning Statistics')
+            stat_card.pack(fill=tk.X, expand=False)
+
+            charts_row = tk.Frame(stat_card.inner, bg=self.theme.palette.bg_surface)
+            charts_row.pack(fill=tk.X, padx=10, pady=(0, 10))
+
+            month_repawn = {}
+            for rh in all_history:
+                if rh.get('status') == 'repawned':
+                    key = (rh.get('repawned_at') or '')[:7]
+                    if key:
+                        month_repawn[key] = month_repawn.get(key, 0) + 1
+            self._render_bar_chart(charts_row, 'Repawned Per Month',
+                                   sorted(month_repawn.items())[-12:], '#a855f7')
+
+            dest_count = {}
+            for rh in all_history:
+                dest = (rh.get('destination') or 'Unknown').strip() or 'Unknown'
+                dest_count[dest] = dest_count.get(dest, 0) + 1
+            dest_pairs = sorted(dest_count.items(), key=lambda x: -x[1])[:8]
+            self._render_bar_chart(charts_row, 'Top Destinations', dest_pairs, self.theme.palette.info)
+
+            # ── 3. Currently repawned loans table ───────────────────────────────────
+            cur_card = self._make_card('📋 Currently Repawned Loans')
+            cur_card.pack(fill=tk.BOTH, expand=True)
+
+            cur_cols = [
+                ('Ticket #',     10), ('Customer', 15), ('NIC',        13),
+                ('Loan Amount',  12), ('Interest %', 10), ('Gold Wt (g)', 11),
+                ('Issue Date',   10), ('Expire Date', 10), ('Repawned On', 11),
+                ('Destination',  15), ('By',          14),
+            ]
+            cur_rows = []
+            for r in currently_repawned:
+                cur_rows.append([
+                    r['ticket_no'],
+                    r['customer_name'] or '-',
+                    r['customer_nic'] or '-',
+                    format_currency(r['loan_amount']),
+                    f"{float(r['interest_rate']):.1f}%",
+                    f"{float(r.get('total_gold_weight') or 0):.3f}",
+                    format_date(r['issue_date']),
+                    format_date(r['expire_date']),
+                    format_date(r.get('repawned_at', '')),
+                    r.get('destination') or '-',
+                    r.get('repawned_by_name') or '-',
+                ])
+            self._render_table(cur_card.inner, cur_cols, cur_rows, ticket_col=0)
+            self._export_columns = [c[0] for c in cur_cols]
+            self._export_rows    = cur_rows
+            self._report_title   = 'repawning_current'
+
+            # ── 4. History filtered by date range ───────────────────────────────────
+            hist_card = self._make_card('📜 Repawn History (Date Range)')
+            hist_card.pack(fill=tk.BOTH, expand=True)
+
+            hist_cols = [
+                ('Ticket #',    10), ('Customer',    15), ('Loan Amount', 12),
+                ('Repawned On', 11), ('Restocked On', 11), ('Status',     10),
+                ('Destination', 15), ('By',           14), ('Remarks',    20),
+            ]
+            hist_rows = []
+            for rh in history_in_range:
+                hist_rows.append([
+                    rh.get('ticket_no', '-'),
+                    rh.get('customer_name', '-'),
+                    format_currency(rh.get('loan_amount', 0)),
+                    format_date(rh.get('repawned_at', '')),
+                    format_date(rh.get('restock_at', '')) if rh.get('restock_at') else '-',
+                    (rh.get('status') or '').upper(),
+                    rh.get('destination') or '-',
+                    rh.get('repawned_by_name') or '-',
+                    rh.get('remarks') or '-',
+                ])
+            self._render_table(hist_card.inner, hist_cols, hist_rows, ticket_col=0)
+
+            # ── 5. Full all-time history table ───────────────────────────────────────
+            full_card = self._make_card('📑 Full Repawn History (All Time)')
+            full_card.pack(fill=tk.BOTH, expand=True)
+
+            full_cols = [
+                ('Ticket #',     10), ('Customer',    15), ('Loan Amount',  12),
+                ('Repawned On',  11), ('Restocked On', 11), ('Status',      10),
+                ('Destination',  15), ('Repawned By',  14), ('Restocked By', 14),
+                ('Remarks',      20),
+            ]
+            full_rows = []
+            for rh in all_history:
+                full_rows.append([
+                    rh.get('ticket_no', '-'),
+                    rh.get('customer_name', '-'),
+                    format_currency(rh.get('loan_amount', 0)),
+                    format_date(rh.get('repawned_at', '')),
+                    format_date(rh.get('restock_at', '')) if rh.get('restock_at') else '-',
+                    (rh.get('status') or '').upper(),
+                    rh.get('destination') or '-',
+                    rh.get('repawned_by_name') or '-',
+                    rh.get('restock_by_name') or '-',
+                    rh.get('remarks') or '-',
+                ])
+            self._render_table(full_card.inner, full_cols, full_rows, ticket_col=0)
+
+        self._run_report(load, render)
@@ -9,13 +9,16 @@ import os
 import json
 import math
 import re
+import threading
+import uuid
 
 from database import (
+    cancel_sms_batch,
     delete_sms_template,
-    get_customer,
     get_setting,
     get_loan,
     get_sms_analytics,
+    get_sms_batch_progress,
     get_upcoming_birthdays,
     list_sms_messages,
     list_sms_messages_filtered,
@@ -30,10 +33,9 @@ from database import (
     list_scheduled_sms,
     update_customer_birthday,
     get_wished_customer_ids_this_year,
-    get_connection,
 )
-from sms_service import build_sms_context, render_template, send_sms
-from sms_service import normalize_phone_number
+from sms_service import build_sms_context, build_sms_contexts, compile_template, queue_sms_jobs, render_template
+from sms_service import invalidate_sms_settings, normalize_phone_number, resend_sms
 
 
 # ── Modern Color Palette ──────────────────────────────────────────────────────
@@ -130,6 +132,7 @@ CATEGORY_LABELS = {
 STATUS_COLORS = {
     'sent': '#10b981', 'failed': '#ef4444',
     'pending': '#f59e0b', 'scheduled': '#6366f1',
+    'queued': '#f59e0b', 'claimed': '#6366f1', 'cancelled': '#94a3b8',
 }
 
 # ── SVG-style icon set using Unicode & styled labels ─────────────────────────
@@ -917,22 +920,14 @@ class SmsCenterPage:
             if not messagebox.askyesno('Confirm', f'Send SMS to {len(recipients)} recipients?'):
                 return
 
-        sent = failed = 0
+        jobs = []
         for r in recipients:
             phone = r.get('phone', '')
             customer = {'id': r.get('id') or r.get('customer_id'), 'name': r.get('name', ''),
                         'nic': r.get('nic', ''), 'phone': phone}
-            context = build_sms_context(customer=customer, loan=r, message=raw_message)
-            final_message = render_template(raw_message, context)
-            ok, _, _ = send_sms(phone, final_message, customer=customer, loan=r,
-                                category='custom', sent_by=self.user['id'])
-            if ok:
-                sent += 1
-            else:
-                failed += 1
-
-        self._toast('SMS Result', f'✅ Sent: {sent}\n❌ Failed: {failed}',
-                    'success' if failed == 0 else 'warning')
+            jobs.append({'recipient': phone, 'template': raw_message, 'customer': customer, 'loan': r,
+                         'category': 'custom', 'sent_by': self.user['id']})
+        self._open_dispatch_dialog('SMS Result', jobs)
 
     # ══════════════════════════════════════════════════════════════════════
     # TAB 2 — Auto SMS (Modern)
@@ -1063,6 +1058,7 @@ class SmsCenterPage:
                 body = self._get_text(text_widget)
                 save_sms_template(template_cat, label, body, True, self.user['id'])
                 self.templates[template_cat] = {'title': label, 'body': body, 'is_active': 1}
+        invalidate_sms_settings()
 
         messagebox.showinfo('Success', 'All auto SMS settings and templates saved.')
 
@@ -1276,19 +1272,99 @@ class SmsCenterPage:
         if not messagebox.askyesno('Confirm', f'Send promotion SMS to {len(customers)} customer{"s" if len(customers) > 1 else ""}?'):
             return
 
-        sent = failed = 0
-        for customer in customers:
-            context = build_sms_context(customer=customer, message=raw_message)
-            message = render_template(raw_message, context)
-            ok, _, _ = send_sms(customer.get('phone', ''), message, customer=customer,
-                                category='promotion', sent_by=self.user['id'])
-            if ok:
-                sent += 1
-            else:
-                failed += 1
+        jobs = [
+            {'recipient': customer.get('phone', ''), 'template': raw_message, 'customer': customer,
+             'category': 'promotion', 'sent_by': self.user['id']}
+            for customer in customers
+        ]
+        self._open_dispatch_dialog('Promotion SMS', jobs)
+
+    def _open_dispatch_dialog(self, title, jobs):
+        """Queue jobs as one outbox batch and follow it with a progress dialog; toast the totals when done."""
+        batch_id = uuid.uuid4().hex
+        state = {'queued': None, 'rejected': 0, 'stop': False}
+        # Whichever of enqueue() and stop() runs second sees the other's flag
+        # and cancels the batch, so a Stop during queueing is never lost.
+        handoff = threading.Lock()
 
-        self._toast('Promotion SMS', f'✅ Sent: {sent}\n❌ Failed: {failed}',
-                    'success' if failed == 0 else 'warning')
+        def enqueue():
+            try:
+                queued, rejected = queue_sms_jobs(jobs, batch_id=batch_id, db_path=self.db_path)
+            except Exception as exc:
+                print(f"SMS enqueue failed: {exc}")
+                queued, rejected = 0, jobs
+            with handoff:
+                state['rejected'] = len(rejected)
+                state['queued'] = queued
+                stopped = state['stop']
+            if stopped:
+                cancel_sms_batch(batch_id, db_path=self.db_path)
+
+        threading.Thread(target=enqueue, daemon=True).start()
+
+        dialog = status_lbl = progress_var = None
+        if len(jobs) > 1:
+            dialog = tk.Toplevel(self.container)
+            dialog.title(title)
+            dialog.geometry("460x170")
+            dialog.configure(bg=self.MC.surface)
+            dialog.transient(self.container)
+
+            main_frm = tk.Frame(dialog, bg=self.MC.surface)
+            main_frm.pack(fill=tk.BOTH, expand=True, padx=20, pady=16)
+
+            progress_var = tk.DoubleVar()
+            ttk.Progressbar(main_frm, variable=progress_var, maximum=len(jobs)).pack(fill=tk.X, pady=(0, 10))
+            status_lbl = tk.Label(
+                main_frm, text=f"Queueing {len(jobs)} messages...",
+                font=('Segoe UI', 9), bg=dialog['bg'], fg=self.MC.text
+            )
+            status_lbl.pack(anchor='w', pady=(0, 12))
+
+            btn_row = tk.Frame(main_frm, bg=dialog['bg'])
+            btn_row.pack(fill=tk.X)
+
+            def stop():
+                with handoff:
+                    state['stop'] = True
+                    queued = state['queued'] is not None
+                if queued:
+                    cancel_sms_batch(batch_id, db_path=self.db_path)
+                btn_stop.configure(text='Stopping...', state='disabled')
+
+            btn_stop = self._modern_button(btn_row, 'Stop', stop, kind='danger')
+            btn_stop.pack(side=tk.RIGHT)
+            dialog.protocol('WM_DELETE_WINDOW', stop)
+
+        def poll():
+            if not self.container.winfo_exists():
+                # Page closed; the sender still delivers the batch.
+                return
+            if state['queued'] is None:
+                self.container.after(300, poll)
+                return
+            counts = get_sms_batch_progress(batch_id, db_path=self.db_path)
+            sent = counts.get('sent', 0)
+            failed = counts.get('failed', 0) + state['rejected']
+            stopped = counts.get('cancelled', 0)
+            pending = counts.get('queued', 0) + counts.get('claimed', 0)
+            if dialog is not None and status_lbl.winfo_exists():
+                progress_var.set(sent + failed + stopped)
+                status_lbl.configure(text=f"{sent + failed + stopped} / {len(jobs)}   ✅ {sent}   ❌ {failed}")
+            if pending:
+                self.container.after(500, poll)
+                return
+            if dialog is not None and dialog.winfo_exists():
+                dialog.destroy()
+            summary = f'✅ Sent: {sent}\n❌ Failed: {failed}'
+            if stopped:
+                summary += f'\n⏹ Not sent (stopped): {stopped}'
+            skipped = len(jobs) - state['rejected'] - state['queued']
+            if skipped:
+                summary += f'\n↩ Already queued: {skipped}'
+            self._toast(title, summary, 'success' if failed == 0 and not stopped else 'warning')
+
+        self.container.after(300, poll)
 
     # ══════════════════════════════════════════════════════════════════════
     # TAB 4 — Birthday Wishes
@@ -1825,122 +1901,12 @@ class SmsCenterPage:
         if not messagebox.askyesno('Confirm', f'Send birthday wishes to {len(customers)} customer{"s" if len(customers) > 1 else ""}?'):
             return
 
-        self._open_sequential_sender_dialog(customers, raw_message)
-
-    def _open_sequential_sender_dialog(self, customers, message_template):
-        dialog = tk.Toplevel(self.container)
-        dialog.title("Campaign Sequencer")
-        dialog.geometry("550x450")
-        dialog.configure(bg=self.MC.surface)
-        dialog.transient(self.container)
-        dialog.grab_set()
-
-        dialog.update_idletasks()
-        x = self.container.winfo_rootx() + (self.container.winfo_width() - dialog.winfo_width()) // 2
-        y = self.container.winfo_rooty() + (self.container.winfo_height() - dialog.winfo_height()) // 2
-        dialog.geometry(f"+{x}+{y}")
-
-        main_frm = tk.Frame(dialog, bg=self.MC.surface)
-        main_frm.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
-
-        tk.Label(
-            main_frm, text="SMS Campaign Progress",
-            font=('Segoe UI', 14, 'bold'), bg=dialog['bg'], fg=self.MC.text
-        ).pack(anchor='w', pady=(0, 6))
-
-        progress_var = tk.DoubleVar()
-        progress_bar = ttk.Progressbar(main_frm, variable=progress_var, maximum=len(customers))
-        progress_bar.pack(fill=tk.X, pady=(0, 10))
-
-        status_lbl = tk.Label(
-            main_frm, text=f"Preparing campaign for {len(customers)} recipients...",
-            font=('Segoe UI', 9), bg=dialog['bg'], fg=self.MC.text
-        )
-        status_lbl.pack(anchor='w', pady=(0, 4))
-        
-        countdown_lbl = tk.Label(
-            main_frm, text="",
-            font=('Segoe UI', 10, 'bold'), bg=dialog['bg'], fg=self.MC.primary
-        )
-        countdown_lbl.pack(anchor='w', pady=(0, 10))
-
-        log_box = tk.Text(
-            main_frm, height=12, wrap='word',
-            bg=self.MC.surface_alt, fg=self.MC.text,
-            font=('Segoe UI', 8), relief='flat', bd=0, padx=8, pady=8
-        )
-        log_box.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
-
-        btn_row = tk.Frame(main_frm, bg=dialog['bg'])
-        btn_row.pack(fill=tk.X)
-
-        campaign_state = {
-            'index': 0,
-            'countdown': 0,
-            'cancelled': False,
-            'sent': 0,
-            'failed': 0
-        }
-
-        def append_log(txt):
-            log_box.insert(tk.END, f"[{datetime.now().strftime('%H:%M:%S')}] {txt}\n")
-            log_box.see(tk.END)
-
-        def stop_campaign():
-            campaign_state['cancelled'] = True
-            append_log("Campaign cancelled by user.")
-            btn_stop.configure(text="Close", command=dialog.destroy)
-
-        btn_stop = self._modern_button(btn_row, 'Stop Campaign', stop_campaign, kind='primary')
-        btn_stop.pack(side=tk.RIGHT)
-
-        def tick():
-            if campaign_state['cancelled']:
-                return
-
-            idx = campaign_state['index']
-            if idx >= len(customers):
-                append_log(f"Campaign complete. Success: {campaign_state['sent']}, Failed: {campaign_state['failed']}")
-                btn_stop.configure(text="Close", command=dialog.destroy)
-                countdown_lbl.configure(text="Campaign Finished! 🎉", fg=self.MC.success)
-                return
-
-            if campaign_state['countdown'] > 0:
-                countdown_lbl.configure(text=f"Next message in {campaign_state['countdown']} seconds...", fg=self.MC.primary)
-                campaign_state['countdown'] -= 1
-                dialog.after(1000, tick)
-                return
-
-            customer = customers[idx]
-            recipient = customer.get('phone', '')
-            context = build_sms_context(customer=customer, message=message_template)
-            message = render_template(message_template, context)
-
-            append_log(f"Sending to {customer['name']} ({recipient})...")
-            
-            ok, msg_text, _ = send_sms(
-                recipient, message, customer=customer,
-                category='birthday', sent_by=self.user['id']
-            )
-
-            if ok:
-                campaign_state['sent'] += 1
-                append_log(f"✅ Sent successfully to {customer['name']}.")
-            else:
-                campaign_state['failed'] += 1
-                append_log(f"❌ Failed: {msg_text}")
-
-            campaign_state['index'] += 1
-            progress_var.set(campaign_state['index'])
-            
-            if campaign_state['index'] < len(customers):
-                campaign_state['countdown'] = 3
-                countdown_lbl.configure(text="Next message in 3 seconds...", fg=self.MC.primary)
-                dialog.after(1000, tick)
-            else:
-                dialog.after(100, tick)
-
-        tick()
+        jobs = [
+            {'recipient': customer.get('phone', ''), 'template': raw_message, 'customer': customer,
+             'category': 'birthday', 'sent_by': self.user['id']}
+            for customer in customers
+        ]
+        self._open_dispatch_dialog('Birthday Wishes', jobs)
 
     def _schedule_birthday_sms(self):
         raw_message = self._get_text(self.bday_message_text)
@@ -2021,10 +1987,11 @@ class SmsCenterPage:
                 messagebox.showerror("Error", "Invalid date/time conversion.", parent=dialog)
                 return
 
-            for customer in customers:
+            template = compile_template(raw_message)
+            contexts = build_sms_contexts([(customer, None) for customer in customers], message=raw_message)
+            for customer, context in zip(customers, contexts):
                 recipient = customer.get('phone', '')
-                context = build_sms_context(customer=customer, message=raw_message)
-                message = render_template(raw_message, context)
+                message = template.render(context)
 
                 add_scheduled_sms(
                     recipient=recipient,
@@ -2129,39 +2096,12 @@ class SmsCenterPage:
         values = self.failed_tree.item(selected_item, 'values')
         msg_id = int(values[0])
         recipient = values[1]
-        
-        conn = get_connection()
-        row = conn.execute("SELECT message, category, customer_id, loan_id FROM sms_messages WHERE id = ?", (msg_id,)).fetchone()
-        conn.close()
-        
-        if not row:
-            self._toast('Error', 'Failed to retrieve the message content from the database.', 'error')
-            return
-            
-        message = row['message']
-        category = row['category']
-        customer_id = row['customer_id']
-        loan_id = row['loan_id']
-        
-        customer = None
-        if customer_id:
-            customer = get_customer(customer_id)
-
-        ok, res_text, _ = send_sms(
-            recipient=recipient,
-            message=message,
-            customer=customer,
-            category=category,
-            sent_by=self.user['id']
-        )
-        
+
+        # Back into the outbox on the same row; the sender records the outcome.
+        ok, res_text = resend_sms(msg_id, sent_by=self.user['id'], db_path=self.db_path)
+
         if ok:
-            conn = get_connection()
-            conn.execute("DELETE FROM sms_messages WHERE id = ?", (msg_id,))
-            conn.commit()
-            conn.close()
-            
-            self._toast('Success', f'SMS resent successfully to {recipient}!', 'success')
+            self._toast('Success', f'SMS to {recipient} queued for resending.', 'success')
             self._refresh_failed_list()
             if hasattr(self, '_refresh_history_table'):
                 self._refresh_history_table()
@@ -2395,7 +2335,7 @@ class SmsCenterPage:
                                  command=lambda _: self._refresh_history()).pack(side=tk.LEFT, padx=(8, 8))
 
         self.hist_status_var = tk.StringVar(value='All')
-        self.theme.make_combobox(filter_row, variable=self.hist_status_var, values=['All', 'Sent', 'Failed', 'Pending'], width=10,
+        self.theme.make_combobox(filter_row, variable=self.hist_status_var, values=['All', 'Sent', 'Failed', 'Queued', 'Pending', 'Cancelled'], width=10,
                                  command=lambda _: self._refresh_history()).pack(side=tk.LEFT, padx=(0, 8))
 
         self._modern_button(filter_row, 'Refresh', self._refresh_history,
@@ -2431,6 +2371,9 @@ class SmsCenterPage:
         self.hist_tree.tag_configure('sent', foreground='#16a34a')
         self.hist_tree.tag_configure('failed', foreground='#dc2626')
         self.hist_tree.tag_configure('pending', foreground='#d97706')
+        self.hist_tree.tag_configure('queued', foreground='#d97706')
+        self.hist_tree.tag_configure('claimed', foreground='#4f46e5')
+        self.hist_tree.tag_configure('cancelled', foreground='#64748b')
 
         # Bind click to show detail popup
         self.hist_tree.bind('<ButtonRelease-1>', self._on_history_click)
@@ -2550,31 +2493,11 @@ class SmsCenterPage:
                     self._toast('No Internet', 'Internet connection required to resend.', 'warning')
                     return
 
-                msg_id = msg.get('id')
                 recipient = msg.get('recipient', '')
-                message = msg.get('message', '')
-                category = msg.get('category', '')
-                customer_id = msg.get('customer_id')
-                loan_id = msg.get('loan_id')
-
-                customer = None
-                if customer_id:
-                    customer = get_customer(customer_id)
-
-                ok, res_text, _ = send_sms(
-                    recipient=recipient,
-                    message=message,
-                    customer=customer,
-                    category=category,
-                    sent_by=self.user['id']
-                )
+                ok, res_text = resend_sms(msg.get('id'), sent_by=self.user['id'], db_path=self.db_path)
 
                 if ok:
-                    conn = get_connection()
-                    conn.execute("DELETE FROM sms_messages WHERE id = ?", (msg_id,))
-                    conn.commit()
-                    conn.close()
-                    self._toast('Success', f'SMS resent successfully to {recipient}!', 'success')
+                    self._toast('Success', f'SMS to {recipient} queued for resending.', 'success')
                     popup.destroy()
                     self._refresh_history()
                 else:
@@ -2592,7 +2515,8 @@ class SmsCenterPage:
             'Renewal': 'auto_renewal', 'Redemption': 'auto_redemption', 'Reminder': 'auto_reminder',
             'Promotion': 'promotion', 'Birthday': 'birthday', 'Loan Status': 'order_status',
         }
-        status_map = {'All': '', 'Sent': 'sent', 'Failed': 'failed', 'Pending': 'pending'}
+        status_map = {'All': '', 'Sent': 'sent', 'Failed': 'failed', 'Queued': 'queued', 'Pending': 'pending',
+                      'Cancelled': 'cancelled'}
 
         cat = cat_map.get(self.hist_cat_var.get(), '')
         status = status_map.get(self.hist_status_var.get(), '')
@@ -1,22 +1,51 @@
 """Text.lk SMS gateway helpers for the gold loan basic package."""
 
+import os
 import re
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 
 from database import (
+    SMS_LEASE_SECONDS,
+    claim_sms_messages,
+    enqueue_sms,
+    enqueue_sms_many,
+    expire_sms_leases,
+    finish_sms_messages,
     get_customer,
-    get_latest_loan_for_customer,
+    get_latest_loans_for_customers,
     get_loan,
-    get_setting,
+    get_pool_generation,
+    get_settings,
     get_sms_settings,
     log_sms_message,
+    release_sms_messages,
+    requeue_sms_message,
 )
-from utils import calculate_total_payable
+from utils import calculate_total_payable_batch
 
 
 TEXTLK_DEFAULT_URL = 'https://app.text.lk/api/v3/sms/send'
+# Recipients per multi-recipient request (comma-separated `recipient`).
+TEXTLK_BULK_SIZE = 100
+
+# Bulk sends stay under the Text.lk API throttle: a steady rate with a small
+# burst, shared by every worker. A 429 pauses the whole bucket.
+TEXTLK_RATE_PER_SECOND = 5.0
+TEXTLK_RATE_BURST = 5
+SMS_DISPATCH_WORKERS = 4
+SMS_SEND_ATTEMPTS = 3
+SMS_RETRY_BASE_DELAY = 1.0
+SMS_RETRY_MAX_DELAY = 30.0
 
 
 def normalize_phone_number(phone, default_country_code='94'):
@@ -38,45 +67,99 @@ def normalize_phone_number(phone, default_country_code='94'):
     return digits
 
 
-def render_template(text, context=None):
-    context = context or {}
-    template = str(text or '')
+_PLACEHOLDER = re.compile(r'\{\{\s*([a-zA-Z0-9_]+)\s*\}\}')
 
-    def replace(match):
-        key = match.group(1).strip()
-        value = context.get(key, '')
-        return '' if value is None else str(value)
 
-    return re.sub(r'\{\{\s*([a-zA-Z0-9_]+)\s*\}\}', replace, template)
+class SmsTemplate:
+    """An SMS template parsed once into literal text and {{placeholder}} slots.
 
+    render(context) returns what render_template() does; a batch renders one
+    compiled template per recipient instead of re-scanning the text each time.
+    """
 
-def build_sms_context(customer=None, loan=None, message=''):
-    customer = customer or {}
-    loan = loan or {}
+    __slots__ = ('text', 'keys', '_literals', '_slots')
 
-    # Auto-resolve latest customer loan so loan placeholders work in custom/promotion SMS.
-    if not loan and customer and customer.get('id'):
-        resolved = get_latest_loan_for_customer(customer.get('id'))
-        if resolved:
-            loan = resolved
+    def __init__(self, text):
+        self.text = str(text or '')
+        pieces = _PLACEHOLDER.split(self.text)
+        self._literals = pieces[0::2]
+        self._slots = pieces[1::2]
+        self.keys = frozenset(self._slots)
 
-    def _to_float(value):
-        try:
-            return float(value)
-        except (TypeError, ValueError):
-            return 0.0
+    def render(self, context=None):
+        context = context or {}
+        parts = [self._literals[0]]
+        for key, literal in zip(self._slots, self._literals[1:]):
+            value = context.get(key, '')
+            parts.append('' if value is None else str(value))
+            parts.append(literal)
+        return ''.join(parts)
+
+
+@lru_cache(maxsize=64)
+def compile_template(text):
+    """The SmsTemplate for text, parsed once per distinct template."""
+    return SmsTemplate(text)
 
-    company_name = get_setting('company_name', 'Gold Loan Center')
-    company_phone = get_setting('company_phone', '')
-    company_address = get_setting('company_address', '')
 
+def render_template(text, context=None):
+    return compile_template(str(text or '')).render(context)
+
+
+_COMPANY_SETTINGS = (
+    ('company_name', 'Gold Loan Center'),
+    ('company_phone', ''),
+    ('company_address', ''),
+)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def build_sms_context(customer=None, loan=None, message='', db_path=None):
+    return build_sms_contexts([(customer, loan)], message=message, db_path=db_path)[0]
+
+
+def build_sms_contexts(pairs, message='', db_path=None):
+    """build_sms_context() for many (customer, loan) pairs in a fixed number of queries.
+
+    Company settings are read once, customers given without a loan get their
+    latest loan from one query (so loan placeholders work in custom and
+    promotion SMS), and total_interest for every loan comes from one
+    calculate_total_payable_batch() call.
+    """
+    pairs = [(customer or {}, loan or {}) for customer, loan in pairs]
+    missing = [customer['id'] for customer, loan in pairs if not loan and customer.get('id')]
+    latest = get_latest_loans_for_customers(missing, db_path=db_path) if missing else {}
+    pairs = [(customer, loan or latest.get(customer.get('id')) or {}) for customer, loan in pairs]
+
+    stored = get_settings([key for key, _ in _COMPANY_SETTINGS], db_path=db_path)
+    now = datetime.now()
+    base = {key: stored.get(key, default) for key, default in _COMPANY_SETTINGS}
+    base.update(message=message, date=now.strftime('%Y-%m-%d'), time=now.strftime('%H:%M'))
+
+    # Accurate total interest = accrued interest + overdue interest (actual current values)
+    loans = [loan for _, loan in pairs if loan]
+    payable = calculate_total_payable_batch(
+        [_to_float(loan.get('interest_principal_amount') or loan.get('loan_amount')) for loan in loans],
+        [_to_float(loan.get('interest_rate')) for loan in loans],
+        [_to_float(loan.get('overdue_interest_rate', 0)) for loan in loans],
+        [loan.get('expire_date') or '' for loan in loans],
+        [loan.get('renew_date') or loan.get('issue_date') or '' for loan in loans],
+    )
+    total_interest = iter([
+        round(interest + overdue, 2) for interest, overdue in zip(payable['interest'], payable['overdue_interest'])
+    ])
+    return [_sms_context(base, customer, loan, next(total_interest) if loan else None) for customer, loan in pairs]
+
+
+def _sms_context(base, customer, loan, total_interest):
     context = {
-        'company_name': company_name,
-        'company_phone': company_phone,
-        'company_address': company_address,
-        'message': message,
-        'date': datetime.now().strftime('%Y-%m-%d'),
-        'time': datetime.now().strftime('%H:%M'),
+        **base,
         'loan_status': loan.get('status', ''),
         'ticket_no': '',
         'loan_amount': '',
@@ -129,17 +212,6 @@ def build_sms_context(customer=None, loan=None, message=''):
         # Simple payable projection used in templates: principal + normal interest for duration.
         total_payable = principal + (principal * (monthly_rate_pct / 100.0) * duration_months)
 
-        # Accurate total interest = accrued interest + overdue interest (actual current values)
-        _principal_base = _to_float(loan.get('interest_principal_amount') or loan.get('loan_amount'))
-        _accrual_start = loan.get('renew_date') or loan.get('issue_date') or ''
-        _expire_date = loan.get('expire_date') or ''
-        _payable = calculate_total_payable(
-            _principal_base, monthly_rate_pct, duration_months,
-            _to_float(loan.get('overdue_interest_rate', 0)),
-            _expire_date, _accrual_start
-        )
-        total_interest = round(_payable['interest'] + _payable['overdue_interest'], 2)
-
         context.update({
             'loan_id': loan.get('id', ''),
             'ticket_no': loan.get('ticket_no', ''),
@@ -179,81 +251,282 @@ def build_sms_context(customer=None, loan=None, message=''):
     return context
 
 
-def send_sms(recipient, message, *, customer=None, loan=None, category='custom', sent_by=None, db_path=None):
-    settings = get_sms_settings(db_path)
-    sender_id = (settings.get('sms_sender_id') or '').strip()
-    token = (settings.get('sms_gateway_token') or '').strip()
-    url = (settings.get('sms_gateway_base_url') or TEXTLK_DEFAULT_URL).strip() or TEXTLK_DEFAULT_URL
+def _retry_delay(response, attempt):
+    """Seconds to wait before retry number attempt + 1; honours a numeric Retry-After."""
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = SMS_RETRY_BASE_DELAY * (2 ** attempt)
+    return min(max(delay, 0.0), SMS_RETRY_MAX_DELAY)
+
+
+# Only failures where the gateway cannot have taken the message are retried;
+# a read timeout or a 500 may follow a send that went out.
+_RETRY_STATUSES = (429, 502, 503, 504)
+
+
+def _never_reached_gateway(exc):
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    return isinstance(exc, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def _backoff(delay, cancelled):
+    """Sleep delay seconds; True if cancelled was set meanwhile."""
+    if cancelled is not None:
+        return cancelled.wait(delay)
+    time.sleep(delay)
+    return False
+
+
+# Per-recipient states in a bulk reply that mean that number was not sent.
+_FAILED_RECIPIENT_STATUSES = ('failed', 'rejected', 'undelivered', 'error', 'invalid')
+
+
+def _recipient_outcomes(data):
+    """{number: (status, provider_message_id, item)} from a reply that lists its recipients, else {}.
+
+    Text.lk answers a multi-recipient send either with one sms_id for the
+    request or with a list of per-number entries (under data, or under
+    data.recipients / data.messages); only the list says which numbers failed.
+    """
+    items = data.get('data') if isinstance(data, dict) else None
+    if isinstance(items, dict):
+        items = items.get('recipients') or items.get('messages')
+    if not isinstance(items, list):
+        return {}
+    outcomes = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        number = re.sub(r'\D+', '', str(item.get('recipient') or item.get('to') or item.get('phone') or ''))
+        if not number:
+            continue
+        state = item.get('status', True)
+        failed = state is False or str(state).strip().lower() in _FAILED_RECIPIENT_STATUSES
+        outcomes[number] = ('failed' if failed else 'sent', str(item.get('sms_id') or item.get('uid') or ''), item)
+    return outcomes
+
+
+# ── Gateway client ──
+# One client per process: its requests.Session keeps the connection to the
+# gateway alive between messages (no new TCP and TLS handshake per SMS), and
+# the SMS settings are read once and kept until invalidate_sms_settings(),
+# which the settings screens call after saving. send_sms() and the outbox
+# sender go through it, so every SMS shares the same pool.
+
+
+class SmsGatewayClient:
+    """Text.lk sender holding a pooled requests.Session and the cached SMS settings."""
+
+    def __init__(self, pool_size=SMS_DISPATCH_WORKERS * 2):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._settings = {}
+        self._lock = threading.Lock()
+
+    def settings(self, db_path=None):
+        """get_sms_settings(db_path), read once until invalidate().
+
+        Keyed on the pool generation too, so a restored backup (which closes
+        every pooled connection) is read afresh instead of keeping the
+        replaced file's token, sender ID and country code.
+        """
+        key = (db_path, get_pool_generation())
+        with self._lock:
+            cached = self._settings.get(key)
+        if cached is None:
+            cached = get_sms_settings(db_path)
+            with self._lock:
+                for stale in [k for k in self._settings if k[1] != key[1]]:
+                    del self._settings[stale]
+                self._settings[key] = cached
+        return cached
+
+    def invalidate(self):
+        with self._lock:
+            self._settings.clear()
+
+    def close(self):
+        self.session.close()
+
+    def deliver(self, recipient, message, *, db_path=None, attempts=1, limiter=None, cancelled=None):
+        """POST one SMS to Text.lk without recording it; returns (ok, message_text, data, record).
+
+        attempts > 1 retries throttled (429), gateway-unavailable and connection
+        failures with exponential backoff. limiter (a TokenBucket) gates every
+        HTTP attempt, and cancelled (a threading.Event) abandons the send
+        between attempts. record holds the sms_messages fields of the outcome
+        (recipient, recipients, message, status, provider_message_id, response)
+        plus retry_after: the seconds to wait before trying again when the
+        gateway cannot have taken the message, else None. record is None when
+        nothing was sent (bad input, missing settings, cancelled).
+        """
+        settings = self.settings(db_path)
+        if not normalize_phone_number(recipient, settings.get('sms_default_country_code', '94')):
+            return False, 'A valid recipient phone number is required.', None, None
+        message_text, data, (record,) = self.deliver_many(
+            [recipient], message, db_path=db_path, attempts=attempts, limiter=limiter, cancelled=cancelled,
+        )
+        return bool(record and record['status'] == 'sent'), message_text, data, record
+
+    def deliver_many(self, recipients, message, *, db_path=None, attempts=1, limiter=None, cancelled=None):
+        """POST one SMS text to several recipients in a single Text.lk request; returns (message_text, data, records).
+
+        Text.lk takes a comma-separated recipient list, so a batch of identical
+        messages costs one request (and one rate-limit token) instead of one
+        per number. records line up with recipients and have the shape of
+        deliver()'s record; a number the gateway reports back as rejected is
+        failed on its own, otherwise every number gets the request's outcome.
+        A number that does not normalise is failed without being sent. Every
+        record is None when nothing was sent (missing settings, empty message,
+        cancelled). Retries, limiter and cancelled work as in deliver().
+        """
+        settings = self.settings(db_path)
+        sender_id = (settings.get('sms_sender_id') or '').strip()
+        token = (settings.get('sms_gateway_token') or '').strip()
+        url = (settings.get('sms_gateway_base_url') or TEXTLK_DEFAULT_URL).strip() or TEXTLK_DEFAULT_URL
+        country_code = settings.get('sms_default_country_code', '94')
+        text = str(message or '').strip()
+        numbers = [normalize_phone_number(recipient, country_code) for recipient in recipients]
+        unsent = [None] * len(numbers)
+
+        if not token:
+            return 'SMS gateway token is not configured.', None, unsent
+        if not sender_id:
+            return 'SMS sender ID is not configured.', None, unsent
+        if not text:
+            return 'SMS message cannot be empty.', None, unsent
+
+        valid = [number for number in numbers if number]
+        records = []
+        for recipient, number in zip(recipients, numbers):
+            record = {'recipient': number or str(recipient or ''), 'recipients': ','.join(valid),
+                      'message': text, 'retry_after': None}
+            if not number:
+                record.update(recipients=record['recipient'], status='failed', provider_message_id='',
+                              response={'error': 'A valid recipient phone number is required.'})
+            records.append(record)
+        if not valid:
+            return 'A valid recipient phone number is required.', None, records
+
+        payload = {
+            'recipient': ','.join(valid),
+            'sender_id': sender_id,
+            'type': 'plain',
+            'message': text,
+        }
+        headers = {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+        }
+        pending = [record for record, number in zip(records, numbers) if number]
+
+        attempt = 0
+        try:
+            response = None
+            for attempt in range(max(1, attempts)):
+                if limiter is not None and not limiter.acquire(cancelled):
+                    return 'SMS sending cancelled.', None, unsent
+                try:
+                    response = self.session.post(url, json=payload, headers=headers, timeout=25)
+                except requests.RequestException as exc:
+                    if (attempt + 1 >= attempts or not _never_reached_gateway(exc)
+                            or _backoff(_retry_delay(None, attempt), cancelled)):
+                        raise
+                    continue
+                if response.status_code not in _RETRY_STATUSES or attempt + 1 >= attempts:
+                    break
+                delay = _retry_delay(response, attempt)
+                if response.status_code == 429 and limiter is not None:
+                    # The next acquire() waits out the pause, for every worker.
+                    limiter.defer(delay)
+                elif _backoff(delay, cancelled):
+                    break
+
+            try:
+                data = response.json()
+            except Exception:
+                data = {'status': response.ok, 'message': response.text}
+
+            ok = bool(response.ok and data.get('status', True))
+            message_text = data.get('message') or ('SMS sent successfully.' if ok else 'SMS sending failed.')
+            provider_message_id = ''
+            if isinstance(data.get('data'), dict):
+                provider_message_id = str(data['data'].get('sms_id', '') or '')
+            per_recipient = _recipient_outcomes(data) if response.ok else {}
+            retry_after = _retry_delay(response, attempt) if response.status_code in _RETRY_STATUSES else None
+            for record in pending:
+                outcome = per_recipient.get(record['recipient'])
+                if outcome is None:
+                    record.update(status='sent' if ok else 'failed', provider_message_id=provider_message_id,
+                                  response=data, retry_after=retry_after)
+                else:
+                    status, item_id, item = outcome
+                    record.update(status=status, provider_message_id=item_id or provider_message_id,
+                                  response={'status': data.get('status'), 'message': data.get('message'), 'data': item})
+                    if status == 'failed':
+                        record['response']['error'] = item.get('message') or f"Gateway reported {item.get('status')!r}."
+            return message_text, data, records
+        except Exception as exc:
+            retry_after = None
+            if isinstance(exc, requests.RequestException) and _never_reached_gateway(exc):
+                retry_after = _retry_delay(None, attempt)
+            for record in pending:
+                record.update(status='failed', provider_message_id='', response={'error': str(exc)},
+                              retry_after=retry_after)
+            return f'Unable to send SMS: {exc}', None, records
+
+    def send(self, recipient, message, *, customer=None, loan=None, category='custom', sent_by=None,
+             db_path=None, attempts=1, limiter=None, cancelled=None):
+        """Send one SMS now through deliver() and log the outcome to sms_messages."""
+        ok, message_text, data, record = self.deliver(
+            recipient, message, db_path=db_path, attempts=attempts, limiter=limiter, cancelled=cancelled,
+        )
+        if record is not None:
+            record = {key: value for key, value in record.items() if key != 'retry_after'}
+            log_sms_message(
+                category=category,
+                provider='text.lk',
+                customer_id=(customer or {}).get('id'),
+                loan_id=(loan or {}).get('id'),
+                sent_by=sent_by,
+                db_path=db_path,
+                **record,
+            )
+        return ok, message_text, data
 
-    recipient = normalize_phone_number(recipient, settings.get('sms_default_country_code', '94'))
-    if not recipient:
-        return False, 'A valid recipient phone number is required.', None
 
-    if not token:
-        return False, 'SMS gateway token is not configured.', None
-    if not sender_id:
-        return False, 'SMS sender ID is not configured.', None
+_gateway_client = None
+_gateway_client_lock = threading.Lock()
 
-    payload = {
-        'recipient': recipient,
-        'sender_id': sender_id,
-        'type': 'plain',
-        'message': str(message or '').strip(),
-    }
 
-    if not payload['message']:
-        return False, 'SMS message cannot be empty.', None
+def get_gateway_client():
+    """The process-wide SmsGatewayClient, created on first use."""
+    global _gateway_client
+    with _gateway_client_lock:
+        if _gateway_client is None:
+            _gateway_client = SmsGatewayClient()
+        return _gateway_client
 
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-    }
 
-    try:
-        response = requests.post(url, json=payload, headers=headers, timeout=25)
-        try:
-            data = response.json()
-        except Exception:
-            data = {'status': response.ok, 'message': response.text}
-
-        ok = bool(response.ok and data.get('status', True))
-        message_text = data.get('message') or ('SMS sent successfully.' if ok else 'SMS sending failed.')
-        provider_message_id = ''
-        if isinstance(data.get('data'), dict):
-            provider_message_id = str(data['data'].get('sms_id', '') or '')
-
-        log_sms_message(
-            recipient=recipient,
-            recipients=recipient,
-            message=payload['message'],
-            category=category,
-            status='sent' if ok else 'failed',
-            provider='text.lk',
-            provider_message_id=provider_message_id,
-            response=data,
-            customer_id=(customer or {}).get('id'),
-            loan_id=(loan or {}).get('id'),
-            sent_by=sent_by,
-            db_path=db_path,
-        )
-        return ok, message_text, data
-    except Exception as exc:
-        log_sms_message(
-            recipient=recipient,
-            recipients=recipient,
-            message=payload['message'],
-            category=category,
-            status='failed',
-            provider='text.lk',
-            provider_message_id='',
-            response={'error': str(exc)},
-            customer_id=(customer or {}).get('id'),
-            loan_id=(loan or {}).get('id'),
-            sent_by=sent_by,
-            db_path=db_path,
-        )
-        return False, f'Unable to send SMS: {exc}', None
+def invalidate_sms_settings():
+    """Drop the cached SMS settings; call after saving any sms_* setting."""
+    get_gateway_client().invalidate()
+
+
+def send_sms(recipient, message, *, customer=None, loan=None, category='custom', sent_by=None, db_path=None,
+             attempts=1, limiter=None, cancelled=None):
+    """Send one SMS through the shared gateway client; see SmsGatewayClient.send()."""
+    return get_gateway_client().send(
+        recipient, message, customer=customer, loan=loan, category=category, sent_by=sent_by,
+        db_path=db_path, attempts=attempts, limiter=limiter, cancelled=cancelled,
+    )
 
 
 def send_sms_to_customer(customer_id, message, *, category='custom', sent_by=None, db_path=None):
@@ -277,4 +550,275 @@ def send_sms_to_loan(loan_id, message, *, category='order_status', sent_by=None,
         'marital_status': loan.get('customer_marital_status', ''),
         'language': loan.get('customer_language', ''),
     }
-    return send_sms(loan.get('customer_phone', ''), message, customer=customer, loan=loan, category=category, sent_by=sent_by, db_path=db_path)
\ No newline at end of file
+    return send_sms(loan.get('customer_phone', ''), message, customer=customer, loan=loan, category=category, sent_by=sent_by, db_path=db_path)
+
+
+# ── Rate limit ──
+# One TokenBucket is shared by every worker of the outbox sender below, so
+# together they stay under the gateway's rate limit; a 429 pauses the whole
+# bucket.
+
+
+class TokenBucket:
+    """Thread-safe token bucket: rate tokens per second, at most capacity saved up."""
+
+    def __init__(self, rate=TEXTLK_RATE_PER_SECOND, capacity=TEXTLK_RATE_BURST):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, cancelled=None):
+        """Take one token, waiting as needed; False if cancelled is set first."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return True
+                    wait = (1 - self._tokens) / self.rate
+                else:
+                    wait = self._paused_until - now
+            if cancelled is not None:
+                if cancelled.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+    def defer(self, seconds):
+        """Hand out no tokens for the next seconds (the gateway said 429) and drop the saved burst."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._updated = self._paused_until
+            self._tokens = 0.0
+
+
+# ── Outbox ──
+# Every page queues its SMS in the sms_messages outbox (queue_sms /
+# queue_sms_jobs) and returns at once; one long-lived SmsOutboxSender thread
+# per process drains it. The sender claims only when one of its workers is
+# free, so at most `workers` requests are in flight. A claim takes the oldest
+# due message plus up to bulk_size - 1 others with the same text, which go out
+# as one multi-recipient request; a personalised template gives every
+# recipient its own text, so those still go one request each. Each claim
+# is atomic and leased (see the SMS outbox section of database.py): a slow
+# gateway, a second app instance or a crash can delay a message but never send
+# it twice.
+
+SMS_OUTBOX_POLL_SECONDS = 5.0
+# Claims per message: a message the gateway turned away unread (429, 503,
+# connect error) after its in-process retries goes back in the queue until then.
+SMS_OUTBOX_MAX_CLAIMS = 5
+SMS_LEASE_CHECK_SECONDS = 60.0
+
+
+def queue_sms(recipient, message, *, customer=None, loan=None, category='custom', sent_by=None,
+              idempotency_key=None, batch_id=None, not_before=None, db_path=None):
+    """Queue one SMS for the outbox sender; returns (ok, message_text, sms_id).
+
+    sms_id is None when idempotency_key was queued before (ok stays True).
+    """
+    settings = get_gateway_client().settings(db_path)
+    recipient = normalize_phone_number(recipient, settings.get('sms_default_country_code', '94'))
+    message = str(message or '').strip()
+    if not recipient:
+        return False, 'A valid recipient phone number is required.', None
+    if not message:
+        return False, 'SMS message cannot be empty.', None
+    sms_id = enqueue_sms(
+        recipient, message, category=category, customer_id=(customer or {}).get('id'),
+        loan_id=(loan or {}).get('id'), sent_by=sent_by, idempotency_key=idempotency_key,
+        batch_id=batch_id, not_before=not_before, db_path=db_path,
+    )
+    wake_sms_sender()
+    return True, 'SMS queued.' if sms_id else 'SMS already queued.', sms_id
+
+
+def resend_sms(sms_id, *, sent_by=None, db_path=None):
+    """Queue a failed SMS again on its own row; returns (ok, message_text)."""
+    if not requeue_sms_message(sms_id, sent_by=sent_by, db_path=db_path):
+        return False, 'Only a failed SMS can be resent.'
+    wake_sms_sender()
+    return True, 'SMS queued again.'
+
+
+def queue_sms_jobs(jobs, *, batch_id=None, db_path=None):
+    """Render and queue many SMS in one transaction; returns (queued, rejected).
+
+    Each job is a dict with recipient plus either message or template, and
+    optionally customer, loan, category, sent_by and idempotency_key.
+    rejected lists (index, reason) for jobs that could not be queued.
+    Templates are rendered with one build_sms_contexts() call for the batch.
+    """
+    jobs = list(jobs)
+    country_code = get_gateway_client().settings(db_path).get('sms_default_country_code', '94')
+    templated = [job for job in jobs if job.get('message') is None]
+    contexts = iter(build_sms_contexts(
+        [(job.get('customer'), job.get('loan')) for job in templated], db_path=db_path,
+    ))
+    entries, rejected = [], []
+    for index, job in enumerate(jobs):
+        customer = job.get('customer') or {}
+        loan = job.get('loan') or {}
+        message = job.get('message')
+        if message is None:
+            template = job.get('template', '')
+            context = next(contexts)
+            context['message'] = template
+            message = compile_template(str(template or '')).render(context)
+        recipient = normalize_phone_number(job.get('recipient', ''), country_code)
+        message = str(message or '').strip()
+        if not recipient:
+            rejected.append((index, 'A valid recipient phone number is required.'))
+        elif not message:
+            rejected.append((index, 'SMS message cannot be empty.'))
+        else:
+            entries.append({
+                'recipient': recipient, 'message': message, 'category': job.get('category', 'custom'),
+                'customer_id': customer.get('id'), 'loan_id': loan.get('id'), 'sent_by': job.get('sent_by'),
+                'idempotency_key': job.get('idempotency_key'), 'batch_id': batch_id,
+            })
+    queued = enqueue_sms_many(entries, db_path=db_path)
+    wake_sms_sender()
+    return queued, rejected
+
+
+class SmsOutboxSender:
+    """Single background thread delivering queued SMS from the outbox."""
+
+    def __init__(self, db_path=None, workers=SMS_DISPATCH_WORKERS, limiter=None, attempts=SMS_SEND_ATTEMPTS,
+                 lease_seconds=SMS_LEASE_SECONDS, poll_interval=SMS_OUTBOX_POLL_SECONDS, client=None,
+                 bulk_size=TEXTLK_BULK_SIZE):
+        self.db_path = db_path
+        self.workers = workers
+        self.bulk_size = bulk_size
+        self.limiter = limiter or TokenBucket()
+        self.attempts = attempts
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.client = client
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._slots = threading.BoundedSemaphore(workers)
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._pool = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return self
+        self._stopped.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sms-outbox')
+        self._thread = threading.Thread(target=self._run, name='sms-outbox-sender', daemon=True)
+        self._thread.start()
+        return self
+
+    def wake(self):
+        """Look for due messages now instead of at the next poll."""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        """Stop claiming and wait for in-flight sends; unsent claims go back to the queue."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._pool is not None:
+            self._pool.shutdown(wait=timeout is None)
+
+    def _run(self):
+        client = self.client or get_gateway_client()
+        next_lease_check = 0.0
+        while not self._stopped.is_set():
+            if time.monotonic() >= next_lease_check:
+                next_lease_check = time.monotonic() + SMS_LEASE_CHECK_SECONDS
+                try:
+                    expire_sms_leases(db_path=self.db_path)
+                except Exception as exc:
+                    print(f"SMS outbox: lease check failed: {exc}")
+            if not self._slots.acquire(timeout=self.poll_interval):
+                continue
+            # Cleared before the claim: a message queued after this point
+            # sets it again and cuts the idle wait below short.
+            self._wake.clear()
+            rows = []
+            try:
+                if not self._stopped.is_set():
+                    rows = claim_sms_messages(self.owner, self.bulk_size, self.lease_seconds, db_path=self.db_path)
+            except Exception as exc:
+                print(f"SMS outbox: claim failed: {exc}")
+            if not rows:
+                self._slots.release()
+                self._wake.wait(self.poll_interval)
+                continue
+            self._pool.submit(self._deliver, client, rows)
+
+    def _deliver(self, client, rows):
+        ids = [row['id'] for row in rows]
+        try:
+            text, _, records = client.deliver_many(
+                [row['recipient'] for row in rows], rows[0]['message'], db_path=self.db_path,
+                attempts=self.attempts, limiter=self.limiter, cancelled=self._stopped,
+            )
+            if all(record is None for record in records) and self._stopped.is_set():
+                release_sms_messages(ids, self.owner, db_path=self.db_path)
+                return
+            retry, retry_after, outcomes = [], 0.0, []
+            for row, record in zip(rows, records):
+                if record is None:
+                    record = {'status': 'failed', 'response': {'error': text}}
+                delay = record.pop('retry_after', None)
+                if delay is not None and row['attempts'] < SMS_OUTBOX_MAX_CLAIMS:
+                    retry.append(row['id'])
+                    retry_after = max(retry_after, delay)
+                else:
+                    outcomes.append((row['id'], record))
+            if retry:
+                release_sms_messages(retry, self.owner, delay_seconds=retry_after, db_path=self.db_path)
+            finish_sms_messages(self.owner, outcomes, db_path=self.db_path)
+        except Exception as exc:
+            print(f"SMS outbox: messages {ids} failed: {exc}")
+            try:
+                finish_sms_messages(self.owner, [(sms_id, {'status': 'failed', 'response': {'error': str(exc)}})
+                                                 for sms_id in ids], db_path=self.db_path)
+            except Exception:
+                # The lease check fails them later.
+                pass
+        finally:
+            self._slots.release()
+
+
+_outbox_sender = None
+_outbox_sender_lock = threading.Lock()
+
+
+def start_sms_sender(db_path=None, **options):
+    """Start the process-wide SmsOutboxSender (once); returns it."""
+    global _outbox_sender
+    with _outbox_sender_lock:
+        if _outbox_sender is None:
+            _outbox_sender = SmsOutboxSender(db_path=db_path, **options)
+        return _outbox_sender.start()
+
+
+def wake_sms_sender():
+    sender = _outbox_sender
+    if sender is not None:
+        sender.wake()
+
+
+def stop_sms_sender(timeout=5.0):
+    global _outbox_sender
+    with _outbox_sender_lock:
+        sender, _outbox_sender = _outbox_sender, None
+    if sender is not None:
+        sender.stop(timeout)
@@ -3,6 +3,7 @@
 import tkinter as tk
 import tkinter.font as tkfont
 from dataclasses import dataclass
+from tkinter import ttk
 import math
 
 
@@ -160,6 +161,9 @@ class AppTheme:
             highlightthickness=0,
         )
 
+    def make_data_grid(self, parent, columns, rows=(), **kwargs):
+        return DataGrid(parent, theme=self, columns=columns, rows=rows, **kwargs)
+
 
 GOLD_THEME = AppTheme()
 
@@ -545,3 +549,390 @@ class RoundedCombobox(tk.Frame):
             self.arrow.config(cursor=cursor)
 
     configure = config
+
+
+def _grid_sort_key(value):
+    """Sort formatted cells by number when they look like one (Rs. 1,250.00, 12.5%, 3)."""
+    text = str(value if value is not None else '').strip()
+    number = text.replace('Rs.', '').replace(',', '').replace('%', '').strip()
+    try:
+        return (0, float(number), '')
+    except ValueError:
+        return (1, 0.0, text.casefold())
+
+
+class DataGrid(tk.Frame):
+    """Treeview-backed virtual table.
+
+    Only `height` Treeview items ever exist; scrolling refills them from the
+    row list, so showing 50 or 50,000 rows costs the same. Headings sort,
+    `on_open(record)` fires on a click in `link_column`, or on a
+    double-click anywhere in the row when `link_column` is None (a single
+    click then only selects), `row_color(record)` tints a row's text, and
+    `actions` adds a column of clickable labels:
+    [(label, callback(record), enabled(record) or None), ...].
+
+    For paged sources, pass has_more=True to set_rows()/append_rows() and an
+    `on_more()` callback; it is called when the view nears the last loaded
+    row and should append_rows() the next page.
+    """
+
+    def __init__(
+        self,
+        parent,
+        *,
+        theme,
+        columns,
+        rows=(),
+        records=None,
+        height=16,
+        on_open=None,
+        link_column=None,
+        row_color=None,
+        actions=(),
+        on_more=None,
+        empty_text='No records found.',
+    ):
+        super().__init__(parent, bg=parent['bg'], highlightthickness=0, bd=0)
+        self.theme = theme
+        self.on_open = on_open
+        self.link_column = link_column
+        self.row_color = row_color
+        self.on_more = on_more
+        self._has_more = False
+        self._more_pending = False
+        self._loading_all = False
+        self._color_tags = set()
+        self.actions = list(actions)
+        self.empty_text = empty_text
+        self._titles = [str(col[0]) for col in columns]
+        self._width_chars = [int(col[1]) for col in columns]
+        self._slots = max(1, int(height))
+        self._rows = []
+        self._records = []
+        self._order = []
+        self._offset = 0
+        self._selected = None
+        self._sort_column = None
+        self._sort_desc = False
+        self._sort_keys = {}
+
+        self._body_font = tkfont.Font(font=theme.fonts.body)
+        self._header_font = tkfont.Font(font=theme.fonts.body_bold)
+        self._ensure_style(theme, self._body_font)
+
+        self._keys = [f'c{idx}' for idx in range(len(self._titles))]
+        if self.actions:
+            self._keys.append('actions')
+        self.tree = ttk.Treeview(self, columns=self._keys, show='headings', height=self._slots,
+                                 style='Grid.Treeview', selectmode='browse')
+        for idx, key in enumerate(self._keys[:len(self._titles)]):
+            self.tree.heading(key, text=self._titles[idx], anchor='w', command=lambda c=idx: self.sort_by(c))
+        if self.actions:
+            self.tree.heading('actions', text='Actions', anchor='w')
+        self.tree.tag_configure('odd', background=theme.palette.bg_surface)
+        self.tree.tag_configure('even', background=theme.palette.bg_surface_alt)
+
+        self._vbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._yview)
+        self._hbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self._hbar.set)
+        self._vbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self._hbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self._items = [self.tree.insert('', tk.END, values=()) for _ in range(self._slots)]
+        self._empty_label = tk.Label(
+            self.tree,
+            text=empty_text,
+            font=theme.fonts.body,
+            bg=theme.palette.bg_surface,
+            fg=theme.palette.text_muted,
+        )
+
+        self.tree.bind('<ButtonRelease-1>', self._on_click)
+        self.tree.bind('<Double-1>', self._on_double_click)
+        self.tree.bind('<Return>', lambda _e: self._open(self._selected))
+        self.tree.bind('<Motion>', self._on_motion)
+        self.tree.bind('<MouseWheel>', lambda e: self._on_wheel(-1 if e.delta > 0 else 1))
+        self.tree.bind('<Button-4>', lambda _e: self._on_wheel(-1))
+        self.tree.bind('<Button-5>', lambda _e: self._on_wheel(1))
+        for key, step in (('<Up>', -1), ('<Down>', 1), ('<Prior>', -self._slots), ('<Next>', self._slots)):
+            self.tree.bind(key, lambda _e, n=step: self._move_selection(n))
+        self.tree.bind('<Home>', lambda _e: self._move_selection(-len(self._order)))
+        self.tree.bind('<End>', lambda _e: self._move_selection(len(self._order)))
+
+        self.set_rows(rows, records)
+
+    @staticmethod
+    def _ensure_style(theme, body_font):
+        style = ttk.Style()
+        style.configure('Grid.Treeview', font=theme.fonts.body, rowheight=body_font.metrics('linespace') + 10,
+                        background=theme.palette.bg_surface, fieldbackground=theme.palette.bg_surface,
+                        foreground=theme.palette.text_primary, borderwidth=0)
+        style.configure('Grid.Treeview.Heading', font=theme.fonts.body_bold,
+                        background=theme.palette.bg_surface_alt, foreground=theme.palette.text_muted)
+        style.map('Grid.Treeview', background=[('selected', theme.palette.accent)],
+                  foreground=[('selected', theme.palette.text_inverse)])
+
+    # ── Data ──
+
+    def set_rows(self, rows, records=None, has_more=False):
+        """Replace the table contents; keeps the current sort column."""
+        self._has_more = has_more
+        self._more_pending = False
+        self._rows = [list(row) for row in rows]
+        self._records = list(records) if records is not None else self._rows
+        self._sort_keys = {}
+        self._selected = None
+        self._offset = 0
+        self._size_columns()
+        if self._sort_column is not None:
+            self._load_all()
+        self._apply_sort()
+        if self._rows:
+            self._empty_label.place_forget()
+        else:
+            self._empty_label.place(relx=0.5, rely=0.5, anchor='center')
+
+    def append_rows(self, rows, records=None, has_more=False):
+        """Add rows at the end without disturbing the scroll position."""
+        self._has_more = has_more
+        self._more_pending = False
+        rows = [list(row) for row in rows]
+        start = len(self._rows)
+        self._rows.extend(rows)
+        if records is not None:
+            self._records.extend(records)
+        elif self._records is not self._rows:
+            self._records.extend(rows)
+        self._sort_keys = {}
+        if self._loading_all:
+            return
+        if self._sort_column is None:
+            self._order.extend(range(start, len(self._rows)))
+            self._refresh()
+        else:
+            self._apply_sort()
+        if self._rows:
+            self._empty_label.place_forget()
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def last_record(self):
+        """The last row in load order (the paging cursor), whatever the sort."""
+        return self._records[-1] if self._records else None
+
+    @property
+    def selected_record(self):
+        if self._selected is None:
+            return None
+        return self._records[self._selected]
+
+    def _size_columns(self):
+        sample = self._rows[:200]
+        for idx, key in enumerate(self._keys[:len(self._titles)]):
+            by_chars = self._body_font.measure('0') * self._width_chars[idx] + 20
+            by_header = self._header_font.measure(self._titles[idx]) + 28
+            by_content = 0
+            for row in sample:
+                text = str(row[idx] if idx < len(row) else '')[:200]
+                by_content = max(by_content, self._body_font.measure(text) + 20)
+            self.tree.column(key, width=max(72, by_chars, by_header, by_content), minwidth=40, stretch=False)
+        if self.actions:
+            text = '   '.join(label for label, _, _ in self.actions)
+            self.tree.column('actions', width=self._body_font.measure(text) + 24, minwidth=40, stretch=True)
+
+    # ── Sorting ──
+
+    def sort_by(self, column):
+        self._load_all()
+        if self._sort_column == column:
+            self._sort_desc = not self._sort_desc
+        else:
+            self._sort_column, self._sort_desc = column, False
+        self._offset = 0
+        self._apply_sort()
+
+    def _load_all(self):
+        # Sorting a partial result would be misleading; pull in the remaining pages first.
+        loaded = -1
+        self._loading_all = True
+        try:
+            while self._has_more and self.on_more is not None and len(self._rows) > loaded:
+                loaded = len(self._rows)
+                self.on_more()
+        finally:
+            self._loading_all = False
+
+    def _apply_sort(self):
+        column = self._sort_column
+        if column is None:
+            self._order = list(range(len(self._rows)))
+        else:
+            keys = self._sort_keys.get(column)
+            if keys is None:
+                keys = self._sort_keys[column] = [
+                    _grid_sort_key(row[column] if column < len(row) else '') for row in self._rows
+                ]
+            self._order = sorted(range(len(self._rows)), key=keys.__getitem__, reverse=self._sort_desc)
+        for idx, key in enumerate(self._keys[:len(self._titles)]):
+            arrow = (' ▼' if self._sort_desc else ' ▲') if idx == column else ''
+            self.tree.heading(key, text=self._titles[idx] + arrow)
+        self._refresh()
+
+    # ── Viewport ──
+
+    def _max_offset(self):
+        return max(0, len(self._order) - self._slots)
+
+    def _scroll_to(self, offset):
+        offset = max(0, min(int(offset), self._max_offset()))
+        if offset == self._offset:
+            return False
+        self._offset = offset
+        self._refresh()
+        return True
+
+    def _refresh(self):
+        self._offset = max(0, min(self._offset, self._max_offset()))
+        selected_item = None
+        for slot, item in enumerate(self._items):
+            pos = self._offset + slot
+            if pos >= len(self._order):
+                self.tree.item(item, values=(), tags=())
+                continue
+            index = self._order[pos]
+            values = list(self._rows[index])
+            values.extend([''] * (len(self._titles) - len(values)))
+            if self.actions:
+                values = values[:len(self._titles)] + [self._action_text(self._records[index])]
+            tags = ['even' if pos % 2 else 'odd']
+            color = self.row_color(self._records[index]) if self.row_color is not None else None
+            if color:
+                tags.append(self._color_tag(color))
+            self.tree.item(item, values=values, tags=tags)
+            if index == self._selected:
+                selected_item = item
+        if selected_item:
+            self.tree.selection_set(selected_item)
+        else:
+            self.tree.selection_set(())
+        total = len(self._order)
+        if total <= self._slots:
+            self._vbar.set(0.0, 1.0)
+        else:
+            self._vbar.set(self._offset / total, (self._offset + self._slots) / total)
+        if (self._has_more and self.on_more is not None and not self._more_pending
+                and self._offset + 2 * self._slots >= total):
+            self._more_pending = True
+            self.after_idle(self._load_more)
+
+    def _load_more(self):
+        if self._has_more and self._more_pending:
+            self.on_more()
+
+    def _color_tag(self, color):
+        tag = f'fg{color}'
+        if tag not in self._color_tags:
+            self.tree.tag_configure(tag, foreground=color)
+            self._color_tags.add(tag)
+        return tag
+
+    def _yview(self, *args):
+        if args and args[0] == 'moveto':
+            self._scroll_to(round(float(args[1]) * len(self._order)))
+        elif args and args[0] == 'scroll':
+            step = int(args[1]) * (self._slots if args[2] == 'pages' else 1)
+            self._scroll_to(self._offset + step)
+
+    def _on_wheel(self, direction):
+        # At either end, let the page underneath scroll instead.
+        if self._scroll_to(self._offset + direction * 3):
+            return 'break'
+        return None
+
+    def _move_selection(self, step):
+        if not self._order:
+            return 'break'
+        positions = {index: pos for pos, index in enumerate(self._order)} if self._selected is not None else {}
+        pos = positions.get(self._selected, self._offset - 1 if step > 0 else self._offset)
+        pos = max(0, min(pos + step, len(self._order) - 1))
+        self._selected = self._order[pos]
+        if pos < self._offset:
+            self._offset = pos
+        elif pos >= self._offset + self._slots:
+            self._offset = pos - self._slots + 1
+        self._refresh()
+        return 'break'
+
+    # ── Clicks ──
+
+    def _hit(self, event):
+        item = self.tree.identify_row(event.y)
+        if not item or item not in self._items:
+            return None, None
+        pos = self._offset + self._items.index(item)
+        if pos >= len(self._order):
+            return None, None
+        column = self.tree.identify_column(event.x)
+        return self._order[pos], int(column.lstrip('#') or 0) - 1
+
+    def _on_click(self, event):
+        if self.tree.identify_region(event.x, event.y) != 'cell':
+            return
+        index, column = self._hit(event)
+        if index is None:
+            return
+        self._selected = index
+        self._refresh()
+        if self.actions and column == len(self._titles):
+            self._run_action(index, event)
+        elif self.link_column is not None and column == self.link_column:
+            self._open(index)
+
+    def _on_double_click(self, event):
+        if self.link_column is not None:
+            return 'break'
+        index, column = self._hit(event)
+        if index is not None and not (self.actions and column == len(self._titles)):
+            self._open(index)
+        return 'break'
+
+    def _on_motion(self, event):
+        index, column = self._hit(event)
+        clickable = index is not None and (
+            (self.actions and column == len(self._titles))
+            or (self.on_open is not None and self.link_column is not None and column == self.link_column)
+        )
+        cursor = 'hand2' if clickable else ''
+        if str(self.tree.cget('cursor')) != cursor:
+            self.tree.configure(cursor=cursor)
+
+    def _open(self, index):
+        if index is not None and self.on_open is not None:
+            self.on_open(self._records[index])
+
+    def _enabled_actions(self, record):
+        return [(label, callback) for label, callback, enabled in self.actions
+                if enabled is None or enabled(record)]
+
+    def _action_text(self, record):
+        return '   '.join(label for label, _ in self._enabled_actions(record))
+
+    def _run_action(self, index, event):
+        record = self._records[index]
+        item = self.tree.identify_row(event.y)
+        bbox = self.tree.bbox(item, 'actions')
+        if not bbox:
+            return
+        x = event.x - bbox[0] - 4
+        gap = self._body_font.measure('   ')
+        right = 0
+        for label, callback in self._enabled_actions(record):
+            right += self._body_font.measure(label) + gap
+            if x < right - gap / 2:
+                callback(record)
+                return
+
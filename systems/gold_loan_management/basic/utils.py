@@ -2,7 +2,14 @@
 Gold Loan System - Utility Functions
 """
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
 
 
 def format_currency(amount):
@@ -65,16 +72,19 @@ def calculate_overdue_interest(principal, overdue_rate_monthly, overdue_days):
     return round(float(principal) * daily_rate / 100.0 * float(overdue_days), 2)
 
 
-def calculate_total_payable(loan_amount, interest_rate, duration_months, overdue_rate, expire_date_str, issue_date_str, max_interest_months=3):
+def calculate_total_payable(loan_amount, interest_rate, duration_months, overdue_rate, expire_date_str, issue_date_str, max_interest_months=3, as_of_date_str=None):
     """
     Calculate total amount payable for redemption using daily interest.
-    Normal interest is charged from issue date until today.
+    Normal interest is charged from issue date until today (or as_of_date_str).
     Once loan is overdue, overdue period uses full monthly rate: base_rate + overdue_rate.
     """
     try:
         issue = datetime.strptime(issue_date_str.split(' ')[0], '%Y-%m-%d')
         expire = datetime.strptime(expire_date_str.split(' ')[0], '%Y-%m-%d')
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        if as_of_date_str:
+            today = datetime.strptime(str(as_of_date_str).split(' ')[0], '%Y-%m-%d')
+        else:
+            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         
         # Days for normal interest (from issue until today)
         total_days = max(0, (today - issue).days)
@@ -135,6 +145,144 @@ def calculate_total_payable(loan_amount, interest_rate, duration_months, overdue
         }
 
 
+# ── Batch interest engine ──
+# calculate_total_payable() for a whole loan book at once: dates are parsed
+# once per distinct string and the arithmetic runs over arrays. Every value
+# matches the scalar function to the cent, including its fallback for loans
+# with unparseable dates or rates.
+
+_PAYABLE_FIELDS = ('interest', 'overdue_days', 'overdue_base_interest', 'overdue_penalty_interest',
+                   'overdue_interest', 'total', 'days_passed')
+
+
+def _day_number(value, cache):
+    """Day ordinal of a 'YYYY-MM-DD[ HH:MM:SS]' string, None where the scalar would fail."""
+    try:
+        return cache[value]
+    except KeyError:
+        pass
+    except TypeError:
+        return None
+    try:
+        day = value.split(' ')[0]
+        if len(day) == 10 and day[4] == '-' == day[7] and day.replace('-', '').isdigit():
+            result = date.fromisoformat(day).toordinal()
+        else:
+            result = datetime.strptime(day, '%Y-%m-%d').toordinal()
+    except (AttributeError, TypeError, ValueError):
+        result = None
+    cache[value] = result
+    return result
+
+
+def _rate_or_none(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _round_cents(values):
+    """np.round() twin of round(x, 2); values within a hair of a half cent defer to round()."""
+    scaled = values * 100.0
+    rounded = np.rint(scaled) / 100.0
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half):
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+
+def _payable_batch_python(amounts, rates, overdue_rates, issues, expires, as_of):
+    out = {field: [] for field in _PAYABLE_FIELDS}
+    interest_out, overdue_days_out = out['interest'], out['overdue_days']
+    base_out, penalty_out = out['overdue_base_interest'], out['overdue_penalty_interest']
+    overdue_out, total_out, days_out = out['overdue_interest'], out['total'], out['days_passed']
+    for amount, rate, overdue_rate, issue, expire in zip(amounts, rates, overdue_rates, issues, expires):
+        if issue is None or expire is None or rate is None or overdue_rate is None:
+            interest = base = penalty = overdue = 0.0
+            overdue_days = total_days = 0
+            total = amount
+        else:
+            total_days = max(0, as_of - issue)
+            overdue_days = max(0, as_of - expire)
+            daily = rate / 30.0 / 100.0
+            if overdue_days <= 0:
+                interest = round(amount * daily * total_days, 2)
+                base = penalty = overdue = 0.0
+            else:
+                interest = round(amount * daily * min(total_days, max(0, expire - issue)), 2)
+                base = round(amount * daily * overdue_days, 2)
+                penalty = round(amount * (overdue_rate / 30.0 / 100.0) * overdue_days, 2)
+                overdue = round(base + penalty, 2)
+            total = round(amount + interest + overdue, 2)
+        interest_out.append(interest)
+        overdue_days_out.append(overdue_days)
+        base_out.append(base)
+        penalty_out.append(penalty)
+        overdue_out.append(overdue)
+        total_out.append(total)
+        days_out.append(total_days)
+    return out
+
+
+def _payable_batch_numpy(amounts, rates, overdue_rates, issues, expires, as_of):
+    valid = np.array([i is not None and e is not None and r is not None and o is not None
+                      for i, e, r, o in zip(issues, expires, rates, overdue_rates)], dtype=bool)
+    amount = np.array(amounts, dtype=np.float64)
+    issue = np.array([as_of if d is None else d for d in issues], dtype=np.int64)
+    expire = np.array([as_of if d is None else d for d in expires], dtype=np.int64)
+    daily = np.array([0.0 if r is None else r for r in rates], dtype=np.float64) / 30.0 / 100.0
+    overdue_daily = np.array([0.0 if r is None else r for r in overdue_rates], dtype=np.float64) / 30.0 / 100.0
+
+    total_days = np.where(valid, np.maximum(0, as_of - issue), 0)
+    overdue_days = np.where(valid, np.maximum(0, as_of - expire), 0)
+    is_overdue = overdue_days > 0
+    interest_days = np.where(is_overdue, np.minimum(total_days, np.maximum(0, expire - issue)), total_days)
+
+    interest = _round_cents(amount * daily * interest_days)
+    base = np.where(is_overdue, _round_cents(amount * daily * overdue_days), 0.0)
+    penalty = np.where(is_overdue, _round_cents(amount * overdue_daily * overdue_days), 0.0)
+    overdue = np.where(is_overdue, _round_cents(base + penalty), 0.0)
+    total = np.where(valid, _round_cents(amount + interest + overdue), amount)
+    return {
+        'interest': interest.tolist(),
+        'overdue_days': overdue_days.tolist(),
+        'overdue_base_interest': base.tolist(),
+        'overdue_penalty_interest': penalty.tolist(),
+        'overdue_interest': overdue.tolist(),
+        'total': total.tolist(),
+        'days_passed': total_days.tolist(),
+    }
+
+
+def calculate_total_payable_batch(loan_amounts, interest_rates, overdue_rates, expire_dates, issue_dates,
+                                  as_of_date=None, use_numpy=None):
+    """
+    calculate_total_payable() over parallel per-loan sequences.
+    Returns a dict of lists keyed interest, overdue_days, overdue_base_interest,
+    overdue_penalty_interest, overdue_interest, total and days_passed.
+    as_of_date defaults to today; NumPy is used when installed unless use_numpy=False.
+    """
+    cache = {}
+    amounts = [float(a) for a in loan_amounts]
+    rates = [_rate_or_none(r) for r in interest_rates]
+    overdue = [_rate_or_none(r) for r in overdue_rates]
+    issues = [_day_number(d, cache) for d in issue_dates]
+    expires = [_day_number(d, cache) for d in expire_dates]
+    if as_of_date:
+        as_of = _day_number(str(as_of_date), cache)
+        if as_of is None:
+            raise ValueError(f'Invalid as-of date: {as_of_date!r}')
+    else:
+        as_of = date.today().toordinal()
+
+    if use_numpy is None:
+        use_numpy = NUMPY_AVAILABLE
+    if use_numpy and NUMPY_AVAILABLE and amounts:
+        return _payable_batch_numpy(amounts, rates, overdue, issues, expires, as_of)
+    return _payable_batch_python(amounts, rates, overdue, issues, expires, as_of)
+
+
 def get_expire_date(issue_date_str, months):
     """Calculate expire date from issue date + months."""
     try: